@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+記事（content/*.md）のフロントマター読み込みの共有モジュール
+
+read_frontmatter() は閉じ側の --- までしか読まないので、
+メタデータだけが必要な一括スキャンで本文の読み込みコストがかからない。
+本文が必要になった場合は record.body で遅延読み込みする。
+
+使い方:
+    from article_frontmatter import read_frontmatter, parse_frontmatter_text, split_frontmatter
+
+    record = read_frontmatter(path)
+    if record.content_id:
+        print(record.title, record.date, record.tags)
+        html = record.body  # ここで初めて本文を読む
+
+    # 内容を読み込み済みの場合
+    frontmatter_text, body = split_frontmatter(content)
+    fields = parse_frontmatter_text(frontmatter_text)
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+# 各行の「key: value」
+LINE_PATTERN = re.compile(r'^([A-Za-z_][\w-]*)\s*:\s*(.*?)\s*$')
+# 区切り線（---）
+DELIMITER_PATTERN = re.compile(r'^---[ \t]*\r?\n?$')
+# 内容全体からフロントマターを切り出す
+BLOCK_PATTERN = re.compile(r'\A---[ \t]*\r?\n(.*?)\r?\n---[ \t]*(?=\r?\n|\Z)', re.DOTALL)
+# 配列内のクォートされた要素
+QUOTED_ITEM_PATTERN = re.compile(r'"((?:[^"\\]|\\.)*)"|\'((?:[^\']|\'\')*)\'')
+# ダブルクォート文字列のエスケープ
+ESCAPE_PATTERN = re.compile(r'\\(.)')
+ESCAPES = {"n": "\n", "t": "\t", '"': '"', "\\": "\\"}
+
+FieldValue = Union[str, List[str]]
+
+
+def _unescape(value: str) -> str:
+    """ダブルクォート文字列のエスケープを戻す（\\" \\\\ \\n \\t）"""
+    return ESCAPE_PATTERN.sub(lambda m: ESCAPES.get(m.group(1), m.group(0)), value)
+
+
+def unquote(value: str, unescape: bool = True) -> str:
+    """
+    値の前後のクォートを1組だけ外す
+
+    Args:
+        value: frontmatterの生の値
+        unescape: ダブルクォート文字列のエスケープも戻すか
+    """
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        inner = value[1:-1]
+        return _unescape(inner) if unescape else inner
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        return value[1:-1].replace("''", "'")
+    return value
+
+
+def quote(value: str) -> str:
+    """ダブルクォート文字列にする（unquote() の逆。\\ " 改行をエスケープ）"""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def parse_list(value: str, unescape: bool = True) -> List[str]:
+    """["a", "b"] 形式の値をリストにする"""
+    inner = value.strip()[1:-1]
+    if not inner.strip():
+        return []
+    matches = QUOTED_ITEM_PATTERN.findall(inner)
+    if matches:
+        items = []
+        for double_quoted, single_quoted in matches:
+            if double_quoted:
+                items.append(_unescape(double_quoted) if unescape else double_quoted)
+            elif single_quoted:
+                items.append(single_quoted.replace("''", "'"))
+        return items
+    # クォートなしの配列
+    return [item.strip() for item in inner.split(",") if item.strip()]
+
+
+def parse_value(value: str, parse_arrays: bool = True, unescape: bool = True) -> FieldValue:
+    """frontmatterの生の値を文字列またはリストに変換"""
+    value = value.strip()
+    if parse_arrays and value.startswith("[") and value.endswith("]"):
+        return parse_list(value, unescape)
+    return unquote(value, unescape)
+
+
+def parse_frontmatter_text(frontmatter_text: str, parse_arrays: bool = True,
+                           unescape: bool = True) -> Dict[str, FieldValue]:
+    """
+    frontmatterのテキスト（---の内側）をdictに変換
+
+    Args:
+        frontmatter_text: ---の内側のテキスト
+        parse_arrays: [..] をリストにするか（Falseなら生の文字列のまま）
+        unescape: ダブルクォート文字列のエスケープを戻すか
+    """
+    fields = {}
+    for line in frontmatter_text.splitlines():
+        match = LINE_PATTERN.match(line)
+        if match:
+            fields[match.group(1)] = parse_value(match.group(2), parse_arrays, unescape)
+    return fields
+
+
+def split_frontmatter(content: str) -> Tuple[Optional[str], str]:
+    """
+    内容を (frontmatterのテキスト, 本文) に分割
+
+    フロントマターがない場合は (None, 内容) を返す。本文は閉じ側の --- の直後から。
+    """
+    match = BLOCK_PATTERN.match(content)
+    if not match:
+        return None, content
+    return match.group(1), content[match.end():]
+
+
+class FrontmatterRecord:
+    """1記事分のフロントマター。本文は body にアクセスしたときに読み込む"""
+
+    __slots__ = ("path", "fields", "has_frontmatter", "body_offset", "_body")
+
+    def __init__(self, path: Path, fields: Dict[str, FieldValue], has_frontmatter: bool, body_offset: int):
+        self.path = Path(path)
+        self.fields = fields
+        self.has_frontmatter = has_frontmatter
+        self.body_offset = body_offset
+        self._body = None
+
+    def get(self, key: str, default: FieldValue = "") -> FieldValue:
+        """フィールドの値を取得"""
+        return self.fields.get(key, default)
+
+    def _get_str(self, key: str) -> str:
+        value = self.fields.get(key, "")
+        return value if isinstance(value, str) else ", ".join(value)
+
+    def _get_list(self, key: str) -> List[str]:
+        value = self.fields.get(key, [])
+        if isinstance(value, list):
+            return value
+        return [value] if value else []
+
+    @property
+    def title(self) -> str:
+        return self._get_str("title")
+
+    @property
+    def date(self) -> str:
+        return self._get_str("date")
+
+    @property
+    def excerpt(self) -> str:
+        return self._get_str("excerpt")
+
+    @property
+    def image(self) -> str:
+        return self._get_str("image")
+
+    @property
+    def affiliate_link(self) -> str:
+        return self._get_str("affiliateLink")
+
+    @property
+    def content_id(self) -> str:
+        return self._get_str("contentId")
+
+    @property
+    def source(self) -> str:
+        return self._get_str("source")
+
+    @property
+    def tags(self) -> List[str]:
+        return self._get_list("tags")
+
+    @property
+    def genre(self) -> List[str]:
+        return self._get_list("genre")
+
+    @property
+    def body(self) -> str:
+        """本文（閉じ側の --- の直後から。初回アクセス時にだけ読み込む）"""
+        if self._body is None:
+            with open(self.path, "rb") as f:
+                f.seek(self.body_offset)
+                self._body = f.read().decode("utf-8")
+        return self._body
+
+    def __repr__(self) -> str:
+        return f"FrontmatterRecord({self.path.name!r}, {self.fields!r})"
+
+
+def read_frontmatter(path: Path, parse_arrays: bool = True, unescape: bool = True) -> FrontmatterRecord:
+    """
+    ファイルの先頭から閉じ側の --- までだけを読んでフロントマターを返す
+
+    フロントマターがない（または閉じていない）場合は fields が空のレコードを返す。
+    """
+    lines = []
+    offset = 0
+    with open(path, "rb") as f:
+        first_line = f.readline()
+        if DELIMITER_PATTERN.match(first_line.decode("utf-8")):
+            offset = len(first_line)
+            for raw_line in f:
+                line = raw_line.decode("utf-8")
+                if DELIMITER_PATTERN.match(line):
+                    # 閉じ側の --- の改行は本文側に残す（split_frontmatterと揃える）
+                    body_offset = offset + len(line.rstrip("\r\n").encode("utf-8"))
+                    fields = parse_frontmatter_text("".join(lines), parse_arrays, unescape)
+                    return FrontmatterRecord(path, fields, True, body_offset)
+                lines.append(line)
+                offset += len(raw_line)
+
+    return FrontmatterRecord(path, {}, False, 0)
+
+
+def extract_frontmatter(content: str) -> Tuple[Dict[str, str], str]:
+    """
+    内容を (frontmatter, 本文) に分割（フロントマターを組み立て直す修正スクリプト向け）
+
+    値は前後のクォートを1組外しただけの生の文字列（エスケープ・配列はそのまま）、
+    本文は前後の空白を除いたもの。フロントマターがない場合は ({}, 内容) を返す。
+    """
+    frontmatter_text, body = split_frontmatter(content)
+    if frontmatter_text is None:
+        return {}, content
+    return parse_frontmatter_text(frontmatter_text, parse_arrays=False, unescape=False), body.strip()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+記事をJSONで生成し、Markdownはローカルで組み立てるための共有モジュール
+
+Markdownの全文（フロントマター・アフィリエイトリンク・プレーヤー・画像タグ込み）を生成させると、
+出力トークンの大半がURLやHTMLの繰り返しになり、崩れたYAMLや誤った画像URLを fix_*.py で後から直す必要があった。
+JSONモードでは、見出し・抜粋・各セクションの本文・使うサンプル画像の番号だけを小さなスキーマで受け取り、
+リンク・画像・プレーヤーは各スクリプトが作品情報から組み立てる。
+
+使い方:
+    from article_json import json_generation_config, parse_article, is_valid_article
+
+    config = json_generation_config(GENERATION_CONFIG)
+    response = generate_content(model, prompt, generation_config=config,
+                                cache_if=lambda r: is_valid_article(r, section_count=5))
+    article = parse_article(response.text, section_count=5)
+    article["headline"], article["excerpt"], article["sections"], article["sample_images"]
+"""
+
+import re
+import json
+from typing import Any, Dict, List, Optional
+
+# 応答のスキーマ（response_schema）
+ARTICLE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "headline": {"type": "STRING", "description": "作品の魅力を一言で表す詩的な見出し"},
+        "excerpt": {"type": "STRING", "description": "記事の抜粋（80〜120文字）"},
+        "sections": {
+            "type": "ARRAY",
+            "description": "各セクションの本文（Markdown、見出しは含めない）",
+            "items": {"type": "STRING"},
+        },
+        "sample_images": {
+            "type": "ARRAY",
+            "description": "挿入するサンプル画像の番号",
+            "items": {"type": "INTEGER"},
+        },
+    },
+    "required": ["headline", "excerpt", "sections", "sample_images"],
+}
+
+# サンプル画像の番号の範囲と、指定がない・不正な場合に使う番号
+SAMPLE_IMAGE_COUNT = 10
+DEFAULT_SAMPLE_IMAGES = [1, 2, 3, 4, 5]
+
+# ```json ... ``` で囲まれて返ってきた場合
+CODE_FENCE_PATTERN = re.compile(r'\A\s*```(?:json)?\s*\n(.*?)\n\s*```\s*\Z', re.DOTALL)
+
+
+def json_generation_config(generation_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """generation_config にJSON出力の指定（response_mime_type・response_schema）を加える"""
+    config = dict(generation_config or {})
+    config["response_mime_type"] = "application/json"
+    config["response_schema"] = ARTICLE_SCHEMA
+    return config
+
+
+def _sample_images(value: Any, image_count: int) -> List[int]:
+    images = []
+    for index in value if isinstance(value, list) else []:
+        if isinstance(index, int) and 1 <= index <= image_count and index not in images:
+            images.append(index)
+    return images or list(DEFAULT_SAMPLE_IMAGES)
+
+
+def parse_article(text: str, section_count: Optional[int] = None,
+                  image_count: int = SAMPLE_IMAGE_COUNT) -> Dict[str, Any]:
+    """
+    JSONの応答を検証して {headline, excerpt, sections, sample_images} を返す
+
+    Args:
+        text: 応答の本文
+        section_count: セクション数（指定した場合は一致しなければエラー）
+        image_count: サンプル画像の番号の上限（範囲外・重複した番号は除く）
+
+    Raises:
+        ValueError: JSONとして読めない、必須の項目がない・空
+    """
+    match = CODE_FENCE_PATTERN.match(text)
+    if match:
+        text = match.group(1)
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSONの解析に失敗しました: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("JSONがオブジェクトではありません")
+
+    headline = data.get("headline")
+    excerpt = data.get("excerpt")
+    sections = data.get("sections")
+    if not isinstance(headline, str) or not headline.strip():
+        raise ValueError("headline がありません")
+    if not isinstance(excerpt, str) or not excerpt.strip():
+        raise ValueError("excerpt がありません")
+    if not isinstance(sections, list) or not all(isinstance(s, str) and s.strip() for s in sections):
+        raise ValueError("sections が文字列の配列ではありません")
+    if section_count is not None and len(sections) != section_count:
+        raise ValueError(f"sections が{len(sections)}件です（{section_count}件必要）")
+
+    return {
+        # 見出しに改行や # が含まれていても1行の見出しにする
+        "headline": " ".join(headline.split()).lstrip("#").strip(),
+        "excerpt": " ".join(excerpt.split()),
+        "sections": [s.strip() for s in sections],
+        "sample_images": _sample_images(data.get("sample_images"), image_count),
+    }
+
+
+def is_valid_article(response: Any, section_count: Optional[int] = None) -> bool:
+    """
+    JSONとして読める応答か（gemini_pool.generate_content() の cache_if に渡す）
+
+    section_count を指定した場合は、セクション数が違う応答もキャッシュしない（読み直しても毎回失敗するため）
+    """
+    try:
+        parse_article(response.text, section_count=section_count)
+    except (ValueError, AttributeError, IndexError):
+        return False
+    return True
+
+
+def attr(value: str) -> str:
+    """
+    HTML属性値のエスケープ（タイトルの " や < でタグが崩れないように）
+
+    アフィリエイトURLの & は既存の記事と同じくそのままにする
+    """
+    return value.replace('"', "&quot;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def affiliate_image(affiliate_url: str, image_url: str, alt: str) -> str:
+    """アフィリエイトリンクでラップした画像"""
+    return (f'<a href="{attr(affiliate_url)}" target="_blank" rel="sponsored noopener noreferrer">\n'
+            f'  <img src="{attr(image_url)}" alt="{attr(alt)}" />\n'
+            f'</a>')
+
+
+def affiliate_link(affiliate_url: str, label: str, class_name: str = "affiliate-link-inline") -> str:
+    """アフィリエイトリンクのボタン"""
+    return (f'<div className="{class_name}">\n'
+            f'  <a href="{attr(affiliate_url)}" target="_blank" rel="noopener noreferrer">{label}</a>\n'
+            f'</div>')
+
+
+def dmm_sample_image_url(content_id: str, index: int) -> str:
+    """DMMのサンプル画像（大）のURL"""
+    return f"https://pics.dmm.co.jp/digital/video/{content_id}/{content_id}jp-{index}.jpg"
+
+
+def dmm_player(content_id: str) -> str:
+    """DMMのサンプル動画プレーヤー"""
+    return ('<div style="width:100%; padding-top: 75%; position:relative; margin: 2rem 0;">'
+            '<iframe width="100%" height="100%" max-width="1280px" style="position: absolute; top: 0; left: 0;" '
+            f'src="https://www.dmm.co.jp/litevideo/-/part/=/affi_id=toshichan-002/cid={attr(content_id)}/size=1280_720/" '
+            'scrolling="no" frameborder="0" allowfullscreen></iframe></div>')
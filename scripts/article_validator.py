@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+保存前に記事（フロントマター込みのMarkdown）を検証・修復する共有モジュール
+
+生成した記事の崩れ（```yaml で囲まれたフロントマター、1行につながったフロントマター、エスケープされていない " 、
+文字列になった tags、[K1] などのプレースホルダー、誤った画像URL、Markdown形式のアフィリエイトリンク）は、
+これまで fix_yaml_escape.py・fix_mgs_yaml.py・fix_broken_mgs_articles*.py・fix_mgs_frontmatter.py などで
+記事全体を後から直していた。各スクリプトの save_article() で書き込む前に validate_article() を通し、
+直せるものはその場で直し、直せないもの（必須の項目がない・アフィリエイトリンクがない）は保存しない。
+check_before_save() は検証と既存記事との重複チェック（near_duplicates.py）をまとめて行い、保存しない場合は
+生成した本文を gemini_pool.py のキャッシュから消す（同じプロンプトの再実行で生成し直すため）。
+
+修復後のフロントマターは article_frontmatter.py で読み直し、値が変わらないこと（往復できること）を確かめる。
+
+使い方:
+    from article_validator import validate_article
+
+    full_content = validate_article(full_content, affiliate_url=affiliate_url, content_id=content_id)
+    if full_content is None:
+        return None  # 理由は表示済み
+
+    # 重複チェックとキャッシュの削除もまとめて行う場合
+    full_content = check_before_save(full_content, output_dir, filepath.stem, generated=content,
+                                     affiliate_url=affiliate_url, content_id=content_id)
+
+    # 例外で受け取る場合
+    from article_validator import ArticleRejected, repair_article
+    try:
+        content, fixes = repair_article(content, required=["title", "date", "contentId"])
+    except ArticleRejected as e:
+        print(e.problems)
+
+    # 既存の記事を検証する（--fix で直せる問題を直して上書き）
+    python3 scripts/article_validator.py content/2026-01-02-*.md
+"""
+
+import re
+import sys
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from article_frontmatter import BLOCK_PATTERN, LINE_PATTERN, parse_value, quote, split_frontmatter, unquote
+from near_duplicates import find_near_duplicate
+from gemini_pool import forget_response
+
+# 空でないことが必要な項目（各スクリプトで追加できる）
+REQUIRED_KEYS = ("title", "date")
+
+# フィルター回避のプレースホルダー（bulk_generate_articles.py などのプロンプトで指定しているもの）
+PLACEHOLDERS = {
+    "[K1]": "中出し",
+    "[K2]": "ベロチュー",
+    "[K3]": "ガチイキ",
+}
+PLACEHOLDER_PATTERN = re.compile(r'\[K\d+\]')
+
+# 記事全体が ```yaml / ```markdown で囲まれている
+FENCED_FRONTMATTER_PATTERN = re.compile(r'\A\s*```(?:ya?ml|markdown|md)?[ \t]*\r?\n(---[ \t]*\r?\n.*?\r?\n---[ \t]*)\r?\n\s*```[ \t]*\r?\n?',
+                                        re.DOTALL)
+OPENING_FENCE_PATTERN = re.compile(r'\A\s*```(?:ya?ml|markdown|md)?[ \t]*\r?\n(?=---)')
+TRAILING_FENCE_PATTERN = re.compile(r'\n```\s*\Z')
+# 1行につながったフロントマター（--- title: "..." date: "..." ... ---）
+INLINE_FRONTMATTER_PATTERN = re.compile(r'\A(?:---\s*)+(title:.*?)\s*---[ \t]*(?:\r?\n|\Z)', re.DOTALL)
+INLINE_FIELD_PATTERN = re.compile(r'([A-Za-z_][\w-]*):\s*("(?:[^"\\]|\\.)*"|\[[^\]]*\]|[^\s"\[]+)')
+# 正しくエスケープされたダブルクォート文字列
+QUOTED_PATTERN = re.compile(r'^"(?:[^"\\]|\\["\\nt])*"$')
+# クォートしなくてもよい値（数値・真偽値・日付・URLなど）
+PLAIN_PATTERN = re.compile(r'^(?:-?\d+(?:\.\d+)?|true|false|null|[^\s"\'\[\]{}#&*!|>%@`,][^"#]*?)$')
+# YAMLのブロック形式の配列の要素（  - "熟女"）
+BLOCK_ITEM_PATTERN = re.compile(r'^\s+-\s+(.*?)\s*$')
+
+# 画像・リンクのURLの正規化（誤ったホスト名・http・プロトコル省略）
+URL_FIXES = [
+    (re.compile(r'https?://\.mgstage\.com'), "https://www.mgstage.com"),
+    (re.compile(r'(?<![:\w])//(pics\.dmm\.co\.jp|image\.mgstage\.com|www\.mgstage\.com)'), r'https://\1'),
+    (re.compile(r'http://(pics\.dmm\.co\.jp|image\.mgstage\.com|www\.mgstage\.com|www\.dmm\.co\.jp)'), r'https://\1'),
+]
+# Markdown形式のアフィリエイトリンク（<div className="affiliate-link">[text](url)</div>）
+MARKDOWN_AFFILIATE_PATTERN = re.compile(r'<div className="(affiliate-link(?:-inline)?)">\s*\[([^\]]+)\]\(([^)]+)\)\s*</div>')
+
+
+class ArticleRejected(ValueError):
+    """直せない問題があるため保存しない（problems に理由の一覧）"""
+
+    def __init__(self, problems: List[str]):
+        super().__init__(" / ".join(problems))
+        self.problems = problems
+
+
+def _strip_fence(content: str, fixes: List[str]) -> str:
+    """```yaml で囲まれたフロントマター・記事全体を囲む ``` を外す"""
+    match = FENCED_FRONTMATTER_PATTERN.match(content)
+    if match:
+        content = match.group(1) + "\n" + content[match.end():]
+        fixes.append("フロントマターを囲む ``` を外しました")
+    else:
+        match = OPENING_FENCE_PATTERN.match(content)
+        if match is None:
+            return content
+        content = content[match.end():]
+        fixes.append("記事全体を囲む ``` を外しました")
+    return TRAILING_FENCE_PATTERN.sub("\n", content)
+
+
+def _repair_block(content: str, fixes: List[str]) -> str:
+    """重複した ---・欠けた先頭の ---・1行につながったフロントマターを直す"""
+    content = content.lstrip("\ufeff \t\r\n")
+    duplicated = re.match(r'---[ \t]*\n(?:\s*\n)*---[ \t]*\n\s*(?=title:)', content)
+    if duplicated:
+        content = "---\n" + content[duplicated.end():]
+        fixes.append("重複した --- を削除しました")
+    if content.startswith("title:"):
+        content = "---\n" + content
+        fixes.append("フロントマターの先頭の --- を補いました")
+    if BLOCK_PATTERN.match(content):
+        return content
+
+    match = INLINE_FRONTMATTER_PATTERN.match(content)
+    if match is None:
+        return content
+    lines = [f"{key}: {value}" for key, value in INLINE_FIELD_PATTERN.findall(match.group(1))]
+    if not lines:
+        return content
+    fixes.append("1行につながったフロントマターを行ごとに分けました")
+    return "---\n" + "\n".join(lines) + "\n---\n\n" + content[match.end():].lstrip()
+
+
+def _repair_value(key: str, value: str) -> Tuple[str, Optional[str]]:
+    """
+    値を読み直せる形にする
+
+    Returns:
+        (修復後の値, 修正内容 または None)
+    """
+    if not value:
+        return value, None
+    if value.startswith("[") or value.startswith("'"):
+        return value, None
+    if value.startswith('"'):
+        if QUOTED_PATTERN.match(value):
+            return value, None
+        # 裸の " や不正なエスケープ（fix_yaml_escape.py と同じ修正）
+        inner = value[1:-1] if len(value) >= 2 and value.endswith('"') else value[1:]
+        return quote(unquote(f'"{inner}"')), f"{key} のエスケープを直しました"
+    if PLAIN_PATTERN.match(value) and ": " not in value:
+        return value, None
+    return quote(value), f"{key} をクォートしました"
+
+
+def _repair_tags(key: str, value: str) -> Tuple[str, Optional[str]]:
+    """文字列として保存された配列（tags: "[\"a\", \"b\"]"）を配列に戻す（fix_mgs_yaml.py と同じ修正）"""
+    if key not in ("tags", "genre") or not value.startswith('"'):
+        return value, None
+    inner = unquote(value)
+    if inner.startswith("[") and inner.endswith("]"):
+        return inner, f"{key} を配列に戻しました"
+    return value, None
+
+
+def _repair_frontmatter(frontmatter_text: str, fixes: List[str], problems: List[str]) -> str:
+    """各行を読み直せる形にする（重複したキーは最初の値を使う）"""
+    lines: List[str] = []
+    seen = set()
+    list_key = None
+    list_items: List[str] = []
+
+    def flush_list():
+        nonlocal list_key
+        if list_key is None:
+            return
+        if list_items:
+            lines.append(f"{list_key}: [{', '.join(quote(unquote(item)) for item in list_items)}]")
+            fixes.append(f"{list_key} をブロック形式から [..] 形式にしました")
+        else:
+            lines.append(f"{list_key}:")
+        list_key = None
+        list_items.clear()
+
+    for line in frontmatter_text.splitlines():
+        item = BLOCK_ITEM_PATTERN.match(line)
+        if list_key is not None and item:
+            list_items.append(item.group(1))
+            continue
+        flush_list()
+        if not line.strip() or line.lstrip().startswith("#"):
+            lines.append(line)
+            continue
+        match = LINE_PATTERN.match(line)
+        if match is None:
+            problems.append(f"フロントマターに読めない行があります: {line.strip()[:40]}")
+            continue
+        key, value = match.group(1), match.group(2)
+        if key in seen:
+            fixes.append(f"重複した {key} を削除しました")
+            continue
+        seen.add(key)
+        if not value:
+            # 次の行から「  - 要素」が続く場合
+            list_key = key
+            continue
+        value, fix = _repair_tags(key, value)
+        if fix:
+            fixes.append(fix)
+        repaired, fix = _repair_value(key, value)
+        if fix:
+            fixes.append(fix)
+        lines.append(f"{key}: {repaired}")
+    flush_list()
+    return "\n".join(lines)
+
+
+def _check_round_trip(frontmatter_text: str, problems: List[str]) -> Dict[str, object]:
+    """各値を読み、書き戻して同じ値になるか確かめる"""
+    fields: Dict[str, object] = {}
+    for line in frontmatter_text.splitlines():
+        match = LINE_PATTERN.match(line)
+        if match is None:
+            continue
+        key, raw = match.group(1), match.group(2)
+        value = parse_value(raw)
+        fields[key] = value
+        if raw.startswith('"') and parse_value(quote(value) if isinstance(value, str) else raw) != value:
+            problems.append(f"{key} を読み直すと値が変わります")
+        if raw.startswith("[") and not raw.endswith("]"):
+            problems.append(f"{key} の配列が閉じていません")
+    return fields
+
+
+def _restore_placeholders(text: str) -> Tuple[str, int]:
+    count = 0
+    for placeholder, word in PLACEHOLDERS.items():
+        count += text.count(placeholder)
+        text = text.replace(placeholder, word)
+    return text, count
+
+
+def _normalize_urls(text: str, content_id: str = "") -> Tuple[str, int]:
+    """画像・リンクのURLを正規化（MGSのサンプル画像は cap_e_{番号}_{品番}.jpg にする）"""
+    count = 0
+    for pattern, replacement in URL_FIXES:
+        text, n = pattern.subn(replacement, text)
+        count += n
+    if content_id:
+        # pf_o2_348ntr-082-1.jpg / pf_348ntr-082-1.jpg → cap_e_1_348ntr-082.jpg（fix_mgs_sample_image_urls_correct.py と同じ）
+        cid = content_id.lower()
+        pattern = re.compile(rf'(https://image\.mgstage\.com/images/[^/\s"]+/[^/\s"]+/[^/\s"]+/)pf_(?:o2_)?{re.escape(cid)}-(\d+)\.jpg',
+                             re.IGNORECASE)
+        text, n = pattern.subn(lambda m: f"{m.group(1)}cap_e_{int(m.group(2))}_{cid}.jpg", text)
+        count += n
+    return text, count
+
+
+def repair_article(content: str, required: Iterable[str] = REQUIRED_KEYS, affiliate_url: str = "",
+                   content_id: str = "") -> Tuple[str, List[str]]:
+    """
+    記事を検証し、直せる問題を直す
+
+    Args:
+        content: フロントマター込みの記事
+        required: 空でないことが必要なフロントマターの項目
+        affiliate_url: 本文に含まれている必要があるアフィリエイトURL（省略した場合はフロントマターの affiliateLink）
+        content_id: 品番（フロントマターの contentId と一致する必要がある。MGSのサンプル画像URLの修正にも使う）
+
+    Returns:
+        (修復後の記事, 修正内容の一覧)
+
+    Raises:
+        ArticleRejected: 直せない問題がある
+    """
+    fixes: List[str] = []
+    problems: List[str] = []
+
+    content = content.replace("\r\n", "\n")
+    content = _strip_fence(content, fixes)
+    content = _repair_block(content, fixes)
+
+    frontmatter_text, body = split_frontmatter(content)
+    if frontmatter_text is None:
+        raise ArticleRejected(["フロントマター（--- で囲まれた部分）がありません"])
+
+    frontmatter_text = _repair_frontmatter(frontmatter_text, fixes, problems)
+
+    frontmatter_text, restored = _restore_placeholders(frontmatter_text)
+    body, restored_body = _restore_placeholders(body)
+    if restored + restored_body:
+        fixes.append(f"プレースホルダーを{restored + restored_body}箇所戻しました")
+    unknown = sorted(set(PLACEHOLDER_PATTERN.findall(frontmatter_text + body)))
+    if unknown:
+        problems.append(f"戻し方のわからないプレースホルダーがあります: {' '.join(unknown)}")
+
+    fields = _check_round_trip(frontmatter_text, problems)
+    content_id = content_id or str(fields.get("contentId", ""))
+    frontmatter_text, fixed_urls = _normalize_urls(frontmatter_text, content_id)
+    body, fixed_body_urls = _normalize_urls(body, content_id)
+    if fixed_urls + fixed_body_urls:
+        fixes.append(f"画像・リンクのURLを{fixed_urls + fixed_body_urls}箇所直しました")
+
+    body, converted = MARKDOWN_AFFILIATE_PATTERN.subn(
+        r'<div className="\1">\n  <a href="\3" target="_blank" rel="noopener noreferrer">\2</a>\n</div>', body)
+    if converted:
+        fixes.append(f"Markdown形式のアフィリエイトリンクを{converted}箇所 <a> タグにしました")
+
+    fields = _check_round_trip(frontmatter_text, [])
+    missing = [key for key in required if not fields.get(key)]
+    if missing:
+        problems.append(f"フロントマターに {', '.join(missing)} がありません")
+    if content_id and fields.get("contentId") and fields["contentId"] != content_id:
+        problems.append(f"contentId が {fields['contentId']!r} です（{content_id!r} のはず）")
+
+    affiliate_url = affiliate_url or str(fields.get("affiliateLink", ""))
+    if affiliate_url and affiliate_url not in body and affiliate_url.replace("&", "&amp;") not in body:
+        problems.append("本文にアフィリエイトリンクがありません")
+    if not body.strip():
+        problems.append("本文がありません")
+
+    if problems:
+        raise ArticleRejected(problems)
+    return "---\n" + frontmatter_text + "\n---" + body, fixes
+
+
+def validate_article(content: str, required: Iterable[str] = REQUIRED_KEYS, affiliate_url: str = "",
+                     content_id: str = "") -> Optional[str]:
+    """
+    save_article() 用: repair_article() の結果を表示し、保存する内容（保存しない場合はNone）を返す
+    """
+    try:
+        content, fixes = repair_article(content, required, affiliate_url, content_id)
+    except ArticleRejected as e:
+        print(f"❌ 記事の検証に失敗したため保存しません: {e}", file=sys.stderr)
+        return None
+    if fixes:
+        print(f"🔧 保存前に修正しました: {' / '.join(fixes)}")
+    return content
+
+
+def check_before_save(content: str, output_dir: Path, exclude: str, generated: Optional[str] = None,
+                      required: Iterable[str] = REQUIRED_KEYS, affiliate_url: str = "",
+                      content_id: str = "") -> Optional[str]:
+    """
+    save_article() 用: validate_article() と既存記事との重複チェックを行い、保存する内容（保存しない場合はNone）を返す
+
+    保存しない場合は生成した本文（generated）をキャッシュから消す。消さないと同じプロンプトの再実行でも
+    同じ本文がキャッシュから返り、また保存できない（プロンプトファイルからの生成ではずっと変わらない）。
+
+    Args:
+        exclude: 重複チェックで除く記事（保存先のファイル名の stem）
+    """
+    checked = validate_article(content, required, affiliate_url, content_id)
+    if checked is not None:
+        duplicate = find_near_duplicate(checked, Path(output_dir), exclude=exclude)
+        if duplicate:
+            print(f"❌ 既存記事と酷似しているため保存しません: {duplicate[0]}（類似度 {duplicate[1]:.2f}）", file=sys.stderr)
+            checked = None
+    if checked is None:
+        forget_response(generated)
+    return checked
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="記事を検証し、直せる問題・直せない問題を表示（--fix で書き換え）")
+    parser.add_argument("paths", nargs="+", type=Path, help="記事のMarkdown")
+    parser.add_argument("--fix", action="store_true", help="直せる問題を直して上書きする")
+    args = parser.parse_args()
+
+    counts = {"ok": 0, "fixed": 0, "rejected": 0}
+    for path in args.paths:
+        content = path.read_text(encoding="utf-8")
+        try:
+            repaired, fixes = repair_article(content)
+        except ArticleRejected as e:
+            print(f"❌ {path.name}: {e}")
+            counts["rejected"] += 1
+            continue
+        if not fixes:
+            counts["ok"] += 1
+            continue
+        counts["fixed"] += 1
+        print(f"🔧 {path.name}: {' / '.join(fixes)}")
+        if args.fix:
+            path.write_text(repaired, encoding="utf-8")
+
+    print(f"\n📋 問題なし {counts['ok']}件 / 修正{'済み' if args.fix else 'できる'} {counts['fixed']}件 / "
+          f"直せない {counts['rejected']}件")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ works_list.txtから作品リストを読み込み、バリエーション豊富
 import os
 import json
 import sys
+import argparse
 import re
 import ssl
 import random
@@ -16,6 +17,12 @@ from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlencode, parse_qs, urlparse, unquote
 import google.generativeai as genai
+from near_duplicates import remember_article
+from article_validator import check_before_save
+from gemini_batch import BatchRequestWriter, batch_key, split_key, iter_batch_results
+from gemini_pool import generate_content
+from gemini_prefix import create_model
+from gemini_stream import StreamAborted, combine, frontmatter_check, length_check
 
 # .envファイルの読み込み
 try:
@@ -37,6 +44,33 @@ DMM_API_ID = os.environ.get("DMM_API_ID", "")
 DMM_AFFILIATE_ID = os.environ.get("DMM_AFFILIATE_ID", "")
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
 
+# safety_settingsを設定して、より寛容な設定にする
+SAFETY_SETTINGS = [
+    {
+        "category": genai.types.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
+        "threshold": genai.types.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    },
+    {
+        "category": genai.types.HarmCategory.HARM_CATEGORY_HARASSMENT,
+        "threshold": genai.types.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    },
+    {
+        "category": genai.types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
+        "threshold": genai.types.HarmBlockThreshold.BLOCK_ONLY_HIGH,
+    },
+    {
+        "category": genai.types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
+        "threshold": genai.types.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    },
+]
+
+# バッチ処理のリクエストのキー（"bulk_article:品番"）
+BATCH_KIND = "bulk_article"
+
+# ストリーミングで打ち切る基準（明らかに壊れた生成だけを対象にするので、プロンプトの2,000文字より緩い）
+MIN_ARTICLE_CHARS = 1000
+MAX_ARTICLE_CHARS = 20000
+
 # 既存の関数をインポート（同じディレクトリから）
 sys.path.insert(0, str(Path(__file__).parent))
 from generate_prompt_from_api import (
@@ -190,16 +224,111 @@ def get_random_structure() -> dict:
     return random.choice(structures)
 
 
+# 全作品で共通のプロンプト（前提・共通のスタイル指針・執筆ルール・注意事項）
+# ペルソナ・作品データ・記事の構成は作品ごとのプロンプト（generate_article_prompt）に入れる
+SYSTEM_INSTRUCTION = """# 重要：このプロンプトについて
+これは、エンターテインメント作品のレビュー記事を書くためのプロンプトです。
+作品の内容を分析し、読者に作品の魅力を伝えることを目的としています。
+レビュー記事として適切な表現を使用してください。
+
+# 共通のスタイル指針
+- スペック（画角、解像度、制作年）などの説明は一切不要。
+- 丁寧語、ライター気取りのきれいな言葉は全部ゴミ箱へ。
+- 「ｗ」「マジで」「ヤバい」などのカジュアルな表現を多用してください。
+- **重要：語尾のバリエーションを豊富に使ってください。「だわｗ」「だったわｗ」を毎回使わないでください。**
+  - 語尾の例：「〜だ」「〜だな」「〜だよ」「〜だろ」「〜だぜ」「〜だっけ」「〜だし」「〜だしな」
+  - 語尾の例：「〜だね」「〜だよね」「〜だなあ」「〜だっけ」「〜だし」
+  - 「だわｗ」「だったわｗ」は時々使う程度にしてください。
+
+# 執筆ルール
+1. **作品のあらすじ・紹介文をしっかり読んで、その内容に基づいて書く**: 
+   - 「紹介文」に書かれている具体的なシーンやシチュエーションを必ず反映してください。
+   - 紹介文から読み取れる内容を中心に、そのシーンの具体的な様子を描写してください。
+2. **シーンの描写**: 
+   - 作品に含まれるシーンを具体的に描写してください。変な比喩はいりません。
+3. **表現のバリエーション**: 
+   - 「抜けるわｗ」「やられたわｗ」などの表現を繰り返し使わないでください。
+   - 作品の内容に合わせて、様々な表現を使ってください。
+4. **主観のみで語る**: 
+   - 個人的な感想を最優先に書いてください。
+5. **表現の参考パターン（適宜使用）**: 
+   - 以下の表現パターンを参考に、適宜使えるところで使ってください。そのまま使うのではなく、作品の内容に合わせて自然に組み込んでください。
+   
+   **1. 「肌の白さ・質感」のユニークな喩え**
+   - 食材系（空腹時に効く）：「つきたての餅（もっちり感）」「高級食パンの白いところ（しっとり感）」「冷奴（ひややっこ）の断面（冷んやり感）」「湯上がりのゆで卵（ツルツル感）」「杏仁豆腐（プルプル感）」「特Aランクの炊きたて銀シャリ（ツヤ感）」
+   - 自然・無機物系（透明感・冷たさ）：「新潟の豪雪地帯の雪」「蛍光灯の直視できない眩しさ」「新品の陶器（ポーセリン）」「コピー用紙のような漂白された白」「流氷のような冷たい白」
+   
+   **2. 「季節・天気」に絡めた情緒的な表現**
+   - 春：「新入社員のスーツのような初々しさ」「花粉症の憂鬱も吹き飛ぶエロさ」「春一番のようにスカートをめくりたくなる衝動」
+   - 夏：「8月の湿気を含んだ、まとわりつくような肌」「クーラーの効いた部屋で食べるアイスのような背徳感」「甲子園のサイレンより激しい喘ぎ声」「夕立のように激しく、そして去っていく」
+   - 秋：「人肌恋しい季節に、心臓を直撃する温もり」「サンマより脂が乗っている」「読書の秋より、性欲の秋」
+   - 冬：「こたつの魔力のような、抜け出せない沼」「吐く息が白くなるような、低温火傷しそうな情熱」「クリスマスのイルミネーションより輝いてる」
+   
+   **3. 「地域・場所」に絡めた妄想**
+   - 北国（北海道・東北）：「北国のガードの固さが決壊する瞬間」「寒さで赤くなった頬と鼻先」
+   - 南国（沖縄・九州）：「日差しを跳ね返すような健康的な小麦色」「台風のような気圧の変化を感じる感情の起伏」
+   - 都会（東京・大阪）：「満員電車のストレスを発散するかのような乱れ方」「コンクリートジャングルの隙間に咲いた花」
+   - 田舎・実家：「畳の匂いが画面から漂ってきそうな昭和感」「夏休みに親戚の家で見てしまったような罪悪感」
+   
+   **4. 「平成ノスタルジー・時事ネタ」の喩え**
+   - ガジェット・技術：「ガラケーの着信ランプのような点滅する快感」「ダイヤルアップ接続のような、じらされる待機時間」「ブラウン管テレビの砂嵐のような荒々しさ」「MD（ミニディスク）に録音して永久保存したい声」
+   - 社会・トレンド：「バブル崩壊後のような虚無感と、そこからの再起」「就職氷河期よりも厳しい、女優のガード」「ノストラダムスの大予言より信憑性のあるエロさ」「たまごっちの世話より手間がかかるが、そこがいい」
+   
+   **5. 「社会人の悲哀」を絡めた自虐**
+   - 「ブラック企業の連勤明けに飲むビールのような染み渡り方」「有給休暇の前夜のような開放感」「上司の説教より長いが、聞いていられる喘ぎ声」「ボーナス支給日よりテンションが上がる」「税金で引かれる額を見た時のような衝撃」
+
+# 注意事項
+- **Frontmatterを含めた完全なMarkdownファイル**を出力してください。
+- アフィリエイトリンクは、記事の構成で指定した3箇所に必ず配置してください。
+- 完全タメ口で、熱量100%の文章で書いてください。
+- **最低2,000文字以上**の記事を書いてください。
+- **重要：フィルター回避のため、過激な表現は必ず [K1][K2][K3] 等のプレースホルダーを使用してください。**
+  - [K1] = 中出し
+  - [K2] = ベロチュー
+  - [K3] = ガチイキ
+  - その他の過激な表現も同様にプレースホルダーを使用すること
+- **重要：既存記事（参考例）と同じ文言・表現は使わないように、必ず表現を変えて書いてください。**
+- **重要：記事を書く際は、作品のタイトルや紹介文に含まれる過激な表現をそのまま使わず、必ずプレースホルダーに置き換えてください。**
+"""
+
+
+def create_system_instruction(example_articles: list[str] = None) -> str:
+    """
+    システムインストラクションを作成（既存記事の参考例も実行中は変わらないので共通部分に含める）
+    
+    Args:
+        example_articles: 既存記事のサンプル
+        
+    Returns:
+        gemini_prefix.create_model() に渡す共通部分
+    """
+    example_section = ""
+    if example_articles:
+        example_section = "\n# 参考例（既存の記事サンプル）\n"
+        example_section += "以下の既存記事を参考にして、**同じスタイル・トーンで書いてください**。\n"
+        example_section += "**重要：既存記事と同じ文言・表現は使わないように、必ず表現を変えて書いてください。**\n\n"
+        example_section += "**特に、以下のスタイルも参考にしてください（必須ではないが、選択肢の一つとして）：**\n"
+        example_section += "- 個人的な体験から入る（「深夜にDMMで作品を漁ってたんだけど」など）\n"
+        example_section += "- 思考プロセスをそのまま書く（「うん。これはヤバい。」など）\n"
+        example_section += "- 感情の表現（「思ったことそれは・・・」「なんちゅう清楚さだ！！！！！ 」など）\n"
+        example_section += "- 短いセンテンスでリズムを作る\n"
+        example_section += "- リアルな反応（「マジか・・・・」など）\n\n"
+        for i, article in enumerate(example_articles[:2], 1):
+            preview = article[:600] + "..." if len(article) > 600 else article
+            example_section += f"## 参考記事 {i}\n{preview}\n\n---\n\n"
+    
+    return SYSTEM_INSTRUCTION + example_section
+
+
 def generate_article_prompt(
     product_info: dict,
     input_url: str,
     memo: str,
     persona: dict,
-    structure: dict,
-    example_articles: list[str] = None
+    structure: dict
 ) -> str:
     """
-    記事生成用のプロンプトを作成（バリエーション対応）
+    記事生成用のプロンプトを作成（バリエーション対応、作品ごとの部分のみ）
     
     Args:
         product_info: 作品情報
@@ -207,10 +336,9 @@ def generate_article_prompt(
         memo: ユーザーメモ
         persona: ペルソナ情報
         structure: 構成情報
-        example_articles: 既存記事のサンプル
         
     Returns:
-        プロンプト文字列
+        プロンプト文字列（共通部分は create_system_instruction() で作る）
     """
     title = product_info.get("title", "")
     description = product_info.get("description", "")
@@ -332,22 +460,6 @@ def generate_article_prompt(
         tags = tags[:8]
     tags_str = ", ".join(tags)
     
-    # 既存記事の参考例セクション
-    example_section = ""
-    if example_articles:
-        example_section = "\n# 参考例（既存の記事サンプル）\n"
-        example_section += "以下の既存記事を参考にして、**同じスタイル・トーンで書いてください**。\n"
-        example_section += "**重要：既存記事と同じ文言・表現は使わないように、必ず表現を変えて書いてください。**\n\n"
-        example_section += "**特に、以下のスタイルも参考にしてください（必須ではないが、選択肢の一つとして）：**\n"
-        example_section += "- 個人的な体験から入る（「深夜にDMMで作品を漁ってたんだけど」など）\n"
-        example_section += "- 思考プロセスをそのまま書く（「うん。これはヤバい。」など）\n"
-        example_section += "- 感情の表現（「思ったことそれは・・・」「なんちゅう清楚さだ！！！！！ 」など）\n"
-        example_section += "- 短いセンテンスでリズムを作る\n"
-        example_section += "- リアルな反応（「マジか・・・・」など）\n\n"
-        for i, article in enumerate(example_articles[:2], 1):
-            preview = article[:600] + "..." if len(article) > 600 else article
-            example_section += f"## 参考記事 {i}\n{preview}\n\n---\n\n"
-    
     # ユーザーメモセクション（過激な表現を控えめに変換）
     memo_section = ""
     if memo:
@@ -396,25 +508,11 @@ def generate_article_prompt(
         safe_description = safe_description.replace(old, new)
         safe_keywords = safe_keywords.replace(old, new)
     
-    prompt = f"""# 重要：このプロンプトについて
-これは、エンターテインメント作品のレビュー記事を書くためのプロンプトです。
-作品の内容を分析し、読者に作品の魅力を伝えることを目的としています。
-レビュー記事として適切な表現を使用してください。
-
-# Role
+    prompt = f"""# Role
 {persona["role"]}
 
 # スタイル指針
 {persona["style"]}
-- スペック（画角、解像度、制作年）などの説明は一切不要。
-- 丁寧語、ライター気取りのきれいな言葉は全部ゴミ箱へ。
-- 「ｗ」「マジで」「ヤバい」などのカジュアルな表現を多用してください。
-- **重要：語尾のバリエーションを豊富に使ってください。「だわｗ」「だったわｗ」を毎回使わないでください。**
-  - 語尾の例：「〜だ」「〜だな」「〜だよ」「〜だろ」「〜だぜ」「〜だっけ」「〜だし」「〜だしな」
-  - 語尾の例：「〜だね」「〜だよね」「〜だなあ」「〜だっけ」「〜だし」
-  - 「だわｗ」「だったわｗ」は時々使う程度にしてください。
-
-{example_section}
 
 # 作品データ
 - 作品名： {safe_title}
@@ -435,43 +533,6 @@ def generate_article_prompt(
 
 {memo_section}
 
-# 執筆ルール
-1. **作品のあらすじ・紹介文をしっかり読んで、その内容に基づいて書く**: 
-   - 「紹介文」に書かれている具体的なシーンやシチュエーションを必ず反映してください。
-   - 紹介文から読み取れる内容を中心に、そのシーンの具体的な様子を描写してください。
-2. **シーンの描写**: 
-   - 作品に含まれるシーンを具体的に描写してください。変な比喩はいりません。
-3. **表現のバリエーション**: 
-   - 「抜けるわｗ」「やられたわｗ」などの表現を繰り返し使わないでください。
-   - 作品の内容に合わせて、様々な表現を使ってください。
-4. **主観のみで語る**: 
-   - 個人的な感想を最優先に書いてください。
-5. **表現の参考パターン（適宜使用）**: 
-   - 以下の表現パターンを参考に、適宜使えるところで使ってください。そのまま使うのではなく、作品の内容に合わせて自然に組み込んでください。
-   
-   **1. 「肌の白さ・質感」のユニークな喩え**
-   - 食材系（空腹時に効く）：「つきたての餅（もっちり感）」「高級食パンの白いところ（しっとり感）」「冷奴（ひややっこ）の断面（冷んやり感）」「湯上がりのゆで卵（ツルツル感）」「杏仁豆腐（プルプル感）」「特Aランクの炊きたて銀シャリ（ツヤ感）」
-   - 自然・無機物系（透明感・冷たさ）：「新潟の豪雪地帯の雪」「蛍光灯の直視できない眩しさ」「新品の陶器（ポーセリン）」「コピー用紙のような漂白された白」「流氷のような冷たい白」
-   
-   **2. 「季節・天気」に絡めた情緒的な表現**
-   - 春：「新入社員のスーツのような初々しさ」「花粉症の憂鬱も吹き飛ぶエロさ」「春一番のようにスカートをめくりたくなる衝動」
-   - 夏：「8月の湿気を含んだ、まとわりつくような肌」「クーラーの効いた部屋で食べるアイスのような背徳感」「甲子園のサイレンより激しい喘ぎ声」「夕立のように激しく、そして去っていく」
-   - 秋：「人肌恋しい季節に、心臓を直撃する温もり」「サンマより脂が乗っている」「読書の秋より、性欲の秋」
-   - 冬：「こたつの魔力のような、抜け出せない沼」「吐く息が白くなるような、低温火傷しそうな情熱」「クリスマスのイルミネーションより輝いてる」
-   
-   **3. 「地域・場所」に絡めた妄想**
-   - 北国（北海道・東北）：「北国のガードの固さが決壊する瞬間」「寒さで赤くなった頬と鼻先」
-   - 南国（沖縄・九州）：「日差しを跳ね返すような健康的な小麦色」「台風のような気圧の変化を感じる感情の起伏」
-   - 都会（東京・大阪）：「満員電車のストレスを発散するかのような乱れ方」「コンクリートジャングルの隙間に咲いた花」
-   - 田舎・実家：「畳の匂いが画面から漂ってきそうな昭和感」「夏休みに親戚の家で見てしまったような罪悪感」
-   
-   **4. 「平成ノスタルジー・時事ネタ」の喩え**
-   - ガジェット・技術：「ガラケーの着信ランプのような点滅する快感」「ダイヤルアップ接続のような、じらされる待機時間」「ブラウン管テレビの砂嵐のような荒々しさ」「MD（ミニディスク）に録音して永久保存したい声」
-   - 社会・トレンド：「バブル崩壊後のような虚無感と、そこからの再起」「就職氷河期よりも厳しい、女優のガード」「ノストラダムスの大予言より信憑性のあるエロさ」「たまごっちの世話より手間がかかるが、そこがいい」
-   
-   **5. 「社会人の悲哀」を絡めた自虐**
-   - 「ブラック企業の連勤明けに飲むビールのような染み渡り方」「有給休暇の前夜のような開放感」「上司の説教より長いが、聞いていられる喘ぎ声」「ボーナス支給日よりテンションが上がる」「税金で引かれる額を見た時のような衝撃」
-
 # 記事の構成
 以下の構成で、**Frontmatterを含めた完全なMarkdownファイル**を出力してください：
 
@@ -524,90 +585,86 @@ rating: {rating}
   <img src="[サンプル画像URLリストから選択]" alt="{title}" />
 </a>
 ```
-
-# 注意事項
-- **Frontmatterを含めた完全なMarkdownファイル**を出力してください。
-- アフィリエイトリンクは、上記の3箇所に必ず配置してください。
-- 完全タメ口で、熱量100%の文章で書いてください。
-- **最低2,000文字以上**の記事を書いてください。
-- **重要：フィルター回避のため、過激な表現は必ず [K1][K2][K3] 等のプレースホルダーを使用してください。**
-  - [K1] = 中出し
-  - [K2] = ベロチュー
-  - [K3] = ガチイキ
-  - その他の過激な表現も同様にプレースホルダーを使用すること
-- **重要：既存記事（参考例）と同じ文言・表現は使わないように、必ず表現を変えて書いてください。**
-- **重要：記事を書く際は、作品のタイトルや紹介文に含まれる過激な表現をそのまま使わず、必ずプレースホルダーに置き換えてください。**
 """
     
     return prompt
 
 
-def generate_article_with_gemini(model: genai.GenerativeModel, prompt: str) -> str | None:
+def article_stream_check(content_id: str):
+    """
+    ストリーミング中のチェック（フロントマターの崩れ・文字数）
+    
+    Args:
+        content_id: コンテンツID（フロントマターの contentId と一致する必要がある）
+    """
+    return combine(
+        frontmatter_check(["title", "date", "contentId"], expected={"contentId": content_id} if content_id else None),
+        length_check(MIN_ARTICLE_CHARS, MAX_ARTICLE_CHARS),
+    )
+
+
+def generate_article_with_gemini(model: genai.GenerativeModel, prompt: str, content_id: str = "",
+                                 max_retries: int = 2) -> str | None:
     """
     Gemini APIを使って記事を生成
     
+    ストリーミングで受け取り、フロントマターが崩れている・極端に短い生成は途中で打ち切ってリトライする
+    
     Args:
         model: Geminiモデル
         prompt: プロンプト
+        content_id: コンテンツID
+        max_retries: 打ち切った場合を含めた最大試行回数
         
     Returns:
         生成された記事本文、またはNone
     """
-    try:
-        # safety_settingsを設定して、より寛容な設定にする
-        safety_settings = [
-            {
-                "category": genai.types.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                "threshold": genai.types.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-            },
-            {
-                "category": genai.types.HarmCategory.HARM_CATEGORY_HARASSMENT,
-                "threshold": genai.types.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-            },
-            {
-                "category": genai.types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-                "threshold": genai.types.HarmBlockThreshold.BLOCK_ONLY_HIGH,
-            },
-            {
-                "category": genai.types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-                "threshold": genai.types.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-            },
-        ]
+    for attempt in range(max_retries):
+        try:
+            response = generate_content(model, prompt, safety_settings=SAFETY_SETTINGS,
+                                        stream_check=article_stream_check(content_id))
         
-        response = model.generate_content(prompt, safety_settings=safety_settings)
+            # プロンプトがブロックされた場合
+            if response.prompt_feedback and response.prompt_feedback.block_reason:
+                print(f"    ❌ プロンプトがブロックされました。理由: {response.prompt_feedback.block_reason}", file=sys.stderr)
+                return None
         
-        # プロンプトがブロックされた場合
-        if response.prompt_feedback and response.prompt_feedback.block_reason:
-            print(f"    ❌ プロンプトがブロックされました。理由: {response.prompt_feedback.block_reason}", file=sys.stderr)
-            return None
+            # レスポンス候補がない場合
+            if not response.candidates:
+                print(f"    ❌ レスポンス候補がありません", file=sys.stderr)
+                return None
         
-        # レスポンス候補がない場合
-        if not response.candidates:
-            print(f"    ❌ レスポンス候補がありません", file=sys.stderr)
-            return None
+            # finish_reasonをチェック（8 = SAFETYフィルターによるブロック）
+            candidate = response.candidates[0]
+            if hasattr(candidate, 'finish_reason'):
+                finish_reason = candidate.finish_reason
+                if finish_reason == 8:  # SAFETY
+                    print(f"    ❌ セーフティフィルターによってコンテンツがブロックされました（finish_reason: {finish_reason}）", file=sys.stderr)
+                    print(f"    💡 ヒント: プロンプトの内容を調整するか、別の作品で試してください", file=sys.stderr)
+                    return None
+                elif finish_reason and finish_reason != 1:  # 1 = STOP（正常終了）
+                    print(f"    ⚠️  予期しないfinish_reason: {finish_reason}", file=sys.stderr)
         
-        # finish_reasonをチェック（8 = SAFETYフィルターによるブロック）
-        candidate = response.candidates[0]
-        if hasattr(candidate, 'finish_reason'):
-            finish_reason = candidate.finish_reason
-            if finish_reason == 8:  # SAFETY
-                print(f"    ❌ セーフティフィルターによってコンテンツがブロックされました（finish_reason: {finish_reason}）", file=sys.stderr)
-                print(f"    💡 ヒント: プロンプトの内容を調整するか、別の作品で試してください", file=sys.stderr)
+            # コンテンツが存在するかチェック
+            if not hasattr(candidate, 'content') or not candidate.content:
+                print(f"    ❌ コンテンツが存在しません", file=sys.stderr)
                 return None
-            elif finish_reason and finish_reason != 1:  # 1 = STOP（正常終了）
-                print(f"    ⚠️  予期しないfinish_reason: {finish_reason}", file=sys.stderr)
         
-        # コンテンツが存在するかチェック
-        if not hasattr(candidate, 'content') or not candidate.content:
-            print(f"    ❌ コンテンツが存在しません", file=sys.stderr)
+            return response.text
+        except StreamAborted as e:
+            # 壊れた生成は途中で打ち切り済みなので、待たずにリトライする（セーフティで止められた場合を除く）
+            print(f"    ❌ 生成を打ち切りました: {e.reason}（{e.chars:,}文字で中断）", file=sys.stderr)
+            if e.blocked or attempt >= max_retries - 1:
+                return None
+            print(f"    🔁 すぐにリトライします... (試行 {attempt + 1}/{max_retries})")
+            continue
+        except Exception as e:
+            print(f"    ❌ 記事生成に失敗: {e}", file=sys.stderr)
+            import traceback
+            traceback.print_exc()
             return None
-        
-        return response.text
-    except Exception as e:
-        print(f"    ❌ 記事生成に失敗: {e}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
-        return None
+    
+    return None
 
 
 def save_article_file(content: str, content_id: str, output_dir: Path) -> Path | None:
@@ -627,32 +684,101 @@ def save_article_file(content: str, content_id: str, output_dir: Path) -> Path |
     filepath = output_dir / filename
     
     try:
-        # Frontmatterの```yamlを---に修正
-        # ```yaml\n---\n...\n---\n``` の形式を ---\n...\n--- に変換
-        fixed_content = content
-        
-        # ```yamlで始まるFrontmatterを修正
-        if fixed_content.startswith("```yaml"):
-            # ```yaml\n---\n を ---\n に置換
-            fixed_content = re.sub(r'^```yaml\s*\n---\s*\n', '---\n', fixed_content, flags=re.MULTILINE)
-            # ---\n``` を ---\n に置換（Frontmatterの終わり）
-            fixed_content = re.sub(r'---\s*\n```\s*\n', '---\n\n', fixed_content, flags=re.MULTILINE)
-            # 末尾の```を削除（もしあれば）
-            fixed_content = re.sub(r'```\s*$', '', fixed_content, flags=re.MULTILINE)
-        
-        # ```markdownで囲まれた部分も修正（本文中のコードブロックは残す）
-        # ただし、Frontmatter部分だけを修正するため、最初の```yamlのみを対象とする
+        # ```yamlで囲まれたFrontmatter・YAMLのエスケープ・プレースホルダー・画像URLを直し、既存記事とほぼ同じ文章なら保存しない
+        # （保存しない場合は生成した本文をキャッシュから消し、次の実行で生成し直す）
+        fixed_content = check_before_save(content, output_dir, filepath.stem, generated=content,
+                                          required=("title", "date", "contentId"), content_id=content_id)
+        if fixed_content is None:
+            return None
         
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(fixed_content)
+        remember_article(filepath, fixed_content)
         return filepath
     except Exception as e:
         print(f"    ❌ ファイル保存に失敗: {e}", file=sys.stderr)
         return None
 
 
+def ingest_batch(path: Path, content_dir: Path) -> None:
+    """バッチ処理の結果ファイルを読み、通常の生成と同じチェックをして記事を保存する"""
+    if not path.exists():
+        print(f"❌ 結果ファイルが見つかりません: {path}", file=sys.stderr)
+        sys.exit(1)
+
+    success_count = 0
+    skip_count = 0
+    fail_count = 0
+
+    print(f"📥 バッチ結果を読み込み中: {path}\n")
+    for key, response, error in iter_batch_results(path):
+        kind, content_id = split_key(key)
+        if kind != BATCH_KIND or not content_id:
+            print(f"⏭️  スキップ（このスクリプトで書き出した結果ではありません）: {key}")
+            skip_count += 1
+            continue
+
+        print(f"📝 品番: {content_id}")
+        today = datetime.now().strftime("%Y-%m-%d")
+        existing_file = content_dir / f"{today}-{content_id}.md"
+        if existing_file.exists():
+            print(f"   ⏭️  既存記事があるためスキップ: {existing_file.name}\n")
+            skip_count += 1
+            continue
+
+        article_content = None
+        if error:
+            print(f"   ❌ 記事生成失敗: {error}", file=sys.stderr)
+        elif response.prompt_feedback and response.prompt_feedback.block_reason:
+            print(f"   ❌ プロンプトがブロックされました。理由: {response.prompt_feedback.block_reason}", file=sys.stderr)
+        else:
+            try:
+                content = response.text
+                # 通常の生成でストリーミング中に行うチェック（フロントマター・文字数）を全文に対して行う
+                problem = article_stream_check(content_id)(content, True)
+                if problem:
+                    print(f"   ❌ 記事生成失敗: {problem}", file=sys.stderr)
+                else:
+                    article_content = content
+            except ValueError as e:
+                print(f"   ❌ 記事生成失敗: {e}", file=sys.stderr)
+
+        filepath = save_article_file(article_content, content_id, content_dir) if article_content else None
+        if filepath:
+            print(f"   ✅ 保存完了: {filepath.name}")
+            success_count += 1
+        else:
+            fail_count += 1
+        print()
+
+    print("=" * 80)
+    print("🎉 バッチ結果の取り込み完了！")
+    print(f"   成功: {success_count}件")
+    print(f"   スキップ: {skip_count}件")
+    print(f"   失敗: {fail_count}件")
+    print(f"   保存先: {content_dir}")
+    print("=" * 80)
+
+
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description="works_list.txtの作品のレビュー記事を一括生成")
+    parser.add_argument("--write-batch", type=Path, metavar="PATH",
+                        help="APIを呼ばず、全作品のプロンプトをバッチ処理用のリクエストファイル（JSONL）に書き出す")
+    parser.add_argument("--ingest-batch", type=Path, metavar="PATH",
+                        help="バッチ処理の結果ファイル（JSONL）を読み込んで記事を保存する")
+    args = parser.parse_args()
+    
+    # プロジェクトルートを取得
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+    works_list_path = project_root / "works_list.txt"
+    content_dir = project_root / "content"
+    
+    if args.ingest_batch:
+        ingest_batch(args.ingest_batch, content_dir)
+        return
+    
     print("\n" + "=" * 80)
     print("  一括記事生成スクリプト")
     print("=" * 80 + "\n")
@@ -663,17 +789,11 @@ def main():
         print("   環境変数 DMM_API_ID と DMM_AFFILIATE_ID を設定してください", file=sys.stderr)
         sys.exit(1)
     
-    if not GEMINI_API_KEY:
+    if not GEMINI_API_KEY and not args.write_batch:
         print("❌ Gemini API認証情報が設定されていません", file=sys.stderr)
         print("   環境変数 GEMINI_API_KEY を設定してください", file=sys.stderr)
         sys.exit(1)
     
-    # プロジェクトルートを取得
-    script_dir = Path(__file__).parent
-    project_root = script_dir.parent
-    works_list_path = project_root / "works_list.txt"
-    content_dir = project_root / "content"
-    
     # works_list.txtを読み込む
     print(f"📋 {works_list_path} を読み込み中...")
     works = read_works_list(works_list_path)
@@ -684,12 +804,6 @@ def main():
     
     print(f"✅ {len(works)}件の作品を読み込みました\n")
     
-    # Gemini APIを初期化
-    print("🤖 Gemini APIを初期化中...")
-    initialize_gemini(GEMINI_API_KEY)
-    model = genai.GenerativeModel("gemini-flash-latest")
-    print("✅ 初期化完了\n")
-    
     # 既存記事を読み込む（参考用）
     print("📚 既存記事を読み込み中...")
     example_articles = load_example_articles(content_dir, max_articles=3)
@@ -697,6 +811,20 @@ def main():
         print(f"✅ {len(example_articles)}件の既存記事を読み込みました\n")
     else:
         print("⚠️  既存記事が見つかりませんでした\n")
+    system_instruction = create_system_instruction(example_articles)
+    
+    model = None
+    writer = None
+    if args.write_batch:
+        # バッチ処理ではAPIを呼ばず、共通部分は各リクエストの system_instruction として書き出す
+        writer = BatchRequestWriter(args.write_batch)
+    else:
+        # Gemini APIを初期化
+        print("🤖 Gemini APIを初期化中...")
+        initialize_gemini(GEMINI_API_KEY)
+        # 共通部分（ルール・参考例）はここで1回だけ登録し、各リクエストでは作品ごとの部分だけを送る
+        model = create_model("gemini-flash-latest", system_instruction)
+        print("✅ 初期化完了\n")
     
     # 各作品について記事を生成
     print("=" * 80)
@@ -759,13 +887,19 @@ def main():
             url,
             memo,
             persona,
-            structure,
-            example_articles
+            structure
         )
         
+        if writer:
+            writer.add(batch_key(BATCH_KIND, content_id), prompt,
+                       safety_settings={s["category"]: s["threshold"] for s in SAFETY_SETTINGS},
+                       system_instruction=system_instruction)
+            print(f"   📤 リクエストを書き出しました\n")
+            continue
+        
         # 記事を生成
         print(f"   ✍️  記事生成中...")
-        article_content = generate_article_with_gemini(model, prompt)
+        article_content = generate_article_with_gemini(model, prompt, content_id)
         
         if article_content:
             # 記事を保存
@@ -787,6 +921,16 @@ def main():
         else:
             print()
     
+    if writer:
+        writer.close()
+        print("=" * 80)
+        print(f"📤 {writer.count}本のリクエストを書き出しました: {args.write_batch}")
+        print(f"   スキップ: {skip_count}件")
+        print(f"   失敗: {fail_count}件")
+        print(f"   結果を取り込むには: python3 scripts/bulk_generate_articles.py --ingest-batch <結果ファイル>")
+        print("=" * 80)
+        return
+    
     # 完了メッセージ
     print("=" * 80)
     print("🎉 記事生成完了！")
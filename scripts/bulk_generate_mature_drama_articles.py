@@ -5,15 +5,30 @@
 """
 
 import os
-import json
 import sys
 import time
 import random
+import argparse
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Iterator
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from content_index import get_existing_content_ids
+from near_duplicates import remember_article
+from article_validator import check_before_save
+from ndjson_store import find_records_file, iter_records, read_index
+from gemini_pool import generate_content, get_controller, get_workers
+from parallel import map_threads
+from job_queue import get_queue, LEASE_LOST, LEASE_SECONDS
+from gemini_batch import BatchRequestWriter, batch_key, split_key, iter_batch_results
+from gemini_prefix import create_model
+from gemini_stream import StreamAborted, combine, contains_check, length_check
+from article_frontmatter import quote
+from article_json import (
+    SAMPLE_IMAGE_COUNT, json_generation_config, parse_article, is_valid_article,
+    affiliate_image, affiliate_link, dmm_player, dmm_sample_image_url,
+)
 
 # .envファイルの読み込み
 try:
@@ -26,6 +41,37 @@ try:
 except ImportError:
     pass
 
+# ジョブキューの種類（retry_failed_articles.py・generate_failed_articles.py も同じキューを使う）
+JOB_KIND = "mature_drama"
+
+MODEL_NAME = "gemini-2.5-flash"
+
+# セーフティ設定（創作物・小説レビューとして扱うため、ブロックを緩和）
+SAFETY_SETTINGS = {
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_ONLY_HIGH,  # 高レベルのみブロック
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+}
+
+GENERATION_CONFIG = {
+    "temperature": 0.9,  # 創造性を高める
+    "top_p": 0.95,
+    "top_k": 40,
+}
+
+# ストリーミングで打ち切る基準（明らかに壊れた生成だけを対象にするので、プロンプトの2,500文字より緩い）
+MIN_ARTICLE_CHARS = 1200
+MAX_ARTICLE_CHARS = 20000
+# 記事構成どおりなら、この文字数までにサンプル動画プレーヤー（品番）が出てくる
+PLAYER_WITHIN_CHARS = 2000
+
+# JSONモード（--json）の generation_config
+JSON_GENERATION_CONFIG = json_generation_config(GENERATION_CONFIG)
+
+# バッチ処理の結果が返ってくるまでジョブを処理中のままにしておく時間（過ぎたら通常の実行で取り出し直す）
+BATCH_LEASE_SECONDS = 48 * 3600
+
 
 def initialize_gemini(api_key: str):
     """Gemini APIを初期化"""
@@ -190,36 +236,9 @@ def sanitize_description(description: str) -> str:
     return sanitized
 
 
-def create_article_prompt(product_info: dict) -> str:
-    """記事生成用のプロンプトを作成"""
-    title = product_info.get("title", "")
-    # タイトルをサニタイズ（プロンプト内では婉曲的な表現を使用）
-    sanitized_title = sanitize_title(title)
-    content_id = product_info.get("content_id", "")
-    image_url = product_info.get("image_url", "")
-    affiliate_url = product_info.get("affiliate_url", "")
-    actress_list = product_info.get("actress", [])
-    genre_list = product_info.get("genre", [])
-    maker = product_info.get("maker", "")
-    director = product_info.get("director", "")
-    description = product_info.get("description", "")
-    release_date = product_info.get("release_date", "")
-    
-    # 説明もサニタイズ
-    sanitized_description = sanitize_description(description)
-    
-    actresses = "、".join(actress_list) if actress_list else "不明"
-    genres = "、".join(genre_list) if genre_list else "不明"
-    
-    # 発売年を抽出
-    year = ""
-    if release_date:
-        try:
-            year = release_date.split("-")[0]
-        except:
-            pass
-    
-    prompt = f"""# あなたの役割
+# 全作品で共通のプロンプト（役割・制約・各セクションの書き方・ガイドライン）
+# gemini_prefix.create_model() でシステムインストラクションとして1回だけ登録し、作品ごとのプロンプトには含めない
+SYSTEM_INSTRUCTION = """# あなたの役割
 
 あなたは、文芸評論家と映画評論家の両方の視点を持つ、洗練されたレビュアーです。
 
@@ -268,9 +287,123 @@ def create_article_prompt(product_info: dict) -> str:
 - **あくまで「創作物のレビュー」として書く**
 - **性的な場面は「感情的な場面」「心理描写の深い場面」として表現**
 
+# 各セクションの書き方
+
+記事構成の各セクションは、以下の内容で書いてください。
+
+## [詩的なタイトル]
+（「心を揺さぶる、複雑な人間関係の物語」「成熟した表現が光る作品」など、作品の魅力を一言で表現）
+
+## 作品との出会い
+
+（この創作小説・ドラマ作品との出会いを、文学的・映画評論的に語る）
+- 「この作品に出会ったのは〜」という自然な語り出し
+- タイトルやパッケージから感じた印象、期待感
+- 作品が描く世界観への期待
+
+## 物語の魅力
+
+（ストーリーの構成、設定、展開を映画レビュー・文芸評論のように分析）
+- 物語の設定、テーマを丁寧に紹介
+- ネタバレしない範囲で、物語の核心に迫る
+- 人間関係の複雑さ、心理描写の深さを語る
+- 「作品説明」の内容を必ず反映すること
+- 文学的・芸術的な視点で物語を分析
+
+## 演技と演出の妙
+
+（登場人物の演技力、表現力を映画評論的に評価）
+- 登場人物の表現力の素晴らしさを具体的に
+- 表情の変化、仕草の繊細さ
+- 監督の演出、カメラワークへの言及
+- 成熟した女性の魅力を、芸術的な視点で表現
+
+## 心に残るシーン
+
+（特に印象的だったシーンを、文学的・映画評論的に描写）
+- 具体的なシーンを2-3つ取り上げる
+- **比喩的・文学的な表現で、想像力を掻き立てる（直接的な描写は避ける）**
+- 余韻を残す、詩的な文章
+- あくまで「創作物の一場面」として描写
+- **感情的な場面、心理描写の深い場面として表現**
+- **「官能的な場面」ではなく「感情が高ぶる場面」「心理的な葛藤が描かれる場面」として表現**
+
+## この作品を観るあなたへ
+
+（読者への語りかけで締めくくる）
+- 「この作品は、あなたに新しい発見をもたらすでしょう」のような語りかけ
+- 作品から得られる体験、感情を伝える
+- 余韻を残す、詩的な締めくくり
+
 ---
 
-# レビュー対象の作品情報
+# 執筆ガイドライン
+
+## 推奨表現（文学的・映画評論的）
+- 「余韻」「深み」「情感」「表現力」「芸術性」
+- 「心を揺さぶる」「魅了される」「感動的」
+- 「複雑な人間関係」「心理描写」「ドラマ性」
+- 「成熟した表現」「洗練された演出」「芸術的な美しさ」
+- 比喩的表現：「まるで〜のように」「〜を思わせる」
+- **性的な表現は一切使わず、感情・心理・ストーリー性に焦点を当てる**
+- 「情熱的な場面」→「感情が高ぶる場面」「心理的な葛藤が描かれる場面」
+- 「官能的な場面」→「心理描写の深い場面」「感情の機微が描かれる場面」
+
+## 文字数
+- 最低2,500文字以上
+- 各セクションを丁寧に展開
+"""
+
+# 記事のセクション（JSONモードでは sections の順番、見出しはローカルで付ける）
+SECTION_HEADINGS = ["作品との出会い", "物語の魅力", "演技と演出の妙", "心に残るシーン", "この作品を観るあなたへ"]
+
+# JSONモードの出力形式（フロントマター・リンク・画像・プレーヤーは render_article() で組み立てる）
+JSON_OUTPUT_FORMAT = f"""# 出力形式
+
+記事はJSONで出力してください。リンク・画像・動画プレーヤー・作品情報の表はこちらで挿入するので、本文に含めないでください。
+
+- headline: 作品の魅力を一言で表す詩的な見出し（「各セクションの書き方」の [詩的なタイトル]）
+- excerpt: 記事の抜粋（80〜120文字、作品の魅力が伝わる1〜2文）
+- sections: 次の{len(SECTION_HEADINGS)}セクションの本文を、この順番で（Markdown、見出しは含めない）
+{chr(10).join(f"  {i}. {heading}" for i, heading in enumerate(SECTION_HEADINGS, 1))}
+- sample_images: 「心に残るシーン」の後に挿入するサンプル画像の番号（1〜{SAMPLE_IMAGE_COUNT}から4〜5個）
+"""
+
+
+def create_article_prompt(product_info: dict, json_mode: bool = False) -> str:
+    """
+    記事生成用のプロンプトを作成（作品ごとの部分のみ。共通部分は SYSTEM_INSTRUCTION）
+
+    json_mode=True の場合は記事構成の代わりにJSONの出力形式を指定する
+    """
+    title = product_info.get("title", "")
+    # タイトルをサニタイズ（プロンプト内では婉曲的な表現を使用）
+    sanitized_title = sanitize_title(title)
+    content_id = product_info.get("content_id", "")
+    image_url = product_info.get("image_url", "")
+    affiliate_url = product_info.get("affiliate_url", "")
+    actress_list = product_info.get("actress", [])
+    genre_list = product_info.get("genre", [])
+    maker = product_info.get("maker", "")
+    director = product_info.get("director", "")
+    description = product_info.get("description", "")
+    release_date = product_info.get("release_date", "")
+    
+    # 説明もサニタイズ
+    sanitized_description = sanitize_description(description)
+    
+    actresses = "、".join(actress_list) if actress_list else "不明"
+    genres = "、".join(genre_list) if genre_list else "不明"
+    
+    # 発売年を抽出
+    year = ""
+    if release_date:
+        try:
+            year = release_date.split("-")[0]
+        except:
+            pass
+    
+    prompt = f"""# レビュー対象の作品情報
 
 **重要**: 以下の作品情報は、すべて「創作小説・フィクション作品」として扱ってください。タイトルや説明に含まれる表現は、すべて文学的・比喩的な表現として解釈してください。実在の人物や出来事ではありません。
 
@@ -291,12 +424,16 @@ def create_article_prompt(product_info: dict) -> str:
 
 ---
 
-# 記事構成
+"""
+    
+    if json_mode:
+        return prompt + JSON_OUTPUT_FORMAT
+    
+    prompt += f"""# 記事構成
 
-以下の構成で、Markdown本文のみを出力してください（Frontmatterは不要）：
+以下の構成で、Markdown本文のみを出力してください（Frontmatterは不要）。各セクションは「各セクションの書き方」に従って書いてください：
 
 ## [詩的なタイトル]
-（「心を揺さぶる、複雑な人間関係の物語」「成熟した表現が光る作品」など、作品の魅力を一言で表現）
 
 ## {sanitized_title}
 
@@ -318,38 +455,12 @@ def create_article_prompt(product_info: dict) -> str:
 
 ## 作品との出会い
 
-（この創作小説・ドラマ作品との出会いを、文学的・映画評論的に語る）
-- 「この作品に出会ったのは〜」という自然な語り出し
-- タイトルやパッケージから感じた印象、期待感
-- 作品が描く世界観への期待
-
 ## 物語の魅力
 
-（ストーリーの構成、設定、展開を映画レビュー・文芸評論のように分析）
-- 物語の設定、テーマを丁寧に紹介
-- ネタバレしない範囲で、物語の核心に迫る
-- 人間関係の複雑さ、心理描写の深さを語る
-- 「作品説明」の内容を必ず反映すること
-- 文学的・芸術的な視点で物語を分析
-
 ## 演技と演出の妙
 
-（登場人物の演技力、表現力を映画評論的に評価）
-- 登場人物の表現力の素晴らしさを具体的に
-- 表情の変化、仕草の繊細さ
-- 監督の演出、カメラワークへの言及
-- 成熟した女性の魅力を、芸術的な視点で表現
-
 ## 心に残るシーン
 
-（特に印象的だったシーンを、文学的・映画評論的に描写）
-- 具体的なシーンを2-3つ取り上げる
-- **比喩的・文学的な表現で、想像力を掻き立てる（直接的な描写は避ける）**
-- 余韻を残す、詩的な文章
-- あくまで「創作物の一場面」として描写
-- **感情的な場面、心理描写の深い場面として表現**
-- **「官能的な場面」ではなく「感情が高ぶる場面」「心理的な葛藤が描かれる場面」として表現**
-
 **重要**: シーンの説明の後、以下の形式でサンプル画像を4-5枚挿入してください：
 
 <a href="{affiliate_url}" target="_blank" rel="sponsored noopener noreferrer">
@@ -378,11 +489,6 @@ def create_article_prompt(product_info: dict) -> str:
 
 ## この作品を観るあなたへ
 
-（読者への語りかけで締めくくる）
-- 「この作品は、あなたに新しい発見をもたらすでしょう」のような語りかけ
-- 作品から得られる体験、感情を伝える
-- 余韻を残す、詩的な締めくくり
-
 <div className="affiliate-link">
   <a href="{affiliate_url}" target="_blank" rel="noopener noreferrer">作品を鑑賞する</a>
 </div>
@@ -395,69 +501,74 @@ def create_article_prompt(product_info: dict) -> str:
 - 制作会社: {maker}
 {f'- 公開年: {year}年' if year else ''}
 
----
-
-# 執筆ガイドライン
-
-## 推奨表現（文学的・映画評論的）
-- 「余韻」「深み」「情感」「表現力」「芸術性」
-- 「心を揺さぶる」「魅了される」「感動的」
-- 「複雑な人間関係」「心理描写」「ドラマ性」
-- 「成熟した表現」「洗練された演出」「芸術的な美しさ」
-- 比喩的表現：「まるで〜のように」「〜を思わせる」
-- **性的な表現は一切使わず、感情・心理・ストーリー性に焦点を当てる**
-- 「情熱的な場面」→「感情が高ぶる場面」「心理的な葛藤が描かれる場面」
-- 「官能的な場面」→「心理描写の深い場面」「感情の機微が描かれる場面」
-
-## 文字数
-- 最低2,500文字以上
-- 各セクションを丁寧に展開
-
 注意: Frontmatter（---で囲まれたメタデータ）は含めず、Markdown本文のみを出力してください。
 """
     
     return prompt
 
 
-def generate_article(model: genai.GenerativeModel, product_info: dict, max_retries: int = 2) -> str | None:
-    """Gemini APIを使って記事本文を生成（リトライ機能付き、トークン消費を最小化）"""
-    prompt = create_article_prompt(product_info)
-    
-    # セーフティ設定（創作物・小説レビューとして扱うため、ブロックを緩和）
-    safety_settings = {
-        HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_ONLY_HIGH,  # 高レベルのみブロック
-        HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-    }
+def check_response(response) -> str | None:
+    """レスポンスを確認して記事本文を返す（ブロックされた・候補がない場合はNone）"""
+    if not response.candidates:
+        if response.prompt_feedback and response.prompt_feedback.block_reason:
+            print(f"❌ ブロックされました: {response.prompt_feedback.block_reason}", file=sys.stderr)
+        return None
     
-    generation_config = {
-        "temperature": 0.9,  # 創造性を高める
-        "top_p": 0.95,
-        "top_k": 40,
-    }
+    return response.text
+
+
+def article_stream_check(product_info: dict):
+    """Markdownモードのストリーミング中のチェック（記事構成の崩れ・文字数）"""
+    return combine(
+        contains_check(f"cid={product_info.get('content_id', '')}/", PLAYER_WITHIN_CHARS, "サンプル動画プレーヤー"),
+        length_check(MIN_ARTICLE_CHARS, MAX_ARTICLE_CHARS),
+    )
+
+
+def generate_article(model: genai.GenerativeModel, product_info: dict, max_retries: int = 2,
+                     json_mode: bool = False) -> str | None:
+    """
+    Gemini APIを使って記事本文を生成（リトライ機能付き、トークン消費を最小化）
+
+    json_mode=True の場合はJSONの応答を返す（Markdownへの変換は prepare_article()）
+    """
+    prompt = create_article_prompt(product_info, json_mode)
     
     for attempt in range(max_retries):
         try:
-            response = model.generate_content(
+            response = generate_content(
+                model,
                 prompt,
-                safety_settings=safety_settings,
-                generation_config=generation_config
+                safety_settings=SAFETY_SETTINGS,
+                generation_config=JSON_GENERATION_CONFIG if json_mode else GENERATION_CONFIG,
+                cache_if=(lambda r: is_valid_article(r, section_count=len(SECTION_HEADINGS))) if json_mode else None,
+                stream_check=None if json_mode else article_stream_check(product_info)
             )
             
-            if not response.candidates:
-                if response.prompt_feedback and response.prompt_feedback.block_reason:
-                    print(f"❌ ブロックされました: {response.prompt_feedback.block_reason}", file=sys.stderr)
-                    # ブロックエラーはリトライしても意味がないので即座に失敗
+            # ブロックエラーはリトライしても意味がないので即座に失敗
+            content = check_response(response)
+            if content and json_mode:
+                try:
+                    parse_article(content, section_count=len(SECTION_HEADINGS))
+                except ValueError as e:
+                    # 壊れたJSONはキャッシュされないので、リトライで生成し直す
+                    print(f"   ❌ JSONの応答が不正です: {e}", file=sys.stderr)
+                    if attempt < max_retries - 1:
+                        continue
                     return None
-                return None
-            
-            return response.text
+            return content
             
+        except StreamAborted as e:
+            # 壊れた生成は途中で打ち切り済みなので、待たずにリトライする（セーフティで止められた場合を除く）
+            print(f"   ❌ 生成を打ち切りました: {e.reason}（{e.chars:,}文字で中断）", file=sys.stderr)
+            if e.blocked or attempt >= max_retries - 1:
+                return None
+            print(f"   🔁 すぐにリトライします... (試行 {attempt + 1}/{max_retries})")
+            continue
         except Exception as e:
             error_str = str(e)
             
-            # クォータエラー（429）の場合 - リトライしても意味がないので即座に失敗
+            # クォータエラー（429）の場合 - generate_content() で同時実行数を下げて再試行済みなので失敗
             if "429" in error_str or "quota" in error_str.lower() or "Quota exceeded" in error_str:
                 print(f"   ❌ クォータ制限に達しました。リトライを中止します（トークン節約のため）", file=sys.stderr)
                 return None
@@ -478,8 +589,79 @@ def generate_article(model: genai.GenerativeModel, product_info: dict, max_retri
     return None
 
 
-def save_article(content: str, product_info: dict, publish_date: str, output_dir: Path, content_id: str, matched_genres: list) -> str | None:
-    """記事をMarkdownファイルとして保存"""
+def render_article(article: dict, product_info: dict) -> str:
+    """JSONモードの応答から記事本文（Markdown）を組み立てる（create_article_prompt() の記事構成と同じ形）"""
+    sanitized_title = sanitize_title(product_info.get("title", ""))
+    content_id = product_info.get("content_id", "")
+    image_url = product_info.get("image_url", "")
+    affiliate_url = product_info.get("affiliate_url", "")
+    actress_list = product_info.get("actress", [])
+    genre_list = product_info.get("genre", [])
+    maker = product_info.get("maker", "")
+    director = product_info.get("director", "")
+    release_date = product_info.get("release_date", "")
+    
+    actresses = "、".join(actress_list) if actress_list else "不明"
+    genres = "、".join(genre_list) if genre_list else "不明"
+    year = release_date.split("-")[0] if release_date else ""
+    
+    details = [f"**主要キャラクター:** {actresses}", f"**ジャンル:** {genres}", f"**制作会社:** {maker}"]
+    if director:
+        details.append(f"**監督:** {director}")
+    if year:
+        details.append(f"**公開年:** {year}年")
+    
+    blocks = [
+        f"## {article['headline']}",
+        f"## {sanitized_title}",
+        affiliate_image(affiliate_url, image_url, sanitized_title),
+        "\n".join(details),
+        affiliate_link(affiliate_url, "作品の詳細を見る"),
+        dmm_player(content_id),
+    ]
+    for heading, body in zip(SECTION_HEADINGS, article["sections"]):
+        blocks += [f"## {heading}", body]
+        if heading == "心に残るシーン":
+            blocks += [affiliate_image(affiliate_url, dmm_sample_image_url(content_id, index), sanitized_title)
+                       for index in article["sample_images"]]
+            blocks.append(affiliate_link(affiliate_url, "サンプル動画で確認する"))
+    blocks.append(affiliate_link(affiliate_url, "作品を鑑賞する", class_name="affiliate-link"))
+    
+    info = [
+        "**作品情報:**",
+        f"- 作品タイトル: {sanitized_title}",
+        f"- 作品ID: {content_id}",
+        f"- 主要キャラクター: {actresses}",
+        f"- ジャンル: {genres}",
+        f"- 制作会社: {maker}",
+    ]
+    if year:
+        info.append(f"- 公開年: {year}年")
+    blocks.append("\n".join(info))
+    
+    return "\n\n".join(blocks) + "\n"
+
+
+def prepare_article(content: str, product_info: dict, json_mode: bool) -> tuple[str, str | None]:
+    """
+    生成結果を (記事本文, 抜粋) にする（Markdownモードはそのまま、抜粋は save_article() の定型文）
+
+    Raises:
+        ValueError: JSONモードで応答が不正な場合
+    """
+    if not json_mode:
+        return content, None
+    article = parse_article(content, section_count=len(SECTION_HEADINGS))
+    return render_article(article, product_info), article["excerpt"]
+
+
+def save_article(content: str, product_info: dict, publish_date: str, output_dir: Path, content_id: str, matched_genres: list,
+                 excerpt: str | None = None, generated: str | None = None) -> str | None:
+    """
+    記事をMarkdownファイルとして保存（excerpt を省略した場合は定型文）
+
+    内容を理由に保存しなかった場合は、生成した本文（generated、省略時は content）をキャッシュから消す
+    """
     title = product_info.get("title", "")
     image_url = product_info.get("image_url", "")
     affiliate_url = product_info.get("affiliate_url", "")
@@ -534,7 +716,8 @@ def save_article(content: str, product_info: dict, publish_date: str, output_dir
     tags_str = ", ".join(tags[:15])
     
     # 抜粋を生成
-    excerpt = f"{title}のレビュー。大人の女性の色気とストーリー性を、官能小説のような筆致で綴ります。"
+    if not excerpt:
+        excerpt = f"{title}のレビュー。大人の女性の色気とストーリー性を、官能小説のような筆致で綴ります。"
     
     # 評価を生成
     rating = round(random.uniform(4.0, 5.0), 1)
@@ -544,9 +727,9 @@ def save_article(content: str, product_info: dict, publish_date: str, output_dir
     
     # Frontmatterを作成
     frontmatter = f"""---
-title: "{title}"
+title: {quote(title)}
 date: "{publish_date}"
-excerpt: "{excerpt}"
+excerpt: {quote(excerpt)}
 image: "{image_url}"
 tags: [{tags_str}]
 affiliateLink: "{affiliate_url}"
@@ -567,49 +750,151 @@ atmosphereScore: {atmosphere_score}
     # 記事全体を作成
     full_content = frontmatter + content
     
+    # フロントマターの崩れ・プレースホルダー・画像URLを直し、既存記事とほぼ同じ文章なら保存しない
+    # （保存しない場合は生成した本文をキャッシュから消し、次の実行で生成し直す）
+    full_content = check_before_save(full_content, Path(output_dir), Path(filepath).stem,
+                                     generated=generated or content, required=("title", "date", "contentId"),
+                                     affiliate_url=affiliate_url, content_id=content_id)
+    if full_content is None:
+        return None
+    
     try:
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(full_content)
+        remember_article(Path(filepath), full_content)
         return str(filepath)
     except IOError as e:
         print(f"❌ 保存失敗: {e}", file=sys.stderr)
         return None
 
 
-def load_ranking_data(data_dir: Path) -> list:
-    """ランキングデータを読み込む"""
-    latest_file = data_dir / "mature_drama_all_latest.json"
+def load_ranking_data(data_dir: Path) -> tuple[int, Iterator[dict]]:
+    """
+    ランキングデータを読み込む
+
+    Returns:
+        (件数, 作品を1件ずつ返すイテレータ)。件数はファイル末尾のインデックスから読み、
+        作品は使う分だけ読み込む（以前のJSON形式のファイルも読める）
+    """
+    latest_file = find_records_file(data_dir / "mature_drama_all_latest.ndjson")
     
-    if not latest_file.exists():
-        print(f"❌ ランキングファイルが見つかりません: {latest_file}", file=sys.stderr)
+    if latest_file is None:
+        print(f"❌ ランキングファイルが見つかりません: {data_dir / 'mature_drama_all_latest.ndjson'}", file=sys.stderr)
         print("", file=sys.stderr)
         print("💡 まず以下のコマンドでランキングを取得してください:", file=sys.stderr)
         print("   python3 scripts/fetch_mature_drama_ranking.py", file=sys.stderr)
         sys.exit(1)
     
     try:
-        with open(latest_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("ranking", [])
+        return read_index(latest_file)["count"], iter_records(latest_file)
     except Exception as e:
         print(f"❌ ランキングデータの読み込み失敗: {e}", file=sys.stderr)
         sys.exit(1)
 
 
+def write_batch_file(path: Path, jobs: list, json_mode: bool = False) -> int:
+    """生成対象のプロンプトをバッチ処理のリクエストファイル（JSONL）に書き出す"""
+    generation_config = JSON_GENERATION_CONFIG if json_mode else GENERATION_CONFIG
+    with BatchRequestWriter(path) as writer:
+        for idx, work, publish_date, matched_genres in jobs:
+            writer.add(batch_key(JOB_KIND, work.get("content_id", "")), create_article_prompt(work, json_mode),
+                       generation_config, SAFETY_SETTINGS, SYSTEM_INSTRUCTION)
+    return writer.count
+
+
+def ingest_batch(path: Path, content_dir: Path, json_mode: bool = False) -> None:
+    """バッチ処理の結果ファイルを読み、通常の生成と同じチェックをして記事を保存する（--json で書き出した場合は json_mode=True）"""
+    if not path.exists():
+        print(f"❌ 結果ファイルが見つかりません: {path}", file=sys.stderr)
+        sys.exit(1)
+    
+    queue = get_queue()
+    success_count = 0
+    skip_count = 0
+    fail_count = 0
+    
+    print(f"📥 バッチ結果を読み込み中: {path}\n")
+    for key, response, error in iter_batch_results(path):
+        kind, content_id = split_key(key)
+        job = queue.get(kind, content_id) if kind == JOB_KIND else None
+        if job is None or job["status"] != "leased":
+            # 別のバッチ・通常の実行で処理済み、または --write-batch で書き出していない結果
+            print(f"⏭️  スキップ（処理待ちのジョブがありません）: {key}")
+            skip_count += 1
+            continue
+        
+        work = job["payload"]["work"]
+        publish_date = job["payload"]["publish_date"]
+        title = work.get("title", "不明")
+        print(f"📝 {title[:40]}...")
+        print(f"   公開日: {publish_date}")
+        
+        is_valid, matched_genres = is_valid_genre(work)
+        if not is_valid:
+            print(f"   ⏭️  スキップ（対象外ジャンル）")
+            queue.cancel(job["id"], "対象外ジャンル")
+            skip_count += 1
+            continue
+        
+        article_content = None
+        excerpt = None
+        if error:
+            print(f"   ❌ 記事生成失敗: {error}", file=sys.stderr)
+        else:
+            try:
+                content = check_response(response)
+                # 通常の生成でストリーミング中に行うチェック（プレーヤー・文字数）を全文に対して行う
+                problem = article_stream_check(work)(content, True) if content and not json_mode else None
+                if problem:
+                    print(f"   ❌ 記事生成失敗: {problem}", file=sys.stderr)
+                elif content:
+                    article_content, excerpt = prepare_article(content, work, json_mode)
+            except ValueError as e:
+                print(f"   ❌ 記事生成失敗: {e}", file=sys.stderr)
+        
+        if not article_content:
+            print(f"   ❌ 生成失敗")
+            fail_count += 1
+            queue.fail(job["id"], error or "記事の生成に失敗しました")
+        elif save_article(article_content, work, publish_date, content_dir, content_id, matched_genres, excerpt, content):
+            print(f"   ✅ 保存完了")
+            success_count += 1
+            queue.complete(job["id"])
+        else:
+            print(f"   ❌ 保存失敗")
+            fail_count += 1
+            queue.fail(job["id"], "記事の保存に失敗しました")
+        print()
+    
+    print("=" * 80)
+    print("🎉 バッチ結果の取り込み完了！")
+    print("=" * 80)
+    print(f"✅ 成功: {success_count}本")
+    print(f"⏭️  スキップ: {skip_count}本")
+    print(f"❌ 失敗: {fail_count}本")
+    if fail_count:
+        print(f"   再試行するには: python3 scripts/retry_failed_articles.py")
+    print(f"📁 保存先: {content_dir}")
+    print("=" * 80)
+    print()
+
+
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description="熟女・人妻・ドラマ作品の一括記事生成")
+    parser.add_argument("--write-batch", type=Path, metavar="PATH",
+                        help="APIを呼ばず、プロンプトをバッチ処理のリクエストファイル（JSONL）に書き出す")
+    parser.add_argument("--ingest-batch", type=Path, metavar="PATH",
+                        help="バッチ処理の結果ファイル（JSONL）を読み込んで記事を保存する")
+    parser.add_argument("--json", action="store_true",
+                        help="記事をJSON（見出し・抜粋・本文・画像番号）で生成し、リンク・画像・プレーヤーはローカルで組み立てる")
+    args = parser.parse_args()
+    
     print("\n" + "✨" * 40)
     print("  熟女・人妻・ドラマ作品 一括記事生成")
     print("  〜艶めく物語〜")
     print("✨" * 40 + "\n")
     
-    # 環境変数からAPIキーを取得
-    api_key = os.environ.get("GEMINI_API_KEY")
-    
-    if not api_key:
-        print("❌ 環境変数 GEMINI_API_KEY が設定されていません", file=sys.stderr)
-        sys.exit(1)
-    
     # ディレクトリ設定
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
@@ -618,14 +903,25 @@ def main():
     
     content_dir.mkdir(exist_ok=True)
     
+    if args.ingest_batch:
+        ingest_batch(args.ingest_batch, content_dir, args.json)
+        return
+    
+    # 環境変数からAPIキーを取得（バッチファイルを書き出すだけなら不要）
+    api_key = os.environ.get("GEMINI_API_KEY")
+    
+    if not api_key and not args.write_batch:
+        print("❌ 環境変数 GEMINI_API_KEY が設定されていません", file=sys.stderr)
+        sys.exit(1)
+    
     # ランキングデータを読み込む
     print("📖 ランキングデータを読み込み中...")
-    ranking_data = load_ranking_data(data_dir)
-    print(f"✅ {len(ranking_data)}件の作品を取得しました\n")
+    total_count, ranking_data = load_ranking_data(data_dir)
+    print(f"✅ {total_count}件の作品を取得しました\n")
     
     # 生成する記事数を入力
-    max_articles = int(input(f"何本の記事を生成しますか？（最大{len(ranking_data)}本）: ").strip() or "10")
-    max_articles = min(max_articles, len(ranking_data))
+    max_articles = int(input(f"何本の記事を生成しますか？（最大{total_count}本）: ").strip() or "10")
+    max_articles = min(max_articles, total_count)
     
     # 開始日を入力
     start_date_input = input("開始日（YYYY-MM-DD、空白で今日）: ").strip()
@@ -640,46 +936,34 @@ def main():
     
     # 既存記事のcontent_idを取得
     print("🔍 既存記事をチェック中...")
-    existing_content_ids = set()
-    for content_file in content_dir.glob("*.md"):
-        try:
-            with open(content_file, "r", encoding="utf-8") as f:
-                content = f.read()
-                # frontmatterからcontentIdを抽出
-                if "contentId:" in content:
-                    for line in content.split("\n"):
-                        if line.startswith("contentId:"):
-                            existing_id = line.split("contentId:")[1].strip().strip('"').strip("'")
-                            if existing_id:
-                                existing_content_ids.add(existing_id)
-                            break
-        except Exception:
-            pass
+    # content_index（SQLite）を差分更新して参照する
+    existing_content_ids = get_existing_content_ids(content_dir)
     
     print(f"✅ {len(existing_content_ids)}件の既存記事を検出しました\n")
     
-    # 既存記事を除外
-    filtered_ranking = [work for work in ranking_data if work.get("content_id", "") not in existing_content_ids]
-    print(f"📊 フィルタリング後: {len(filtered_ranking)}件（既存除外: {len(ranking_data) - len(filtered_ranking)}件）\n")
+    # 既存記事を除外（生成する本数に達したら残りは読まない）
+    filtered_ranking = []
+    excluded_count = 0
+    for work in ranking_data:
+        if work.get("content_id", "") in existing_content_ids:
+            excluded_count += 1
+            continue
+        filtered_ranking.append(work)
+        if len(filtered_ranking) >= max_articles:
+            break
+    print(f"📊 フィルタリング後: {len(filtered_ranking)}件（既存除外: {excluded_count}件）\n")
     
     if not filtered_ranking:
         print("❌ 新規記事がありません。全て既存記事です。", file=sys.stderr)
         sys.exit(0)
     
-    # Gemini APIを初期化
-    print("🤖 Gemini APIを初期化中...")
-    initialize_gemini(api_key)
-    
-    model_name = "gemini-2.5-flash"
-    print(f"✅ {model_name} を使用します\n")
-    model = genai.GenerativeModel(model_name)
-    
     # 記事生成
     success_count = 0
     skip_count = 0
     fail_count = 0
-    failed_items = []  # 失敗した記事を記録
     
+    # 生成対象を決める（既存・対象外ジャンルはここでスキップ）
+    jobs = []
     for idx, work in enumerate(filtered_ranking[:max_articles], 1):
         content_id = work.get("content_id", "")
         title = work.get("title", "不明")
@@ -694,60 +978,95 @@ def main():
             skip_count += 1
             continue
         
-        print(f"[{idx}/{max_articles}] 📝 {title[:40]}...")
-        print(f"   公開日: {publish_date}")
-        
         # ジャンル判定
         is_valid, matched_genres = is_valid_genre(work)
         if not is_valid:
-            print(f"   ⏭️  スキップ（対象外ジャンル）")
+            print(f"[{idx}/{max_articles}] ⏭️  スキップ（対象外ジャンル）: {title[:40]}...")
             skip_count += 1
             continue
         
-        print(f"   ジャンル: {', '.join(matched_genres)}")
+        jobs.append((idx, work, publish_date, matched_genres))
+    
+    # ジョブキューに登録してから取り出す（失敗したジョブは retry_failed_articles.py が再試行する）
+    # バッチ処理に回すジョブは結果を取り込むまで処理中のままにする
+    queue = get_queue()
+    leased = queue.submit(JOB_KIND, {
+        work.get("content_id", ""): {
+            "content_id": work.get("content_id", ""),
+            "title": work.get("title", "不明"),
+            "publish_date": publish_date,
+            "work": work,
+        }
+        for idx, work, publish_date, matched_genres in jobs
+    }, lease_seconds=BATCH_LEASE_SECONDS if args.write_batch else LEASE_SECONDS)
+    if len(leased) < len(jobs):
+        print(f"⏳ {len(jobs) - len(leased)}本は再試行待ち・処理中のジョブのためスキップします（python3 scripts/job_queue.py で確認）")
+        skip_count += len(jobs) - len(leased)
+        jobs = [job for job in jobs if job[1].get("content_id", "") in leased]
+    
+    if args.write_batch:
+        count = write_batch_file(args.write_batch, jobs, args.json)
+        print(f"📤 {count}本のリクエストを書き出しました: {args.write_batch}")
+        print(f"⏭️  スキップ: {skip_count}本")
+        print(f"   結果を取り込むには: python3 scripts/bulk_generate_mature_drama_articles.py --ingest-batch <結果ファイル>"
+              f"{' --json' if args.json else ''}")
+        return
+    
+    # Gemini APIを初期化
+    print("🤖 Gemini APIを初期化中...")
+    initialize_gemini(api_key)
+    
+    print(f"✅ {MODEL_NAME} を使用します\n")
+    # 共通部分（SYSTEM_INSTRUCTION）はここで1回だけ登録し、各リクエストでは作品ごとの部分だけを送る
+    model = create_model(MODEL_NAME, SYSTEM_INSTRUCTION)
+    
+    # 記事生成（同時実行数は gemini_pool がクォータと応答時間から調整する）
+    workers = get_workers()
+    print(f"\n✍️  {len(jobs)}本を最大{workers}並列で生成します...\n")
+    
+    def generate(job):
+        # 取り出してから時間が経っていることがあるので、始める前に期限を延ばす（別のプロセスが取り出し直していれば生成しない）
+        if not queue.renew(leased[job[1].get("content_id", "")]):
+            return None
+        return generate_article(model, job[1], json_mode=args.json)
+    
+    articles = map_threads(generate, jobs, workers)
+    
+    for (idx, work, publish_date, matched_genres), article_content in zip(jobs, articles):
+        content_id = work.get("content_id", "")
+        title = work.get("title", "不明")
+        job = leased[content_id]
         
-        # 記事生成
-        print(f"   ✍️  生成中...")
-        article_content = generate_article(model, work)
+        print(f"[{idx}/{max_articles}] 📝 {title[:40]}...")
+        print(f"   公開日: {publish_date}")
+        print(f"   ジャンル: {', '.join(matched_genres)}")
         
-        if article_content:
+        if job["status"] == LEASE_LOST:
+            print(f"   ⏭️  スキップ（期限が切れ、別のプロセスが処理中）")
+            skip_count += 1
+        elif article_content:
             # 保存
-            filepath = save_article(article_content, work, publish_date, content_dir, content_id, matched_genres)
+            generated = article_content
+            article_content, excerpt = prepare_article(article_content, work, args.json)
+            filepath = save_article(article_content, work, publish_date, content_dir, content_id, matched_genres, excerpt,
+                                    generated)
             
             if filepath:
                 print(f"   ✅ 保存完了")
                 success_count += 1
+                queue.complete(job["id"], job["lease_until"])
             else:
                 print(f"   ❌ 保存失敗")
                 fail_count += 1
+                queue.fail(job["id"], "記事の保存に失敗しました", job["lease_until"])
         else:
             print(f"   ❌ 生成失敗")
             fail_count += 1
-            # 失敗した記事を記録
-            failed_items.append({
-                "content_id": content_id,
-                "title": title,
-                "publish_date": publish_date,
-                "work": work
-            })
-        
-        # レート制限対策（クォータを考慮して長めに待機）
-        if idx < max_articles:
-            wait_time = 15  # 15秒待機（クォータ制限を考慮）
-            print(f"   ⏳ {wait_time}秒待機中...")
-            time.sleep(wait_time)
+            queue.fail(job["id"], "記事の生成に失敗しました", job["lease_until"])
         
         print()
     
-    # 失敗した記事をJSONファイルに保存
-    if failed_items:
-        failed_file = data_dir / "failed_articles.json"
-        try:
-            with open(failed_file, "w", encoding="utf-8") as f:
-                json.dump(failed_items, f, ensure_ascii=False, indent=2)
-            print(f"📝 失敗した記事を記録しました: {failed_file}")
-        except Exception as e:
-            print(f"⚠️  失敗記事の記録に失敗: {e}", file=sys.stderr)
+    print(get_controller().format_stats())
     
     # 完了メッセージ
     print("=" * 80)
@@ -756,8 +1075,8 @@ def main():
     print(f"✅ 成功: {success_count}本")
     print(f"⏭️  スキップ: {skip_count}本")
     print(f"❌ 失敗: {fail_count}本")
-    if failed_items:
-        print(f"💾 失敗した記事は {failed_file} に保存されました")
+    if fail_count:
+        print(f"💾 失敗した記事はジョブキューに記録されました（python3 scripts/job_queue.py --list pending）")
         print(f"   再試行するには: python3 scripts/retry_failed_articles.py")
     print(f"📁 保存先: {content_dir}")
     print("=" * 80)
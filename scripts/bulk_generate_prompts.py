@@ -10,6 +10,9 @@ import random
 import time
 from datetime import datetime
 from pathlib import Path
+from typing import Iterator
+
+from ndjson_store import find_records_file, iter_records, read_index
 
 # .envファイルの読み込み
 try:
@@ -40,31 +43,27 @@ from generate_prompt_from_api import (
 )
 
 
-def load_ranking_data(data_dir: Path) -> list:
+def load_ranking_data(data_dir: Path) -> tuple[int, Iterator[dict]]:
     """
-    mature_drama_all_latest.jsonからランキングデータを読み込む
+    mature_drama_all_latest.ndjsonからランキングデータを読み込む（以前の .json も読める）
     
     Args:
         data_dir: dataディレクトリのパス
         
     Returns:
-        作品情報のリスト
+        (件数, 作品情報を1件ずつ返すイテレータ)
     """
-    import json
-    
-    latest_file = data_dir / "mature_drama_all_latest.json"
+    latest_file = find_records_file(data_dir / "mature_drama_all_latest.ndjson")
     
-    if not latest_file.exists():
-        print(f"❌ ランキングファイルが見つかりません: {latest_file}", file=sys.stderr)
-        return []
+    if latest_file is None:
+        print(f"❌ ランキングファイルが見つかりません: {data_dir / 'mature_drama_all_latest.ndjson'}", file=sys.stderr)
+        return 0, iter([])
     
     try:
-        with open(latest_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("ranking", [])
+        return read_index(latest_file)["count"], iter_records(latest_file)
     except Exception as e:
         print(f"❌ ランキングデータの読み込み失敗: {e}", file=sys.stderr)
-        return []
+        return 0, iter([])
 
 
 def convert_to_product_info(work: dict) -> dict:
@@ -177,14 +176,14 @@ def main():
     prompts_dir = project_root / "prompts"
     
     # ランキングデータを読み込む
-    print(f"📋 {data_dir / 'mature_drama_all_latest.json'} を読み込み中...")
-    ranking_data = load_ranking_data(data_dir)
+    print(f"📋 {data_dir / 'mature_drama_all_latest.ndjson'} を読み込み中...")
+    total_count, ranking_data = load_ranking_data(data_dir)
     
-    if not ranking_data:
+    if not total_count:
         print("❌ ランキングデータが空です", file=sys.stderr)
         sys.exit(1)
     
-    print(f"✅ {len(ranking_data)}件の作品を読み込みました\n")
+    print(f"✅ {total_count}件の作品を読み込みました\n")
     
     # 既存記事のcontent_idを取得
     print("🔍 既存記事をチェック中...")
@@ -208,7 +207,7 @@ def main():
     
     # 既存記事を除外
     filtered_ranking = [work for work in ranking_data if work.get("content_id", "") not in existing_content_ids]
-    print(f"📊 フィルタリング後: {len(filtered_ranking)}件（既存除外: {len(ranking_data) - len(filtered_ranking)}件）\n")
+    print(f"📊 フィルタリング後: {len(filtered_ranking)}件（既存除外: {total_count - len(filtered_ranking)}件）\n")
     
     if not filtered_ranking:
         print("❌ 新規記事がありません。全て既存記事です。", file=sys.stderr)
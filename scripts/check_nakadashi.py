@@ -6,13 +6,16 @@
 import os
 import re
 import sys
-import time
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs
 import urllib.request
 import urllib.error
 from bs4 import BeautifulSoup
 
+from article_frontmatter import read_frontmatter
+from response_cache import get_default_cache
+from rate_limit import get_limiter
+
 def extract_content_id_from_url(url: str) -> str:
     """アフィリエイトURLからcontent_idを抽出"""
     try:
@@ -42,7 +45,12 @@ def extract_content_id_from_url(url: str) -> str:
 
 
 def get_dmm_page_content(content_id: str) -> str:
-    """DMMの作品ページのHTMLを取得"""
+    """DMMの作品ページのHTMLを取得（data/dmm_cache.sqlite3 にキャッシュ済みならそれを使う）"""
+    return get_default_cache().fetch("detail_page", {"cid": content_id}, lambda: download_dmm_page(content_id))
+
+
+def download_dmm_page(content_id: str) -> str:
+    """DMMの作品ページのHTMLをダウンロード"""
     # DMMの作品ページURL（videoaとvideoの両方を試す）
     urls = [
         f"https://www.dmm.co.jp/digital/videoa/-/detail/=/cid={content_id}/",
@@ -63,6 +71,8 @@ def get_dmm_page_content(content_id: str) -> str:
     # 複数のURLを試す
     for url in urls:
         try:
+            # 負荷軽減のため、実際にダウンロードするときだけ共有のレート制限を待つ
+            get_limiter("dmm_page").acquire()
             req = urllib.request.Request(url, headers=headers)
             with urllib.request.urlopen(req, timeout=10, context=ssl_context) as response:
                 html = response.read().decode('utf-8')
@@ -163,29 +173,9 @@ def check_nakadashi(html: str) -> bool:
 
 
 def parse_markdown_file(file_path: Path) -> dict:
-    """Markdownファイルからfrontmatterを解析"""
+    """Markdownファイルからfrontmatterを解析（本文は読まない）"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # frontmatterを抽出
-        match = re.match(r'^---\n(.*?)\n---', content, re.DOTALL)
-        if not match:
-            return {}
-        
-        frontmatter_text = match.group(1)
-        frontmatter = {}
-        
-        # 各行をパース
-        for line in frontmatter_text.split('\n'):
-            if ':' in line:
-                key, value = line.split(':', 1)
-                key = key.strip()
-                value = value.strip().strip('"').strip("'")
-                frontmatter[key] = value
-        
-        return frontmatter
-        
+        return read_frontmatter(file_path).fields
     except Exception as e:
         print(f"⚠️  ファイル読み込みエラー ({file_path}): {e}", file=sys.stderr)
         return {}
@@ -330,9 +320,6 @@ def main():
             })
         else:
             print(f"   ❌ 中出し作品ではありません")
-        
-        # API負荷軽減のため、少し待機
-        time.sleep(1)
     
     # 結果を表示
     print("\n" + "=" * 80)
@@ -342,6 +329,7 @@ def main():
     print(f"🎯 中出し作品: {nakadashi_count}件")
     print(f"📝 タグ追加: {updated_count}件")
     print(f"❌ エラー: {error_count}件")
+    print(get_default_cache().format_stats())
     
     if results:
         print("\n📝 中出し作品一覧:")
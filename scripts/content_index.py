@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+content/*.md のフロントマターをSQLiteにインデックスする共有モジュール
+
+既存記事のcontentId確認のたびに全記事を読み直さなくて済むように、
+data/content_index.sqlite3 に記事メタデータを保存する。
+更新はmtime/sizeが変化したファイルだけを読み直す差分方式。
+
+使い方:
+    from content_index import ContentIndex, get_existing_content_ids
+
+    existing_ids = get_existing_content_ids(content_dir)
+
+    with ContentIndex(content_dir) as index:
+        index.refresh()
+        if index.has_content_id("1start00473"):
+            ...
+
+    # コマンドラインから更新・確認
+    python3 scripts/content_index.py
+    python3 scripts/content_index.py --rebuild
+    python3 scripts/content_index.py --lookup 1start00473
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from article_frontmatter import read_frontmatter
+
+# プロジェクトルート
+script_dir = Path(__file__).parent
+project_root = script_dir.parent
+DEFAULT_CONTENT_DIR = project_root / "content"
+DEFAULT_DB_PATH = project_root / "data" / "content_index.sqlite3"
+
+# スキーマ・パース方法を変更したら上げる（古いインデックスは自動で作り直す）
+SCHEMA_VERSION = 2
+
+# ファイル名から日付とcontent_idを取り出す（例: 2025-12-14-1start00473.md）
+FILENAME_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})-(.+)$')
+
+
+def content_id_from_filename(file_path: Path) -> Optional[str]:
+    """ファイル名からcontent_idを抽出（例: 2025-12-14-1start00473.md -> 1start00473）"""
+    match = FILENAME_PATTERN.match(Path(file_path).stem)
+    return match.group(2) if match else None
+
+
+def _file_hash(file_path: Path) -> str:
+    """ファイル内容のSHA-1（変更検出用）"""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentIndex:
+    """content/*.md のメタデータインデックス"""
+
+    def __init__(self, content_dir: Path = DEFAULT_CONTENT_DIR, db_path: Path = DEFAULT_DB_PATH):
+        self.content_dir = Path(content_dir)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self._ensure_schema()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """DB接続を閉じる"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _ensure_schema(self):
+        """テーブルを作成（スキーマが古い場合は作り直す）"""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS articles")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS articles (
+                slug TEXT PRIMARY KEY,
+                content_id TEXT,
+                date TEXT,
+                title TEXT,
+                tags TEXT,
+                image TEXT,
+                affiliate_link TEXT,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                hash TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_content_id ON articles (content_id)")
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def _build_row(self, file_path: Path, stat: os.stat_result) -> tuple:
+        """1記事分の行データを作成（フロントマターだけを読む）"""
+        record = read_frontmatter(file_path)
+        return (
+            file_path.stem,
+            record.content_id or None,
+            record.date or None,
+            record.title or None,
+            json.dumps(record.tags, ensure_ascii=False),
+            record.image or None,
+            record.affiliate_link or None,
+            stat.st_mtime_ns,
+            stat.st_size,
+            _file_hash(file_path),
+        )
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        content/ とインデックスを同期する
+
+        mtime/sizeが変わったファイルだけを読み直し、削除されたファイルは行を消す。
+
+        Returns:
+            {"added": n, "updated": n, "removed": n, "unchanged": n}
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+
+        known = {
+            row["slug"]: (row["mtime_ns"], row["size"])
+            for row in self.conn.execute("SELECT slug, mtime_ns, size FROM articles")
+        }
+
+        seen = set()
+        rows = []
+        if self.content_dir.exists():
+            with os.scandir(self.content_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".md") or not entry.is_file():
+                        continue
+                    file_path = Path(entry.path)
+                    slug = file_path.stem
+                    seen.add(slug)
+                    stat = entry.stat()
+                    if known.get(slug) == (stat.st_mtime_ns, stat.st_size):
+                        stats["unchanged"] += 1
+                        continue
+                    try:
+                        rows.append(self._build_row(file_path, stat))
+                    except (OSError, UnicodeDecodeError) as e:
+                        print(f"⚠️  {entry.name} のインデックス作成に失敗: {e}", file=sys.stderr)
+                        continue
+                    stats["updated" if slug in known else "added"] += 1
+
+        removed = [(slug,) for slug in known if slug not in seen]
+        stats["removed"] = len(removed)
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.executemany("DELETE FROM articles WHERE slug = ?", removed)
+
+        return stats
+
+    def rebuild(self) -> Dict[str, int]:
+        """インデックスを空にしてから作り直す"""
+        with self.conn:
+            self.conn.execute("DELETE FROM articles")
+        return self.refresh()
+
+    def has_content_id(self, content_id: str) -> bool:
+        """指定したcontent_idの記事が存在するか"""
+        row = self.conn.execute(
+            "SELECT 1 FROM articles WHERE content_id = ? LIMIT 1", (content_id,)
+        ).fetchone()
+        return row is not None
+
+    def content_ids(self) -> Set[str]:
+        """
+        既存記事のcontent_idのセット
+
+        フロントマターのcontentIdに加えて、ファイル名から読み取れるIDも含める
+        （contentIdが書かれていない古い記事も既存扱いにするため）
+        """
+        ids = set()
+        for row in self.conn.execute("SELECT slug, content_id FROM articles"):
+            if row["content_id"]:
+                ids.add(row["content_id"])
+            filename_id = content_id_from_filename(Path(row["slug"]))
+            if filename_id:
+                ids.add(filename_id)
+        return ids
+
+    def find_by_content_id(self, content_id: str) -> List[dict]:
+        """指定したcontent_idの記事一覧"""
+        rows = self.conn.execute(
+            "SELECT * FROM articles WHERE content_id = ? ORDER BY slug", (content_id,)
+        ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def articles(self) -> List[dict]:
+        """全記事のメタデータ一覧（slug順）"""
+        rows = self.conn.execute("SELECT * FROM articles ORDER BY slug").fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def _row_to_dict(self, row: sqlite3.Row) -> dict:
+        """DBの行をdictにする（pathとtagsを復元）"""
+        article = dict(row)
+        article["path"] = self.content_dir / f"{row['slug']}.md"
+        article["tags"] = json.loads(row["tags"]) if row["tags"] else []
+        return article
+
+
+def get_existing_content_ids(content_dir: Path = DEFAULT_CONTENT_DIR, db_path: Path = DEFAULT_DB_PATH) -> Set[str]:
+    """インデックスを差分更新して、既存記事のcontent_idのセットを返す"""
+    with ContentIndex(content_dir, db_path) as index:
+        index.refresh()
+        return index.content_ids()
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="content/*.md のフロントマターインデックスを更新")
+    parser.add_argument("--content-dir", type=Path, default=DEFAULT_CONTENT_DIR, help="記事ディレクトリ")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="インデックスDBのパス")
+    parser.add_argument("--rebuild", action="store_true", help="インデックスを作り直す")
+    parser.add_argument("--lookup", type=str, help="指定したcontent_idの記事を表示")
+    args = parser.parse_args()
+
+    with ContentIndex(args.content_dir, args.db) as index:
+        stats = index.rebuild() if args.rebuild else index.refresh()
+        print(f"✅ インデックス更新: 追加 {stats['added']}件 / 更新 {stats['updated']}件 / "
+              f"削除 {stats['removed']}件 / 変更なし {stats['unchanged']}件")
+        print(f"📁 保存先: {index.db_path}")
+
+        if args.lookup:
+            articles = index.find_by_content_id(args.lookup)
+            if not articles:
+                print(f"❌ {args.lookup} の記事はありません")
+            for article in articles:
+                print(f"   - {article['slug']} (日付: {article['date']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+content/*.md を1回だけ読み込み、登録済みの修正処理（fix_*）をまとめて適用するスクリプト
+
+各修正は (frontmatter, 本文) を持つ Document を受け取り、その場で書き換える関数として登録する。
+すべての修正をメモリ上で順番に適用し、バイト列が変わった記事だけを書き戻す。
+
+使い方:
+    python3 scripts/corpus_pipeline.py --list
+    python3 scripts/corpus_pipeline.py                      # デフォルト有効の修正をすべて適用
+    python3 scripts/corpus_pipeline.py --only yaml_escape,affiliate_links
+    python3 scripts/corpus_pipeline.py --enable mgs_tone    # デフォルト無効の修正も追加
+    python3 scripts/corpus_pipeline.py --dry-run            # 書き込まずに件数だけ確認
+    python3 scripts/corpus_pipeline.py --jobs 0             # CPUコア数のプロセスで並列実行
+"""
+
+import re
+import sys
+import argparse
+from functools import partial
+from pathlib import Path
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+import article_frontmatter
+import fix_mgs_frontmatter
+import fix_yaml_escape
+import fix_affiliate_links
+import fix_mgs_sample_images_clean
+import fix_mgs_article_tone
+import extract_genres_to_tags
+from parallel import add_jobs_argument, map_parallel
+
+# プロジェクトルート
+script_dir = Path(__file__).parent
+project_root = script_dir.parent
+content_dir = project_root / "content"
+
+# 書き戻したときにバイト列が変わらないよう、区切りは元の形のまま扱う
+FRONTMATTER_PATTERN = re.compile(r'\A---\n(.*?)\n---[ \t]*(?=\n|\Z)', re.DOTALL)
+
+
+class Document:
+    """1記事分の (frontmatter, 本文)。textに代入すると再分割される"""
+
+    def __init__(self, path: Path, text: str):
+        self.path = path
+        self.text = text
+
+    @property
+    def text(self) -> str:
+        """記事全体のテキスト"""
+        if self.frontmatter is None:
+            return self.body
+        return f"---\n{self.frontmatter}\n---{self.body}"
+
+    @text.setter
+    def text(self, value: str):
+        match = FRONTMATTER_PATTERN.match(value)
+        if match:
+            self.frontmatter = match.group(1)
+            self.body = value[match.end():]
+        else:
+            self.frontmatter = None
+            self.body = value
+
+    def get(self, key: str, default: str = "") -> str:
+        """frontmatterの値（前後のクォートを外したもの）を取得"""
+        if self.frontmatter is None:
+            return default
+        for line in self.frontmatter.split("\n"):
+            match = article_frontmatter.LINE_PATTERN.match(line)
+            if match and match.group(1) == key:
+                return article_frontmatter.unquote(match.group(2), unescape=False)
+        return default
+
+    def set(self, key: str, raw_value: str):
+        """frontmatterの行を書き換える（raw_valueはクォート込みでそのまま書く）"""
+        lines = self.frontmatter.split("\n") if self.frontmatter is not None else []
+        for i, line in enumerate(lines):
+            match = article_frontmatter.LINE_PATTERN.match(line)
+            if match and match.group(1) == key:
+                lines[i] = f"{key}: {raw_value}"
+                break
+        else:
+            lines.append(f"{key}: {raw_value}")
+        self.frontmatter = "\n".join(lines)
+
+
+# 登録済みの修正処理（登録順に適用される）
+TRANSFORMS: Dict[str, dict] = {}
+
+
+def register(name: str, description: str, default: bool = True):
+    """修正処理を登録するデコレータ"""
+    def decorator(func: Callable[[Document], None]):
+        TRANSFORMS[name] = {
+            "func": func,
+            "description": description,
+            "default": default,
+        }
+        return func
+    return decorator
+
+
+def is_mgs(doc: Document) -> bool:
+    """MGS記事かどうか"""
+    return doc.get("source") == "MGS"
+
+
+@register("mgs_frontmatter", "壊れたフロントマター（1行化・---欠け・URL誤り）を修復（fix_mgs_frontmatter.py）")
+def transform_mgs_frontmatter(doc: Document):
+    text = doc.text
+    if fix_mgs_frontmatter.is_broken_frontmatter(text):
+        doc.text = fix_mgs_frontmatter.fix_frontmatter(text)
+
+
+@register("yaml_escape", "タイトル・抜粋のYAMLエスケープを修正（fix_yaml_escape.py）")
+def transform_yaml_escape(doc: Document):
+    new_text = fix_yaml_escape.fix_yaml_escape_content(doc.text)
+    if new_text is not None:
+        doc.text = new_text
+
+
+@register("affiliate_links", "Markdownリンクのアフィリエイトリンクを<a>タグに変換（fix_affiliate_links.py）")
+def transform_affiliate_links(doc: Document):
+    doc.body = fix_affiliate_links.fix_affiliate_links_in_content(doc.body)
+
+
+@register("mgs_sample_images", "MGS記事のサンプル画像を重複なしで差し替え（fix_mgs_sample_images_clean.py）")
+def transform_mgs_sample_images(doc: Document):
+    if not is_mgs(doc):
+        return
+    image_url = doc.get("image")
+    content_id = doc.get("contentId")
+    if not image_url or not content_id:
+        return
+    doc.body = fix_mgs_sample_images_clean.fix_sample_images_in_body(
+        doc.body, image_url, content_id, doc.get("affiliateLink"), doc.get("title")
+    )
+
+
+@register("mgs_tone", "MGS記事のタメ口表現を修正（fix_mgs_article_tone.py、URL内のwも消すため明示指定時のみ）", default=False)
+def transform_mgs_tone(doc: Document):
+    if is_mgs(doc):
+        doc.body = fix_mgs_article_tone.fix_article_tone(doc.body)
+
+
+@register("genre_tags", "本文の「**ジャンル:**」をtagsに追加（extract_genres_to_tags.py）")
+def transform_genre_tags(doc: Document):
+    genres = extract_genres_to_tags.extract_genres_from_content(doc.body)
+    if not genres:
+        return
+    new_text = extract_genres_to_tags.add_genres_to_tags(doc.text, genres)
+    if new_text is not None:
+        doc.text = new_text
+
+
+def select_transforms(only: Optional[List[str]] = None, enable: Optional[List[str]] = None,
+                      skip: Optional[List[str]] = None) -> List[str]:
+    """適用する修正処理の名前を登録順で返す"""
+    names = list(only) if only else [name for name, t in TRANSFORMS.items() if t["default"]]
+    names += [name for name in (enable or []) if name not in names]
+    names = [name for name in names if name not in (skip or [])]
+
+    unknown = [name for name in names if name not in TRANSFORMS]
+    if unknown:
+        raise ValueError(f"未登録の修正処理: {', '.join(unknown)}")
+
+    order = list(TRANSFORMS)
+    return sorted(names, key=order.index)
+
+
+def process_file(file_path: Path, transform_names: List[str], dry_run: bool = False) -> dict:
+    """
+    1記事に修正処理をまとめて適用する
+
+    Returns:
+        {"file": ファイル名, "changed": 書き換えたか, "applied": 変更を出した修正名のリスト, "error": エラー}
+    """
+    result = {"file": file_path.name, "changed": False, "applied": [], "error": None}
+    try:
+        original_bytes = file_path.read_bytes()
+        doc = Document(file_path, original_bytes.decode("utf-8"))
+
+        for name in transform_names:
+            before = doc.text
+            TRANSFORMS[name]["func"](doc)
+            if doc.text != before:
+                result["applied"].append(name)
+
+        new_bytes = doc.text.encode("utf-8")
+        if new_bytes != original_bytes:
+            result["changed"] = True
+            if not dry_run:
+                file_path.write_bytes(new_bytes)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def run_pipeline(files: List[Path], transform_names: List[str], dry_run: bool = False, jobs: int = 1) -> dict:
+    """
+    記事一覧に修正処理を適用して集計を返す（jobs > 1 でプロセス並列、結果はファイル順）
+
+    Returns:
+        {"checked": n, "changed": n, "errors": [(ファイル名, エラー)], "per_transform": Counter}
+    """
+    summary = {"checked": 0, "changed": 0, "errors": [], "per_transform": Counter()}
+    worker = partial(process_file, transform_names=transform_names, dry_run=dry_run)
+    for result in map_parallel(worker, files, jobs):
+        summary["checked"] += 1
+        if result["error"]:
+            summary["errors"].append((result["file"], result["error"]))
+            print(f"❌ {result['file']} - エラー: {result['error']}")
+            continue
+        if result["changed"]:
+            summary["changed"] += 1
+            summary["per_transform"].update(result["applied"])
+            print(f"✅ {result['file']} - {', '.join(result['applied'])}")
+    return summary
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="content/*.md に修正処理をまとめて適用")
+    parser.add_argument("--list", action="store_true", help="登録済みの修正処理を表示")
+    parser.add_argument("--only", type=str, help="適用する修正処理（カンマ区切り）")
+    parser.add_argument("--enable", type=str, help="デフォルト無効の修正処理を追加（カンマ区切り）")
+    parser.add_argument("--skip", type=str, help="除外する修正処理（カンマ区切り）")
+    parser.add_argument("--glob", type=str, default="*.md", help="対象ファイルのパターン（例: 2026-01-02-*.md）")
+    parser.add_argument("--dry-run", action="store_true", help="書き込まずに変更件数だけ表示")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+
+    if args.list:
+        print("📋 登録済みの修正処理（適用順）:")
+        for name, transform in TRANSFORMS.items():
+            mark = "✅" if transform["default"] else "⏸️ "
+            print(f"   {mark} {name}: {transform['description']}")
+        return
+
+    def split(value: Optional[str]) -> List[str]:
+        return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+    try:
+        transform_names = select_transforms(split(args.only), split(args.enable), split(args.skip))
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if not content_dir.exists():
+        print(f"❌ contentディレクトリが見つかりません: {content_dir}")
+        sys.exit(1)
+
+    files = sorted(content_dir.glob(args.glob))
+
+    print("=" * 80)
+    print("  記事の一括修正パイプライン")
+    print("=" * 80 + "\n")
+    print(f"📋 {len(files)}件の記事をチェックします")
+    print(f"🔧 修正処理: {', '.join(transform_names)}")
+    if args.dry_run:
+        print("👀 ドライラン（書き込みなし）")
+    print()
+
+    summary = run_pipeline(files, transform_names, args.dry_run, args.jobs)
+
+    print("\n" + "=" * 80)
+    print("🎉 修正完了！")
+    print(f"   チェック: {summary['checked']}件")
+    print(f"   {'変更予定' if args.dry_run else '書き込み'}: {summary['changed']}件")
+    print(f"   エラー: {len(summary['errors'])}件")
+    for name in transform_names:
+        print(f"   - {name}: {summary['per_transform'][name]}件")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
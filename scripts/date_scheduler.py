@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+記事の日付（frontmatterのdateとファイル名の日付部分）をまとめて付け替えるスケジューラ
+
+1. content/ のメタデータを1回だけスキャンし（content_index.py）、
+   登録済みの割り当てルールで「旧ファイル名 → 新しい日付・新ファイル名」の計画をメモリ上で作る
+2. 書き込み前に衝突（同じファイル名への複数の移動・動かない記事との重複）を検出して計画から外す
+3. ジャーナル（data/date_schedule_journal.json）を書いてから2段階で適用する
+   - staged:  新しい内容を content/.date_schedule/ に書き出す（元の記事には触らない）
+   - removed: 元の記事を削除する
+   - 最後に書き出した記事を content/ に移動してジャーナルを消す
+   途中で落ちても --resume でジャーナルの段階から再開できる
+
+使い方:
+    python3 scripts/date_scheduler.py --list
+    python3 scripts/date_scheduler.py per_day --start-date 2025-12-30 --per-day 20 --dry-run
+    python3 scripts/date_scheduler.py recent --max-articles 300
+    python3 scripts/date_scheduler.py future_to_today
+    python3 scripts/date_scheduler.py --resume
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import inspect
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from content_index import FILENAME_PATTERN, ContentIndex
+from article_frontmatter import split_frontmatter
+
+# プロジェクトルート
+script_dir = Path(__file__).parent
+project_root = script_dir.parent
+DEFAULT_CONTENT_DIR = project_root / "content"
+DEFAULT_JOURNAL_PATH = project_root / "data" / "date_schedule_journal.json"
+
+# 書き出し先（content/ と同じファイルシステムに置いてos.replaceを原子的にする）
+STAGING_DIR_NAME = ".date_schedule"
+
+DATE_LINE_PATTERN = re.compile(r'^date:.*$', re.MULTILINE)
+
+# 2025-12-30/31 と 2026-01-01 の固定枠（reassign_dates_custom / fix_dates_final）
+FIXED_DAYS = ["2025-12-30", "2025-12-31"]
+FIXED_DAYS_TOTAL = 300
+NEW_YEAR_DAY = "2026-01-01"
+NEW_YEAR_DAY_TOTAL = 20
+
+
+def scan_articles(content_dir: Path) -> List[dict]:
+    """
+    記事のメタデータを1回だけスキャンする（ファイル名順）
+
+    Returns:
+        [{"name": ファイル名, "name_date": ファイル名の日付 or None, "suffix": 日付以降の部分, "date": frontmatterのdate}]
+    """
+    with ContentIndex(content_dir) as index:
+        index.refresh()
+        rows = index.articles()
+
+    articles = []
+    for row in rows:
+        match = FILENAME_PATTERN.match(row["slug"])
+        articles.append({
+            "name": f"{row['slug']}.md",
+            "name_date": match.group(1) if match else None,
+            "suffix": match.group(2) if match else None,
+            "date": row["date"] or "",
+        })
+    return articles
+
+
+def day_string(day: datetime) -> str:
+    return day.strftime("%Y-%m-%d")
+
+
+def parse_day(value: Optional[str]) -> datetime:
+    """YYYY-MM-DD（省略時は今日）"""
+    if not value:
+        return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+# 登録済みの割り当てルール: (articles, **options) -> {ファイル名: 新しい日付}
+PLANNERS: Dict[str, dict] = {}
+
+
+def planner(name: str, description: str):
+    """割り当てルールを登録するデコレータ"""
+    def decorator(func: Callable[..., Dict[str, str]]):
+        PLANNERS[name] = {"func": func, "description": description}
+        return func
+    return decorator
+
+
+def spread_per_day(articles: List[dict], start: datetime, per_day: int) -> Dict[str, str]:
+    """開始日から1日per_day件ずつ順番に割り当てる"""
+    return {
+        article["name"]: day_string(start + timedelta(days=idx // per_day))
+        for idx, article in enumerate(articles)
+    }
+
+
+def group_by_name_date(articles: List[dict]) -> Dict[str, List[dict]]:
+    """ファイル名の日付ごとに分類"""
+    groups: Dict[str, List[dict]] = {}
+    for article in articles:
+        if article["name_date"]:
+            groups.setdefault(article["name_date"], []).append(article)
+    return groups
+
+
+@planner("per_day", "全記事を開始日から1日N件ずつ割り当て（旧 reassign_dates_20_per_day.py / assign_future_dates.py）")
+def plan_per_day(articles: List[dict], start_date: str = "2025-12-30", per_day: int = 20) -> Dict[str, str]:
+    dated = [a for a in articles if a["name_date"]]
+    return spread_per_day(dated, parse_day(start_date), per_day)
+
+
+@planner("recent", "先頭N件を前半は昨日、後半は今日に割り当て（旧 assign_past_dates.py）")
+def plan_recent(articles: List[dict], max_articles: int = 300, today: Optional[str] = None) -> Dict[str, str]:
+    today_obj = parse_day(today)
+    targets = articles[:max_articles]
+    half = len(targets) // 2
+    return {
+        article["name"]: day_string(today_obj - timedelta(days=1) if idx < half else today_obj)
+        for idx, article in enumerate(targets)
+    }
+
+
+@planner("future_to_today", "未来の日付の記事を今日に変更（旧 fix_future_dates_to_today.py）")
+def plan_future_to_today(articles: List[dict], today: Optional[str] = None) -> Dict[str, str]:
+    today_str = day_string(parse_day(today))
+    assignments = {}
+    for article in articles:
+        try:
+            article_day = day_string(datetime.strptime(article["date"], "%Y-%m-%d"))
+        except ValueError:
+            continue
+        if article_day > today_str:
+            assignments[article["name"]] = today_str
+    return assignments
+
+
+@planner("custom", "12/30・12/31に300件、1/1に20件（既存5件+15件）、残りを1/2から1日20件（旧 reassign_dates_custom.py）")
+def plan_custom(articles: List[dict], per_day: int = 20) -> Dict[str, str]:
+    groups = group_by_name_date(articles)
+    fixed = [a for day in FIXED_DAYS for a in groups.get(day, [])]
+    if len(fixed) < FIXED_DAYS_TOTAL:
+        others = [a for a in articles if a["name_date"] and a["name_date"] not in FIXED_DAYS + [NEW_YEAR_DAY]]
+        fixed += others[:FIXED_DAYS_TOTAL - len(fixed)]
+    fixed = fixed[:FIXED_DAYS_TOTAL]
+
+    half = FIXED_DAYS_TOTAL // 2
+    assignments = {a["name"]: FIXED_DAYS[0] if idx < half else FIXED_DAYS[1] for idx, a in enumerate(fixed)}
+
+    kept_new_year = groups.get(NEW_YEAR_DAY, [])[:5]
+    assignments.update({a["name"]: NEW_YEAR_DAY for a in kept_new_year})
+
+    rest = [a for a in articles if a["name_date"] and a["name"] not in assignments]
+    new_year_slots = NEW_YEAR_DAY_TOTAL - len(kept_new_year)
+    assignments.update({a["name"]: NEW_YEAR_DAY for a in rest[:new_year_slots]})
+    assignments.update(spread_per_day(rest[new_year_slots:], parse_day(NEW_YEAR_DAY) + timedelta(days=1), per_day))
+    return assignments
+
+
+@planner("final", "1/1の20件超過分を12/30へ移し、12/30・12/31を合計300件に補充（旧 fix_dates_final.py）")
+def plan_final(articles: List[dict]) -> Dict[str, str]:
+    groups = group_by_name_date(articles)
+    assignments = {}
+
+    excess = groups.get(NEW_YEAR_DAY, [])[NEW_YEAR_DAY_TOTAL:]
+    assignments.update({a["name"]: FIXED_DAYS[0] for a in excess})
+
+    counts = {day: len(groups.get(day, [])) for day in FIXED_DAYS}
+    counts[FIXED_DAYS[0]] += len(excess)
+    needed = FIXED_DAYS_TOTAL - sum(counts.values())
+    if needed > 0:
+        others = [a for a in articles if a["name_date"] and a["name_date"] not in FIXED_DAYS + [NEW_YEAR_DAY]]
+        for article in others[:needed]:
+            day = FIXED_DAYS[0] if counts[FIXED_DAYS[0]] < FIXED_DAYS_TOTAL // 2 else FIXED_DAYS[1]
+            assignments[article["name"]] = day
+            counts[day] += 1
+    return assignments
+
+
+def build_plan(articles: List[dict], assignments: Dict[str, str]) -> Tuple[List[dict], List[dict]]:
+    """
+    割り当てから移動計画を作り、衝突する移動を外す
+
+    移動先が「計画に入っていて別名に移る記事」の旧ファイル名なら衝突ではない（2段階で適用するため）。
+    衝突した移動を外すとその記事は元の名前に残るので、衝突がなくなるまで繰り返す。
+
+    Returns:
+        (moves, collisions)
+        moves: [{"old": 旧ファイル名, "new": 新ファイル名, "date": 新しい日付}]
+        collisions: [{"old", "new", "date", "reason"}]
+    """
+    by_name = {a["name"]: a for a in articles}
+    moves = {}
+    for name, new_date in assignments.items():
+        article = by_name[name]
+        new_name = f"{new_date}-{article['suffix']}.md" if article["suffix"] else name
+        if new_name == name and article["date"] == new_date:
+            continue
+        moves[name] = {"old": name, "new": new_name, "date": new_date}
+
+    collisions = []
+    while True:
+        # 移動しない記事が占めている名前
+        occupied = {name for name in by_name if name not in moves or moves[name]["new"] == name}
+        targets: Dict[str, List[str]] = {}
+        for move in moves.values():
+            targets.setdefault(move["new"], []).append(move["old"])
+
+        dropped = []
+        for new_name, olds in targets.items():
+            if len(olds) > 1:
+                # 同じ名前への移動は、元から同じ名前の記事（いなければ最初の1件）だけを残す
+                keep = new_name if new_name in olds else olds[0]
+                dropped += [(old, f"{new_name} への移動が{len(olds)}件") for old in olds if old != keep]
+            elif new_name in occupied and olds[0] != new_name:
+                dropped.append((olds[0], f"{new_name} は移動しない記事と重複"))
+
+        if not dropped:
+            break
+        for old, reason in dropped:
+            collisions.append(dict(moves.pop(old), reason=reason))
+
+    return sorted(moves.values(), key=lambda m: m["old"]), collisions
+
+
+def replace_date(content: str, new_date: str) -> str:
+    """frontmatterのdate行だけを書き換える（本文中の「date:」には触らない）"""
+    frontmatter_text, _ = split_frontmatter(content)
+    if frontmatter_text is None:
+        return content
+    start = content.index(frontmatter_text)
+    end = start + len(frontmatter_text)
+    new_frontmatter = DATE_LINE_PATTERN.sub(f'date: "{new_date}"', frontmatter_text, count=1)
+    return content[:start] + new_frontmatter + content[end:]
+
+
+def write_journal(journal_path: Path, journal: dict) -> None:
+    """ジャーナルを原子的に書き換える"""
+    journal_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = journal_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(journal, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, journal_path)
+
+
+def load_journal(journal_path: Path) -> Optional[dict]:
+    if not journal_path.exists():
+        return None
+    with open(journal_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def stage(content_dir: Path, staging_dir: Path, moves: List[dict]) -> None:
+    """新しい内容を書き出す（元の記事はそのまま）"""
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+    staging_dir.mkdir()
+    for idx, move in enumerate(moves, 1):
+        content = (content_dir / move["old"]).read_text(encoding="utf-8")
+        staged_file = staging_dir / move["new"]
+        with open(staged_file, "w", encoding="utf-8") as f:
+            f.write(replace_date(content, move["date"]))
+            f.flush()
+            os.fsync(f.fileno())
+        if idx % 500 == 0:
+            print(f"  📝 {idx}/{len(moves)}件書き出し完了")
+
+
+def commit(content_dir: Path, staging_dir: Path, journal_path: Path, journal: dict) -> None:
+    """ジャーナルの段階から残りを適用する（何度実行しても同じ結果になる）"""
+    moves = journal["moves"]
+
+    if journal["phase"] == "staged":
+        # 移動先として使われない旧ファイルだけを削除（それ以外はos.replaceで上書きされる）
+        new_names = {move["new"] for move in moves}
+        for move in moves:
+            if move["old"] not in new_names:
+                (content_dir / move["old"]).unlink(missing_ok=True)
+        journal["phase"] = "removed"
+        write_journal(journal_path, journal)
+
+    if journal["phase"] == "removed":
+        for move in moves:
+            staged_file = staging_dir / move["new"]
+            if staged_file.exists():
+                os.replace(staged_file, content_dir / move["new"])
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        journal_path.unlink()
+
+
+class UnfinishedJournal(RuntimeError):
+    """前回の適用が途中で止まっている（--resume で再開するまで新しい計画は適用しない）"""
+
+
+def resume_command(journal_path: Path = DEFAULT_JOURNAL_PATH) -> str:
+    """中断した適用を再開するコマンド"""
+    command = "python3 scripts/date_scheduler.py --resume"
+    if Path(journal_path) != DEFAULT_JOURNAL_PATH:
+        command += f" --journal {journal_path}"
+    return command
+
+
+def apply_plan(content_dir: Path, moves: List[dict], journal_path: Path = DEFAULT_JOURNAL_PATH) -> None:
+    """
+    移動計画をジャーナル付きの2段階で適用する
+
+    Raises:
+        UnfinishedJournal: 未完了のジャーナルがある
+    """
+    if load_journal(journal_path):
+        raise UnfinishedJournal(f"未完了のジャーナルがあります: {journal_path}\n"
+                                f"   先に再開してください: {resume_command(journal_path)}")
+
+    staging_dir = content_dir / STAGING_DIR_NAME
+    journal = {
+        "created": datetime.now().isoformat(),
+        "content_dir": str(content_dir.resolve()),
+        "phase": "staging",
+        "moves": moves,
+    }
+    write_journal(journal_path, journal)
+
+    stage(content_dir, staging_dir, moves)
+    journal["phase"] = "staged"
+    write_journal(journal_path, journal)
+
+    commit(content_dir, staging_dir, journal_path, journal)
+
+
+def resume(journal_path: Path = DEFAULT_JOURNAL_PATH) -> bool:
+    """
+    中断した適用を再開する
+
+    書き出し中（staging）に中断した場合は元の記事に触れていないので、書き出しを破棄して終了する。
+
+    Returns:
+        ジャーナルがあったか
+    """
+    journal = load_journal(journal_path)
+    if journal is None:
+        return False
+
+    content_dir = Path(journal["content_dir"])
+    staging_dir = content_dir / STAGING_DIR_NAME
+    if journal["phase"] == "staging":
+        print("⚠️  書き出し中に中断されていました。書き出しを破棄します（記事は変更されていません）")
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        journal_path.unlink()
+        return True
+
+    print(f"🔁 {journal['phase']} の段階から再開します（{len(journal['moves'])}件）")
+    commit(content_dir, staging_dir, journal_path, journal)
+    return True
+
+
+def run_schedule(content_dir: Path, planner_name: str, dry_run: bool = False,
+                 journal_path: Path = DEFAULT_JOURNAL_PATH, **options) -> dict:
+    """
+    スキャン → 計画 → 衝突検出 → 適用 をまとめて実行する
+
+    Returns:
+        {"moves": 移動計画, "collisions": 衝突で外した移動, "per_day": Counter相当のdict}
+    """
+    content_dir = Path(content_dir)
+    articles = scan_articles(content_dir)
+    print(f"📋 全記事数: {len(articles)}件")
+
+    assignments = PLANNERS[planner_name]["func"](articles, **options)
+    moves, collisions = build_plan(articles, assignments)
+
+    per_day: Dict[str, int] = {}
+    for day in assignments.values():
+        per_day[day] = per_day.get(day, 0) + 1
+
+    print(f"📅 割り当て: {len(assignments)}件（変更あり: {len(moves)}件）")
+    if per_day:
+        print(f"   期間: {min(per_day)} 〜 {max(per_day)}（{len(per_day)}日）")
+    for collision in collisions:
+        print(f"⚠️  スキップ: {collision['old']} -> {collision['new']}（{collision['reason']}）")
+
+    if dry_run:
+        for move in moves[:20]:
+            print(f"   {move['old']} -> {move['new']}")
+        if len(moves) > 20:
+            print(f"   ...他{len(moves) - 20}件")
+        print("👀 ドライラン（書き込みなし）")
+    elif moves:
+        apply_plan(content_dir, moves, journal_path)
+        print(f"✅ {len(moves)}件の日付を更新しました")
+
+    return {"moves": moves, "collisions": collisions, "per_day": per_day}
+
+
+def run_cli(content_dir: Path, planner_name: str, dry_run: bool = False,
+            journal_path: Path = DEFAULT_JOURNAL_PATH, **options) -> dict:
+    """
+    コマンドから呼ぶ run_schedule()（未完了のジャーナルがあればメッセージを表示し、終了コード1で終わる）
+    """
+    try:
+        return run_schedule(content_dir, planner_name, dry_run, journal_path, **options)
+    except UnfinishedJournal as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="記事の日付をまとめて付け替える")
+    parser.add_argument("planner", nargs="?", help="割り当てルール（--list で一覧）")
+    parser.add_argument("--list", action="store_true", help="割り当てルールを表示")
+    parser.add_argument("--resume", action="store_true", help="中断した適用を再開")
+    parser.add_argument("--content-dir", type=Path, default=DEFAULT_CONTENT_DIR, help="記事ディレクトリ")
+    parser.add_argument("--journal", type=Path, default=DEFAULT_JOURNAL_PATH, help="ジャーナルのパス")
+    parser.add_argument("--start-date", type=str, help="開始日 YYYY-MM-DD（per_day）")
+    parser.add_argument("--per-day", type=int, help="1日あたりの件数（per_day, custom）")
+    parser.add_argument("--max-articles", type=int, help="対象件数（recent）")
+    parser.add_argument("--today", type=str, help="今日として扱う日付 YYYY-MM-DD（recent, future_to_today）")
+    parser.add_argument("--dry-run", action="store_true", help="計画だけを表示して書き込まない")
+    args = parser.parse_args()
+
+    if args.list:
+        print("📋 割り当てルール:")
+        for name, entry in PLANNERS.items():
+            print(f"   - {name}: {entry['description']}")
+        return
+
+    if args.resume:
+        if not resume(args.journal):
+            print("✅ 未完了のジャーナルはありません")
+        return
+
+    if args.planner not in PLANNERS:
+        parser.error(f"割り当てルールを指定してください: {', '.join(PLANNERS)}")
+
+    options = {
+        "start_date": args.start_date,
+        "per_day": args.per_day,
+        "max_articles": args.max_articles,
+        "today": args.today,
+    }
+    # 指定されたオプションのうち、そのルールが受け取るものだけを渡す
+    accepted = inspect.signature(PLANNERS[args.planner]["func"]).parameters
+    options = {key: value for key, value in options.items() if value is not None and key in accepted}
+
+    run_cli(args.content_dir, args.planner, args.dry_run, args.journal, **options)
+
+
+if __name__ == "__main__":
+    main()
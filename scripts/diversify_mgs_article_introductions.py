@@ -7,8 +7,12 @@ MGS記事の導入部分を多様化するスクリプト
 import re
 import json
 import random
+import argparse
 from pathlib import Path
 
+from article_frontmatter import extract_frontmatter
+from parallel import add_jobs_argument, map_parallel
+
 # プロジェクトルート
 script_dir = Path(__file__).parent
 project_root = script_dir.parent
@@ -33,28 +37,6 @@ DIVERSIFIED_INTRODUCTIONS = [
     "この作品を手に取ったのは、偶然の出会いだった。タイトルから伝わってくる成熟した女性の魅力、そして禁断の物語の予感。これは単なる作品ではなく、人間の感情の深層を描き出す物語なのだろうと感じた。",
 ]
 
-def extract_frontmatter(content: str) -> tuple[dict, str]:
-    """フロントマターを抽出"""
-    if not content.startswith("---"):
-        return {}, content
-    
-    end_pos = content.find("\n---", 3)
-    if end_pos == -1:
-        return {}, content
-    
-    frontmatter_text = content[4:end_pos].strip()
-    body = content[end_pos + 5:].strip()
-    
-    frontmatter = {}
-    for line in frontmatter_text.split("\n"):
-        if ":" in line:
-            key, value = line.split(":", 1)
-            key = key.strip()
-            value = value.strip().strip('"')
-            frontmatter[key] = value
-    
-    return frontmatter, body
-
 def escape_yaml_string(s: str) -> str:
     """YAML文字列をエスケープ"""
     s = s.replace("\\", "\\\\")
@@ -99,120 +81,131 @@ def fix_introduction(body: str) -> str:
     
     return body
 
+def process_article(article_file: Path) -> dict:
+    """
+    1記事分の処理（MGS記事なら導入部分を多様化して保存）
+    
+    Returns:
+        {"status": "not_mgs" | "skipped" | "fixed" | "error", "error": エラー内容}
+    """
+    try:
+        with open(article_file, "r", encoding="utf-8") as f:
+            content = f.read()
+        
+        frontmatter, body = extract_frontmatter(content)
+        
+        # MGS記事のみを対象
+        if frontmatter.get("source", "") != "MGS":
+            return {"status": "not_mgs"}
+        
+        # 「静かな夜」が含まれているかチェック
+        if "静かな夜" not in content:
+            return {"status": "skipped"}
+        
+        # 導入部分を修正
+        new_body = fix_introduction(body)
+        
+        # 変更がない場合はスキップ
+        if new_body == body:
+            return {"status": "skipped"}
+        
+        # フロントマターを再構築
+        title = frontmatter.get("title", "")
+        date = frontmatter.get("date", "")
+        excerpt = frontmatter.get("excerpt", "")
+        image = frontmatter.get("image", "")
+        tags = frontmatter.get("tags", "[]")
+        affiliate_link = frontmatter.get("affiliateLink", "")
+        content_id = frontmatter.get("contentId", "")
+        rating = frontmatter.get("rating", "4.0")
+        source = frontmatter.get("source", "")
+        
+        # タグを正しく処理
+        if isinstance(tags, str):
+            try:
+                tags = json.loads(tags)
+            except:
+                tags = []
+        tags_str = json.dumps(tags, ensure_ascii=False)
+        
+        # エスケープ
+        escaped_title = escape_yaml_string(title)
+        escaped_excerpt = escape_yaml_string(excerpt)
+        
+        frontmatter_lines = ["---"]
+        frontmatter_lines.append(f'title: "{escaped_title}"')
+        frontmatter_lines.append(f'date: "{date}"')
+        frontmatter_lines.append(f'excerpt: "{escaped_excerpt}"')
+        frontmatter_lines.append(f'image: "{image}"')
+        frontmatter_lines.append(f'tags: {tags_str}')
+        frontmatter_lines.append(f'affiliateLink: "{affiliate_link}"')
+        frontmatter_lines.append(f'contentId: "{content_id}"')
+        frontmatter_lines.append(f'rating: {rating}')
+        if source:
+            frontmatter_lines.append(f'source: "{source}"')
+        frontmatter_lines.append("---")
+        
+        new_content = "\n".join(frontmatter_lines) + "\n\n" + new_body
+        
+        # 保存
+        with open(article_file, "w", encoding="utf-8") as f:
+            f.write(new_content)
+        
+        return {"status": "fixed"}
+        
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description="MGS記事の導入部分を多様化")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
     print("=" * 80)
     print("  MGS記事の導入部分を多様化")
     print("=" * 80 + "\n")
     
-    # MGS記事のみを対象
-    mgs_articles = []
-    for article_file in content_dir.glob("*.md"):
-        try:
-            with open(article_file, "r", encoding="utf-8") as f:
-                content = f.read()
-            
-            frontmatter, _ = extract_frontmatter(content)
-            source = frontmatter.get("source", "")
-            
-            if source == "MGS":
-                mgs_articles.append(article_file)
-        except:
-            continue
-    
-    if not mgs_articles:
-        print("❌ MGS記事が見つかりません")
-        return
-    
-    print(f"📋 {len(mgs_articles)}件のMGS記事をチェックします\n")
+    articles = sorted(content_dir.glob("*.md"))
+    print(f"📋 {len(articles)}件の記事からMGS記事をチェックします\n")
     
+    mgs_count = 0
     fixed_count = 0
     skipped_count = 0
     
-    for article_file in mgs_articles:
-        try:
-            with open(article_file, "r", encoding="utf-8") as f:
-                content = f.read()
-            
-            # 「静かな夜」が含まれているかチェック
-            if "静かな夜" not in content:
-                skipped_count += 1
-                continue
-            
-            frontmatter, body = extract_frontmatter(content)
-            
-            if not frontmatter:
-                skipped_count += 1
-                continue
-            
-            # 導入部分を修正
-            new_body = fix_introduction(body)
-            
-            # 変更がない場合はスキップ
-            if new_body == body:
-                skipped_count += 1
-                continue
-            
-            # フロントマターを再構築
-            title = frontmatter.get("title", "")
-            date = frontmatter.get("date", "")
-            excerpt = frontmatter.get("excerpt", "")
-            image = frontmatter.get("image", "")
-            tags = frontmatter.get("tags", "[]")
-            affiliate_link = frontmatter.get("affiliateLink", "")
-            content_id = frontmatter.get("contentId", "")
-            rating = frontmatter.get("rating", "4.0")
-            source = frontmatter.get("source", "")
-            
-            # タグを正しく処理
-            if isinstance(tags, str):
-                try:
-                    tags = json.loads(tags)
-                except:
-                    tags = []
-            tags_str = json.dumps(tags, ensure_ascii=False)
-            
-            # エスケープ
-            escaped_title = escape_yaml_string(title)
-            escaped_excerpt = escape_yaml_string(excerpt)
-            
-            frontmatter_lines = ["---"]
-            frontmatter_lines.append(f'title: "{escaped_title}"')
-            frontmatter_lines.append(f'date: "{date}"')
-            frontmatter_lines.append(f'excerpt: "{escaped_excerpt}"')
-            frontmatter_lines.append(f'image: "{image}"')
-            frontmatter_lines.append(f'tags: {tags_str}')
-            frontmatter_lines.append(f'affiliateLink: "{affiliate_link}"')
-            frontmatter_lines.append(f'contentId: "{content_id}"')
-            frontmatter_lines.append(f'rating: {rating}')
-            if source:
-                frontmatter_lines.append(f'source: "{source}"')
-            frontmatter_lines.append("---")
-            
-            new_content = "\n".join(frontmatter_lines) + "\n\n" + new_body
-            
-            # 保存
-            with open(article_file, "w", encoding="utf-8") as f:
-                f.write(new_content)
-            
-            print(f"✅ {article_file.name} - 導入部分を修正")
-            fixed_count += 1
-            
-            # 進捗表示（100件ごと）
-            if fixed_count % 100 == 0:
-                print(f"\n📊 進捗: {fixed_count}件修正完了\n")
-                
-        except Exception as e:
-            print(f"❌ {article_file.name} - エラー: {e}")
-            import traceback
-            traceback.print_exc()
+    for article_file, result in zip(articles, map_parallel(process_article, articles, args.jobs)):
+        status = result["status"]
+        
+        if status == "not_mgs":
+            continue
+        
+        if status == "error":
+            print(f"❌ {article_file.name} - エラー: {result['error']}")
+            continue
+        
+        mgs_count += 1
+        
+        if status == "skipped":
+            skipped_count += 1
+            continue
+        
+        print(f"✅ {article_file.name} - 導入部分を修正")
+        fixed_count += 1
+        
+        # 進捗表示（100件ごと）
+        if fixed_count % 100 == 0:
+            print(f"\n📊 進捗: {fixed_count}件修正完了\n")
+    
+    if not mgs_count:
+        print("❌ MGS記事が見つかりません")
+        return
     
     print("\n" + "=" * 80)
     print(f"🎉 修正完了！")
+    print(f"   MGS記事: {mgs_count}件")
     print(f"   修正: {fixed_count}件")
     print(f"   スキップ: {skipped_count}件")
     print("=" * 80)
 
 if __name__ == "__main__":
     main()
-
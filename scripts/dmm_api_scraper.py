@@ -7,15 +7,24 @@ DMM API を使用してアダルト動画データを取得するスクリプト
 - ベスト・総集編を除外
 - 女優名が存在する作品のみを対象
 - 重複除去とレート制限対応
+- 1ページごとに途中経過を actress_videos.progress.jsonl に追記し、中断しても続きから再開
+
+使い方:
+    python3 dmm_api_scraper.py
+    python3 dmm_api_scraper.py --restart   # 途中経過を破棄して最初から
 """
 
 import os
 import json
-import time
+import argparse
 import requests
 from typing import List, Dict, Set, Optional
 from datetime import datetime
+from pathlib import Path
 from dotenv import load_dotenv
+from rate_limit import get_limiter
+from ndjson_store import write_records
+from dmm_client import DEFAULT_BASE_URL, get_base_url
 
 # 環境変数を読み込み（親ディレクトリの.envファイルを参照）
 load_dotenv('../.env')
@@ -29,9 +38,10 @@ class DMMAPIScraper:
         if not self.api_id or not self.affiliate_id:
             raise ValueError("DMM_API_ID と DMM_AFFILIATE_ID を .env ファイルに設定してください")
         
-        # DMM API v3 公式エンドポイント（年齢認証対応）
-        self.base_url = "https://api.dmm.com/affiliate/v3/ItemList"
+        # DMM API v3 公式エンドポイント（年齢認証対応、DMM_API_BASE_URL で差し替え可）
+        self.base_url = get_base_url()
         self.collected_ids: Set[str] = set()  # 重複防止用
+        self.collected_videos: List[Dict] = []
         
         # セッション設定（年齢認証突破用）
         self.session = requests.Session()
@@ -89,8 +99,9 @@ class DMMAPIScraper:
         
         print(f"🍪 年齢認証Cookie設定完了: {len(cookies)}個のCookieを設定")
         
-        # 事前に年齢認証を突破
-        self.bypass_age_verification()
+        # 事前に年齢認証を突破（スタブなど本番以外のAPIでは不要）
+        if self.base_url == DEFAULT_BASE_URL:
+            self.bypass_age_verification()
 
     def bypass_age_verification(self):
         """
@@ -164,6 +175,8 @@ class DMMAPIScraper:
         }
         
         try:
+            # API レート制限対応（他のスクリプトと共有の上限）
+            get_limiter("dmm_api").acquire()
             print(f"🔍 検索中: '{keyword}' (offset: {offset})")
             
             # リクエスト固有のヘッダーを追加
@@ -371,95 +384,177 @@ class DMMAPIScraper:
             'collected_at': datetime.now().isoformat()
         }
 
-    def collect_all_videos(self, max_per_keyword: int = 500) -> List[Dict]:
+    def load_progress(self, progress_file: str) -> Dict[str, Dict]:
+        """
+        途中経過ファイル（1行=1ページのJSONL）を読み込み、収集済みのアイテムを復元
+
+        書き込み途中で止まった最後の行は捨てて、ファイルを正常な行の終わりまで切り詰める。
+
+        Returns:
+            {キーワード: {'offset': 次に取得するoffset, 'count': 取得済み件数, 'done': 完了したか}}
+        """
+        progress: Dict[str, Dict] = {}
+        if not os.path.exists(progress_file):
+            return progress
+        
+        valid_end = 0
+        with open(progress_file, 'rb') as f:
+            for line in f:
+                try:
+                    page = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                valid_end += len(line)
+                
+                state = progress.setdefault(page['keyword'], {'offset': 1, 'count': 0, 'done': False})
+                state['offset'] = page['next_offset']
+                state['count'] += len(page['items'])
+                state['done'] = page['done']
+                for video_data in page['items']:
+                    self.collected_ids.add(video_data['content_id'])
+                    self.collected_videos.append(video_data)
+        
+        if valid_end < os.path.getsize(progress_file):
+            print(f"⚠️  途中経過ファイルの壊れた末尾を切り詰めます: {progress_file}")
+            with open(progress_file, 'r+b') as f:
+                f.truncate(valid_end)
+        
+        return progress
+
+    def append_progress(self, progress_file: str, keyword: str, offset: int, next_offset: int,
+                        items: List[Dict], done: bool):
+        """1ページ分の結果と次のoffsetを途中経過ファイルに追記（ディスクに書き出してから戻る）"""
+        page = {
+            'keyword': keyword,
+            'offset': offset,
+            'next_offset': next_offset,
+            'done': done,
+            'items': items,
+        }
+        with open(progress_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(page, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def collect_all_videos(self, max_per_keyword: int = 500,
+                           progress_file: str = 'actress_videos.progress.jsonl',
+                           resume: bool = True) -> List[Dict]:
         """
         全キーワードで動画データを収集
         
+        1ページ取得するごとに、そのページの有効なアイテムと次のoffsetを progress_file に追記する。
+        途中で止まっても、再実行すると各キーワードの続きのoffsetから再開する（取得済みのページは取り直さない）。
+        
         Args:
             max_per_keyword: キーワードあたりの最大取得件数
+            progress_file: 途中経過ファイル（JSONL）
+            resume: Falseなら途中経過を破棄して最初から取得
         
         Returns:
             収集されたビデオデータのリスト
         """
-        all_videos = []
+        self.collected_videos = []
+        self.collected_ids = set()
+        
+        if not resume and os.path.exists(progress_file):
+            os.remove(progress_file)
+        progress = self.load_progress(progress_file)
+        all_videos = self.collected_videos
+        
+        if progress:
+            print(f"♻️  途中経過から再開: {len(all_videos)}件取得済み"
+                  f"（完了キーワード {sum(1 for state in progress.values() if state['done'])}/{len(self.include_keywords)}）")
         
         for keyword in self.include_keywords:
-            print(f"\n🎯 キーワード '{keyword}' の検索開始")
+            state = progress.get(keyword, {'offset': 1, 'count': 0, 'done': False})
+            if state['done']:
+                print(f"\n⏭️  キーワード '{keyword}' は取得済み（{state['count']}件）")
+                continue
             
-            offset = 1
-            keyword_count = 0
+            offset = state['offset']
+            keyword_count = state['count']
+            if offset > 1:
+                print(f"\n🎯 キーワード '{keyword}' の検索再開（offset: {offset}, 取得済み: {keyword_count}件）")
+            else:
+                print(f"\n🎯 キーワード '{keyword}' の検索開始")
             
             while keyword_count < max_per_keyword:
-                # API レート制限対応
-                time.sleep(1)  # 1秒待機
-                
                 # 検索実行
                 response_data = self.search_videos(keyword, offset=offset, hits=100)
                 
                 if not response_data or 'result' not in response_data:
+                    # 通信エラーの可能性があるので完了扱いにはしない（再実行時にこのoffsetから取り直す）
                     print(f"⚠️  '{keyword}' の検索終了（データなし）")
                     break
                 
                 items = response_data['result'].get('items', [])
                 if not items:
                     print(f"⚠️  '{keyword}' の検索終了（アイテムなし）")
+                    self.append_progress(progress_file, keyword, offset, offset, [], done=True)
                     break
                 
                 # アイテムの処理
-                valid_items = 0
+                page_videos = []
                 for item in items:
                     if self.is_valid_item(item):
                         video_data = self.extract_item_data(item)
-                        all_videos.append(video_data)
+                        page_videos.append(video_data)
                         self.collected_ids.add(video_data['content_id'])
-                        valid_items += 1
                         keyword_count += 1
                         
                         if keyword_count >= max_per_keyword:
                             break
+                all_videos.extend(page_videos)
                 
-                print(f"📊 '{keyword}': {valid_items}件の有効なアイテムを追加 (累計: {len(all_videos)}件)")
+                print(f"📊 '{keyword}': {len(page_videos)}件の有効なアイテムを追加 (累計: {len(all_videos)}件)")
                 
                 # 次のページへ
-                offset += len(items)
+                next_offset = offset + len(items)
                 
                 # 取得件数が100件未満の場合は最後のページ
-                if len(items) < 100:
+                last_page = len(items) < 100
+                done = last_page or keyword_count >= max_per_keyword
+                self.append_progress(progress_file, keyword, offset, next_offset, page_videos, done)
+                offset = next_offset
+                
+                if last_page:
                     print(f"✅ '{keyword}' の検索完了（最終ページ）")
                     break
         
         print(f"\n🎉 全検索完了! 総取得件数: {len(all_videos)}件")
         return all_videos
 
-    def save_to_json(self, videos: List[Dict], filename: str = 'actress_videos.json'):
+    def save_to_ndjson(self, videos: List[Dict], filename: str = 'actress_videos.ndjson') -> bool:
         """
-        収集したデータをJSONファイルに保存
+        収集したデータをNDJSONファイル（1行1作品＋末尾に統計のインデックス）に保存
         
         Args:
             videos: ビデオデータのリスト
             filename: 保存ファイル名
+        
+        Returns:
+            保存できた場合True
         """
         try:
-            # 統計情報の追加
             metadata = {
-                'total_count': len(videos),
                 'collected_at': datetime.now().isoformat(),
                 'keywords_used': self.include_keywords,
                 'excluded_keywords': self.exclude_keywords,
                 'unique_actresses': len(set(v['actress'] for v in videos)),
-                'videos': videos
             }
-            
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            total_count = write_records(Path(filename), videos, meta=metadata)
             
             print(f"💾 データ保存完了: {filename}")
             print(f"📊 統計:")
-            print(f"   - 総作品数: {metadata['total_count']}件")
+            print(f"   - 総作品数: {total_count}件")
             print(f"   - ユニーク女優数: {metadata['unique_actresses']}人")
+            return True
             
         except Exception as e:
             print(f"❌ ファイル保存エラー: {e}")
+            return False
 
     def display_summary(self, videos: List[Dict]):
         """
@@ -507,6 +602,15 @@ class DMMAPIScraper:
 
 def main():
     """メイン実行関数"""
+    parser = argparse.ArgumentParser(description="DMM API アダルト動画データ収集")
+    parser.add_argument("--max-per-keyword", type=int, default=200, help="キーワードあたりの最大取得件数")
+    parser.add_argument("--output", default="actress_videos.ndjson", help="保存ファイル名")
+    parser.add_argument("--restart", action="store_true", help="途中経過を破棄して最初から取得")
+    args = parser.parse_args()
+    
+    # 途中経過ファイル（保存ファイルと同じ場所。保存が終わったら削除する）
+    progress_file = os.path.splitext(args.output)[0] + '.progress.jsonl'
+    
     print("🎬 DMM API アダルト動画データ収集スクリプト")
     print("=" * 60)
     
@@ -516,14 +620,19 @@ def main():
         
         # データ収集の実行
         print(f"\n🚀 データ収集開始...")
-        videos = scraper.collect_all_videos(max_per_keyword=200)  # キーワードあたり200件まで
+        videos = scraper.collect_all_videos(
+            max_per_keyword=args.max_per_keyword,
+            progress_file=progress_file,
+            resume=not args.restart
+        )
         
         if videos:
             # 結果の表示
             scraper.display_summary(videos)
             
-            # JSONファイルに保存
-            scraper.save_to_json(videos, 'actress_videos.json')
+            # NDJSONファイルに保存
+            if scraper.save_to_ndjson(videos, args.output) and os.path.exists(progress_file):
+                os.remove(progress_file)
             
             print(f"\n✅ 処理完了!")
         else:
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+DMM API（ItemList）のローカル代替サーバー
+
+本番APIを呼ばずに取得スクリプト（ページング・フィルタ・重複除去・再試行）を動かすためのHTTPサーバー。
+録画したレスポンス（フィクスチャ）を返し、遅延・5xx・429を指定した割合で混ぜる。
+乱数は --seed で固定できるので、同じ条件で何度でも同じ結果になる。
+
+リクエストのパラメータ（認証情報を除く）が録画と一致すればそのレスポンスをそのまま返し、
+一致しなければ録画した全作品（録画がなければ --synthetic 件の架空の作品）から
+cid・keyword・article_id・gte_date/lte_date で絞り込み、sort・offset・hits でページを切り出して返す。
+
+使い方:
+    # レスポンスキャッシュ（data/dmm_cache.sqlite3）からフィクスチャを作る
+    python3 scripts/dmm_api_stub.py --record-from-cache
+
+    # サーバーを起動（平均50msの遅延、5%で503、2%で429）
+    python3 scripts/dmm_api_stub.py --latency 50 --error-rate 0.05 --throttle-rate 0.02 --seed 1
+
+    # 取得スクリプトをサーバーに向ける（レート制限も外す）
+    export DMM_API_BASE_URL=http://127.0.0.1:8765/affiliate/v3/ItemList
+    RATE_LIMITS="dmm_api=1000:100" python3 scripts/fetch_mature_drama_ranking.py --pages 5 --no-watermark
+
+    # リクエスト数・ステータスの集計
+    curl http://127.0.0.1:8765/_stats
+"""
+
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+from typing import Any, Dict, List, Optional
+
+from ndjson_store import iter_records, write_records
+from response_cache import DEFAULT_DB_PATH as CACHE_DB_PATH, normalize_params
+
+# プロジェクトルート
+script_dir = Path(__file__).parent
+project_root = script_dir.parent
+DEFAULT_FIXTURES_PATH = project_root / "data" / "dmm_fixtures.ndjson"
+
+DEFAULT_PORT = 8765
+ITEM_LIST_PATH = "/affiliate/v3/ItemList"
+
+# DMM APIの1リクエストあたりの最大件数
+MAX_HITS = 100
+
+# 架空の作品に付けるジャンル（ID, 名前）
+SYNTHETIC_GENRES = [
+    (1014, "熟女"), (1039, "人妻・主婦"), (4010, "ドラマ"), (5001, "中出し"),
+    (4111, "寝取り・寝取られ・NTR"), (1031, "素人"), (6179, "ギャル"),
+]
+SYNTHETIC_MAKERS = ["マドンナ", "溜池ゴロー", "本中", "プレステージ"]
+
+
+def synthetic_item(index: int) -> Dict[str, Any]:
+    """架空の作品（indexが同じなら常に同じ内容）"""
+    rng = random.Random(index)
+    content_id = f"stub{index:05d}"
+    genres = rng.sample(SYNTHETIC_GENRES, 2)
+    release = date(2025, 12, 31) - timedelta(days=index // 3)
+    return {
+        "content_id": content_id,
+        "product_id": content_id,
+        "title": f"テスト作品 {index} {' '.join(name for _, name in genres)}",
+        "URL": f"https://video.dmm.co.jp/av/content/?id={content_id}",
+        "affiliateURL": f"https://al.dmm.co.jp/?lurl=stub&cid={content_id}",
+        "imageURL": {"large": f"https://pics.dmm.co.jp/digital/video/{content_id}/{content_id}pl.jpg"},
+        "sampleImageURL": {"sample_s": {"image": [
+            f"https://pics.dmm.co.jp/digital/video/{content_id}/{content_id}-{i}.jpg" for i in range(1, 6)
+        ]}},
+        "prices": {"price": f"{rng.choice([980, 1980, 2980])}~"},
+        "date": f"{release.isoformat()} 10:00:00",
+        "review": {"count": rng.randint(0, 50), "average": f"{rng.uniform(3, 5):.2f}"},
+        "iteminfo": {
+            "genre": [{"id": genre_id, "name": name} for genre_id, name in genres],
+            "actress": [{"id": 100000 + index % 97, "name": f"テスト女優{index % 97}"}],
+            "maker": [{"id": 40000 + index % len(SYNTHETIC_MAKERS), "name": SYNTHETIC_MAKERS[index % len(SYNTHETIC_MAKERS)]}],
+        },
+    }
+
+
+def record_from_cache(cache_db: Path, fixtures_path: Path) -> int:
+    """レスポンスキャッシュのItemListのレスポンスをフィクスチャとして書き出し、件数を返す"""
+    conn = sqlite3.connect(str(cache_db), timeout=30)
+    try:
+        rows = conn.execute(
+            "SELECT endpoint, params, body FROM responses WHERE endpoint LIKE 'ItemList%' ORDER BY fetched_at"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    records = (
+        {"endpoint": endpoint, "params": json.loads(params), "response": json.loads(body)}
+        for endpoint, params, body in rows
+        # スタブ自身のレスポンス（_base_url付き）は録画しない
+        if "_base_url" not in json.loads(params)
+    )
+    return write_records(fixtures_path, records, meta={"source": str(cache_db)})
+
+
+class StubState:
+    """フィクスチャ・障害の設定・集計（全スレッドで共有）"""
+
+    def __init__(self, fixtures: List[Dict[str, Any]], synthetic: int, latency: float, jitter: float,
+                 error_rate: float, throttle_rate: float, retry_after: int, seed: Optional[int]):
+        # 完全一致用（正規化したパラメータ -> レスポンス）
+        self.responses = {normalize_params(record["params"]): record["response"] for record in fixtures}
+
+        # 絞り込み用の作品（品番で重複除去、録画した順）
+        self.items: List[Dict[str, Any]] = []
+        seen = set()
+        for record in fixtures:
+            for item in record["response"].get("result", {}).get("items", []):
+                if item.get("content_id") not in seen:
+                    seen.add(item.get("content_id"))
+                    self.items.append(item)
+        if not self.items:
+            self.items = [synthetic_item(index) for index in range(1, synthetic + 1)]
+
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.stats: Counter = Counter()
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def roll(self) -> tuple:
+        """(遅延秒, 返すステータス) を決める"""
+        with self._lock:
+            delay = max(0.0, self.rng.gauss(self.latency, self.jitter)) / 1000 if self.latency else 0.0
+            draw = self.rng.random()
+        if draw < self.throttle_rate:
+            return delay, 429
+        if draw < self.throttle_rate + self.error_rate:
+            return delay, 503
+        return delay, 200
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            stats = dict(self.stats)
+        requests_total = stats.get("requests", 0)
+        return {**stats, "elapsed": round(elapsed, 3),
+                "requests_per_sec": round(requests_total / elapsed, 2) if elapsed else 0.0}
+
+    def item_list(self, query: Dict[str, str]) -> Dict[str, Any]:
+        """ItemListのレスポンス（録画と一致すればそのまま、しなければ作品から組み立てる）"""
+        recorded = self.responses.get(normalize_params(query))
+        if recorded is not None:
+            self.count("fixture_hits")
+            return recorded
+        self.count("generated")
+
+        items = self.items
+        if query.get("cid"):
+            items = [item for item in items if item.get("content_id") == query["cid"]]
+        if query.get("keyword"):
+            words = query["keyword"].split()
+            items = [item for item in items if all(word in _searchable(item) for word in words)]
+        if query.get("article_id"):
+            items = [item for item in items
+                     if any(str(genre.get("id")) == query["article_id"]
+                            for genre in item.get("iteminfo", {}).get("genre", []))]
+        if query.get("gte_date"):
+            items = [item for item in items if item.get("date", "")[:10] >= query["gte_date"][:10]]
+        if query.get("lte_date"):
+            items = [item for item in items if item.get("date", "")[:10] <= query["lte_date"][:10]]
+        if query.get("sort") == "date":
+            items = sorted(items, key=lambda item: item.get("date", ""), reverse=True)
+
+        offset = max(1, int(query.get("offset", 1)))
+        hits = min(MAX_HITS, max(1, int(query.get("hits", 20))))
+        page = items[offset - 1:offset - 1 + hits]
+        return {
+            "request": {"parameters": query},
+            "result": {
+                "status": 200,
+                "result_count": len(page),
+                "total_count": len(items),
+                "first_position": offset,
+                "items": page,
+            },
+        }
+
+
+def _searchable(item: Dict[str, Any]) -> str:
+    """keyword検索の対象（タイトル・ジャンル名・女優名）"""
+    iteminfo = item.get("iteminfo", {})
+    names = [entry.get("name", "") for key in ("genre", "actress") for entry in iteminfo.get(key, [])]
+    return " ".join([item.get("title", "")] + names)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """ItemListと /_stats に応答する（keep-alive対応）"""
+
+    protocol_version = "HTTP/1.1"
+    state: StubState = None
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/_stats":
+            self._send_json(200, self.state.snapshot())
+            return
+        if parts.path != ITEM_LIST_PATH:
+            self._send_json(404, {"result": {"status": 404, "message": "not found"}})
+            return
+
+        self.state.count("requests")
+        delay, status = self.state.roll()
+        if delay:
+            time.sleep(delay)
+        self.state.count(f"status_{status}")
+
+        if status == 429:
+            self._send_json(429, {"result": {"status": 429, "message": "Too Many Requests"}},
+                            {"Retry-After": str(self.state.retry_after)})
+            return
+        if status != 200:
+            self._send_json(status, {"result": {"status": status, "message": "Service Unavailable"}})
+            return
+
+        query = dict(parse_qsl(parts.query))
+        try:
+            self._send_json(200, self.state.item_list(query))
+        except ValueError as e:
+            self._send_json(400, {"result": {"status": 400, "message": str(e)}})
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # リクエストごとのログは出さない（集計は /_stats）
+        pass
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="DMM API（ItemList）のローカル代替サーバー")
+    parser.add_argument("--host", default="127.0.0.1", help="待ち受けるアドレス")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"ポート（デフォルト: {DEFAULT_PORT}）")
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES_PATH, help="フィクスチャ（NDJSON）のパス")
+    parser.add_argument("--record-from-cache", action="store_true",
+                        help="data/dmm_cache.sqlite3 のItemListのレスポンスからフィクスチャを作って終了")
+    parser.add_argument("--cache-db", type=Path, default=CACHE_DB_PATH, help="録画元のキャッシュDB")
+    parser.add_argument("--synthetic", type=int, default=1000, help="フィクスチャがない場合の架空の作品数")
+    parser.add_argument("--latency", type=float, default=0.0, help="1リクエストの平均遅延（ミリ秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="遅延のばらつき（標準偏差、ミリ秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503を返す割合（0〜1）")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="429を返す割合（0〜1）")
+    parser.add_argument("--retry-after", type=int, default=1, help="429に付けるRetry-After（秒）")
+    parser.add_argument("--seed", type=int, default=None, help="乱数のシード（指定すると毎回同じ結果）")
+    args = parser.parse_args()
+
+    if args.record_from_cache:
+        if not args.cache_db.exists():
+            print(f"❌ キャッシュDBが見つかりません: {args.cache_db}", file=sys.stderr)
+            sys.exit(1)
+        count = record_from_cache(args.cache_db, args.fixtures)
+        print(f"✅ {count}件のレスポンスを録画しました: {args.fixtures}")
+        return
+
+    fixtures = list(iter_records(args.fixtures)) if args.fixtures.exists() else []
+    StubHandler.state = StubState(fixtures, args.synthetic, args.latency, args.jitter,
+                                  args.error_rate, args.throttle_rate, args.retry_after, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+
+    source = f"フィクスチャ {len(fixtures)}件" if fixtures else f"架空の作品 {args.synthetic}件"
+    print(f"🧪 DMM APIスタブを起動しました: http://{args.host}:{args.port}{ITEM_LIST_PATH}（{source} / 作品 {len(StubHandler.state.items)}件）")
+    print(f"   遅延 {args.latency:g}ms±{args.jitter:g} / 503 {args.error_rate:.0%} / 429 {args.throttle_rate:.0%}")
+    print(f"   export DMM_API_BASE_URL=http://{args.host}:{args.port}{ITEM_LIST_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n📊 {json.dumps(StubHandler.state.snapshot(), ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+DMM API（ItemList）の共有クライアント
+
+リクエストごとにSSLContextを作って urllib.request.urlopen で新しいTLS接続を張る代わりに、
+TLSコンテキストを1つだけ作り、keep-aliveの接続をプールして使い回す。
+5xx・429・接続エラーは指数バックオフで再試行し、レスポンスは parse_item() で
+各スクリプト共通の作品dictに変換する。
+レスポンスは response_cache.py のキャッシュを通すので、同じ品番・同じ検索は期限内ならAPIを呼ばない。
+実リクエストは rate_limit.py の共有トークンバケット（dmm_api）で間隔を空けるので、複数スレッドから呼んでもよく、
+同時に動く別のスクリプトとも上限を分け合う。
+環境変数 DMM_API_BASE_URL を設定すると、本番APIの代わりにそのURL（dmm_api_stub.py など）を呼ぶ。
+
+使い方:
+    from dmm_client import DMMAPIError, get_client, parse_item
+
+    client = get_client(api_id, affiliate_id)
+    item = client.get_item("1start00473")
+    if item:
+        product = parse_item(item)
+
+    response = client.item_list(keyword="熟女", sort="rank", hits=50, offset=1)
+    items = response.get("result", {}).get("items", [])
+"""
+
+import os
+import sys
+import ssl
+import json
+import time
+import random
+import threading
+import http.client
+from queue import Empty, Full, LifoQueue
+from urllib.parse import urlencode, urlsplit
+from typing import Any, Dict, List, Optional, TypedDict
+
+from rate_limit import TokenBucket, get_limiter
+from response_cache import ResponseCache, get_default_cache
+
+DEFAULT_BASE_URL = "https://api.dmm.com/affiliate/v3/ItemList"
+
+# 本番APIの代わりに呼ぶURL（例: http://127.0.0.1:8765/affiliate/v3/ItemList）
+BASE_URL_ENV = "DMM_API_BASE_URL"
+
+# 再試行の設定（待ち時間は BACKOFF_BASE * 2^試行回数 + ゆらぎ、最大 BACKOFF_MAX 秒）
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# 1ホストあたりに保持するアイドル接続の数
+POOL_SIZE = 4
+
+# 接続が切れていた・タイムアウトした場合は接続を作り直して再試行する
+# （socket.timeout・ssl.SSLError・ConnectionResetError などはすべてOSErrorのサブクラス）
+CONNECTION_ERRORS = (http.client.HTTPException, OSError)
+
+
+class DMMAPIError(Exception):
+    """DMM APIがエラーを返した（再試行しても成功しなかった）"""
+
+    def __init__(self, message: str, status: Optional[int] = None, reason: str = "", body: str = "",
+                 retry_after: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.body = body
+        self.retry_after = retry_after
+
+
+class DMMItem(TypedDict):
+    """parse_item() が返す作品情報"""
+    content_id: str
+    title: str
+    url: str
+    affiliate_url: str
+    image_url: str
+    price: str
+    release_date: str
+    actress: List[str]
+    genre: List[str]
+    maker: str
+    director: str
+    description: str
+
+
+def get_base_url() -> str:
+    """ItemListのURL（DMM_API_BASE_URL が設定されていればそちら）"""
+    return os.environ.get(BASE_URL_ENV) or DEFAULT_BASE_URL
+
+
+def create_ssl_context() -> ssl.SSLContext:
+    """共有のTLSコンテキスト（macOSで証明書が見つからない環境に合わせて検証はスキップ）"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+class ConnectionPool:
+    """1ホスト分のkeep-alive接続プール（スレッドセーフ）"""
+
+    def __init__(self, scheme: str, host: str, port: Optional[int], context: ssl.SSLContext,
+                 timeout: float, maxsize: int = POOL_SIZE):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.context = context
+        self.timeout = timeout
+        self._idle: LifoQueue = LifoQueue(maxsize)
+
+    def acquire(self) -> http.client.HTTPConnection:
+        """アイドル接続を取り出す（なければ新しく作る）"""
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            if self.scheme == "https":
+                return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.context)
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def release(self, conn: http.client.HTTPConnection) -> None:
+        """使い終わった接続をプールに戻す（満杯なら閉じる）"""
+        try:
+            self._idle.put_nowait(conn)
+        except Full:
+            conn.close()
+
+    def close(self) -> None:
+        """アイドル接続をすべて閉じる"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                return
+
+
+class DMMClient:
+    """DMM API ItemList のクライアント"""
+
+    def __init__(self, api_id: str, affiliate_id: str, base_url: Optional[str] = None,
+                 timeout: float = 30, max_retries: int = MAX_RETRIES, pool_size: int = POOL_SIZE,
+                 cache: Optional[ResponseCache] = None, limiter: Optional[TokenBucket] = None):
+        self.api_id = api_id
+        self.affiliate_id = affiliate_id
+        self.base_url = base_url or get_base_url()
+        self.max_retries = max_retries
+        self.cache = cache
+        # APIへの実リクエストだけ待つ（キャッシュから返す場合は待たない）
+        self.limiter = limiter if limiter is not None else get_limiter("dmm_api")
+
+        parts = urlsplit(self.base_url)
+        self.path = parts.path or "/"
+        self.pool = ConnectionPool(parts.scheme, parts.hostname, parts.port, create_ssl_context(), timeout, pool_size)
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def build_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """認証情報と共通パラメータを付けたクエリ（値がNoneの項目は送らない）"""
+        query = {
+            "api_id": self.api_id,
+            "affiliate_id": self.affiliate_id,
+            "site": "FANZA",
+            "service": "digital",
+            "floor": "videoa",
+            "output": "json",
+        }
+        query.update({key: value for key, value in params.items() if value is not None})
+        return query
+
+    def build_url(self, params: Dict[str, Any]) -> str:
+        """リクエストURL（ログ表示用）"""
+        return f"{self.base_url}?{urlencode(self.build_params(params))}"
+
+    def mask(self, text: str) -> str:
+        """ログに出す文字列から認証情報を隠す"""
+        if self.api_id:
+            text = text.replace(self.api_id, "***API_ID***")
+        if self.affiliate_id:
+            text = text.replace(self.affiliate_id, "***AFFILIATE_ID***")
+        return text
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """待ち時間（Retry-Afterヘッダーがあればそれに従う）"""
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX)
+            except ValueError:
+                pass
+        return min(BACKOFF_BASE * (2 ** attempt) + random.uniform(0, BACKOFF_BASE), BACKOFF_MAX)
+
+    def item_list(self, **params) -> Dict[str, Any]:
+        """
+        ItemListを呼び出してJSONを返す（キャッシュがあればキャッシュを通す）
+
+        Args:
+            **params: keyword, cid, sort, hits, offset, floor など（Noneは送らない）
+
+        Raises:
+            DMMAPIError: 4xx（429以外）、または再試行しても失敗した場合
+        """
+        if self.cache is None:
+            return self._request(params)
+        endpoint = "ItemList:cid" if params.get("cid") else "ItemList"
+        cache_params = self.build_params(params)
+        if self.base_url != DEFAULT_BASE_URL:
+            # 本番以外（スタブなど）のレスポンスは本番のキャッシュと混ぜない
+            cache_params["_base_url"] = self.base_url
+        return self.cache.fetch(endpoint, cache_params, lambda: self._request(params))
+
+    def _request(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """APIを呼び出す（5xx・429・接続エラーは再試行）"""
+        target = f"{self.path}?{urlencode(self.build_params(params))}"
+        headers = {"Connection": "keep-alive", "Accept": "application/json"}
+
+        last_error: Optional[DMMAPIError] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self._backoff(attempt - 1, last_error.retry_after))
+
+            self.limiter.acquire()
+            conn = self.pool.acquire()
+            try:
+                conn.request("GET", target, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except CONNECTION_ERRORS as e:
+                conn.close()
+                last_error = DMMAPIError(f"接続エラー: {e}")
+                continue
+
+            if response.will_close:
+                conn.close()
+            else:
+                self.pool.release(conn)
+
+            text = body.decode("utf-8", errors="replace")
+            if response.status in RETRY_STATUSES:
+                last_error = DMMAPIError(f"HTTP {response.status} {response.reason}",
+                                         response.status, response.reason, text,
+                                         retry_after=response.getheader("Retry-After"))
+                continue
+            if response.status >= 400:
+                raise DMMAPIError(f"HTTP {response.status} {response.reason}",
+                                  response.status, response.reason, text)
+            try:
+                return json.loads(text)
+            except json.JSONDecodeError as e:
+                raise DMMAPIError(f"JSONのパースに失敗しました: {e}", response.status, response.reason, text)
+
+        raise last_error
+
+    def get_item(self, content_id: str, floor: str = "videoa") -> Optional[Dict[str, Any]]:
+        """品番で1件取得（見つからなければNone）"""
+        response = self.item_list(cid=content_id, floor=floor, hits=1)
+        items = response.get("result", {}).get("items", [])
+        return items[0] if items else None
+
+
+def parse_item(item: Dict[str, Any]) -> DMMItem:
+    """ItemListの作品1件を各スクリプト共通のdictに変換"""
+    iteminfo = item.get("iteminfo", {})
+    makers = iteminfo.get("maker") or [{}]
+    directors = iteminfo.get("director") or [{}]
+    return {
+        "content_id": item.get("content_id", ""),
+        "title": item.get("title", ""),
+        "url": item.get("URL", ""),
+        "affiliate_url": item.get("affiliateURL", ""),
+        "image_url": item.get("imageURL", {}).get("large", ""),
+        "price": item.get("prices", {}).get("price", ""),
+        "release_date": item.get("date", ""),
+        "actress": [actress.get("name", "") for actress in iteminfo.get("actress", [])],
+        "genre": [genre.get("name", "") for genre in iteminfo.get("genre", [])],
+        "maker": makers[0].get("name", ""),
+        "director": directors[0].get("name", ""),
+        "description": item.get("review", {}).get("text", "") if item.get("review") else "",
+    }
+
+
+# 認証情報ごとに1つのクライアント（接続プール）を共有する
+_clients: Dict[tuple, DMMClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_id: str, affiliate_id: str, use_cache: bool = True) -> DMMClient:
+    """共有クライアントを取得（use_cache=False でキャッシュを通さない）"""
+    key = (api_id, affiliate_id, use_cache)
+    with _clients_lock:
+        if key not in _clients:
+            cache = get_default_cache() if use_cache else None
+            _clients[key] = DMMClient(api_id, affiliate_id, cache=cache)
+        return _clients[key]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DMM APIで品番を検索")
+    parser.add_argument("content_id", help="品番（例: 1start00473）")
+    parser.add_argument("--floor", default="videoa", help="フロア（videoa / video）")
+    args = parser.parse_args()
+
+    client = get_client(os.environ.get("DMM_API_ID", ""), os.environ.get("DMM_AFFILIATE_ID", ""))
+    try:
+        item = client.get_item(args.content_id, args.floor)
+    except DMMAPIError as e:
+        print(f"❌ API取得エラー: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(parse_item(item) if item else None, ensure_ascii=False, indent=2))
@@ -6,47 +6,12 @@ frontmatterのtagsに追加するスクリプト
 
 import re
 import sys
+import argparse
 from pathlib import Path
 from collections import Counter
 
-def parse_markdown_file(file_path: Path) -> dict:
-    """Markdownファイルからfrontmatterを解析"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # frontmatterを抽出
-        match = re.match(r'^---\n(.*?)\n---', content, re.DOTALL)
-        if not match:
-            return {}
-        
-        frontmatter_text = match.group(1)
-        frontmatter = {}
-        
-        # 各行をパース
-        for line in frontmatter_text.split('\n'):
-            if ':' in line:
-                key, value = line.split(':', 1)
-                key = key.strip()
-                value = value.strip().strip('"').strip("'")
-                
-                # 配列の処理
-                if value.startswith('[') and value.endswith(']'):
-                    array_content = value[1:-1]
-                    array_values = []
-                    for item in array_content.split(','):
-                        item = item.strip().strip('"').strip("'")
-                        if item:
-                            array_values.append(item)
-                    frontmatter[key] = array_values
-                else:
-                    frontmatter[key] = value
-        
-        return frontmatter, content
-        
-    except Exception as e:
-        print(f"⚠️  ファイル読み込みエラー ({file_path}): {e}", file=sys.stderr)
-        return {}, ""
+from article_frontmatter import parse_frontmatter_text
+from parallel import add_jobs_argument, map_parallel
 
 
 def extract_genres_from_content(content: str) -> list:
@@ -66,56 +31,69 @@ def extract_genres_from_content(content: str) -> list:
     return genres
 
 
+def add_genres_to_tags(content: str, genres_from_content: list) -> str | None:
+    """
+    記事の内容のfrontmatterのtagsにジャンルを追加
+    
+    Returns:
+        更新後の内容（frontmatterがない場合はNone）
+    """
+    # frontmatterを抽出
+    match = re.match(r'^(---\n(.*?)\n---)', content, re.DOTALL)
+    if not match:
+        return None
+    
+    frontmatter_text = match.group(1)
+    rest_content = content[len(frontmatter_text):]
+    
+    # 既存のfrontmatterを解析
+    existing_frontmatter = parse_frontmatter_text(match.group(2))
+    existing_tags = existing_frontmatter.get('tags', [])
+    
+    # 既存のタグを文字列のセットに変換（重複チェック用）
+    existing_tags_set = {str(tag).strip().strip('"').strip("'") for tag in existing_tags}
+    
+    # 新しいタグリストを作成
+    new_tags = []
+    
+    # 1. 既存のタグを保持
+    for tag in existing_tags:
+        tag_str = str(tag).strip().strip('"').strip("'")
+        if tag_str:
+            new_tags.append(f'"{tag_str}"')
+    
+    # 2. 本文から抽出したジャンルを追加（重複を避ける）
+    for genre in genres_from_content:
+        if genre and genre not in existing_tags_set:
+            new_tags.append(f'"{genre}"')
+            existing_tags_set.add(genre)
+    
+    # タグ数を15個までに制限
+    new_tags = new_tags[:15]
+    tags_str = ", ".join(new_tags)
+    
+    # frontmatterを更新
+    tags_pattern = r'tags:\s*\[.*?\]'
+    if re.search(tags_pattern, frontmatter_text):
+        new_frontmatter = re.sub(tags_pattern, f'tags: [{tags_str}]', frontmatter_text)
+    else:
+        # tags行がない場合は追加
+        new_frontmatter = frontmatter_text.rstrip() + f'\ntags: [{tags_str}]\n---'
+    
+    return new_frontmatter + rest_content
+
+
 def update_article_tags(file_path: Path, genres_from_content: list) -> bool:
     """記事ファイルのタグを更新"""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        # frontmatterを抽出
-        match = re.match(r'^(---\n.*?\n---)', content, re.DOTALL)
-        if not match:
+        new_content = add_genres_to_tags(content, genres_from_content)
+        if new_content is None:
             return False
         
-        frontmatter_text = match.group(1)
-        rest_content = content[len(frontmatter_text):]
-        
-        # 既存のfrontmatterを解析
-        existing_frontmatter, _ = parse_markdown_file(file_path)
-        existing_tags = existing_frontmatter.get('tags', [])
-        
-        # 既存のタグを文字列のセットに変換（重複チェック用）
-        existing_tags_set = {str(tag).strip().strip('"').strip("'") for tag in existing_tags}
-        
-        # 新しいタグリストを作成
-        new_tags = []
-        
-        # 1. 既存のタグを保持
-        for tag in existing_tags:
-            tag_str = str(tag).strip().strip('"').strip("'")
-            if tag_str:
-                new_tags.append(f'"{tag_str}"')
-        
-        # 2. 本文から抽出したジャンルを追加（重複を避ける）
-        for genre in genres_from_content:
-            if genre and genre not in existing_tags_set:
-                new_tags.append(f'"{genre}"')
-                existing_tags_set.add(genre)
-        
-        # タグ数を15個までに制限
-        new_tags = new_tags[:15]
-        tags_str = ", ".join(new_tags)
-        
-        # frontmatterを更新
-        tags_pattern = r'tags:\s*\[.*?\]'
-        if re.search(tags_pattern, frontmatter_text):
-            new_frontmatter = re.sub(tags_pattern, f'tags: [{tags_str}]', frontmatter_text)
-        else:
-            # tags行がない場合は追加
-            new_frontmatter = frontmatter_text.rstrip() + f'\ntags: [{tags_str}]\n---'
-        
         # ファイルを書き込み
-        new_content = new_frontmatter + rest_content
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write(new_content)
         
@@ -126,8 +104,43 @@ def update_article_tags(file_path: Path, genres_from_content: list) -> bool:
         return False
 
 
+def process_article(md_file: Path) -> dict:
+    """
+    1記事分の処理（ジャンル抽出とタグ更新）
+    
+    Returns:
+        {"status": "updated" | "skipped" | "failed" | "error", "genres": [...], "error": エラー内容}
+    """
+    try:
+        # ファイルを読み込み
+        with open(md_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        # 「**ジャンル:**」からジャンルを抽出
+        genres = extract_genres_from_content(content)
+        
+        if not genres:
+            return {"status": "skipped", "genres": []}
+        
+        # タグを更新（読み込み済みの内容を使う）
+        new_content = add_genres_to_tags(content, genres)
+        if new_content is None:
+            return {"status": "failed", "genres": genres}
+        
+        with open(md_file, 'w', encoding='utf-8') as f:
+            f.write(new_content)
+        return {"status": "updated", "genres": genres}
+        
+    except Exception as e:
+        return {"status": "error", "genres": [], "error": str(e)}
+
+
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description="本文の「**ジャンル:**」をfrontmatterのtagsに追加")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
     content_dir = project_root / "content"
@@ -147,37 +160,32 @@ def main():
     error_count = 0
     all_genres = Counter()
     
-    for idx, md_file in enumerate(md_files, 1):
+    results = map_parallel(process_article, md_files, args.jobs)
+    for idx, (md_file, result) in enumerate(zip(md_files, results), 1):
         print(f"\n[{idx}/{len(md_files)}] {md_file.name} を処理中...")
         
-        try:
-            # ファイルを読み込み
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 「**ジャンル:**」からジャンルを抽出
-            genres = extract_genres_from_content(content)
-            
-            if not genres:
-                print(f"   ⚠️  「**ジャンル:**」が見つかりません")
-                skipped_count += 1
-                continue
-            
-            # ジャンルをカウント
-            for genre in genres:
-                all_genres[genre] += 1
-            
-            # タグを更新
-            if update_article_tags(md_file, genres):
-                print(f"   ✅ タグを更新しました（ジャンル: {len(genres)}件）")
-                print(f"      {', '.join(genres[:5])}{'...' if len(genres) > 5 else ''}")
-                updated_count += 1
-            else:
-                print(f"   ⚠️  タグの更新に失敗しました")
-                error_count += 1
-                
-        except Exception as e:
-            print(f"   ❌ エラー: {e}", file=sys.stderr)
+        genres = result["genres"]
+        
+        if result["status"] == "error":
+            print(f"   ❌ エラー: {result['error']}", file=sys.stderr)
+            error_count += 1
+            continue
+        
+        if result["status"] == "skipped":
+            print(f"   ⚠️  「**ジャンル:**」が見つかりません")
+            skipped_count += 1
+            continue
+        
+        # ジャンルをカウント
+        for genre in genres:
+            all_genres[genre] += 1
+        
+        if result["status"] == "updated":
+            print(f"   ✅ タグを更新しました（ジャンル: {len(genres)}件）")
+            print(f"      {', '.join(genres[:5])}{'...' if len(genres) > 5 else ''}")
+            updated_count += 1
+        else:
+            print(f"   ⚠️  タグの更新に失敗しました")
             error_count += 1
     
     # 結果を表示
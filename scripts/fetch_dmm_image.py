@@ -11,6 +11,8 @@ import urllib.error
 from urllib.parse import urlencode
 import json
 
+from dmm_client import get_base_url
+
 # ============================================
 # 設定値（ここを編集してください）
 # ============================================
@@ -34,7 +36,7 @@ def fetch_product_image(keyword: str, api_id: str, affiliate_id: str) -> str:
     Returns:
         画像URL（見つからない場合は空文字列）
     """
-    base_url = "https://api.dmm.com/affiliate/v3/ItemList"
+    base_url = get_base_url()
     
     params = {
         "api_id": api_id,
@@ -5,16 +5,17 @@ DMM APIからニッチジャンルのアダルト動画の人気作品を取得
 """
 
 import os
-import json
 import sys
-import ssl
 import argparse
-import time
+import shutil
 from datetime import datetime
-from urllib.parse import urlencode
-import urllib.request
+from pathlib import Path
 from typing import Dict, List, Any, Optional
 
+import content_index
+from dmm_client import DMMAPIError, get_client
+from ndjson_store import NDJSONWriter, write_records
+
 # ニッチジャンルの定義
 NICHE_GENRES = {
     "drama": {
@@ -85,49 +86,23 @@ def fetch_dmm_ranking(api_id: str, affiliate_id: str, keyword: str, sort: str =
     Returns:
         APIレスポンスのJSON
     """
-    base_url = "https://api.dmm.com/affiliate/v3/ItemList"
-    
+    client = get_client(api_id, affiliate_id)
     params = {
-        "api_id": api_id,
-        "affiliate_id": affiliate_id,
-        "site": "FANZA",  # アダルト専用サイト
-        "service": "digital",  # デジタル商品
-        "floor": "videoa",  # アダルト動画
         "keyword": keyword,  # キーワード検索
         "sort": sort,  # ソート順
         "hits": hits,  # 取得件数
         "offset": offset,  # オフセット
-        "output": "json"
     }
     
-    url = f"{base_url}?{urlencode(params)}"
-    
     # デバッグ用：URLを表示（認証情報はマスク）
-    debug_url = url.replace(api_id, "***API_ID***").replace(affiliate_id, "***AFFILIATE_ID***")
-    print(f"🔍 リクエストURL: {debug_url}")
+    print(f"🔍 リクエストURL: {client.mask(client.build_url(params))}")
     
     try:
-        # macOSでSSL証明書が見つからない場合の対策
-        # SSL検証をスキップするコンテキストを作成
-        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-        
-        req = urllib.request.Request(url)
-        # contextを明示的に指定
-        with urllib.request.urlopen(req, context=context, timeout=30) as response:
-            data = response.read()
-            return json.loads(data.decode('utf-8'))
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode('utf-8') if e.fp else "詳細情報なし"
-        print(f"HTTPエラーが発生しました: {e.code} {e.reason}", file=sys.stderr)
-        print(f"エラー詳細: {error_body}", file=sys.stderr)
-        sys.exit(1)
-    except urllib.error.URLError as e:
-        print(f"URLエラーが発生しました: {e.reason}", file=sys.stderr)
-        sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"JSONのパースに失敗しました: {e}", file=sys.stderr)
+        return client.item_list(**params)
+    except DMMAPIError as e:
+        print(f"APIエラーが発生しました: {e}", file=sys.stderr)
+        if e.body:
+            print(f"エラー詳細: {e.body}", file=sys.stderr)
         sys.exit(1)
 
 
@@ -197,41 +172,28 @@ def get_existing_content_ids(content_dir: str) -> set:
     Returns:
         content_idのセット
     """
-    existing_ids = set()
     if not os.path.exists(content_dir):
-        return existing_ids
+        return set()
     
     try:
-        for filename in os.listdir(content_dir):
-            if filename.endswith('.md'):
-                # ファイル名からcontent_idを抽出（例: 2025-12-14-1start00473.md -> 1start00473）
-                parts = filename.replace('.md', '').split('-')
-                if len(parts) >= 4:
-                    content_id = '-'.join(parts[3:])  # 日付部分を除いた残り
-                    existing_ids.add(content_id)
+        # content_index（SQLite）を差分更新して参照する
+        # ファイル名から読み取れるcontent_idも含まれる
+        return content_index.get_existing_content_ids(Path(content_dir))
     except Exception as e:
         print(f"⚠️  既存記事の読み込みエラー: {e}", file=sys.stderr)
-    
-    return existing_ids
+        return set()
 
 
-def save_to_json(data: List[Dict[str, Any]], output_path: str) -> None:
+def save_to_ndjson(data: List[Dict[str, Any]], output_path: str) -> None:
     """
-    データをJSON形式で保存
+    データをNDJSON形式（1行1件＋末尾に件数のインデックス）で保存
     
     Args:
         data: 保存するデータ
         output_path: 保存先のファイルパス
     """
-    output_data = {
-        "fetched_at": datetime.now().isoformat(),
-        "total_count": len(data),
-        "ranking": data
-    }
-    
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        write_records(Path(output_path), data, meta={"fetched_at": datetime.now().isoformat()})
         print(f"✅ データを保存しました: {output_path}")
     except IOError as e:
         print(f"ファイルの保存に失敗しました: {e}", file=sys.stderr)
@@ -326,6 +288,15 @@ def main():
     # 各ジャンルごとにデータ取得
     all_results = {}
     
+    # 全ジャンルをまとめたファイルは、ジャンルごとに取得が終わるたびに追記する
+    combined_writer = None
+    if len(genres_to_fetch) > 1:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        combined_path = os.path.join(output_dir, f"dmm_ranking_all_{timestamp}.ndjson")
+        combined_latest_path = os.path.join(output_dir, "dmm_ranking_all_latest.ndjson")
+        combined_writer = NDJSONWriter(Path(combined_path), meta={"fetched_at": datetime.now().isoformat()},
+                                       count_by="genre_key")
+    
     for genre_key in genres_to_fetch:
         genre_info = NICHE_GENRES[genre_key]
         print(f"🔄 [{genre_info['name']}] データ取得中...")
@@ -355,10 +326,7 @@ def main():
                     # 既存記事を除外
                     if args.exclude_existing and existing_content_ids:
                         all_items = [item for item in all_items if item.get("content_id") not in existing_content_ids]
-                    
-                    # ページ間で少し待機（API負荷軽減）
-                    if page < args.pages:
-                        time.sleep(1)
+                    # ページ間の待機は dmm_client の共有レート制限が行う
                 
                 ranking_data = all_items
             else:
@@ -392,15 +360,19 @@ def main():
             
             # ジャンルごとにJSONファイルを保存
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            genre_output_path = os.path.join(output_dir, f"dmm_ranking_{genre_key}_{timestamp}.json")
-            genre_latest_path = os.path.join(output_dir, f"dmm_ranking_{genre_key}_latest.json")
+            genre_output_path = os.path.join(output_dir, f"dmm_ranking_{genre_key}_{timestamp}.ndjson")
+            genre_latest_path = os.path.join(output_dir, f"dmm_ranking_{genre_key}_latest.ndjson")
             
-            save_to_json(ranking_data, genre_output_path)
-            save_to_json(ranking_data, genre_latest_path)
+            save_to_ndjson(ranking_data, genre_output_path)
+            save_to_ndjson(ranking_data, genre_latest_path)
+            
+            # 全ジャンルをまとめたファイルに追記
+            if combined_writer is not None:
+                combined_writer.write_many({**item, "genre_key": genre_key} for item in ranking_data)
             
             all_results[genre_key] = {
                 "genre_name": genre_info['name'],
-                "data": ranking_data
+                "count": len(ranking_data)
             }
             
             # 簡易表示
@@ -413,29 +385,18 @@ def main():
             print(f"   ❌ エラー: {e}", file=sys.stderr)
             continue
     
-    # 全ジャンルをまとめたファイルも保存（オプション）
-    if len(genres_to_fetch) > 1:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        combined_path = os.path.join(output_dir, f"dmm_ranking_all_{timestamp}.json")
-        combined_latest_path = os.path.join(output_dir, "dmm_ranking_all_latest.json")
-        
-        combined_data = {
-            "fetched_at": datetime.now().isoformat(),
-            "genres": all_results
-        }
-        
-        with open(combined_path, "w", encoding="utf-8") as f:
-            json.dump(combined_data, f, ensure_ascii=False, indent=2)
-        with open(combined_latest_path, "w", encoding="utf-8") as f:
-            json.dump(combined_data, f, ensure_ascii=False, indent=2)
-        
+    # 全ジャンルをまとめたファイルを確定（オプション）
+    if combined_writer is not None:
+        combined_writer.meta["genres"] = {key: result["genre_name"] for key, result in all_results.items()}
+        combined_writer.close()
+        shutil.copyfile(combined_path, combined_latest_path)
         print(f"✅ 全ジャンル統合データを保存しました: {combined_latest_path}")
     
     print("\n" + "=" * 80)
     print("📊 取得完了サマリー:")
     print("=" * 80)
     for genre_key, result in all_results.items():
-        print(f"  {result['genre_name']}: {len(result['data'])}件")
+        print(f"  {result['genre_name']}: {result['count']}件")
     print("=" * 80)
 
 
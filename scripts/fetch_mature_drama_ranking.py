@@ -7,16 +7,16 @@ DMM APIから熟女・人妻・ドラマ作品のランキングを取得する
 import os
 import json
 import sys
-import ssl
 import argparse
 import time
 from datetime import datetime
-from urllib.parse import urlencode
-import urllib.request
-import urllib.error
 from typing import Dict, List, Any
 from pathlib import Path
 
+from dmm_client import DMMAPIError, get_client, parse_item
+from parallel import map_threads
+from ndjson_store import NDJSONWriter, write_records
+
 # .envファイルの読み込み
 try:
     from dotenv import load_dotenv
@@ -33,6 +33,9 @@ except ImportError:
 except Exception as e:
     print(f"⚠️  .envファイルの読み込みエラー: {e}")
 
+# 取得済み位置があるとき、--pages を超えて位置に達するまで追加で取得するページ数の上限
+WATERMARK_EXTRA_PAGES = 20
+
 # 熟女・人妻・ドラマジャンルの定義
 MATURE_DRAMA_GENRES = {
     "mature": {
@@ -91,66 +94,33 @@ def fetch_dmm_ranking(
     Returns:
         APIレスポンスのJSON
     """
-    base_url = "https://api.dmm.com/affiliate/v3/ItemList"
+    client = get_client(api_id, affiliate_id)
     
+    # 空文字・Noneのパラメータは送らない
     params = {
-        "api_id": api_id,
-        "affiliate_id": affiliate_id,
-        "site": "FANZA",
-        "service": "digital",
-        "floor": "videoa",
         "hits": hits,
         "offset": offset,
-        "output": "json"
+        "sort": sort or None,
+        "keyword": keyword or None,
+        "genre_id": genre_id or None,
+        "maker_id": maker_id or None,
+        "actress_id": actress_id or None,
+        "series_id": series_id or None,
+        "price_from": price_from,
+        "price_to": price_to,
     }
-    
-    # sortパラメータを追加（Noneの場合は追加しない）
-    if sort:
-        params["sort"] = sort
-    
-    # オプションパラメータを追加
-    if keyword:
-        params["keyword"] = keyword
-    if genre_id:
-        params["genre_id"] = genre_id
-    if maker_id:
-        params["maker_id"] = maker_id
-    if actress_id:
-        params["actress_id"] = actress_id
-    if series_id:
-        params["series_id"] = series_id
-    if price_from is not None:
-        params["price_from"] = price_from
-    if price_to is not None:
-        params["price_to"] = price_to
-    # DMM APIの日付パラメータは異なる可能性があるため、一旦コメントアウト
+    # DMM APIの日付パラメータは異なる可能性があるため、gte_date / lte_date は送らない
     # 代わりに、sort=dateでoffsetを大きくして過去のページを取得する方法を使用
-    # if gte_date:
-    #     params["gte_date"] = gte_date
-    # if lte_date:
-    #     params["lte_date"] = lte_date
-    
-    url = f"{base_url}?{urlencode(params)}"
     
     try:
-        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-        
-        req = urllib.request.Request(url)
-        with urllib.request.urlopen(req, context=context, timeout=30) as response:
-            data = response.read()
-            return json.loads(data.decode('utf-8'))
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode('utf-8') if e.fp else "エラー詳細なし"
-        print(f"❌ API取得エラー (HTTP {e.code}): {e.reason}", file=sys.stderr)
-        print(f"   エラー詳細: {error_body[:200]}", file=sys.stderr)
-        # デバッグ用: URLを表示（認証情報はマスク）
-        debug_url = url.replace(api_id, "***API_ID***").replace(affiliate_id, "***AFFILIATE_ID***")
-        print(f"   リクエストURL: {debug_url[:200]}...", file=sys.stderr)
-        return {}
-    except Exception as e:
+        return client.item_list(**params)
+    except DMMAPIError as e:
         print(f"❌ API取得エラー: {e}", file=sys.stderr)
+        if e.body:
+            print(f"   エラー詳細: {e.body[:200]}", file=sys.stderr)
+        if e.status:
+            # デバッグ用: URLを表示（認証情報はマスク）
+            print(f"   リクエストURL: {client.mask(client.build_url(params))[:200]}...", file=sys.stderr)
         return {}
 
 
@@ -163,21 +133,7 @@ def extract_ranking_data(api_response: Dict[str, Any], filter_keywords: List[str
     ranking = []
     
     for idx, item in enumerate(items, start=1):
-        ranking_item = {
-            "rank": idx,
-            "content_id": item.get("content_id", ""),
-            "title": item.get("title", ""),
-            "url": item.get("URL", ""),
-            "affiliate_url": item.get("affiliateURL", ""),
-            "image_url": item.get("imageURL", {}).get("large", ""),
-            "price": item.get("prices", {}).get("price", ""),
-            "release_date": item.get("date", ""),
-            "actress": [actress.get("name", "") for actress in item.get("iteminfo", {}).get("actress", [])],
-            "genre": [genre.get("name", "") for genre in item.get("iteminfo", {}).get("genre", [])],
-            "maker": item.get("iteminfo", {}).get("maker", [{}])[0].get("name", "") if item.get("iteminfo", {}).get("maker") else "",
-            "director": item.get("iteminfo", {}).get("director", [{}])[0].get("name", "") if item.get("iteminfo", {}).get("director") else "",
-            "description": item.get("review", {}).get("text", "") if item.get("review") else "",
-        }
+        ranking_item = {"rank": idx, **parse_item(item)}
         ranking.append(ranking_item)
     
     # ジャンルフィルタリング（緩和: タイトルまたはジャンルに含まれていればOK）
@@ -259,23 +215,247 @@ def is_valid_mature_drama_work(item: Dict[str, Any], debug: bool = False) -> boo
     return False
 
 
-def save_to_json(data: List[Dict[str, Any]], output_path: str) -> None:
-    """データをJSON形式で保存"""
-    output_data = {
-        "fetched_at": datetime.now().isoformat(),
-        "total_count": len(data),
-        "ranking": data
-    }
-    
+def save_to_ndjson(data: List[Dict[str, Any]], output_path: str) -> None:
+    """データをNDJSON形式（1行1件＋末尾に件数のインデックス）で保存"""
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        write_records(Path(output_path), data, meta={"fetched_at": datetime.now().isoformat()})
         print(f"✅ データを保存しました: {output_path}")
     except IOError as e:
         print(f"❌ ファイルの保存に失敗しました: {e}", file=sys.stderr)
         sys.exit(1)
 
 
+def plan_genre_requests(genre_info: Dict[str, Any], args: argparse.Namespace,
+                        date_from: str = None, date_to: str = None) -> List[Dict[str, Any]]:
+    """
+    1ジャンル分のリクエスト（fetch_dmm_ranking の引数）を取得順に並べる
+
+    Returns:
+        [{"label": ログ表示用の名前, "params": fetch_dmm_ranking に渡すキーワード引数}, ...]
+    """
+    requests = []
+    filters = {
+        "keyword": genre_info['keyword'] if not args.genre_id else None,
+        "hits": args.hits,
+        "genre_id": args.genre_id,
+        "maker_id": args.maker_id,
+        "actress_id": args.actress_id,
+        "series_id": args.series_id,
+        "price_from": args.price_from,
+        "price_to": args.price_to,
+    }
+    
+    # base_offsetの初期化
+    base_offset = 0
+    
+    # 取得モードに応じて複数ページから取得
+    if args.mode == "ranking":
+        # ランキング順のみ
+        sort_mode = "rank"
+        pages_to_fetch = args.pages
+    elif args.mode == "latest":
+        # 新着順のみ
+        sort_mode = "date"
+        pages_to_fetch = args.pages
+    else:  # all
+        # ランキング順と新着順の両方
+        sort_mode = "rank"
+        pages_to_fetch = args.pages
+    
+    # 古い順取得モードの場合、offsetを大きくして過去のページを取得
+    if args.oldest_first:
+        sort_mode = "date"
+        # 古い順に取得するため、offsetを大きく設定
+        # 例: 1000件目から取得する場合、offset=1001
+        base_offset = 1000  # デフォルトの開始offset
+        pages_to_fetch = args.pages
+    
+    # 発売日範囲指定がある場合、sort=dateでoffsetを調整して取得
+    # DMM APIでは直接日付範囲を指定できないため、sort=dateで大量のoffsetから取得
+    if date_from or date_to:
+        sort_mode = "date"
+        # 日付範囲指定時は、offsetを大きくして過去のページを取得
+        # 2014年から取得する場合、offsetを大きく設定
+        if date_from:
+            # 開始年からoffsetを計算
+            try:
+                year = int(date_from.split("-")[0])
+                if year <= 2005:
+                    base_offset = 10000  # 2005年以前はoffsetを非常に大きく
+                elif year <= 2010:
+                    base_offset = 8000
+                elif year <= 2015:
+                    base_offset = 5000  # 2015年以前はoffsetを大きく
+                elif year <= 2018:
+                    base_offset = 3000
+                elif year <= 2020:
+                    base_offset = 1000
+                else:
+                    base_offset = 0
+            except:
+                base_offset = 1000
+        else:
+            base_offset = 0
+        
+        # 日付範囲指定時は、より多くのページを取得する
+        # 古いデータほど多くのページが必要
+        if date_from:
+            try:
+                year = int(date_from.split("-")[0])
+                if year <= 2010:
+                    # 2005-2010年は100ページ以上取得
+                    pages_to_fetch = max(pages_to_fetch, 100)
+                elif year <= 2015:
+                    # 2011-2015年は50ページ取得
+                    pages_to_fetch = max(pages_to_fetch, 50)
+                elif year <= 2018:
+                    # 2016-2018年は30ページ取得
+                    pages_to_fetch = max(pages_to_fetch, 30)
+            except:
+                pages_to_fetch = max(pages_to_fetch, 20)
+    
+    # keywordがある場合、sort=rankは使えないため、sortは指定しない
+    actual_sort = sort_mode
+    if genre_info['keyword'] and not args.genre_id and sort_mode == "rank":
+        actual_sort = None
+    
+    # 複数ページから取得
+    for page in range(1, pages_to_fetch + 1):
+        if args.oldest_first or (date_from or date_to):
+            # 古い順または日付範囲指定: offsetを大きくして過去のページを取得
+            offset = base_offset + (page - 1) * args.hits + 1
+        else:
+            offset = (page - 1) * args.hits + 1
+        
+        requests.append({
+            "label": f"ページ {page}/{pages_to_fetch}（offset: {offset}）",
+            # DMM APIでは直接日付範囲指定ができないため、gte_date / lte_date はNone
+            # （sort=dateでoffsetを調整して取得）
+            "params": {**filters, "sort": actual_sort, "offset": offset},
+        })
+    
+    # allモードの場合、新着順も取得
+    if args.mode == "all":
+        for page in range(1, args.pages + 1):
+            offset = (page - 1) * args.hits + 1
+            requests.append({
+                "label": f"新着順 ページ {page}/{args.pages}（offset: {offset}）",
+                "params": {**filters, "sort": "date", "offset": offset,
+                           "gte_date": date_from, "lte_date": date_to},
+            })
+    
+    return requests
+
+
+def load_watermarks(path: Path) -> Dict[str, Dict[str, Any]]:
+    """ジャンルごとの取得済み位置（最新の発売日とその日の品番）を読み込む"""
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"⚠️  取得済み位置ファイルを読み込めません（最初から取得します）: {e}", file=sys.stderr)
+        return {}
+
+
+def save_watermarks(path: Path, watermarks: Dict[str, Dict[str, Any]]) -> None:
+    """取得済み位置を保存（一時ファイルに書いてから置き換える）"""
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(watermarks, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def watermark_key(genre_key: str, args: argparse.Namespace) -> str:
+    """取得済み位置のキー（絞り込み条件が違えば別の新着列として扱う）"""
+    filters = [
+        f"{name}={getattr(args, name)}"
+        for name in ("genre_id", "maker_id", "actress_id", "series_id", "price_from", "price_to")
+        if getattr(args, name) is not None
+    ]
+    return "|".join([genre_key] + filters)
+
+
+def is_known(release_date: str, content_id: str, watermark: Dict[str, Any]) -> bool:
+    """前回の取得済み位置以前の作品か"""
+    if release_date < watermark["release_date"]:
+        return True
+    return release_date == watermark["release_date"] and content_id in watermark["content_ids"]
+
+
+def reaches_watermark(api_response: Dict[str, Any], watermark: Dict[str, Any]) -> bool:
+    """新着順のページに取得済みの作品が含まれるか"""
+    return any(
+        is_known(item.get("date", ""), item.get("content_id"), watermark)
+        for item in api_response.get("result", {}).get("items", [])
+    )
+
+
+def is_failed_response(api_response: Any) -> bool:
+    """取得に失敗したページか（fetch_dmm_ranking はAPIエラーのとき {} を返す）"""
+    return isinstance(api_response, Exception) or "result" not in api_response
+
+
+def next_page_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """同じ条件で次のページを取るリクエスト"""
+    params = request["params"]
+    offset = params["offset"] + params["hits"]
+    return {"label": f"追加ページ（offset: {offset}）", "params": {**params, "offset": offset}}
+
+
+def advance_watermark(watermark: Dict[str, Any] | None, api_responses: List[Dict[str, Any]]) -> Dict[str, Any] | None:
+    """取得したページの中で最も新しい発売日とその日の品番で取得済み位置を更新"""
+    newest = dict(watermark) if watermark else None
+    for api_response in api_responses:
+        for item in api_response.get("result", {}).get("items", []):
+            release_date = item.get("date", "")
+            content_id = item.get("content_id")
+            if not release_date or not content_id:
+                continue
+            if newest is None or release_date > newest["release_date"]:
+                newest = {"release_date": release_date, "content_ids": [content_id]}
+            elif release_date == newest["release_date"] and content_id not in newest["content_ids"]:
+                newest["content_ids"] = newest["content_ids"] + [content_id]
+    return newest
+
+
+def fetch_all_requests(api_id: str, affiliate_id: str, chains: List[Dict[str, Any]], concurrency: int) -> List[List[tuple]]:
+    """
+    リクエスト列（chain）を並列に取得し、chainごとに [(リクエスト, APIレスポンス), ...] を返す
+
+    chain は {"genre_key": ジャンルキー, "requests": [...], "watermark": 取得済み位置またはNone}。
+    同じchainのリクエストは順番に取得し、watermarkがあれば取得済みの作品に達したページで止める。
+    予定のページで達しなければ、最大 WATERMARK_EXTRA_PAGES ページまで続けて取得する。
+    リクエスト間隔は DMMClient のトークンバケットが全スレッドまとめて制御する。
+    想定外の例外はそのリクエストの結果として返す（ジャンルごとのエラー処理で扱う）。
+    """
+    def fetch(chain):
+        results = []
+        requests = list(chain["requests"])
+        extra = 0
+        while requests:
+            request = requests.pop(0)
+            try:
+                api_response = fetch_dmm_ranking(api_id, affiliate_id, **request["params"])
+            except Exception as e:
+                results.append((request, e))
+                break
+            results.append((request, api_response))
+            if is_failed_response(api_response) or not chain["watermark"]:
+                continue
+            if reaches_watermark(api_response, chain["watermark"]):
+                break
+            # 予定のページを取り終えても取得済み位置に達していなければ、次のページへ進む
+            items = api_response["result"].get("items", [])
+            if not requests and len(items) >= request["params"]["hits"] and extra < WATERMARK_EXTRA_PAGES:
+                requests.append(next_page_request(request))
+                extra += 1
+        return results
+    
+    return list(map_threads(fetch, chains, concurrency))
+
+
 def main():
     """メイン処理"""
     parser = argparse.ArgumentParser(description="熟女・人妻・ドラマ作品のランキング取得")
@@ -379,6 +559,34 @@ def main():
         action="store_true",
         help="古い順に取得（sort=dateでoffsetを大きくして取得）"
     )
+    parser.add_argument(
+        "--no-watermark",
+        action="store_true",
+        help="latestモードでも取得済み位置で止めず、--pagesの全ページを取得"
+    )
+    parser.add_argument(
+        "--reset-watermark",
+        action="store_true",
+        help="取得済み位置を無視して取得し直す（取得後に位置は更新される）"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="同時に実行するリクエスト数"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="APIへの実リクエストの上限（回/秒、省略時は rate_limit.py の dmm_api の設定）"
+    )
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=None,
+        help="続けて送ってよいリクエスト数（省略時は rate_limit.py の dmm_api の設定）"
+    )
     args = parser.parse_args()
     
     # 環境変数から認証情報を取得
@@ -456,154 +664,73 @@ def main():
     
     all_results = {}
     
-    # 各ジャンルごとにデータ取得
+    # 全ジャンル統合ファイルは、ジャンルごとの集計が終わるたびに追記する
+    combined_writer = None
+    combined_seen_ids = set()
+    if len(genres_to_fetch) > 1:
+        combined_latest_path = output_dir / "mature_drama_all_latest.ndjson"
+        combined_writer = NDJSONWriter(combined_latest_path, meta={"fetched_at": datetime.now().isoformat()},
+                                       count_by="genre_key")
+    
+    # 全ジャンル・全ページのリクエストをまとめて並列に取得
+    client = get_client(api_id, affiliate_id)
+    if args.rate or args.burst:
+        client.limiter.configure(rate=args.rate, burst=args.burst)
+    
+    # 新着順のみの取得では、前回の取得済み位置に達したところでページ送りを止める
+    use_watermark = (args.mode == "latest" and not args.oldest_first and not (date_from or date_to)
+                     and not args.no_watermark)
+    watermarks_path = output_dir / "mature_drama_watermarks.json"
+    watermarks = load_watermarks(watermarks_path) if use_watermark else {}
+    
+    chains = []
+    planned = 0
+    for genre_key in genres_to_fetch:
+        requests = plan_genre_requests(MATURE_DRAMA_GENRES[genre_key], args, date_from, date_to)
+        planned += len(requests)
+        watermark = None if args.reset_watermark else watermarks.get(watermark_key(genre_key, args))
+        if watermark:
+            print(f"🔖 [{MATURE_DRAMA_GENRES[genre_key]['name']}] 取得済み位置: {watermark['release_date']}（この日の{len(watermark['content_ids'])}件）")
+            chains.append({"genre_key": genre_key, "requests": requests, "watermark": watermark})
+        else:
+            # 取得済み位置がなければページごとに並列に取得
+            chains.extend({"genre_key": genre_key, "requests": [request], "watermark": None} for request in requests)
+    
+    print(f"🚀 最大{planned}件のリクエストを並列取得中（同時{args.concurrency}件、最大{client.limiter.rate:g}回/秒）...")
+    started = time.monotonic()
+    chain_results = fetch_all_requests(api_id, affiliate_id, chains, args.concurrency)
+    fetched = sum(len(results) for results in chain_results)
+    print(f"   ⏱️  取得時間: {time.monotonic() - started:.1f}秒（{fetched}/{planned}ページ）")
+    if client.cache is not None:
+        print(f"   {client.cache.format_stats()}")
+    print()
+    
+    responses_by_genre = {genre_key: [] for genre_key in genres_to_fetch}
+    for chain, results in zip(chains, chain_results):
+        responses_by_genre[chain["genre_key"]].extend(results)
+    
+    # 各ジャンルごとに集計
     for genre_key in genres_to_fetch:
         genre_info = MATURE_DRAMA_GENRES[genre_key]
-        print(f"🔄 [{genre_info['name']}] データ取得中...")
+        print(f"🔄 [{genre_info['name']}] データ集計中...")
         
         try:
             all_items = []
-            
-            # base_offsetの初期化
-            base_offset = 0
-            
-            # 取得モードに応じて複数ページから取得
-            if args.mode == "ranking":
-                # ランキング順のみ
-                sort_mode = "rank"
-                pages_to_fetch = args.pages
-            elif args.mode == "latest":
-                # 新着順のみ
-                sort_mode = "date"
-                pages_to_fetch = args.pages
-            else:  # all
-                # ランキング順と新着順の両方
-                sort_mode = "rank"
-                pages_to_fetch = args.pages
-            
-            # 古い順取得モードの場合、offsetを大きくして過去のページを取得
-            if args.oldest_first:
-                sort_mode = "date"
-                # 古い順に取得するため、offsetを大きく設定
-                # 例: 1000件目から取得する場合、offset=1001
-                base_offset = 1000  # デフォルトの開始offset
-                pages_to_fetch = args.pages
-            
-            # 発売日範囲指定がある場合、sort=dateでoffsetを調整して取得
-            # DMM APIでは直接日付範囲を指定できないため、sort=dateで大量のoffsetから取得
-            if date_from or date_to:
-                sort_mode = "date"
-                # 日付範囲指定時は、offsetを大きくして過去のページを取得
-                # 2014年から取得する場合、offsetを大きく設定
-                if date_from:
-                    # 開始年からoffsetを計算
-                    try:
-                        year = int(date_from.split("-")[0])
-                        if year <= 2005:
-                            base_offset = 10000  # 2005年以前はoffsetを非常に大きく
-                        elif year <= 2010:
-                            base_offset = 8000
-                        elif year <= 2015:
-                            base_offset = 5000  # 2015年以前はoffsetを大きく
-                        elif year <= 2018:
-                            base_offset = 3000
-                        elif year <= 2020:
-                            base_offset = 1000
-                        else:
-                            base_offset = 0
-                    except:
-                        base_offset = 1000
-                else:
-                    base_offset = 0
-                
-                # 日付範囲指定時は、より多くのページを取得する
-                # 古いデータほど多くのページが必要
-                if date_from:
-                    try:
-                        year = int(date_from.split("-")[0])
-                        if year <= 2010:
-                            # 2005-2010年は100ページ以上取得
-                            pages_to_fetch = max(pages_to_fetch, 100)
-                        elif year <= 2015:
-                            # 2011-2015年は50ページ取得
-                            pages_to_fetch = max(pages_to_fetch, 50)
-                        elif year <= 2018:
-                            # 2016-2018年は30ページ取得
-                            pages_to_fetch = max(pages_to_fetch, 30)
-                    except:
-                        pages_to_fetch = max(pages_to_fetch, 20)
-            
-            # 複数ページから取得
-            for page in range(1, pages_to_fetch + 1):
-                if args.oldest_first or (date_from or date_to):
-                    # 古い順または日付範囲指定: offsetを大きくして過去のページを取得
-                    offset = base_offset + (page - 1) * args.hits + 1
-                else:
-                    offset = (page - 1) * args.hits + 1
-                
-                if pages_to_fetch > 1:
-                    print(f"   📄 ページ {page}/{pages_to_fetch} 取得中（offset: {offset}）...")
-                
-                # keywordがある場合、sort=rankは使えないため、sort_modeをdateに変更
-                actual_sort = sort_mode
-                if genre_info['keyword'] and not args.genre_id and sort_mode == "rank":
-                    actual_sort = None  # keywordがある場合、sortは指定しない
-                
-                api_response = fetch_dmm_ranking(
-                    api_id,
-                    affiliate_id,
-                    keyword=genre_info['keyword'] if not args.genre_id else None,
-                    sort=actual_sort,  # sort_modeを使用（日付範囲指定時はdateに設定されている）
-                    hits=args.hits,
-                    offset=offset,
-                    genre_id=args.genre_id,
-                    maker_id=args.maker_id,
-                    actress_id=args.actress_id,
-                    series_id=args.series_id,
-                    price_from=args.price_from,
-                    price_to=args.price_to,
-                    gte_date=None,  # DMM APIでは直接日付範囲指定ができないため、Noneに設定
-                    lte_date=None   # sort=dateでoffsetを調整して取得
-                )
-                
+            genre_responses = responses_by_genre[genre_key]
+            genre_watermark = None
+            if use_watermark and not args.reset_watermark:
+                genre_watermark = watermarks.get(watermark_key(genre_key, args))
+            for request, api_response in genre_responses:
+                if isinstance(api_response, Exception):
+                    raise api_response
                 page_data = extract_ranking_data(api_response, filter_keywords=genre_info['filter_keywords'])
+                if genre_watermark:
+                    # 前回までに取得した作品は除く（新着分だけを出力）
+                    page_data = [item for item in page_data
+                                 if not is_known(item["release_date"], item["content_id"], genre_watermark)]
+                if len(genre_responses) > 1:
+                    print(f"   📄 {request['label']}: {len(page_data)}件")
                 all_items.extend(page_data)
-                
-                # ページ間で少し待機（API負荷軽減）
-                if page < pages_to_fetch:
-                    time.sleep(1)
-            
-            # allモードの場合、新着順も取得
-            if args.mode == "all":
-                print(f"   📄 新着順も取得中...")
-                for page in range(1, args.pages + 1):
-                    offset = (page - 1) * args.hits + 1
-                    if args.pages > 1:
-                        print(f"   📄 新着順 ページ {page}/{args.pages} 取得中（offset: {offset}）...")
-                    
-                    api_response = fetch_dmm_ranking(
-                        api_id,
-                        affiliate_id,
-                        keyword=genre_info['keyword'] if not args.genre_id else None,
-                        sort="date",
-                        hits=args.hits,
-                        offset=offset,
-                        genre_id=args.genre_id,
-                        maker_id=args.maker_id,
-                        actress_id=args.actress_id,
-                        series_id=args.series_id,
-                        price_from=args.price_from,
-                        price_to=args.price_to,
-                        gte_date=date_from,
-                        lte_date=date_to
-                    )
-                    
-                    page_data = extract_ranking_data(api_response, filter_keywords=genre_info['filter_keywords'])
-                    all_items.extend(page_data)
-                    
-                    # ページ間で少し待機
-                    if page < args.pages:
-                        time.sleep(1)
             
             # 重複を除去（content_idでユニーク化）
             seen_ids = set()
@@ -666,23 +793,50 @@ def main():
             for idx, item in enumerate(ranking_data, start=1):
                 item["rank"] = idx
             
+            # 取得済み位置を更新（今回見た作品は次回から取り直さない）
+            # 前回の位置まで途切れずに取得できたときだけ進める（届かなかった・失敗したページの作品を飛ばさない）
+            if use_watermark:
+                key = watermark_key(genre_key, args)
+                previous = None if args.reset_watermark else watermarks.get(key)
+                responses = [response for _, response in genre_responses]
+                failed = any(is_failed_response(response) for response in responses)
+                reached = previous is None or any(reaches_watermark(response, previous) for response in responses)
+                if failed or not reached:
+                    reason = "取得に失敗したページがある" if failed else "前回の位置まで届かなかった"
+                    print(f"   ⚠️  {reason}ため、取得済み位置は更新しません（次回もう一度取得します）")
+                else:
+                    watermark = advance_watermark(previous, responses)
+                    if watermark and watermark != watermarks.get(key):
+                        watermarks[key] = watermark
+                        save_watermarks(watermarks_path, watermarks)
+            
             if not ranking_data:
-                print(f"   ⚠️  {genre_info['name']}の作品が見つかりませんでした")
+                if genre_watermark:
+                    print(f"   ✅ {genre_info['name']}の新着作品はありませんでした")
+                else:
+                    print(f"   ⚠️  {genre_info['name']}の作品が見つかりませんでした")
                 continue
             
             print(f"   ✅ {len(ranking_data)}件の作品を取得しました")
             
             # JSONファイルを保存
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            genre_output_path = output_dir / f"mature_drama_{genre_key}_{timestamp}.json"
-            genre_latest_path = output_dir / f"mature_drama_{genre_key}_latest.json"
+            genre_output_path = output_dir / f"mature_drama_{genre_key}_{timestamp}.ndjson"
+            genre_latest_path = output_dir / f"mature_drama_{genre_key}_latest.ndjson"
             
-            save_to_json(ranking_data, str(genre_output_path))
-            save_to_json(ranking_data, str(genre_latest_path))
+            save_to_ndjson(ranking_data, str(genre_output_path))
+            save_to_ndjson(ranking_data, str(genre_latest_path))
+            
+            # 全ジャンル統合ファイルに追記（content_idで重複を除去）
+            if combined_writer is not None:
+                for item in ranking_data:
+                    if item['content_id'] not in combined_seen_ids:
+                        combined_seen_ids.add(item['content_id'])
+                        combined_writer.write({**item, "genre_key": genre_key})
             
             all_results[genre_key] = {
                 "genre_name": genre_info['name'],
-                "data": ranking_data
+                "count": len(ranking_data)
             }
             
             # TOP5表示
@@ -692,39 +846,21 @@ def main():
                 print(f"      {item['rank']:2d}. {item['title'][:40]}... ({actresses})")
             print()
             
-            time.sleep(1)  # API負荷軽減
-            
         except Exception as e:
             print(f"   ❌ エラー: {e}", file=sys.stderr)
             continue
     
-    # 全ジャンル統合ファイルを保存
-    if len(genres_to_fetch) > 1:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        combined_latest_path = output_dir / "mature_drama_all_latest.json"
-        
-        # 全ジャンルのデータを統合
-        all_items = []
-        for result in all_results.values():
-            all_items.extend(result['data'])
-        
-        # 重複を除去（content_idでユニーク化）
-        seen_ids = set()
-        unique_items = []
-        for item in all_items:
-            if item['content_id'] not in seen_ids:
-                seen_ids.add(item['content_id'])
-                unique_items.append(item)
-        
-        save_to_json(unique_items, str(combined_latest_path))
-        print(f"✅ 全ジャンル統合（重複除去後）: {len(unique_items)}件")
+    # 全ジャンル統合ファイルを確定
+    if combined_writer is not None:
+        combined_writer.close()
+        print(f"✅ 全ジャンル統合（重複除去後）: {combined_writer.count}件: {combined_latest_path}")
     
     print("\n" + "=" * 80)
     print("📊 取得完了サマリー:")
     print("=" * 80)
     total_count = 0
     for genre_key, result in all_results.items():
-        count = len(result['data'])
+        count = result['count']
         total_count += count
         print(f"  {result['genre_name']}: {count}件")
     print(f"\n  合計: {total_count}件")
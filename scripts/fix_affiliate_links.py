@@ -9,6 +9,29 @@ import sys
 from pathlib import Path
 
 
+def fix_affiliate_links_in_content(content: str) -> str:
+    """
+    Markdownリンク構文のアフィリエイトリンクをHTMLの<a>タグに変換
+    
+    Args:
+        content: 記事の内容
+        
+    Returns:
+        変換後の内容
+    """
+    # <div className="affiliate-link">[text](url)</div> のパターン
+    pattern1 = r'<div className="affiliate-link">\s*\[([^\]]+)\]\(([^)]+)\)\s*</div>'
+    replacement1 = r'<div className="affiliate-link">\n  <a href="\2" target="_blank" rel="noopener noreferrer">\1</a>\n</div>'
+    content = re.sub(pattern1, replacement1, content)
+    
+    # <div className="affiliate-link-inline">[text](url)</div> のパターン
+    pattern2 = r'<div className="affiliate-link-inline">\s*\[([^\]]+)\]\(([^)]+)\)\s*</div>'
+    replacement2 = r'<div className="affiliate-link-inline">\n  <a href="\2" target="_blank" rel="noopener noreferrer">\1</a>\n</div>'
+    content = re.sub(pattern2, replacement2, content)
+    
+    return content
+
+
 def fix_affiliate_links_in_file(file_path: str) -> bool:
     """
     ファイル内のアフィリエイトリンクを修正
@@ -26,15 +49,7 @@ def fix_affiliate_links_in_file(file_path: str) -> bool:
         original_content = content
         
         # Markdownリンク構文をHTMLの<a>タグに変換
-        # <div className="affiliate-link">[text](url)</div> のパターン
-        pattern1 = r'<div className="affiliate-link">\s*\[([^\]]+)\]\(([^)]+)\)\s*</div>'
-        replacement1 = r'<div className="affiliate-link">\n  <a href="\2" target="_blank" rel="noopener noreferrer">\1</a>\n</div>'
-        content = re.sub(pattern1, replacement1, content)
-        
-        # <div className="affiliate-link-inline">[text](url)</div> のパターン
-        pattern2 = r'<div className="affiliate-link-inline">\s*\[([^\]]+)\]\(([^)]+)\)\s*</div>'
-        replacement2 = r'<div className="affiliate-link-inline">\n  <a href="\2" target="_blank" rel="noopener noreferrer">\1</a>\n</div>'
-        content = re.sub(pattern2, replacement2, content)
+        content = fix_affiliate_links_in_content(content)
         
         # 変更があった場合のみファイルを保存
         if content != original_content:
@@ -9,33 +9,13 @@ import json
 from pathlib import Path
 from datetime import datetime, timedelta
 
+from article_frontmatter import extract_frontmatter
+
 # プロジェクトルート
 script_dir = Path(__file__).parent
 project_root = script_dir.parent
 content_dir = project_root / "content"
 
-def extract_frontmatter(content: str) -> tuple[dict, str]:
-    """フロントマターを抽出"""
-    if not content.startswith("---"):
-        return {}, content
-    
-    end_pos = content.find("\n---", 3)
-    if end_pos == -1:
-        return {}, content
-    
-    frontmatter_text = content[4:end_pos].strip()
-    body = content[end_pos + 5:].strip()
-    
-    frontmatter = {}
-    for line in frontmatter_text.split("\n"):
-        if ":" in line:
-            key, value = line.split(":", 1)
-            key = key.strip()
-            value = value.strip().strip('"')
-            frontmatter[key] = value
-    
-    return frontmatter, body
-
 def escape_yaml_string(s: str) -> str:
     """YAML文字列をエスケープ"""
     s = s.replace("\\", "\\\\")
@@ -92,6 +92,15 @@ def fix_frontmatter(content: str) -> str:
     
     return frontmatter + "\n\n" + body
 
+def is_broken_frontmatter(content: str) -> bool:
+    """フロントマターが壊れているか（fix_frontmatterの対象か）をチェック"""
+    return (
+        content.startswith("---\n---\n") or
+        "--- title:" in content or
+        "https://.mgstage.com" in content or
+        (content.startswith("---") and content.count("\n---\n") == 0 and "title:" in content)
+    )
+
 def main():
     """メイン処理"""
     print("=" * 80)
@@ -116,14 +125,7 @@ def main():
                 content = f.read()
             
             # 壊れているかチェック
-            is_broken = (
-                content.startswith("---\n---\n") or
-                "--- title:" in content or
-                "https://.mgstage.com" in content or
-                (content.startswith("---") and content.count("\n---\n") == 0 and "title:" in content)
-            )
-            
-            if not is_broken:
+            if not is_broken_frontmatter(content):
                 # 正しい形式か確認
                 if content.startswith("---\n") and "\n---\n" in content[:500]:
                     lines = content.split("\n")
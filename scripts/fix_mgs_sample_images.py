@@ -5,37 +5,17 @@ MGS記事のサンプル画像を規則性のあるURLで表示するように
 
 import re
 import json
+import argparse
 from pathlib import Path
 
+from article_frontmatter import extract_frontmatter
+from parallel import add_jobs_argument, map_parallel
+
 # プロジェクトルート
 script_dir = Path(__file__).parent
 project_root = script_dir.parent
 content_dir = project_root / "content"
 
-def extract_frontmatter(content: str) -> tuple[dict, str]:
-    """フロントマターを抽出"""
-    if not content.startswith("---"):
-        return {}, content
-    
-    # フロントマターの終了位置を探す
-    end_pos = content.find("\n---", 3)
-    if end_pos == -1:
-        return {}, content
-    
-    frontmatter_text = content[4:end_pos].strip()
-    body = content[end_pos + 5:].strip()
-    
-    # フロントマターをパース
-    frontmatter = {}
-    for line in frontmatter_text.split("\n"):
-        if ":" in line:
-            key, value = line.split(":", 1)
-            key = key.strip()
-            value = value.strip().strip('"')
-            frontmatter[key] = value
-    
-    return frontmatter, body
-
 def generate_mgs_sample_image_urls(image_url: str, content_id: str, count: int = 3) -> list[str]:
     """
     MGSのメイン画像URLからサンプル画像URLを生成
@@ -133,14 +113,71 @@ def fix_sample_images_in_body(body: str, image_url: str, content_id: str, affili
     
     return body
 
+def fix_article(article_file: Path) -> dict:
+    """
+    1記事分のサンプル画像を修正して保存
+    
+    Returns:
+        {"status": "fixed" | "skipped" | "error", "message": 理由}
+    """
+    try:
+        with open(article_file, "r", encoding="utf-8") as f:
+            content = f.read()
+        
+        # フロントマターを抽出
+        frontmatter, body = extract_frontmatter(content)
+        
+        if not frontmatter:
+            return {"status": "skipped", "message": "フロントマターが見つかりません"}
+        
+        # MGS記事かどうか確認
+        source = frontmatter.get("source", "")
+        if source != "MGS":
+            return {"status": "skipped", "message": "MGS記事ではありません"}
+        
+        image_url = frontmatter.get("image", "")
+        content_id = frontmatter.get("contentId", "")
+        affiliate_url = frontmatter.get("affiliateLink", "")
+        title = frontmatter.get("title", "")
+        
+        if not image_url or not content_id:
+            return {"status": "skipped", "message": "必要な情報が不足しています"}
+        
+        # サンプル画像を修正
+        new_body = fix_sample_images_in_body(body, image_url, content_id, affiliate_url, title)
+        
+        # 保存
+        frontmatter_lines = ["---"]
+        for key, value in frontmatter.items():
+            if isinstance(value, str):
+                frontmatter_lines.append(f'{key}: "{value}"')
+            else:
+                frontmatter_lines.append(f'{key}: {json.dumps(value, ensure_ascii=False)}')
+        frontmatter_lines.append("---")
+        
+        new_content = "\n".join(frontmatter_lines) + "\n\n" + new_body
+        
+        with open(article_file, "w", encoding="utf-8") as f:
+            f.write(new_content)
+        
+        return {"status": "fixed", "message": "修正完了"}
+        
+    except Exception as e:
+        import traceback
+        return {"status": "error", "message": f"エラー: {e}\n{traceback.format_exc()}"}
+
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description="MGS記事のサンプル画像を修正")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
     print("=" * 80)
     print("  MGS記事のサンプル画像修正")
     print("=" * 80 + "\n")
     
     # 2026-01-02の記事を取得（MGS記事）
-    mgs_articles = list(content_dir.glob("2026-01-02-*.md"))
+    mgs_articles = sorted(content_dir.glob("2026-01-02-*.md"))
     
     if not mgs_articles:
         print("❌ 修正対象の記事が見つかりません")
@@ -151,60 +188,15 @@ def main():
     fixed_count = 0
     skipped_count = 0
     
-    for article_file in mgs_articles:
-        try:
-            with open(article_file, "r", encoding="utf-8") as f:
-                content = f.read()
-            
-            # フロントマターを抽出
-            frontmatter, body = extract_frontmatter(content)
-            
-            if not frontmatter:
-                print(f"⏭️  {article_file.name} - フロントマターが見つかりません")
-                skipped_count += 1
-                continue
-            
-            # MGS記事かどうか確認
-            source = frontmatter.get("source", "")
-            if source != "MGS":
-                print(f"⏭️  {article_file.name} - MGS記事ではありません")
-                skipped_count += 1
-                continue
-            
-            image_url = frontmatter.get("image", "")
-            content_id = frontmatter.get("contentId", "")
-            affiliate_url = frontmatter.get("affiliateLink", "")
-            title = frontmatter.get("title", "")
-            
-            if not image_url or not content_id:
-                print(f"⏭️  {article_file.name} - 必要な情報が不足しています")
-                skipped_count += 1
-                continue
-            
-            # サンプル画像を修正
-            new_body = fix_sample_images_in_body(body, image_url, content_id, affiliate_url, title)
-            
-            # 保存
-            frontmatter_lines = ["---"]
-            for key, value in frontmatter.items():
-                if isinstance(value, str):
-                    frontmatter_lines.append(f'{key}: "{value}"')
-                else:
-                    frontmatter_lines.append(f'{key}: {json.dumps(value, ensure_ascii=False)}')
-            frontmatter_lines.append("---")
-            
-            new_content = "\n".join(frontmatter_lines) + "\n\n" + new_body
-            
-            with open(article_file, "w", encoding="utf-8") as f:
-                f.write(new_content)
-            
-            print(f"✅ {article_file.name} - 修正完了")
+    for article_file, result in zip(mgs_articles, map_parallel(fix_article, mgs_articles, args.jobs)):
+        if result["status"] == "fixed":
+            print(f"✅ {article_file.name} - {result['message']}")
             fixed_count += 1
-                
-        except Exception as e:
-            print(f"❌ {article_file.name} - エラー: {e}")
-            import traceback
-            traceback.print_exc()
+        elif result["status"] == "skipped":
+            print(f"⏭️  {article_file.name} - {result['message']}")
+            skipped_count += 1
+        else:
+            print(f"❌ {article_file.name} - {result['message']}")
     
     print("\n" + "=" * 80)
     print(f"🎉 修正完了！")
@@ -214,4 +206,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
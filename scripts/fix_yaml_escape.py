@@ -5,13 +5,23 @@ YAMLフロントマターのエスケープ問題を修正するスクリプト
 """
 
 import re
+import argparse
 from pathlib import Path
 
+from article_frontmatter import LINE_PATTERN, split_frontmatter, unquote
+from parallel import add_jobs_argument, map_parallel
+
 # プロジェクトルート
 script_dir = Path(__file__).parent
 project_root = script_dir.parent
 content_dir = project_root / "content"
 
+# ダブルクォート文字列として正しくエスケープ済みの値
+ESCAPED_YAML_PATTERN = re.compile(r'^(?:[^"\\]|\\["\\n])*$')
+
+# エスケープを直すキー
+ESCAPED_KEYS = ("title", "excerpt")
+
 def escape_yaml_string(s: str) -> str:
     """YAML文字列をエスケープ"""
     # バックスラッシュをエスケープ（最初に処理）
@@ -22,27 +32,41 @@ def escape_yaml_string(s: str) -> str:
     s = s.replace("\n", "\\n")
     return s
 
-def extract_frontmatter(content: str) -> tuple[dict, str]:
-    """フロントマターを抽出"""
-    if not content.startswith("---"):
-        return {}, content
+def needs_escape(value: str) -> bool:
+    """クォートを外した値に、エスケープされていない " や \\ があるか"""
+    return not ESCAPED_YAML_PATTERN.match(value)
+
+def fix_yaml_escape_content(content: str) -> str | None:
+    """
+    記事本文（フロントマター込み）のYAMLエスケープを修正
     
-    end_pos = content.find("\n---", 3)
-    if end_pos == -1:
-        return {}, content
+    書き換えるのはタイトルと抜粋の行だけで、ほかのキー（genre・各スコアなど）と本文はそのまま残す
     
-    frontmatter_text = content[4:end_pos].strip()
-    body = content[end_pos + 5:].strip()
+    Returns:
+        修正後の内容（修正不要の場合はNone）
+    """
+    frontmatter_text, body = split_frontmatter(content)
     
-    frontmatter = {}
-    for line in frontmatter_text.split("\n"):
-        if ":" in line:
-            key, value = line.split(":", 1)
-            key = key.strip()
-            value = value.strip().strip('"')
-            frontmatter[key] = value
+    if frontmatter_text is None:
+        return None
     
-    return frontmatter, body
+    # エスケープ済み（\\ \" \n 以外のバックスラッシュや裸の " がない）なら修正不要
+    # 何度実行しても二重エスケープにならないようにする
+    lines = frontmatter_text.split("\n")
+    fixed = False
+    for i, line in enumerate(lines):
+        match = LINE_PATTERN.match(line)
+        if not match or match.group(1) not in ESCAPED_KEYS:
+            continue
+        value = unquote(match.group(2), unescape=False)
+        if needs_escape(value):
+            lines[i] = f'{match.group(1)}: "{escape_yaml_string(value)}"'
+            fixed = True
+    
+    if not fixed:
+        return None
+    
+    return "---\n" + "\n".join(lines) + "\n---" + body
 
 def fix_article(filepath: Path) -> bool:
     """記事のYAMLエスケープを修正"""
@@ -50,58 +74,11 @@ def fix_article(filepath: Path) -> bool:
         with open(filepath, "r", encoding="utf-8") as f:
             content = f.read()
         
-        frontmatter, body = extract_frontmatter(content)
-        
-        if not frontmatter:
-            return False
-        
-        # タイトルと抜粋をエスケープ
-        title = frontmatter.get("title", "")
-        excerpt = frontmatter.get("excerpt", "")
-        
-        # バックスラッシュが含まれているかチェック
-        needs_fix = False
-        
-        # バックスラッシュが含まれている場合（エスケープされていない可能性）
-        # ただし、既に \\\\ のようにエスケープされている場合はスキップ
-        if "\\" in title:
-            # 単独の \ が含まれている場合（エスケープされていない）
-            # \\ が含まれていても、それが \\\\ でない場合は修正が必要
-            if title.count("\\") % 2 != 0 or (title.count("\\") > 0 and "\\\\" not in title.replace("\\\\", "")):
-                needs_fix = True
-        if "\\" in excerpt:
-            if excerpt.count("\\") % 2 != 0 or (excerpt.count("\\") > 0 and "\\\\" not in excerpt.replace("\\\\", "")):
-                needs_fix = True
-        
-        # ダブルクォートが含まれている場合も修正
-        if '"' in title and '\\"' not in title:
-            needs_fix = True
-        if '"' in excerpt and '\\"' not in excerpt:
-            needs_fix = True
+        new_content = fix_yaml_escape_content(content)
         
-        if not needs_fix:
+        if new_content is None:
             return False
         
-        # エスケープ
-        escaped_title = escape_yaml_string(title)
-        escaped_excerpt = escape_yaml_string(excerpt)
-        
-        # フロントマターを再構築
-        frontmatter_lines = ["---"]
-        frontmatter_lines.append(f'title: "{escaped_title}"')
-        frontmatter_lines.append(f'date: "{frontmatter.get("date", "")}"')
-        frontmatter_lines.append(f'excerpt: "{escaped_excerpt}"')
-        frontmatter_lines.append(f'image: "{frontmatter.get("image", "")}"')
-        frontmatter_lines.append(f'tags: {frontmatter.get("tags", "[]")}')
-        frontmatter_lines.append(f'affiliateLink: "{frontmatter.get("affiliateLink", "")}"')
-        frontmatter_lines.append(f'contentId: "{frontmatter.get("contentId", "")}"')
-        frontmatter_lines.append(f'rating: {frontmatter.get("rating", "4.0")}')
-        if "source" in frontmatter:
-            frontmatter_lines.append(f'source: "{frontmatter.get("source", "")}"')
-        frontmatter_lines.append("---")
-        
-        new_content = "\n".join(frontmatter_lines) + "\n\n" + body
-        
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(new_content)
         
@@ -113,6 +90,10 @@ def fix_article(filepath: Path) -> bool:
 
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description="YAMLフロントマターのエスケープ問題を修正")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
     print("=" * 80)
     print("  YAMLエスケープ修正")
     print("=" * 80 + "\n")
@@ -128,9 +109,9 @@ def main():
     fixed_count = 0
     checked_count = 0
     
-    for article_file in articles:
+    for article_file, fixed in zip(articles, map_parallel(fix_article, articles, args.jobs)):
         checked_count += 1
-        if fix_article(article_file):
+        if fixed:
             print(f"✅ {article_file.name} - 修正完了")
             fixed_count += 1
         
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Gemini APIのバッチ処理（JSONL）用の入出力
+
+記事を1本ずつAPIで生成する代わりに、全プロンプトをバッチのリクエストファイル（1行1リクエストのJSONL）に書き出し、
+プロバイダのバッチ処理にまとめて投げる。返ってきた結果ファイルは iter_batch_results() で読み、
+各スクリプトの既存のレスポンスチェック（candidates・prompt_feedback・text）をそのまま通せる形に変換する。
+
+リクエストの1行:
+    {"key": "mature_drama:1start00473",
+     "request": {"contents": [{"role": "user", "parts": [{"text": "..."}]}],
+                 "system_instruction": {"parts": [{"text": "..."}]},
+                 "generation_config": {...}, "safety_settings": [{"category": "...", "threshold": "..."}]}}
+
+結果の1行（"response" か "error" のどちらか）:
+    {"key": "mature_drama:1start00473",
+     "response": {"candidates": [{"content": {"parts": [{"text": "..."}]}, "finishReason": "STOP"}],
+                  "promptFeedback": {"blockReason": "SAFETY"}}}
+
+使い方:
+    from gemini_batch import BatchRequestWriter, iter_batch_results
+
+    with BatchRequestWriter(path) as writer:
+        writer.add(f"mature_drama:{content_id}", prompt, generation_config, safety_settings, system_instruction)
+
+    for key, response, error in iter_batch_results(results_path):
+        if error:
+            ...
+        text = response.text
+
+    # 件数の確認
+    python3 scripts/gemini_batch.py data/batch/mature_drama_requests.jsonl
+"""
+
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# 結果の finishReason（文字列）と SDK の finish_reason（数値）の対応
+FINISH_REASONS = {
+    "FINISH_REASON_UNSPECIFIED": 0,
+    "STOP": 1,
+    "MAX_TOKENS": 2,
+    "SAFETY": 3,
+    "RECITATION": 4,
+    "OTHER": 5,
+}
+
+
+def batch_key(kind: str, content_id: str) -> str:
+    """リクエストのキー（ジョブの種類と品番）"""
+    return f"{kind}:{content_id}"
+
+
+def split_key(key: str) -> tuple:
+    """キーを (種類, 品番) に分ける"""
+    kind, _, content_id = key.partition(":")
+    return kind, content_id
+
+
+def _enum_name(value: Any) -> Any:
+    """HarmCategory などのEnumは名前（"HARM_CATEGORY_HARASSMENT"）にする"""
+    return getattr(value, "name", value)
+
+
+def to_request(prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+               safety_settings: Optional[Dict[Any, Any]] = None,
+               system_instruction: Optional[str] = None) -> Dict[str, Any]:
+    """generate_content() の引数をバッチのリクエスト本文に変換"""
+    request: Dict[str, Any] = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+    if system_instruction:
+        request["system_instruction"] = {"parts": [{"text": system_instruction}]}
+    if generation_config:
+        request["generation_config"] = dict(generation_config)
+    if safety_settings:
+        request["safety_settings"] = [
+            {"category": _enum_name(category), "threshold": _enum_name(threshold)}
+            for category, threshold in safety_settings.items()
+        ]
+    return request
+
+
+class BatchRequestWriter:
+    """バッチのリクエストファイルを1行ずつ書き出す（closeで確定する）"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.count = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+
+    def add(self, key: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+            safety_settings: Optional[Dict[Any, Any]] = None, system_instruction: Optional[str] = None) -> None:
+        """1リクエスト書き出す"""
+        line = {"key": key, "request": to_request(prompt, generation_config, safety_settings, system_instruction)}
+        self._file.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "BatchRequestWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class _Feedback:
+    def __init__(self, data: Dict[str, Any]):
+        self.block_reason = data.get("blockReason") or data.get("block_reason")
+
+
+class _Candidate:
+    def __init__(self, data: Dict[str, Any]):
+        reason = data.get("finishReason") or data.get("finish_reason")
+        self.finish_reason = FINISH_REASONS.get(reason, reason) if isinstance(reason, str) else reason
+        parts = data.get("content", {}).get("parts", [])
+        self.text = "".join(part.get("text", "") for part in parts)
+
+
+class BatchResponse:
+    """
+    バッチ結果の1件（SDKのレスポンスと同じく text・candidates・prompt_feedback を持つ）
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.raw = data
+        self.candidates: List[_Candidate] = [_Candidate(c) for c in data.get("candidates", [])]
+        feedback = data.get("promptFeedback") or data.get("prompt_feedback")
+        self.prompt_feedback = _Feedback(feedback) if feedback else None
+        self.usage_metadata = data.get("usageMetadata") or data.get("usage_metadata")
+
+    @property
+    def text(self) -> str:
+        # SDKと同じく、本文がない場合は ValueError
+        if not self.candidates or not self.candidates[0].text:
+            raise ValueError("レスポンスに本文がありません")
+        return self.candidates[0].text
+
+
+def iter_batch_results(path: Path) -> Iterator[tuple]:
+    """
+    結果ファイルを1件ずつ読む
+
+    Yields:
+        (キー, BatchResponse または None, エラーメッセージ または None)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️  {path}:{line_no} を読み飛ばしました（JSONの解析に失敗: {e}）", file=sys.stderr)
+                continue
+            key = record.get("key") or record.get("metadata", {}).get("key", "")
+            if record.get("error"):
+                error = record["error"]
+                yield key, None, error.get("message", str(error)) if isinstance(error, dict) else str(error)
+            elif record.get("response") is not None:
+                yield key, BatchResponse(record["response"]), None
+            else:
+                yield key, None, "結果に response も error もありません"
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="バッチのリクエスト・結果ファイルの件数を表示")
+    parser.add_argument("paths", nargs="+", type=Path, help="リクエストまたは結果のJSONL")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        if not path.exists():
+            print(f"❌ ファイルが見つかりません: {path}", file=sys.stderr)
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            first = json.loads(f.readline() or "{}")
+        if "request" in first:
+            with open(path, "r", encoding="utf-8") as f:
+                count = sum(1 for line in f if line.strip())
+            print(f"📤 {path}: リクエスト {count}件")
+            continue
+        counts = {"ok": 0, "blocked": 0, "error": 0}
+        for _, response, error in iter_batch_results(path):
+            if error:
+                counts["error"] += 1
+            elif response.candidates and response.candidates[0].text:
+                counts["ok"] += 1
+            else:
+                counts["blocked"] += 1
+        print(f"📥 {path}: 本文あり {counts['ok']}件 / ブロック・空 {counts['blocked']}件 / エラー {counts['error']}件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Gemini APIのレスポンスをSQLiteにキャッシュする共有モジュール
+
+キーは「モデル名 + システムインストラクション + プロンプト + generation_config + safety_settings」のハッシュ。
+記事の生成には成功したが保存に失敗した場合や、生成後に中断した場合でも、次の実行では同じプロンプトに対して
+APIを呼ばずに保存済みの本文を返すので、後処理を直して再実行してもクォータを使わない。
+
+保存するのは本文と finish_reason（ブロックされた・候補がなかったレスポンスは保存しない）。
+gemini_pool.generate_content() が呼び出しの前に必ず参照するので、各スクリプトからは直接使わなくてよい。
+同じプロンプトで別の本文を生成し直したいときは GEMINI_CACHE=off で実行する。
+内容を理由に保存を見送った本文（検証エラー・既存記事と酷似）は gemini_pool.forget_response() で
+そのエントリだけ削除するので、リトライでは生成し直す。
+
+使い方:
+    python3 scripts/gemini_cache.py --stats    # 件数・ヒット数・節約した呼び出し回数
+    python3 scripts/gemini_cache.py --clear
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+# プロジェクトルート
+script_dir = Path(__file__).parent
+project_root = script_dir.parent
+DEFAULT_DB_PATH = project_root / "data" / "gemini_cache.sqlite3"
+
+SCHEMA_VERSION = 1
+
+# GEMINI_CACHE=off でキャッシュを使わない（読まない・書かない）
+CACHE_ENV = "GEMINI_CACHE"
+
+
+def is_enabled() -> bool:
+    return os.environ.get(CACHE_ENV, "").lower() not in ("off", "0", "false", "no")
+
+
+def _normalize(value: Any) -> Any:
+    """キーに使えるよう、dictのキーを文字列にしてJSONにできる形へ変換（Enumなどは文字列）"""
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def model_name(model: Any) -> str:
+    """GenerativeModel のモデル名（"models/gemini-2.5-flash" など）"""
+    return getattr(model, "model_name", None) or type(model).__name__
+
+
+def static_prefix(model: Any) -> Optional[str]:
+    """gemini_prefix.create_model() で作ったモデルのシステムインストラクション"""
+    return getattr(model, "static_prefix", None)
+
+
+def cache_key(model: str, contents: Any, generation_config: Any = None, safety_settings: Any = None,
+              system_instruction: Optional[str] = None) -> str:
+    """モデル名・システムインストラクション・プロンプト・生成設定のハッシュ"""
+    material = {
+        "model": model,
+        "contents": _normalize(contents),
+        "generation_config": _normalize(generation_config or {}),
+        "safety_settings": _normalize(safety_settings or {}),
+    }
+    # システムインストラクションがなければ含めない（以前のキーと同じになる）
+    if system_instruction:
+        material["system_instruction"] = system_instruction
+    material = json.dumps(material, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class CachedCandidate:
+    """キャッシュから復元したレスポンス候補"""
+
+    def __init__(self, text: str, finish_reason: Optional[int]):
+        self.text = text
+        self.finish_reason = finish_reason
+        # candidate.content.parts を参照するスクリプト向け
+        self.content = SimpleNamespace(parts=[SimpleNamespace(text=text)])
+
+
+class CachedResponse:
+    """
+    キャッシュから復元したレスポンス
+
+    各スクリプトが参照する text・candidates・prompt_feedback だけを持つ。
+    """
+
+    from_cache = True
+
+    def __init__(self, text: str, finish_reason: Optional[int]):
+        self.text = text
+        self.candidates: List[CachedCandidate] = [CachedCandidate(text, finish_reason)]
+        self.prompt_feedback = None
+        self.usage_metadata = None
+
+
+def extract_result(response: Any) -> Optional[tuple]:
+    """レスポンスから (本文, finish_reason) を取り出す（ブロック・候補なしならNone）"""
+    try:
+        if not response.candidates:
+            return None
+        text = response.text
+    except (ValueError, AttributeError, IndexError):
+        # 本文がない（セーフティでブロックされたなど）と response.text は ValueError になる
+        return None
+    if not text:
+        return None
+    finish_reason = getattr(response.candidates[0], "finish_reason", None)
+    try:
+        finish_reason = int(finish_reason) if finish_reason is not None else None
+    except (TypeError, ValueError):
+        finish_reason = None
+    return text, finish_reason
+
+
+class GeminiCache:
+    """Gemini APIレスポンスのキャッシュ（スレッドセーフ）"""
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "deleted": 0}
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        # 複数のスクリプトから同時に使えるようにWALにする
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS responses")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                text TEXT NOT NULL,
+                finish_reason INTEGER,
+                created_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """キャッシュ済みのレスポンス（なければNone）"""
+        with self._lock:
+            row = self.conn.execute("SELECT text, finish_reason FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            with self.conn:
+                self.conn.execute("UPDATE responses SET hits = hits + 1 WHERE key = ?", (key,))
+        return CachedResponse(row[0], row[1])
+
+    def put(self, key: str, model: str, response: Any) -> bool:
+        """レスポンスを保存する（本文がなければ保存しない）"""
+        result = extract_result(response)
+        if result is None:
+            return False
+        text, finish_reason = result
+        with self._lock:
+            self.stats["stored"] += 1
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, text, finish_reason, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, model, text, finish_reason, time.time()),
+                )
+        return True
+
+    def delete(self, key: str) -> bool:
+        """1件削除する（なければFalse）"""
+        with self._lock:
+            with self.conn:
+                deleted = self.conn.execute("DELETE FROM responses WHERE key = ?", (key,)).rowcount
+            if deleted:
+                self.stats["deleted"] += 1
+        return bool(deleted)
+
+    def format_stats(self) -> str:
+        """このプロセスでのヒット・ミス数"""
+        line = (f"💾 Geminiキャッシュ: ヒット {self.stats['hits']}件 / ミス {self.stats['misses']}件 / "
+                f"保存 {self.stats['stored']}件")
+        if self.stats["deleted"]:
+            line += f" / 削除 {self.stats['deleted']}件"
+        return line
+
+    def summary(self) -> Dict[str, dict]:
+        """モデル別の件数と累計ヒット数"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT model, COUNT(*), SUM(hits), SUM(LENGTH(text)) FROM responses GROUP BY model"
+            ).fetchall()
+        return {model: {"entries": entries, "hits": hits or 0, "chars": chars or 0}
+                for model, entries, hits, chars in rows}
+
+    def clear(self):
+        """すべて削除"""
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM responses")
+
+
+_default_cache: Optional[GeminiCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> GeminiCache:
+    """プロセス内で共有するキャッシュ（data/gemini_cache.sqlite3）"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = GeminiCache()
+        return _default_cache
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="Gemini APIレスポンスキャッシュの確認・削除")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="キャッシュDBのパス")
+    parser.add_argument("--stats", action="store_true", help="モデル別の件数と累計ヒット数を表示")
+    parser.add_argument("--clear", action="store_true", help="すべて削除")
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print("（キャッシュは空です）")
+        return
+
+    cache = GeminiCache(args.db)
+    try:
+        if args.clear:
+            cache.clear()
+            print("🗑️  キャッシュを削除しました")
+            return
+        summary = cache.summary()
+        if not summary:
+            print("（キャッシュは空です）")
+        for model, entry in sorted(summary.items()):
+            print(f"📦 {model}: {entry['entries']}件（{entry['chars']:,}文字） / "
+                  f"累計ヒット {entry['hits']}回（API呼び出しを{entry['hits']}回節約）")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
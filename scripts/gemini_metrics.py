@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Gemini APIの呼び出しごとの計測値を記録する共有モジュール（SQLite）
+
+gemini_pool.generate_content() が呼び出し1回ごとに、スクリプト名・モデル・プロンプトのハッシュ・
+入力／キャッシュ済み／出力トークン数（usage_metadata）・応答時間・試行回数・finish_reason・結果を
+data/gemini_metrics.sqlite3 に書き込むので、各スクリプトからは直接使わなくてよい。
+
+試行回数は、同じプロセスで同じプロンプトを何回目に送ったか（429の再試行と、スクリプト側のリトライの両方を含む）。
+結果（outcome）:
+    ok         → 応答を受け取った（ブロックされた応答も含む。finish_reason で区別する）
+    cache_hit  → gemini_cache.py のキャッシュを返した（APIは呼んでいない）
+    throttled  → 429 / RESOURCE_EXHAUSTED
+    aborted    → ストリーミング中のチェックで打ち切った
+    timeout    → 期限（GEMINI_TIMEOUT）までに応答がなかった
+    cancelled  → ヘッジで先に別のリクエストが成功したため不要になった（トークンは余分に使った分）
+    error      → その他のエラー
+
+ヘッジ（GEMINI_HEDGE=on）で追加したリクエストは hedge=1 で記録し、試行回数は元のリクエストと同じにする。
+
+GEMINI_METRICS=off で記録しない。
+
+使い方:
+    python3 scripts/gemini_metrics.py                     # スクリプトごとの集計（直近7日）
+    python3 scripts/gemini_metrics.py --days 1 --script bulk_generate_mature_drama_articles
+    python3 scripts/gemini_metrics.py --recent 20         # 直近の呼び出し
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# プロジェクトルート
+script_dir = Path(__file__).parent
+project_root = script_dir.parent
+DEFAULT_DB_PATH = project_root / "data" / "gemini_metrics.sqlite3"
+
+SCHEMA_VERSION = 2
+
+METRICS_ENV = "GEMINI_METRICS"
+
+OUTCOMES = ("ok", "cache_hit", "throttled", "aborted", "timeout", "cancelled", "error")
+
+# 推定料金（USD / 100万トークン: 入力, キャッシュ済み入力, 出力）。料金表が変わったら更新する
+PRICES = {
+    "gemini-2.5-flash": (0.30, 0.075, 2.50),
+    "gemini-2.5-pro": (1.25, 0.31, 10.00),
+    "gemini-flash-latest": (0.30, 0.075, 2.50),
+    "gemini-1.5-pro": (1.25, 0.3125, 5.00),
+    "gemini-1.5-flash": (0.075, 0.01875, 0.30),
+}
+
+
+def is_enabled() -> bool:
+    return os.environ.get(METRICS_ENV, "").lower() not in ("off", "0", "false", "no")
+
+
+def current_script() -> str:
+    """実行中のスクリプト名（bulk_generate_mature_drama_articles など）"""
+    return Path(sys.argv[0]).stem if sys.argv and sys.argv[0] else "python"
+
+
+def prompt_hash(contents: Any) -> str:
+    """プロンプトのハッシュ（先頭16文字）"""
+    text = contents if isinstance(contents, str) else json.dumps(contents, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def usage_counts(response: Any) -> Dict[str, Optional[int]]:
+    """usage_metadata から入力・キャッシュ済み・出力のトークン数を取り出す（ないものはNone）"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return {"input_tokens": None, "cached_tokens": None, "output_tokens": None}
+
+    def read(name: str) -> Optional[int]:
+        value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+        try:
+            return int(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    return {
+        "input_tokens": read("prompt_token_count"),
+        "cached_tokens": read("cached_content_token_count"),
+        "output_tokens": read("candidates_token_count"),
+    }
+
+
+def finish_reason_name(response: Any) -> Optional[str]:
+    """finish_reason の名前（STOP / SAFETY など）。候補がなくブロックされた場合は BLOCKED:理由"""
+    try:
+        candidates = response.candidates
+    except AttributeError:
+        return None
+    if not candidates:
+        feedback = getattr(response, "prompt_feedback", None)
+        reason = getattr(feedback, "block_reason", None) if feedback else None
+        return f"BLOCKED:{getattr(reason, 'name', reason)}" if reason else "NO_CANDIDATES"
+    reason = getattr(candidates[0], "finish_reason", None)
+    if reason is None:
+        return None
+    return str(getattr(reason, "name", reason))
+
+
+def estimate_cost(model: str, input_tokens: int, cached_tokens: int, output_tokens: int) -> Optional[float]:
+    """推定料金（USD）。料金表にないモデルはNone"""
+    name = model.split("/")[-1]
+    prices = PRICES.get(name)
+    if prices is None:
+        return None
+    input_price, cached_price, output_price = prices
+    uncached = max(input_tokens - cached_tokens, 0)
+    return (uncached * input_price + cached_tokens * cached_price + output_tokens * output_price) / 1_000_000
+
+
+def percentile(values: List[float], ratio: float) -> Optional[float]:
+    """ratio（0〜1）分位点（線形補間）"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * ratio
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class GeminiMetrics:
+    """Gemini API呼び出しの計測値（スレッドセーフ、複数プロセスから同時に使える）"""
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        # 複数のスクリプトから同時に使えるようにWALにする
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS calls")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                script TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                attempt INTEGER NOT NULL,
+                outcome TEXT NOT NULL,
+                finish_reason TEXT,
+                input_tokens INTEGER,
+                cached_tokens INTEGER,
+                output_tokens INTEGER,
+                latency REAL NOT NULL,
+                first_chunk_latency REAL,
+                stream INTEGER NOT NULL DEFAULT 0,
+                hedge INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS calls_script_time ON calls (script, created_at)")
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def next_attempt(self, key: str) -> int:
+        """このプロセスで同じプロンプトを送るのが何回目か（キャッシュヒットは数えない）"""
+        with self._lock:
+            self._attempts[key] = self._attempts.get(key, 0) + 1
+            return self._attempts[key]
+
+    def record(self, model: str, prompt: str, attempt: int, outcome: str, latency: float,
+               response: Any = None, first_chunk_latency: Optional[float] = None, stream: bool = False,
+               error: Optional[str] = None, hedge: bool = False) -> None:
+        """呼び出し1回分を記録する（記録に失敗しても生成は止めない）"""
+        usage = usage_counts(response) if response is not None else usage_counts(None)
+        row = (
+            time.time(), current_script(), model, prompt, attempt, outcome,
+            finish_reason_name(response) if response is not None else None,
+            usage["input_tokens"], usage["cached_tokens"], usage["output_tokens"],
+            latency, first_chunk_latency, int(stream), int(hedge), (error or "")[:500] or None,
+        )
+        try:
+            with self._lock:
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT INTO calls (created_at, script, model, prompt_hash, attempt, outcome, finish_reason, "
+                        "input_tokens, cached_tokens, output_tokens, latency, first_chunk_latency, stream, hedge, error) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        row,
+                    )
+        except sqlite3.Error as e:
+            print(f"⚠️  計測値を記録できませんでした: {e}", file=sys.stderr)
+
+    def summary(self, since: float = 0.0, script: Optional[str] = None) -> Dict[str, dict]:
+        """スクリプトごとの集計"""
+        query = "SELECT * FROM calls WHERE created_at >= ?"
+        params: List[Any] = [since]
+        if script:
+            query += " AND script = ?"
+            params.append(script)
+        with self._lock:
+            rows = self.conn.execute(query + " ORDER BY id", params).fetchall()
+
+        summaries: Dict[str, dict] = {}
+        for row in rows:
+            entry = summaries.setdefault(row["script"], {
+                "calls": 0, "outcomes": {outcome: 0 for outcome in OUTCOMES}, "finish_reasons": {},
+                "latencies": [], "first_chunk": [], "retries": 0, "prompts": set(), "articles": set(),
+                "hedges": 0, "hedge_wins": 0, "extra_tokens": 0,
+                "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "cost": 0.0, "unpriced": 0,
+            })
+            entry["calls"] += 1
+            entry["outcomes"][row["outcome"]] = entry["outcomes"].get(row["outcome"], 0) + 1
+            entry["prompts"].add(row["prompt_hash"])
+            if row["outcome"] == "cache_hit":
+                continue
+            if row["hedge"]:
+                entry["hedges"] += 1
+                if row["outcome"] == "ok":
+                    entry["hedge_wins"] += 1
+            elif row["attempt"] > 1:
+                entry["retries"] += 1
+            # 不要になったリクエストの応答時間は含めない（使ったトークンは余分な分として数える）
+            if row["outcome"] == "cancelled":
+                entry["extra_tokens"] += (row["input_tokens"] or 0) + (row["output_tokens"] or 0)
+            else:
+                entry["latencies"].append(row["latency"])
+            if row["first_chunk_latency"] is not None:
+                entry["first_chunk"].append(row["first_chunk_latency"])
+            if row["finish_reason"]:
+                entry["finish_reasons"][row["finish_reason"]] = entry["finish_reasons"].get(row["finish_reason"], 0) + 1
+            if row["outcome"] == "ok" and row["finish_reason"] == "STOP":
+                entry["articles"].add(row["prompt_hash"])
+            input_tokens = row["input_tokens"] or 0
+            cached_tokens = row["cached_tokens"] or 0
+            output_tokens = row["output_tokens"] or 0
+            entry["input_tokens"] += input_tokens
+            entry["cached_tokens"] += cached_tokens
+            entry["output_tokens"] += output_tokens
+            cost = estimate_cost(row["model"], input_tokens, cached_tokens, output_tokens)
+            if cost is None:
+                entry["unpriced"] += 1
+            else:
+                entry["cost"] += cost
+
+        for entry in summaries.values():
+            api_calls = len(entry["latencies"]) + entry["outcomes"]["cancelled"]
+            articles = len(entry["articles"])
+            entry["api_calls"] = api_calls
+            entry["p50"] = percentile(entry["latencies"], 0.5)
+            entry["p95"] = percentile(entry["latencies"], 0.95)
+            entry["first_chunk_p50"] = percentile(entry["first_chunk"], 0.5)
+            entry["retry_rate"] = entry["retries"] / api_calls if api_calls else 0.0
+            total_tokens = entry["input_tokens"] + entry["output_tokens"]
+            entry["tokens_per_article"] = total_tokens / articles if articles else None
+            entry["cost_per_article"] = entry["cost"] / articles if articles else None
+            entry["prompts"] = len(entry["prompts"])
+            entry["articles"] = articles
+            del entry["latencies"], entry["first_chunk"]
+        return summaries
+
+    def recent(self, limit: int = 20, script: Optional[str] = None) -> List[Dict[str, Any]]:
+        """直近の呼び出し"""
+        query = "SELECT * FROM calls"
+        params: List[Any] = []
+        if script:
+            query += " WHERE script = ?"
+            params.append(script)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(query, params).fetchall()]
+
+
+_default_metrics: Optional[GeminiMetrics] = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> GeminiMetrics:
+    """プロセス内で共有する記録先（data/gemini_metrics.sqlite3）"""
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = GeminiMetrics()
+        return _default_metrics
+
+
+def _seconds(value: Optional[float]) -> str:
+    return f"{value:.1f}秒" if value is not None else "-"
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="Gemini API呼び出しの計測値の集計")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="計測値DBのパス")
+    parser.add_argument("--days", type=float, default=7, help="集計する期間（日、0で全期間）")
+    parser.add_argument("--script", help="スクリプト名で絞り込む（bulk_generate_mature_drama_articles など）")
+    parser.add_argument("--recent", type=int, metavar="N", help="直近N件の呼び出しを表示")
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print("（計測値はまだありません）")
+        return
+
+    metrics = GeminiMetrics(args.db)
+    try:
+        if args.recent:
+            for call in reversed(metrics.recent(args.recent, args.script)):
+                tokens = f"{call['input_tokens'] or 0:,}→{call['output_tokens'] or 0:,}"
+                print(f"{datetime.fromtimestamp(call['created_at']).strftime('%m-%d %H:%M:%S')} "
+                      f"[{call['script']}] {call['model']} #{call['prompt_hash'][:8]} 試行{call['attempt']} "
+                      f"{call['outcome']} {call['finish_reason'] or '-'} {tokens}トークン {_seconds(call['latency'])}"
+                      + (f" / {call['error'][:60]}" if call["error"] else ""))
+            return
+
+        since = time.time() - args.days * 86400 if args.days else 0.0
+        summaries = metrics.summary(since, args.script)
+        if not summaries:
+            print("（指定した期間の計測値はありません）")
+        for script, entry in sorted(summaries.items()):
+            outcomes = entry["outcomes"]
+            print(f"📊 {script}: 呼び出し {entry['calls']}回（API {entry['api_calls']}回 / キャッシュ {outcomes['cache_hit']}回） / "
+                  f"記事 {entry['articles']}本 / プロンプト {entry['prompts']}種類")
+            print(f"   ⏱️  応答時間 p50 {_seconds(entry['p50'])} / p95 {_seconds(entry['p95'])}"
+                  + (f" / 最初の応答 p50 {_seconds(entry['first_chunk_p50'])}" if entry["first_chunk_p50"] is not None else ""))
+            per_article = f"{entry['tokens_per_article']:,.0f}" if entry["tokens_per_article"] is not None else "-"
+            print(f"   🔢 トークン 入力 {entry['input_tokens']:,}（キャッシュ済み {entry['cached_tokens']:,}） / "
+                  f"出力 {entry['output_tokens']:,} / 記事1本あたり {per_article}")
+            print(f"   🔁 リトライ率 {entry['retry_rate']:.1%} / 429 {outcomes['throttled']}回 / "
+                  f"打ち切り {outcomes['aborted']}回 / エラー {outcomes['error']}回")
+            if entry["hedges"] or outcomes["timeout"]:
+                print(f"   🔀 ヘッジ {entry['hedges']}回（先に成功 {entry['hedge_wins']}回） / "
+                      f"余分なトークン {entry['extra_tokens']:,} / タイムアウト {outcomes['timeout']}回")
+            if entry["finish_reasons"]:
+                reasons = " / ".join(f"{name} {count}" for name, count in
+                                     sorted(entry["finish_reasons"].items(), key=lambda item: -item[1]))
+                print(f"   🏁 finish_reason: {reasons}")
+            cost = f"${entry['cost']:.4f}"
+            if entry["cost_per_article"] is not None:
+                cost += f"（記事1本あたり ${entry['cost_per_article']:.4f}）"
+            if entry["unpriced"]:
+                cost += f" ※料金表にないモデルの呼び出し {entry['unpriced']}回を除く"
+            print(f"   💰 推定料金 {cost}")
+    finally:
+        metrics.close()
+
+
+if __name__ == "__main__":
+    main()
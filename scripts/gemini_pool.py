@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""
+Gemini APIの同時実行数をAIMDで自動調整する共有モジュール
+
+記事を1本ずつ生成して固定秒数 sleep する代わりに、複数のワーカーで同時に生成し、
+同時に投げるリクエスト数（limit）を観測結果で増減させる。
+
+- 成功するたびに limit を 1/limit ずつ増やす（limit 本成功するごとに +1、加算的増加）
+- 429 / RESOURCE_EXHAUSTED が返ったら limit を半分にする（乗算的減少）
+- 応答時間が最速時の LATENCY_FACTOR 倍を超えたら混雑とみなし、少しだけ減らす
+
+減らすのは1回の混雑につき1回だけ（減らす前に送っていたリクエストの失敗では減らさない）。
+リクエストの間隔は従来どおり rate_limit.py の共有バケット（gemini）で上限を守る。
+呼び出す前に gemini_cache.py のキャッシュを参照し、同じモデル・プロンプト・設定の本文があればAPIを呼ばない。
+保存を見送った本文は forget_response() でキャッシュから消し、リトライで同じ本文が返らないようにする。
+stream_check を渡すと gemini_stream.py でストリーミングしながら検証し、壊れた生成は途中で打ち切る。
+呼び出しごとのトークン数・応答時間・試行回数・finish_reason は gemini_metrics.py に記録する。
+
+1回の呼び出しには期限（GEMINI_TIMEOUT 秒、デフォルト300秒）があり、応答が止まったリクエストで
+ワーカーが止まり続けることはない（送信済みのリクエスト自体は止められないので、終わるまで同時実行数の枠を
+使い続け、終わった時点で使ったトークンを timeout として記録する）。GEMINI_HEDGE=on にすると、
+応答時間が最近の p95 を超えたリクエストは同じ内容をもう1本送り（ヘッジ）、先に成功したほうを使う
+（もう一方はキャンセルし、使ったトークンは gemini_metrics.py に cancelled として記録する）。実行時間が最悪の応答時間ではなく中央値で決まるようになる。
+
+使い方:
+    from gemini_pool import generate_content, get_workers
+    from parallel import map_threads
+
+    # generate_content() は model.generate_content() と同じ引数で呼ぶ
+    response = generate_content(model, prompt, generation_config=config)
+
+    # 記事ごとの処理をワーカーで並列に実行（結果は入力と同じ順番）
+    for work, text in zip(works, map_threads(lambda work: generate_article(model, work), works, get_workers())):
+        ...
+
+    # ワーカー数（同時実行数の上限）は環境変数で変更
+    GEMINI_WORKERS=8 python3 scripts/bulk_generate_mature_drama_articles.py
+
+    # 期限を120秒にし、遅いリクエストはヘッジする
+    GEMINI_TIMEOUT=120 GEMINI_HEDGE=on python3 scripts/bulk_generate_mature_drama_articles.py
+"""
+
+import os
+import sys
+import time
+import queue
+import random
+import hashlib
+import threading
+from collections import deque
+from typing import Any, Callable, Optional
+
+from rate_limit import get_limiter
+from gemini_stream import StreamAborted, StreamCheck, consume_stream
+import gemini_cache
+import gemini_metrics
+
+WORKERS_ENV = "GEMINI_WORKERS"
+DEFAULT_WORKERS = 4
+
+# 乗算的減少の係数（429のとき / 応答が遅いとき）
+THROTTLE_DECREASE = 0.5
+LATENCY_DECREASE = 0.9
+
+# 応答時間の指数移動平均が最速時の何倍を超えたら混雑とみなすか
+LATENCY_FACTOR = 2.0
+LATENCY_SMOOTHING = 0.3
+
+# キャッシュできる呼び出しの引数（これ以外が指定された場合はキャッシュを通さない）
+CACHEABLE_KWARGS = {"generation_config", "safety_settings"}
+
+# 429を受けたときの再試行（待ち時間は THROTTLE_BACKOFF * 2^試行回数 + ゆらぎ、最大 THROTTLE_BACKOFF_MAX 秒）
+THROTTLE_RETRIES = 3
+THROTTLE_BACKOFF = 10.0
+THROTTLE_BACKOFF_MAX = 120.0
+
+# 1回の呼び出しの期限（秒、0で無期限）
+TIMEOUT_ENV = "GEMINI_TIMEOUT"
+DEFAULT_TIMEOUT = 300.0
+
+# ヘッジ（on で有効）。直近 LATENCY_WINDOW 件の応答時間の p95 を超えたら、同じリクエストをもう1本送る
+HEDGE_ENV = "GEMINI_HEDGE"
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 5.0
+LATENCY_WINDOW = 200
+
+
+def get_workers() -> int:
+    """ワーカー数（GEMINI_WORKERS、デフォルト4）"""
+    try:
+        return max(1, int(os.environ.get(WORKERS_ENV, DEFAULT_WORKERS)))
+    except ValueError:
+        print(f"⚠️  {WORKERS_ENV} の値が不正です（{DEFAULT_WORKERS}を使います）", file=sys.stderr)
+        return DEFAULT_WORKERS
+
+
+def get_timeout() -> Optional[float]:
+    """1回の呼び出しの期限（GEMINI_TIMEOUT、デフォルト300秒、0なら無期限）"""
+    try:
+        timeout = float(os.environ.get(TIMEOUT_ENV, DEFAULT_TIMEOUT))
+    except ValueError:
+        print(f"⚠️  {TIMEOUT_ENV} の値が不正です（{DEFAULT_TIMEOUT:.0f}秒を使います）", file=sys.stderr)
+        return DEFAULT_TIMEOUT
+    return timeout if timeout > 0 else None
+
+
+def is_hedging_enabled() -> bool:
+    return os.environ.get(HEDGE_ENV, "").lower() in ("on", "1", "true", "yes")
+
+
+def is_quota_error(error: Exception) -> bool:
+    """429 / RESOURCE_EXHAUSTED / クォータ超過のエラーか"""
+    text = f"{type(error).__name__} {error}"
+    return "429" in text or "RESOURCE_EXHAUSTED" in text or "ResourceExhausted" in text or "quota" in text.lower()
+
+
+class AIMDController:
+    """同時実行数の上限をAIMDで調整するゲート（スレッドセーフ）"""
+
+    def __init__(self, maximum: int, initial: int = 1, minimum: int = 1):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self.stats = {"success": 0, "throttled": 0, "slow": 0, "errors": 0, "timeouts": 0, "hedged": 0, "hedge_wins": 0}
+        self._recent = deque(maxlen=LATENCY_WINDOW)
+        self._latency: Optional[float] = None
+        self._fastest: Optional[float] = None
+        # 減らした回数（この値より前に送ったリクエストの結果では減らさない）
+        self._epoch = 0
+        self._cond = threading.Condition()
+
+    def configure(self, maximum: int) -> None:
+        """同時実行数の上限を変更"""
+        with self._cond:
+            self.maximum = max(self.minimum, maximum)
+            self.limit = min(self.limit, self.maximum)
+            self._cond.notify_all()
+
+    def acquire(self) -> int:
+        """同時実行数に空きができるまで待ち、送信時点の世代を返す"""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            return self._epoch
+
+    def try_acquire(self) -> bool:
+        """空きがあれば待たずに1枠確保する（ヘッジ用。結果はAIMDの調整に使わない）"""
+        with self._cond:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, count: int = 1) -> None:
+        """try_acquire() で確保した枠を返す"""
+        if count:
+            with self._cond:
+                self.in_flight -= count
+                self._cond.notify_all()
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._cond.notify_all()
+
+    def _decrease(self, epoch: int, factor: float) -> None:
+        if epoch == self._epoch:
+            self.limit = max(self.minimum, self.limit * factor)
+            self._epoch += 1
+
+    def on_success(self, epoch: int, latency: float, hedged: bool = False, hedge_won: bool = False) -> None:
+        """成功（応答時間が急に伸びていれば減らし、そうでなければ増やす）"""
+        with self._cond:
+            self._release()
+            self.stats["success"] += 1
+            self.stats["hedged"] += int(hedged)
+            self.stats["hedge_wins"] += int(hedge_won)
+            self._recent.append(latency)
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency += LATENCY_SMOOTHING * (latency - self._latency)
+            self._fastest = self._latency if self._fastest is None else min(self._fastest, self._latency)
+
+            if self._latency > self._fastest * LATENCY_FACTOR:
+                self.stats["slow"] += 1
+                self._decrease(epoch, LATENCY_DECREASE)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_throttle(self, epoch: int) -> None:
+        """429 / RESOURCE_EXHAUSTED（半分に減らす）"""
+        with self._cond:
+            self._release()
+            self.stats["throttled"] += 1
+            self._decrease(epoch, THROTTLE_DECREASE)
+
+    def on_error(self) -> None:
+        """クォータ以外のエラー（上限は変えない）"""
+        with self._cond:
+            self._release()
+            self.stats["errors"] += 1
+
+    def on_timeout(self, release: bool = True) -> None:
+        """期限切れ（上限は変えない。release=False のときは枠を返さず、遅れたリクエストが終わった時点で返す）"""
+        with self._cond:
+            if release:
+                self._release()
+            self.stats["timeouts"] += 1
+
+    def hedge_delay(self) -> Optional[float]:
+        """ヘッジを送るまでの秒数（直近の応答時間の p95。件数が少ないうちはNone）"""
+        with self._cond:
+            if len(self._recent) < HEDGE_MIN_SAMPLES:
+                return None
+            return max(HEDGE_MIN_DELAY, gemini_metrics.percentile(list(self._recent), HEDGE_PERCENTILE))
+
+    def format_stats(self) -> str:
+        with self._cond:
+            latency = f"{self._latency:.1f}秒" if self._latency is not None else "-"
+            line = (f"🧮 Gemini同時実行数: {int(self.limit)}（上限 {self.maximum}） / 成功 {self.stats['success']} / "
+                    f"429 {self.stats['throttled']} / 遅延 {self.stats['slow']} / 平均応答 {latency}")
+            if self.stats["timeouts"] or self.stats["hedged"]:
+                line += (f"\n🔀 期限切れ {self.stats['timeouts']} / ヘッジ {self.stats['hedged']}"
+                         f"（ヘッジが先に成功 {self.stats['hedge_wins']}）")
+        if gemini_cache.is_enabled():
+            line += "\n" + gemini_cache.get_default_cache().format_stats()
+        return line
+
+
+_controller: Optional[AIMDController] = None
+_controller_lock = threading.Lock()
+
+# このプロセスで返した本文のハッシュ → キャッシュのキー（forget_response() 用）
+_response_keys: dict = {}
+_response_keys_lock = threading.Lock()
+
+
+def get_controller() -> AIMDController:
+    """プロセス内で共有するコントローラ（上限は GEMINI_WORKERS）"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AIMDController(get_workers())
+        return _controller
+
+
+def _throttle_backoff(attempt: int) -> float:
+    return min(THROTTLE_BACKOFF * (2 ** attempt) + random.uniform(0, THROTTLE_BACKOFF), THROTTLE_BACKOFF_MAX)
+
+
+def _since(moment: Optional[float], started: float) -> Optional[float]:
+    """ストリーミングで最初のチャンクが届くまでの秒数"""
+    return moment - started if moment is not None else None
+
+
+class GeminiTimeout(TimeoutError):
+    """期限（GEMINI_TIMEOUT）までに応答がなかった"""
+
+
+class _Call:
+    """別スレッドで送る1リクエスト（ヘッジで追加したものは hedge=True）"""
+
+    def __init__(self, race: "_Race", hedge: bool):
+        self.race = race
+        self.hedge = hedge
+        self.cancel = threading.Event()
+        self.started = time.monotonic()
+        self.latency = 0.0
+        self.response: Any = None
+        self.error: Optional[Exception] = None
+        self.sent = False
+        self.recorded = False
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self) -> None:
+        race = self.race
+        try:
+            race.limiter.acquire()
+            if self.cancel.is_set():
+                # レート制限を待っている間に決着がついた（期限切れ・ほかのリクエストが成功）ので送らない
+                race.finish(self)
+                return
+            self.started = time.monotonic()
+            self.sent = True
+            race.sending(self)
+            if race.stream_check is None:
+                self.response = race.model.generate_content(*race.args, **race.kwargs)
+            else:
+                self.response = consume_stream(race.model.generate_content(*race.args, stream=True, **race.kwargs),
+                                               race.stream_check, self.cancel)
+        except Exception as e:
+            self.error = e
+        self.latency = time.monotonic() - self.started
+        race.finish(self)
+
+
+class _Race:
+    """
+    1回の試行（元のリクエストと、p95を超えたら追加するヘッジ）
+
+    最初に成功したリクエストを使い、残りはキャンセルする（ストリーミングは次のチャンクで読むのをやめ、
+    通常の呼び出しは応答を捨てる）。不要になったリクエストも終わった時点で gemini_metrics.py に記録する。
+    期限とヘッジまでの時間は、元のリクエストがレート制限の待ちを抜けて送信した時点から計る。
+    期限が切れても送信済みのリクエストは止められないので、同時実行数の枠（元のリクエストとヘッジの分）は
+    最後のリクエストが終わるまで持ち続け、終わった時点で使ったトークンとともに timeout として記録する。
+    """
+
+    def __init__(self, model: Any, args: tuple, kwargs: dict, stream_check: Optional[StreamCheck], limiter: Any,
+                 controller: AIMDController, metrics: Any, name: str, prompt: str, number: int):
+        self.model = model
+        self.args = args
+        self.kwargs = kwargs
+        self.stream_check = stream_check
+        self.limiter = limiter
+        self.controller = controller
+        self.metrics = metrics
+        self.name = name
+        self.prompt = prompt
+        self.number = number
+        self.calls = []
+        self.winner: Optional[_Call] = None
+        self.closed = False
+        self.hedge_slots = 0
+        # 期限切れのあと、まだ終わっていないリクエストの数（0 になった時点で finish() が枠を返す）
+        self.late = 0
+        self.holding = False
+        self._lock = threading.Lock()
+        # (リクエスト, 終わったか)。送信した時点で False、終わった時点で True を積む
+        self._done: "queue.Queue[tuple[_Call, bool]]" = queue.Queue()
+
+    def _record(self, call: _Call, outcome: str, latency: float) -> None:
+        if self.metrics is None:
+            return
+        error = call.error
+        response = call.response if call.response is not None else (error if isinstance(error, StreamAborted) else None)
+        message = None
+        if isinstance(error, StreamAborted):
+            message = error.reason
+        elif error is not None:
+            message = f"{type(error).__name__}: {error}"
+        self.metrics.record(self.name, self.prompt, self.number, outcome, latency, response,
+                            _since(getattr(response, "first_chunk_at", None), call.started),
+                            self.stream_check is not None, message, call.hedge)
+
+    def finish(self, call: _Call) -> None:
+        """リクエストが終わったとき（別スレッドから呼ばれる）"""
+        release = False
+        with self._lock:
+            if call.recorded or not call.sent:
+                outcome = None
+            elif self.closed and self.winner is None:
+                # 期限が切れたあとに終わった（応答が返っていても使わない）
+                outcome = "timeout"
+            elif call.error is None and self.winner is None and not self.closed:
+                self.winner = call
+                outcome = "ok"
+            elif self.winner is not None:
+                outcome = "cancelled"
+            elif isinstance(call.error, StreamAborted):
+                outcome = "aborted"
+            else:
+                outcome = "throttled" if is_quota_error(call.error) else "error"
+            if self.late and not call.recorded:
+                self.late -= 1
+                release = self.late == 0
+            call.recorded = True
+        if outcome:
+            self._record(call, outcome, call.latency)
+        if release:
+            self.controller.release(1 + self.hedge_slots)
+        self._done.put((call, True))
+
+    def sending(self, call: _Call) -> None:
+        """レート制限の待ちを抜けて送信する直前（別スレッドから呼ばれる）"""
+        self._done.put((call, False))
+
+    def start(self, hedge: bool = False) -> None:
+        self.calls.append(_Call(self, hedge))
+
+    def _expire(self) -> None:
+        """期限切れ。終わっていないリクエストをキャンセルし、終わるまで枠を持ち続ける（記録は finish() で行う）"""
+        with self._lock:
+            self.closed = True
+            late = [call for call in self.calls if not call.recorded]
+            self.late = len(late)
+            self.holding = bool(late)
+        for call in late:
+            call.cancel.set()
+
+    def run(self, timeout: Optional[float], hedge_delay: Optional[float]) -> _Call:
+        """
+        最初に成功したリクエストを返す
+
+        Raises:
+            GeminiTimeout: timeout 秒以内にどのリクエストも成功しなかった
+            Exception: すべてのリクエストが失敗した（最初に失敗したリクエストのエラー）
+        """
+        deadline: Optional[float] = None
+        hedge_at: Optional[float] = None
+        self.start()
+        pending = 1
+        first_error: Optional[Exception] = None
+        try:
+            while True:
+                moments = [moment for moment in (deadline, hedge_at) if moment is not None]
+                wait = max(0.0, min(moments) - time.monotonic()) if moments else None
+                try:
+                    call, finished = self._done.get(timeout=wait)
+                except queue.Empty:
+                    now = time.monotonic()
+                    if deadline is not None and now >= deadline:
+                        self._expire()
+                        raise GeminiTimeout(f"Gemini APIの応答が{timeout:.0f}秒以内にありませんでした")
+                    if hedge_at is not None and now >= hedge_at:
+                        hedge_at = None
+                        # 同時実行数に空きがなければヘッジは送らない
+                        if self.controller.try_acquire():
+                            self.hedge_slots += 1
+                            print(f"   🔀 応答が{hedge_delay:.1f}秒（p95）を超えたため、同じリクエストをもう1本送ります",
+                                  file=sys.stderr)
+                            self.start(hedge=True)
+                            pending += 1
+                    continue
+                if not finished:
+                    if not call.hedge:
+                        deadline = call.started + timeout if timeout else None
+                        hedge_at = call.started + hedge_delay if hedge_delay else None
+                    continue
+                pending -= 1
+                if call is self.winner:
+                    for other in self.calls:
+                        if other is not call:
+                            other.cancel.set()
+                    return call
+                if first_error is None:
+                    first_error = call.error
+                if pending == 0:
+                    raise first_error
+        finally:
+            # ヘッジの枠は決着がついた時点で返す（元のリクエストの枠は呼び出し元が返す）
+            # 期限切れで終わっていないリクエストがあれば、最後のリクエストが finish() で両方の枠を返す
+            if not self.holding:
+                self.controller.release(self.hedge_slots)
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _remember_key(text: str, key: str) -> None:
+    with _response_keys_lock:
+        _response_keys[_text_hash(text)] = key
+
+
+def forget_response(text: Optional[str]) -> bool:
+    """
+    generate_content() が返した本文をキャッシュから消す
+
+    内容を理由に保存を見送った（検証エラー・既存記事と酷似）本文に使う。消さないと、同じプロンプトの
+    リトライでも同じ本文がキャッシュから返り続ける。キャッシュを通していない本文なら何もしない。
+    """
+    if not text:
+        return False
+    with _response_keys_lock:
+        key = _response_keys.pop(_text_hash(text), None)
+    if key is None or not gemini_cache.is_enabled():
+        return False
+    return gemini_cache.get_default_cache().delete(key)
+
+
+def generate_content(model: Any, *args, cache_if: Optional[Callable[[Any], bool]] = None,
+                     stream_check: Optional[StreamCheck] = None, **kwargs) -> Any:
+    """
+    model.generate_content() を同時実行数の制御つきで呼ぶ
+
+    同じモデル・プロンプト・設定で生成済みならキャッシュの本文を返す（APIは呼ばない）。
+    cache_if を指定した場合は、それがTrueを返したレスポンスだけをキャッシュする（JSONとして読めないものなど）。
+    stream_check を指定した場合はストリーミングで受け取り、チェックに失敗した時点で打ち切って
+    gemini_stream.StreamAborted を送出する（同時実行数は変えない）。
+    429 / RESOURCE_EXHAUSTED は同時実行数を減らしたうえで最大 THROTTLE_RETRIES 回再試行し、
+    それでも失敗した場合とその他のエラーはそのまま送出する。
+    GEMINI_TIMEOUT 秒以内に応答がなければ GeminiTimeout を送出し、GEMINI_HEDGE=on の場合は
+    応答時間が最近の p95 を超えた時点で同じリクエストをもう1本送って、先に成功したほうを使う。
+    """
+    metrics = gemini_metrics.get_metrics() if gemini_metrics.is_enabled() else None
+    name = gemini_cache.model_name(model)
+    prompt = gemini_metrics.prompt_hash(args[0] if len(args) == 1 else list(args)) if metrics is not None else ""
+
+    key = None
+    if gemini_cache.is_enabled() and len(args) == 1 and set(kwargs) <= CACHEABLE_KWARGS:
+        cache = gemini_cache.get_default_cache()
+        key = gemini_cache.cache_key(gemini_cache.model_name(model), args[0],
+                                     kwargs.get("generation_config"), kwargs.get("safety_settings"),
+                                     gemini_cache.static_prefix(model))
+        cached = cache.get(key)
+        # 以前にチェックなしで保存した本文は、チェックに通る場合だけ使う
+        if cached is not None and (stream_check is None or not stream_check(cached.text, True)):
+            if metrics is not None:
+                metrics.record(name, prompt, 0, "cache_hit", 0.0, cached)
+            _remember_key(cached.text, key)
+            return cached
+
+    controller = get_controller()
+    limiter = get_limiter("gemini")
+    timeout = get_timeout()
+    hedging = is_hedging_enabled()
+    for attempt in range(THROTTLE_RETRIES + 1):
+        epoch = controller.acquire()
+        number = metrics.next_attempt(prompt) if metrics is not None else 0
+        race = _Race(model, args, kwargs, stream_check, limiter, controller, metrics, name, prompt, number)
+        try:
+            call = race.run(timeout, controller.hedge_delay() if hedging else None)
+        except StreamAborted:
+            controller.on_error()
+            raise
+        except GeminiTimeout:
+            controller.on_timeout(release=not race.holding)
+            raise
+        except Exception as e:
+            if not is_quota_error(e):
+                controller.on_error()
+                raise
+            controller.on_throttle(epoch)
+            if attempt == THROTTLE_RETRIES:
+                raise
+            wait = _throttle_backoff(attempt)
+            print(f"   ⏳ クォータ制限（429）: 同時実行数を{int(controller.limit)}に下げて{wait:.0f}秒後に再試行します", file=sys.stderr)
+            time.sleep(wait)
+            continue
+        controller.on_success(epoch, call.latency, hedged=len(race.calls) > 1, hedge_won=call.hedge)
+        response = call.response
+        if key is not None and (cache_if is None or cache_if(response)):
+            if cache.put(key, name, response):
+                _remember_key(response.text, key)
+        return response
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+プロンプトの共通部分（役割・ルール・ガイドライン）をキャッシュする共有モジュール
+
+記事生成のプロンプトは、作品ごとに変わる部分（作品情報・記事構成）よりも、全作品で同じ部分（役割・執筆ルール・
+ガイドライン）のほうが長い。共通部分をシステムインストラクションとして分け、実行ごとに1回だけ
+Gemini APIのキャッシュ（CachedContent）に登録して、各リクエストでは作品ごとの部分だけを送る。
+
+キャッシュに登録できない場合（モデルが対応していない・共通部分が最小トークン数に満たないなど）は、
+システムインストラクションつきのモデルをそのまま使う（先頭が同じリクエストは暗黙のキャッシュが効く）。
+登録したキャッシュはプロセスの終了時に削除する。PROMPT_PREFIX_CACHE=off で登録しない。
+実行が長くなっても期限切れにならないよう、有効期限の半分を過ぎたら次のリクエストの前に延長する。
+それでも期限切れ・削除済みで使えなくなった場合は、システムインストラクションつきのモデルに切り替えて送り直す。
+
+使い方:
+    from gemini_prefix import create_model
+
+    # 同じモデル名・共通部分なら、何回呼んでも登録は1回
+    model = create_model("gemini-2.5-flash", SYSTEM_INSTRUCTION)
+    response = generate_content(model, create_article_prompt(work))
+"""
+
+import os
+import sys
+import time
+import atexit
+import hashlib
+import threading
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+
+import google.generativeai as genai
+
+CACHE_ENV = "PROMPT_PREFIX_CACHE"
+
+# キャッシュの有効期限（プロセスの終了時に削除する。実行中はこの割合を過ぎるたびに延長する）
+DEFAULT_TTL_SECONDS = 2 * 3600
+RENEW_FRACTION = 0.5
+
+
+def is_enabled() -> bool:
+    return os.environ.get(CACHE_ENV, "").lower() not in ("off", "0", "false", "no")
+
+
+def _full_model_name(model_name: str) -> str:
+    return model_name if "/" in model_name else f"models/{model_name}"
+
+
+_models: Dict[Tuple[str, str], Any] = {}
+_cached_contents: List[Any] = []
+_lock = threading.Lock()
+
+
+def _is_cache_missing(error: Exception) -> bool:
+    """キャッシュ（CachedContent）が期限切れ・削除済みで使えないエラーか"""
+    text = f"{type(error).__name__} {error}".lower()
+    return "cache" in text and any(word in text for word in ("expire", "not found", "notfound", "not_found", "404"))
+
+
+class PrefixModel:
+    """
+    登録したキャッシュを使うモデル（generate_content() 以外の属性はキャッシュを使うモデルのもの）
+
+    有効期限の半分を過ぎたら延長し、キャッシュが使えなくなったらシステムインストラクションつきのモデルで送る。
+    """
+
+    def __init__(self, cached_content: Any, model_name: str, system_instruction: str, ttl_seconds: float):
+        self.cached_content = cached_content
+        self.ttl_seconds = ttl_seconds
+        self._model = genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+        self._model_name = model_name
+        self._system_instruction = system_instruction
+        self._fallback: Any = None
+        self._renewed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._model, name)
+
+    def _renew(self) -> None:
+        with self._lock:
+            if time.monotonic() - self._renewed_at < self.ttl_seconds * RENEW_FRACTION:
+                return
+            self._renewed_at = time.monotonic()
+            try:
+                self.cached_content.update(ttl=timedelta(seconds=self.ttl_seconds))
+            except Exception as e:
+                # 延長できなくても、期限切れになった時点でシステムインストラクションに切り替える
+                print(f"⚠️  プロンプトのキャッシュの有効期限を延長できませんでした: {e}", file=sys.stderr)
+
+    def _use_fallback(self, error: Exception) -> Any:
+        with self._lock:
+            if self._fallback is None:
+                print(f"⚠️  プロンプトのキャッシュが使えなくなりました（システムインストラクションとして送ります）: {error}",
+                      file=sys.stderr)
+                self._fallback = genai.GenerativeModel(self._model_name, system_instruction=self._system_instruction)
+            return self._fallback
+
+    def generate_content(self, *args, **kwargs) -> Any:
+        if self._fallback is not None:
+            return self._fallback.generate_content(*args, **kwargs)
+        self._renew()
+        try:
+            return self._model.generate_content(*args, **kwargs)
+        except Exception as e:
+            if not _is_cache_missing(e):
+                raise
+            return self._use_fallback(e).generate_content(*args, **kwargs)
+
+
+def _register(model_name: str, system_instruction: str, ttl_seconds: float) -> Any:
+    """共通部分をキャッシュに登録し、そのキャッシュを使うモデルを返す（登録できなければNone）"""
+    try:
+        from google.generativeai import caching
+        cached_content = caching.CachedContent.create(
+            model=_full_model_name(model_name),
+            display_name="article-prompt-prefix",
+            system_instruction=system_instruction,
+            ttl=timedelta(seconds=ttl_seconds),
+        )
+    except Exception as e:
+        print(f"⚠️  プロンプトの共通部分をキャッシュに登録できませんでした（システムインストラクションとして送ります）: {e}",
+              file=sys.stderr)
+        return None
+    _cached_contents.append(cached_content)
+    return PrefixModel(cached_content, model_name, system_instruction, ttl_seconds)
+
+
+def create_model(model_name: str, system_instruction: str, ttl_seconds: float = DEFAULT_TTL_SECONDS) -> Any:
+    """
+    共通部分をシステムインストラクションにしたモデル（実行ごとに1回だけ登録する）
+
+    Args:
+        model_name: モデル名（"gemini-2.5-flash" など）
+        system_instruction: 全作品で共通のプロンプト
+        ttl_seconds: キャッシュの有効期限（実行中は延長する）
+    """
+    digest = hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()
+    with _lock:
+        model = _models.get((model_name, digest))
+        if model is not None:
+            return model
+        model = _register(model_name, system_instruction, ttl_seconds) if is_enabled() else None
+        if model is None:
+            model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+        # gemini_cache.py のキーに共通部分を含めるため（キャッシュ名は実行ごとに変わる）
+        model.static_prefix = system_instruction
+        _models[(model_name, digest)] = model
+        return model
+
+
+@atexit.register
+def release_all() -> None:
+    """登録したキャッシュを削除（有効期限まで保存料金がかかるため）"""
+    with _lock:
+        while _cached_contents:
+            cached_content = _cached_contents.pop()
+            try:
+                cached_content.delete()
+            except Exception as e:
+                print(f"⚠️  プロンプトのキャッシュを削除できませんでした（{cached_content.name}）: {e}", file=sys.stderr)
+        _models.clear()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Gemini APIの応答をストリーミングで受け取り、壊れた生成を途中で打ち切る共有モジュール
+
+通常の呼び出しは応答が全部返ってくるまで待ち、その後でようやくセーフティによる中断・フロントマターの欠落・
+文字数不足に気づく。ストリーミングでは受け取った分ごとにチェックを実行し、明らかに壊れている生成は
+その時点で読むのをやめて StreamAborted を送出するので、失敗した試行のコストが減り、リトライも早く始められる。
+
+チェックは check(これまでの本文, 完了したか) -> 打ち切る理由（問題なければNone）。
+gemini_pool.generate_content() に stream_check として渡すと、同時実行数の制御・キャッシュもそのまま使える。
+
+使い方:
+    from gemini_pool import generate_content
+    from gemini_stream import StreamAborted, combine, frontmatter_check, contains_check, length_check
+
+    check = combine(
+        frontmatter_check(["title", "date", "contentId"]),
+        contains_check(affiliate_url, within=1500, label="アフィリエイトリンク"),
+        length_check(minimum=1000, maximum=20000),
+    )
+    try:
+        response = generate_content(model, prompt, stream_check=check)
+    except StreamAborted as e:
+        print(f"打ち切り: {e.reason}（{e.chars}文字で中断）")
+"""
+
+import time
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Iterable, List, Optional
+
+from article_frontmatter import BLOCK_PATTERN, parse_frontmatter_text
+
+StreamCheck = Callable[[str, bool], Optional[str]]
+
+# 生成が途中で止められた finish_reason（数値・名前のどちらでも判定する）
+BLOCKED_FINISH_REASONS = {3, 4, 6, 7, 8, 9}
+BLOCKED_FINISH_NAMES = {"SAFETY", "RECITATION", "BLOCKLIST", "PROHIBITED_CONTENT", "SPII"}
+
+
+class StreamAborted(Exception):
+    """チェックに失敗したため途中で打ち切った（blocked はセーフティなどで止められた場合True）"""
+
+    def __init__(self, reason: str, text: str = "", blocked: bool = False):
+        super().__init__(reason)
+        self.reason = reason
+        self.chars = len(text)
+        self.blocked = blocked
+        # 打ち切るまでに受け取った分（gemini_metrics.py の記録用）
+        self.usage_metadata = None
+        self.first_chunk_at: Optional[float] = None
+
+
+class StreamedCandidate:
+    def __init__(self, text: str, finish_reason: Any):
+        self.text = text
+        self.finish_reason = finish_reason
+        # candidate.content.parts を参照するスクリプト向け（本文がなければNone）
+        self.content = SimpleNamespace(parts=[SimpleNamespace(text=text)]) if text else None
+
+
+class StreamedResponse:
+    """
+    ストリーミングで受け取った応答をまとめたもの
+
+    各スクリプトが参照する text・candidates・prompt_feedback を持つ（gemini_cache.py にもそのまま保存できる）。
+    """
+
+    def __init__(self, text: str, finish_reason: Any, prompt_feedback: Any, has_candidates: bool):
+        self.candidates: List[StreamedCandidate] = [StreamedCandidate(text, finish_reason)] if has_candidates else []
+        self.prompt_feedback = prompt_feedback
+        self.usage_metadata = None
+        # 最初のチャンクを受け取った時刻（time.monotonic()、gemini_metrics.py の記録用）
+        self.first_chunk_at: Optional[float] = None
+        self._text = text
+
+    @property
+    def text(self) -> str:
+        # SDKと同じく、本文がない場合は ValueError
+        if not self._text:
+            raise ValueError("レスポンスに本文がありません")
+        return self._text
+
+
+def _finish_name(finish_reason: Any) -> Any:
+    return getattr(finish_reason, "name", finish_reason)
+
+
+def is_blocked(finish_reason: Any) -> bool:
+    """セーフティなどで生成が止められた finish_reason か"""
+    if finish_reason is None:
+        return False
+    name = _finish_name(finish_reason)
+    if isinstance(name, str):
+        return name in BLOCKED_FINISH_NAMES
+    try:
+        return int(finish_reason) in BLOCKED_FINISH_REASONS
+    except (TypeError, ValueError):
+        return False
+
+
+def _chunk_text(chunk: Any) -> str:
+    try:
+        return chunk.text
+    except (ValueError, AttributeError, IndexError):
+        # 本文のないチャンク（最後の finish_reason だけ、ブロックされたなど）
+        return ""
+
+
+def consume_stream(chunks: Iterable[Any], check: Optional[StreamCheck] = None,
+                   cancel: Optional[threading.Event] = None) -> StreamedResponse:
+    """
+    ストリーミングの応答を読み、チャンクごとに check を実行する
+
+    Args:
+        chunks: generate_content(..., stream=True) の応答
+        check: チャンクごとのチェック
+        cancel: セットされたら次のチャンクで読むのをやめる（gemini_pool.py のヘッジで不要になったリクエスト）
+
+    Raises:
+        StreamAborted: チェックに失敗した・キャンセルされた（それ以降のチャンクは読まない）
+    """
+    parts: List[str] = []
+    text = ""
+    finish_reason = None
+    prompt_feedback = None
+    has_candidates = False
+    usage_metadata = None
+    first_chunk_at = None
+
+    def aborted(reason: str, blocked: bool = False) -> StreamAborted:
+        error = StreamAborted(reason, text, blocked)
+        error.usage_metadata = usage_metadata
+        error.first_chunk_at = first_chunk_at
+        return error
+
+    for chunk in chunks:
+        if cancel is not None and cancel.is_set():
+            raise aborted("キャンセルされました")
+        if first_chunk_at is None:
+            first_chunk_at = time.monotonic()
+        # トークン数は最後のチャンクに累計が入る
+        usage_metadata = getattr(chunk, "usage_metadata", None) or usage_metadata
+        if prompt_feedback is None:
+            prompt_feedback = getattr(chunk, "prompt_feedback", None)
+        candidates = getattr(chunk, "candidates", None)
+        if not candidates:
+            continue
+        has_candidates = True
+        finish_reason = getattr(candidates[0], "finish_reason", None) or finish_reason
+
+        piece = _chunk_text(chunk)
+        if piece:
+            parts.append(piece)
+            text = "".join(parts)
+        if is_blocked(finish_reason):
+            raise aborted(f"生成が途中で止められました（finish_reason: {_finish_name(finish_reason)}）", blocked=True)
+        if check is not None and piece:
+            reason = check(text, False)
+            if reason:
+                raise aborted(reason)
+
+    if check is not None and text:
+        reason = check(text, True)
+        if reason:
+            raise aborted(reason)
+    response = StreamedResponse(text, finish_reason, prompt_feedback, has_candidates)
+    response.usage_metadata = usage_metadata
+    response.first_chunk_at = first_chunk_at
+    return response
+
+
+def combine(*checks: Optional[StreamCheck]) -> StreamCheck:
+    """複数のチェックを順に実行する（最初に見つかった理由を返す）"""
+    active = [check for check in checks if check is not None]
+
+    def check(text: str, finished: bool) -> Optional[str]:
+        for item in active:
+            reason = item(text, finished)
+            if reason:
+                return reason
+        return None
+
+    return check
+
+
+def length_check(minimum: int = 0, maximum: Optional[int] = None) -> StreamCheck:
+    """完了時に minimum 文字未満、または途中で maximum 文字を超えたら打ち切る"""
+
+    def check(text: str, finished: bool) -> Optional[str]:
+        if maximum is not None and len(text) > maximum:
+            return f"本文が{maximum:,}文字を超えました（繰り返しの可能性）"
+        if finished and len(text) < minimum:
+            return f"本文が{len(text):,}文字しかありません（{minimum:,}文字以上必要）"
+        return None
+
+    return check
+
+
+def _strip_fence(text: str) -> str:
+    """```yaml で囲まれたフロントマター（保存時に直す形式）は囲みを外して判定する"""
+    stripped = text.lstrip()
+    if stripped.startswith("```"):
+        newline = stripped.find("\n")
+        return stripped[newline + 1:] if newline >= 0 else ""
+    return stripped
+
+
+def frontmatter_check(required: Iterable[str], expected: Optional[dict] = None, within: int = 2000) -> StreamCheck:
+    """
+    フロントマターが揃った時点で必須の項目を確かめる
+
+    Args:
+        required: 空でないことが必要な項目
+        expected: 値が一致する必要がある項目（contentId など）
+        within: この文字数までにフロントマターが閉じなければ打ち切る
+    """
+    required = list(required)
+    expected = dict(expected or {})
+
+    def check(text: str, finished: bool) -> Optional[str]:
+        body = _strip_fence(text)
+        if len(body) >= 3 and not body.startswith("---"):
+            return "フロントマター（---）で始まっていません"
+        match = BLOCK_PATTERN.match(body)
+        if match is None:
+            if finished or len(body) > within:
+                return f"フロントマターが{within:,}文字以内に閉じていません"
+            return None
+        fields = parse_frontmatter_text(match.group(1), parse_arrays=False)
+        missing = [key for key in required if not fields.get(key)]
+        if missing:
+            return f"フロントマターに {', '.join(missing)} がありません"
+        for key, value in expected.items():
+            if fields.get(key) != value:
+                return f"フロントマターの {key} が {fields.get(key)!r} です（{value!r} のはず）"
+        return None
+
+    return check
+
+
+def contains_check(snippet: str, within: int, label: str) -> StreamCheck:
+    """先頭 within 文字までに snippet（作品のURLなど）が出てこなければ打ち切る"""
+
+    def check(text: str, finished: bool) -> Optional[str]:
+        if not snippet or snippet in text[:within + len(snippet)]:
+            return None
+        if finished or len(text) > within:
+            return f"{label}が先頭{within:,}文字以内にありません"
+        return None
+
+    return check
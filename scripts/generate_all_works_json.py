@@ -2,43 +2,22 @@
 """
 content/ディレクトリ内のすべてのMarkdownファイルを解析して、
 data/all_works.jsonにまとめるスクリプト
+
+ファイルごとの指紋（mtime・サイズ・内容ハッシュ）と解析結果を
+data/all_works_cache.json にキャッシュし、追加・変更された記事だけを解析し直す。
+--rebuild でキャッシュを使わずに全件解析する。
 """
 
 import os
+import sys
 import json
 import re
+import hashlib
+import argparse
 from pathlib import Path
 from typing import Dict, List, Optional
 
-def parse_frontmatter(content: str) -> Dict[str, any]:
-    """フロントマターをパース"""
-    frontmatter = {}
-    
-    # フロントマターの開始と終了を検出
-    if not content.startswith("---"):
-        return frontmatter
-    
-    # 最初の`---`から次の`---`までを抽出
-    end_index = content.find("---", 3)
-    if end_index == -1:
-        return frontmatter
-    
-    frontmatter_text = content[3:end_index].strip()
-    
-    # 各フィールドを抽出
-    patterns = {
-        'title': r'title:\s*"([^"]+)"',
-        'date': r'date:\s*"([^"]+)"',
-        'image': r'image:\s*"([^"]+)"',
-        'affiliateLink': r'affiliateLink:\s*"([^"]+)"',
-    }
-    
-    for key, pattern in patterns.items():
-        match = re.search(pattern, frontmatter_text)
-        if match:
-            frontmatter[key] = match.group(1)
-    
-    return frontmatter
+from article_frontmatter import read_frontmatter
 
 def extract_video_url(content: str) -> Optional[str]:
     """本文からvideoUrl（iframeのsrc）を抽出"""
@@ -70,29 +49,28 @@ def extract_actress(content: str) -> Optional[str]:
 def parse_markdown_file(file_path: Path) -> Optional[Dict[str, any]]:
     """Markdownファイルを解析して必要な情報を抽出"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # フロントマターをパース
-        frontmatter = parse_frontmatter(content)
+        # フロントマターをパース（閉じ側の---までだけ読む）
+        record = read_frontmatter(file_path)
+        frontmatter = record.fields
         
         # 必要な項目が揃っているか確認
-        if not all(key in frontmatter for key in ['title', 'date', 'image', 'affiliateLink']):
+        if not all(frontmatter.get(key) for key in ['title', 'date', 'image', 'affiliateLink']):
             print(f"⚠️  警告: {file_path.name} に必要なフロントマターが不足しています")
             return None
         
-        # 本文からvideoUrlとactressを抽出
-        video_url = extract_video_url(content)
-        actress = extract_actress(content)
+        # 本文からvideoUrlとactressを抽出（ここで初めて本文を読む）
+        body = record.body
+        video_url = extract_video_url(body)
+        actress = extract_actress(body)
         
         # データを構築
         work_data = {
-            'title': frontmatter['title'],
-            'image': frontmatter['image'],
+            'title': record.title,
+            'image': record.image,
             'videoUrl': video_url,
             'actress': actress,
-            'date': frontmatter['date'],
-            'affiliateLink': frontmatter['affiliateLink'],
+            'date': record.date,
+            'affiliateLink': record.affiliate_link,
         }
         
         return work_data
@@ -101,11 +79,85 @@ def parse_markdown_file(file_path: Path) -> Optional[Dict[str, any]]:
         print(f"❌ エラー: {file_path.name} の解析に失敗しました: {e}")
         return None
 
+# 解析内容を変えたら上げる（古いキャッシュは使わない）
+CACHE_VERSION = 1
+
+def file_hash(file_path: Path) -> str:
+    """ファイル内容のSHA-1"""
+    return hashlib.sha1(file_path.read_bytes()).hexdigest()
+
+def load_cache(cache_file: Path) -> Dict[str, dict]:
+    """指紋キャッシュを読み込む（バージョン違い・破損時は空）"""
+    if not cache_file.exists():
+        return {}
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('version') != CACHE_VERSION:
+            return {}
+        return cache.get('files', {})
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️  キャッシュの読み込みに失敗しました（全件解析します）: {e}", file=sys.stderr)
+        return {}
+
+def save_cache(cache_file: Path, entries: Dict[str, dict]) -> None:
+    """指紋キャッシュを保存（書きかけのファイルが残らないよう一時ファイル経由）"""
+    tmp_file = cache_file.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'files': entries}, f, ensure_ascii=False)
+    os.replace(tmp_file, cache_file)
+
+def collect_works(md_files: List[Path], cache: Dict[str, dict]) -> tuple[Dict[str, dict], Dict[str, int]]:
+    """
+    キャッシュを使って全記事の解析結果を集める
+    
+    mtime・サイズが同じならそのまま再利用し、違う場合は内容ハッシュを比べて
+    本当に変わった記事だけを解析し直す。キャッシュにない記事は新規として解析する。
+    
+    Returns:
+        (新しいキャッシュ, {"added", "changed", "unchanged", "removed"} の件数)
+    """
+    entries = {}
+    stats = {'added': 0, 'changed': 0, 'unchanged': 0, 'removed': 0}
+    
+    for md_file in md_files:
+        name = md_file.name
+        stat = md_file.stat()
+        cached = cache.get(name)
+        
+        if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+            entries[name] = cached
+            stats['unchanged'] += 1
+            continue
+        
+        digest = file_hash(md_file)
+        if cached and cached['hash'] == digest:
+            # touchされただけ（内容は同じ）
+            entries[name] = dict(cached, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            stats['unchanged'] += 1
+            continue
+        
+        entries[name] = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'hash': digest,
+            'work': parse_markdown_file(md_file),
+        }
+        stats['changed' if cached else 'added'] += 1
+    
+    stats['removed'] = len(set(cache) - set(entries))
+    return entries, stats
+
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description="content/*.md から data/all_works.json を生成")
+    parser.add_argument("--rebuild", action="store_true", help="キャッシュを使わずに全件解析する")
+    args = parser.parse_args()
+    
     # パスを設定
     content_dir = Path(__file__).parent.parent / 'content'
     output_file = Path(__file__).parent.parent / 'data' / 'all_works.json'
+    cache_file = Path(__file__).parent.parent / 'data' / 'all_works_cache.json'
     
     # contentディレクトリが存在するか確認
     if not content_dir.exists():
@@ -116,21 +168,18 @@ def main():
     output_file.parent.mkdir(parents=True, exist_ok=True)
     
     # すべてのMarkdownファイルを取得
-    md_files = list(content_dir.glob('*.md'))
+    md_files = sorted(content_dir.glob('*.md'))
     print(f"📁 {len(md_files)}個のMarkdownファイルを発見しました")
     
-    # 各ファイルを解析
-    all_works = []
-    success_count = 0
-    error_count = 0
+    # 変更のあった記事だけを解析
+    cache = {} if args.rebuild else load_cache(cache_file)
+    entries, stats = collect_works(md_files, cache)
+    print(f"🔍 新規: {stats['added']}件 / 変更: {stats['changed']}件 / "
+          f"変更なし: {stats['unchanged']}件 / 削除: {stats['removed']}件")
     
-    for md_file in md_files:
-        work_data = parse_markdown_file(md_file)
-        if work_data:
-            all_works.append(work_data)
-            success_count += 1
-        else:
-            error_count += 1
+    all_works = [entry['work'] for entry in entries.values() if entry['work']]
+    success_count = len(all_works)
+    error_count = len(entries) - success_count
     
     # 日付順にソート（新しい順）
     all_works.sort(key=lambda x: x['date'], reverse=True)
@@ -139,6 +188,8 @@ def main():
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(all_works, f, ensure_ascii=False, indent=2)
     
+    save_cache(cache_file, entries)
+    
     print(f"\n✅ 完了!")
     print(f"   - 成功: {success_count}件")
     print(f"   - エラー: {error_count}件")
@@ -147,4 +198,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
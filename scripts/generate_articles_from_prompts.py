@@ -10,6 +10,9 @@ from pathlib import Path
 from datetime import datetime
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from near_duplicates import remember_article
+from article_validator import check_before_save
+from gemini_pool import generate_content
 
 # .envファイルの読み込み
 try:
@@ -113,7 +116,8 @@ def generate_article_from_prompt(model: genai.GenerativeModel, prompt_file: Path
     }
     
     try:
-        response = model.generate_content(
+        response = generate_content(
+            model,
             prompt,
             safety_settings=safety_settings,
             generation_config=generation_config
@@ -143,15 +147,17 @@ def save_article(content: str, info: dict, output_dir: Path) -> Path | None:
     filepath = output_dir / filename
     
     try:
-        # Frontmatterの```yamlを---に修正
-        fixed_content = content
-        if fixed_content.startswith("```yaml"):
-            fixed_content = re.sub(r'^```yaml\s*\n---\s*\n', '---\n', fixed_content, flags=re.MULTILINE)
-            fixed_content = re.sub(r'---\s*\n```\s*\n', '---\n\n', fixed_content, flags=re.MULTILINE)
-            fixed_content = re.sub(r'```\s*$', '', fixed_content, flags=re.MULTILINE)
+        # ```yamlで囲まれたFrontmatter・YAMLのエスケープ・プレースホルダー・画像URLを直し、既存記事とほぼ同じ文章なら保存しない
+        # （保存しない場合は生成した本文をキャッシュから消し、次の実行で生成し直す）
+        fixed_content = check_before_save(content, output_dir, filepath.stem, generated=content,
+                                          affiliate_url=info.get('affiliate_url', ''),
+                                          content_id=info.get('content_id', ''))
+        if fixed_content is None:
+            return None
         
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(fixed_content)
+        remember_article(filepath, fixed_content)
         return filepath
     except Exception as e:
         print(f"   ❌ 保存失敗: {e}", file=sys.stderr)
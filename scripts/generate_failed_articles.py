@@ -1,10 +1,9 @@
 #!/usr/bin/env python3
 """
-failed_articles.jsonから記事を生成するスクリプト
+ジョブキュー（data/generation_jobs.sqlite3）の失敗記事から記事を生成するスクリプト
 既存記事のスタイル（Gemini API使用）に合わせて生成
 """
 
-import json
 import re
 import sys
 import time
@@ -13,6 +12,8 @@ from datetime import datetime
 import random
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from gemini_pool import generate_content
+from job_queue import get_queue, migrate_legacy_failed_file
 
 # .envファイルの読み込み
 try:
@@ -27,6 +28,9 @@ except ImportError:
 
 import os
 
+# bulk_generate_mature_drama_articles.py と同じジョブキューを使う
+JOB_KIND = "mature_drama"
+
 
 def initialize_gemini(api_key: str):
     """Gemini APIを初期化"""
@@ -366,7 +370,8 @@ def generate_article(model: genai.GenerativeModel, product_info: dict, max_retri
     
     for attempt in range(max_retries):
         try:
-            response = model.generate_content(
+            response = generate_content(
+                model,
                 prompt,
                 safety_settings=safety_settings,
                 generation_config=generation_config
@@ -529,16 +534,15 @@ def main():
     
     content_dir.mkdir(exist_ok=True)
     
-    # failed_articles.jsonを読み込む
-    failed_file = data_dir / "failed_articles.json"
-    if not failed_file.exists():
-        print(f"❌ 失敗記事ファイルが見つかりません: {failed_file}", file=sys.stderr)
-        sys.exit(1)
-    
-    with open(failed_file, "r", encoding="utf-8") as f:
-        failed_articles = json.load(f)
+    # ジョブキューから再試行できるジョブを取り出す（以前の failed_articles.json があれば先に取り込む）
+    queue = get_queue()
+    migrate_legacy_failed_file(queue)
+    failed_articles = queue.lease(JOB_KIND)
+    if not failed_articles:
+        print("✅ 再試行する記事がありません")
+        sys.exit(0)
     
-    print(f"📖 {len(failed_articles)}件の失敗記事を読み込みました")
+    print(f"📖 {len(failed_articles)}件の失敗記事を取り出しました")
     if args.overwrite:
         print("⚠️  既存記事を上書きモードで実行します\n")
     else:
@@ -549,7 +553,8 @@ def main():
     skip_count = 0
     error_count = 0
     
-    for idx, failed_item in enumerate(failed_articles, 1):
+    for idx, job in enumerate(failed_articles, 1):
+        failed_item = job["payload"]
         content_id = failed_item.get("content_id", "")
         publish_date = failed_item.get("publish_date", datetime.now().strftime("%Y-%m-%d"))
         work = failed_item.get("work", {})
@@ -557,6 +562,12 @@ def main():
         print(f"[{idx}/{len(failed_articles)}] 📝 {content_id}")
         print(f"   作品名: {work.get('title', '不明')[:50]}...")
         
+        # まとめて取り出してから時間が経っているので、始める前に期限を延ばす（別のプロセスが取り出し直していれば飛ばす）
+        if not queue.renew(job):
+            print(f"   ⏭️  スキップ（期限が切れ、別のプロセスが処理中）")
+            skip_count += 1
+            continue
+        
         # workオブジェクトからproduct_info辞書に変換
         product_info = convert_work_to_product_info(work)
         
@@ -567,6 +578,7 @@ def main():
         if existing_file.exists() and not args.overwrite:
             print(f"   ⏭️  既存記事があるためスキップ")
             skip_count += 1
+            queue.complete(job["id"], job["lease_until"])
             continue
         elif existing_file.exists() and args.overwrite:
             print(f"   ⚠️  既存記事を上書きします")
@@ -578,6 +590,7 @@ def main():
         if not article_content:
             print(f"   ❌ 記事生成に失敗しました")
             error_count += 1
+            queue.fail(job["id"], "記事の生成に失敗しました", job["lease_until"])
             print()
             continue
         
@@ -591,13 +604,11 @@ def main():
                 f.write(full_content)
             print(f"   ✅ 保存完了: {existing_file.name}")
             success_count += 1
+            queue.complete(job["id"], job["lease_until"])
         except Exception as e:
             print(f"   ❌ 保存失敗: {e}")
             error_count += 1
-        
-        # APIレート制限を考慮して少し待機
-        if idx < len(failed_articles):
-            time.sleep(2)
+            queue.fail(job["id"], f"記事の保存に失敗しました: {e}", job["lease_until"])
         
         print()
     
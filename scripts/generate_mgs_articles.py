@@ -12,8 +12,16 @@ import random
 import time
 from datetime import datetime
 from pathlib import Path
+from itertools import islice
+from typing import Iterator
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from near_duplicates import remember_article
+from article_validator import check_before_save
+from ndjson_store import find_records_file, iter_records, read_index
+from gemini_pool import generate_content, get_controller, get_workers
+from parallel import map_threads
+from job_queue import get_queue, LEASE_LOST
 
 # .envファイルの読み込み
 try:
@@ -26,6 +34,9 @@ try:
 except ImportError:
     pass
 
+# ジョブキューの種類
+JOB_KIND = "mgs"
+
 
 def initialize_gemini(api_key: str):
     """Gemini APIを初期化"""
@@ -83,25 +94,16 @@ def sanitize_title(title: str) -> str:
     return sanitized
 
 
-def load_mgs_data(json_path: Path) -> list:
-    """MGStageのJSONデータを読み込む"""
+def load_mgs_data(json_path: Path) -> tuple[int, Iterator[dict]]:
+    """MGStageのデータ（NDJSON、または以前のJSON）を読み込み、(件数, 1件ずつ返すイテレータ) を返す"""
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        if isinstance(data, dict) and "ranking" in data:
-            return data["ranking"]
-        elif isinstance(data, list):
-            return data
-        else:
-            print(f"❌ 予期しないデータ形式です", file=sys.stderr)
-            return []
+        return read_index(json_path)["count"], iter_records(json_path)
     except FileNotFoundError:
         print(f"❌ ファイルが見つかりません: {json_path}", file=sys.stderr)
-        return []
+        return 0, iter([])
     except json.JSONDecodeError as e:
         print(f"❌ JSONの解析に失敗しました: {e}", file=sys.stderr)
-        return []
+        return 0, iter([])
 
 
 def create_article_prompt(product_info: dict) -> str:
@@ -309,7 +311,8 @@ def generate_article(model: genai.GenerativeModel, product_info: dict, max_retri
     
     for attempt in range(max_retries):
         try:
-            response = model.generate_content(
+            response = generate_content(
+                model,
                 prompt,
                 safety_settings=safety_settings,
                 generation_config=generation_config
@@ -332,6 +335,7 @@ def generate_article(model: genai.GenerativeModel, product_info: dict, max_retri
         except Exception as e:
             error_str = str(e)
             
+            # generate_content() で同時実行数を下げて再試行済み
             if "429" in error_str or "quota" in error_str.lower() or "Quota exceeded" in error_str:
                 print(f"   ❌ クォータ制限に達しました", file=sys.stderr)
                 return None
@@ -442,9 +446,18 @@ rating: {rating}
     # 記事全体を作成
     full_content = frontmatter + content
     
+    # フロントマターの崩れ・プレースホルダー・画像URLを直し、既存記事とほぼ同じ文章なら保存しない
+    # （保存しない場合は生成した本文をキャッシュから消し、次の実行で生成し直す）
+    full_content = check_before_save(full_content, Path(output_dir), Path(filepath).stem, generated=content,
+                                     required=("title", "date", "contentId"), affiliate_url=affiliate_url,
+                                     content_id=content_id)
+    if full_content is None:
+        return None
+    
     try:
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(full_content)
+        remember_article(Path(filepath), full_content)
         return str(filepath)
     except IOError as e:
         print(f"   ❌ ファイルの保存に失敗: {e}", file=sys.stderr)
@@ -469,10 +482,10 @@ def main():
     project_root = script_dir.parent
     
     # データファイルのパス
-    data_file = project_root / "data" / "mgs_scraped_data.json"
+    data_file = find_records_file(project_root / "data" / "mgs_scraped_data.ndjson")
     
-    if not data_file.exists():
-        print(f"❌ データファイルが見つかりません: {data_file}", file=sys.stderr)
+    if data_file is None:
+        print(f"❌ データファイルが見つかりません: {project_root / 'data' / 'mgs_scraped_data.ndjson'}", file=sys.stderr)
         sys.exit(1)
     
     # 出力ディレクトリ
@@ -481,13 +494,13 @@ def main():
     
     # MGStageデータを読み込む
     print(f"📋 {data_file} を読み込み中...")
-    products = load_mgs_data(data_file)
+    total_count, products = load_mgs_data(data_file)
     
-    if not products:
+    if not total_count:
         print("❌ 商品データが空です", file=sys.stderr)
         sys.exit(1)
     
-    print(f"✅ {len(products)}件の商品を読み込みました\n")
+    print(f"✅ {total_count}件の商品を読み込みました\n")
     
     # Gemini APIを初期化
     print("🤖 Gemini APIを初期化中...")
@@ -505,13 +518,13 @@ def main():
     print(f"\n📅 公開日: {publish_date}\n")
     
     # 生成する記事数を選択
-    print(f"生成する記事数を選択してください（1-{len(products)}）:")
+    print(f"生成する記事数を選択してください（1-{total_count}）:")
     try:
         num_articles = int(input("記事数: ").strip())
-        if num_articles < 1 or num_articles > len(products):
-            num_articles = len(products)
+        if num_articles < 1 or num_articles > total_count:
+            num_articles = total_count
     except ValueError:
-        num_articles = len(products)
+        num_articles = total_count
     
     print(f"\n✍️  {num_articles}件の記事を生成します...\n")
     
@@ -519,51 +532,79 @@ def main():
     skip_count = 0
     fail_count = 0
     
-    for idx, product in enumerate(products[:num_articles], 1):
+    # 生成対象を決める（作品IDなし・既存記事はここでスキップ）
+    jobs = []
+    for idx, product in enumerate(islice(products, num_articles), 1):
         content_id = product.get("content_id", "")
         title = product.get("title", "")
         
-        print(f"[{idx}/{num_articles}] 処理中...")
-        print(f"   作品ID: {content_id}")
-        print(f"   タイトル: {title[:60]}...")
-        
         if not content_id:
-            print(f"   ❌ 作品IDがありません")
+            print(f"[{idx}/{num_articles}] ❌ 作品IDがありません: {title[:60]}...")
             fail_count += 1
-            print()
             continue
         
         # 既存記事のチェック
         existing_file = content_dir / f"{publish_date}-{content_id}.md"
         if existing_file.exists():
-            print(f"   ⏭️  既存記事があるためスキップ: {existing_file.name}")
+            print(f"[{idx}/{num_articles}] ⏭️  既存記事があるためスキップ: {existing_file.name}")
             skip_count += 1
-            print()
             continue
         
-        # 記事を生成
-        print(f"   ✍️  記事生成中...")
-        article_content = generate_article(model, product)
+        jobs.append((idx, product))
+    
+    # ジョブキューに登録してから取り出す（前回失敗して再試行待ちのものは待ち時間が明けるまで飛ばす）
+    queue = get_queue()
+    leased = queue.submit(JOB_KIND, {
+        product["content_id"]: {"content_id": product["content_id"], "title": product.get("title", ""),
+                                "publish_date": publish_date, "product": product}
+        for idx, product in jobs
+    })
+    if len(leased) < len(jobs):
+        print(f"⏳ {len(jobs) - len(leased)}件は再試行待ち・処理中のジョブのためスキップします（python3 scripts/job_queue.py --kind {JOB_KIND}）")
+        skip_count += len(jobs) - len(leased)
+        jobs = [job for job in jobs if job[1]["content_id"] in leased]
+    
+    # 記事を生成（同時実行数は gemini_pool がクォータと応答時間から調整する）
+    def generate(job):
+        # 取り出してから時間が経っていることがあるので、始める前に期限を延ばす（別のプロセスが取り出し直していれば生成しない）
+        if not queue.renew(leased[job[1]["content_id"]]):
+            return None
+        return generate_article(model, job[1])
+    
+    articles = map_threads(generate, jobs, get_workers())
+    
+    for (idx, product), article_content in zip(jobs, articles):
+        content_id = product.get("content_id", "")
+        title = product.get("title", "")
+        job = leased[content_id]
         
-        if article_content:
+        print(f"[{idx}/{num_articles}] 処理中...")
+        print(f"   作品ID: {content_id}")
+        print(f"   タイトル: {title[:60]}...")
+        
+        if job["status"] == LEASE_LOST:
+            print(f"   ⏭️  スキップ（期限が切れ、別のプロセスが処理中）")
+            skip_count += 1
+        elif article_content:
             # 記事を保存
             filepath = save_article(article_content, product, publish_date, content_dir, content_id)
             
             if filepath:
                 print(f"   ✅ 記事を保存しました: {filepath}")
                 success_count += 1
+                queue.complete(job["id"], job["lease_until"])
             else:
                 print(f"   ❌ 保存失敗")
                 fail_count += 1
+                queue.fail(job["id"], "記事の保存に失敗しました", job["lease_until"])
         else:
             print(f"   ❌ 生成失敗")
             fail_count += 1
+            queue.fail(job["id"], "記事の生成に失敗しました", job["lease_until"])
         
         print()
-        
-        # レート制限対策（3秒待機）
-        if idx < num_articles:
-            time.sleep(3)
+    
+    print(get_controller().format_stats())
     
     # 結果を表示
     print("=" * 80)
@@ -9,7 +9,9 @@ import random
 import re
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, Iterator, List, Tuple
+
+from ndjson_store import find_records_file, iter_records, read_index
 
 # プロジェクトルート
 script_dir = Path(__file__).parent
@@ -56,15 +58,13 @@ TEMPLATE_READER_MESSAGE = [
     "成熟した作品の魅力を、洗練された言葉で語る。この作品は、まさにそのような作品の一つだ。ぜひ、この作品を手に取って、その魅力を堪能していただきたい。",
 ]
 
-def load_mgs_data(json_path: Path) -> List[Dict]:
-    """MGSスクレイピングデータを読み込む"""
+def load_mgs_data(json_path: Path) -> Tuple[int, Iterator[Dict]]:
+    """MGSスクレイピングデータ（NDJSON、または以前のJSON）を読み込み、(件数, 1件ずつ返すイテレータ) を返す"""
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data.get("ranking", [])
+        return read_index(json_path)["count"], iter_records(json_path)
     except Exception as e:
         print(f"❌ データの読み込みエラー: {e}")
-        return []
+        return 0, iter([])
 
 def generate_sample_image_urls(image_url: str, content_id: str, count: int = 3) -> List[str]:
     """サンプル画像URLを生成"""
@@ -279,17 +279,17 @@ def main():
     print("=" * 80 + "\n")
     
     # データファイルを読み込む
-    data_file = data_dir / "mgs_scraped_data.json"
-    if not data_file.exists():
-        print(f"❌ データファイルが見つかりません: {data_file}")
+    data_file = find_records_file(data_dir / "mgs_scraped_data.ndjson")
+    if data_file is None:
+        print(f"❌ データファイルが見つかりません: {data_dir / 'mgs_scraped_data.ndjson'}")
         return
     
-    products = load_mgs_data(data_file)
-    if not products:
+    total_count, products = load_mgs_data(data_file)
+    if not total_count:
         print("❌ データが空です")
         return
     
-    print(f"📋 {len(products)}件のデータを読み込みました\n")
+    print(f"📋 {total_count}件のデータを読み込みました\n")
     
     # 既存記事のcontent_idを取得（重複チェック用）
     existing_articles = set()
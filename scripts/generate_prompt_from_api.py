@@ -8,13 +8,12 @@ import os
 import json
 import sys
 import re
-import ssl
 import random
-import urllib.request
 from datetime import datetime
 from pathlib import Path
-from urllib.parse import urlencode, parse_qs, urlparse, unquote
+from urllib.parse import parse_qs, urlparse, unquote
 import pyperclip
+from dmm_client import DMMAPIError, get_client
 
 # ============================================================================
 # 設定項目: ここにAPI認証情報を設定してください
@@ -119,153 +118,128 @@ def fetch_dmm_product_info(api_id: str, affiliate_id: str, content_id: str) -> d
     Returns:
         商品情報の辞書、または None
     """
-    base_url = "https://api.dmm.com/affiliate/v3/ItemList"
-    
-    params = {
-        "api_id": api_id,
-        "affiliate_id": affiliate_id,
-        "site": "FANZA",
-        "service": "digital",
-        "floor": "videoa",
-        "cid": content_id,
-        "hits": 1,
-        "output": "json"
-    }
-    
-    url = f"{base_url}?{urlencode(params)}"
-    
     try:
-        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-        
-        req = urllib.request.Request(url)
-        with urllib.request.urlopen(req, context=context, timeout=30) as response:
-            data = response.read()
-            result = json.loads(data.decode('utf-8'))
-            
-            if "result" in result and "items" in result["result"] and len(result["result"]["items"]) > 0:
-                item = result["result"]["items"][0]
-                
-                # 画像URLの取得（大きいサイズを優先）
-                image_url_dict = item.get("imageURL", {})
-                # large → medium → small の順で取得を試みる
-                image_url_large = image_url_dict.get("large", "") or image_url_dict.get("medium", "") or image_url_dict.get("small", "")
-                
-                # サンプル画像URLの取得（大きいサイズを優先）
-                sample_images = []
-                sample_image_urls = item.get("sampleImageURL", {})
-                
-                # 大きいサイズから順に取得を試みる（sample_l → sample_m → sample → sample_s）
-                for key in ["sample_l", "sample_m", "sample", "sample_s"]:
-                    if key in sample_image_urls and "image" in sample_image_urls[key]:
-                        img_data = sample_image_urls[key]["image"]
-                        if isinstance(img_data, list):
-                            for img_url in img_data:
-                                if img_url and img_url not in sample_images:
-                                    # URLを大きいサイズに変換を試みる
-                                    # 例: -1.jpg → jp-1.jpg, thumb → 削除
-                                    converted_url = img_url
-                                    if "-" in converted_url and "jp-" not in converted_url:
-                                        # -1.jpg パターンを jp-1.jpg に変換
-                                        converted_url = converted_url.replace(f"-{content_id}-", f"{content_id}jp-")
-                                        converted_url = converted_url.replace(f"/{content_id}-", f"/{content_id}/{content_id}jp-")
-                                    if "thumb" in converted_url:
-                                        converted_url = converted_url.replace("thumb", "")
-                                    if "small" in converted_url and "sample" not in converted_url.lower():
-                                        converted_url = converted_url.replace("small", "")
-                                    sample_images.append(converted_url)
-                        elif isinstance(img_data, str) and img_data and img_data not in sample_images:
-                            # URLを大きいサイズに変換を試みる
-                            converted_url = img_data
-                            if "-" in converted_url and "jp-" not in converted_url:
-                                converted_url = converted_url.replace(f"-{content_id}-", f"{content_id}jp-")
-                                converted_url = converted_url.replace(f"/{content_id}-", f"/{content_id}/{content_id}jp-")
-                            if "thumb" in converted_url:
-                                converted_url = converted_url.replace("thumb", "")
-                            if "small" in converted_url and "sample" not in converted_url.lower():
-                                converted_url = converted_url.replace("small", "")
-                            sample_images.append(converted_url)
-                
-                # サンプル画像が見つからない場合、content_idから直接生成（大きいサイズ）
-                if not sample_images and content_id:
-                    # DMMのサンプル画像URLパターン（大きいサイズ）
-                    # videoa と video の両方を試す
-                    for floor in ["videoa", "video"]:
-                        base_url = f"https://pics.dmm.co.jp/digital/{floor}/{content_id}/{content_id}jp-"
-                        for i in range(1, 11):  # 1-10枚目
-                            sample_images.append(f"{base_url}{i}.jpg")
-                
-                # 紹介文の取得（複数のフィールドから取得を試みる）
-                description = ""
-                if "review" in item and "text" in item["review"]:
-                    description = item["review"]["text"]
-                elif "comment" in item:
-                    description = item["comment"]
-                elif "iteminfo" in item and "comment" in item["iteminfo"]:
-                    description = item["iteminfo"]["comment"]
-                
-                # 作品特徴（女優、ジャンル、メーカー等）を取得
-                keywords = []
-                genres_list = []
-                
-                # 女優名
-                if "iteminfo" in item and "actress" in item["iteminfo"]:
-                    actresses = item["iteminfo"]["actress"]
-                    for actress in actresses:
-                        if "name" in actress:
-                            keywords.append(actress["name"])
-                
-                # ジャンル（別途リストとして保持）
-                if "iteminfo" in item and "genre" in item["iteminfo"]:
-                    genres = item["iteminfo"]["genre"]
-                    for genre in genres:
-                        if "name" in genre:
-                            genre_name = genre["name"]
-                            keywords.append(genre_name)
-                            genres_list.append(genre_name)
-                
-                # メーカー
-                if "iteminfo" in item and "maker" in item["iteminfo"]:
-                    makers = item["iteminfo"]["maker"]
-                    if makers and len(makers) > 0 and "name" in makers[0]:
-                        keywords.append(f"メーカー: {makers[0]['name']}")
-                
-                # シリーズ
-                if "iteminfo" in item and "series" in item["iteminfo"]:
-                    series_list = item["iteminfo"]["series"]
-                    if series_list and len(series_list) > 0 and "name" in series_list[0]:
-                        keywords.append(f"シリーズ: {series_list[0]['name']}")
-                
-                # 監督
-                if "iteminfo" in item and "director" in item["iteminfo"]:
-                    directors = item["iteminfo"]["director"]
-                    if directors and len(directors) > 0 and "name" in directors[0]:
-                        keywords.append(f"監督: {directors[0]['name']}")
-                
-                keywords_str = "、".join(keywords) if keywords else "不明"
-                
-                # 発売日を取得
-                release_date = item.get("date", "")
-                
-                return {
-                    "content_id": item.get("content_id", content_id),
-                    "title": item.get("title", ""),
-                    "description": description,
-                    "keywords": keywords_str,
-                    "genres": genres_list,  # ジャンルを別途リストとして保持
-                    "main_image_url": image_url_large,
-                    "sample_images": sample_images,
-                    "affiliate_url": item.get("affiliateURL", ""),
-                    "url": item.get("URL", ""),
-                    "release_date": release_date,
-                }
-            else:
-                return None
-                
-    except Exception as e:
+        item = get_client(api_id, affiliate_id).get_item(content_id)
+    except DMMAPIError as e:
         print(f"❌ API取得エラー: {e}", file=sys.stderr)
         return None
+    
+    if item is None:
+        return None
+    
+    # 画像URLの取得（大きいサイズを優先）
+    image_url_dict = item.get("imageURL", {})
+    # large → medium → small の順で取得を試みる
+    image_url_large = image_url_dict.get("large", "") or image_url_dict.get("medium", "") or image_url_dict.get("small", "")
+    
+    # サンプル画像URLの取得（大きいサイズを優先）
+    sample_images = []
+    sample_image_urls = item.get("sampleImageURL", {})
+    
+    # 大きいサイズから順に取得を試みる（sample_l → sample_m → sample → sample_s）
+    for key in ["sample_l", "sample_m", "sample", "sample_s"]:
+        if key in sample_image_urls and "image" in sample_image_urls[key]:
+            img_data = sample_image_urls[key]["image"]
+            if isinstance(img_data, list):
+                for img_url in img_data:
+                    if img_url and img_url not in sample_images:
+                        # URLを大きいサイズに変換を試みる
+                        # 例: -1.jpg → jp-1.jpg, thumb → 削除
+                        converted_url = img_url
+                        if "-" in converted_url and "jp-" not in converted_url:
+                            # -1.jpg パターンを jp-1.jpg に変換
+                            converted_url = converted_url.replace(f"-{content_id}-", f"{content_id}jp-")
+                            converted_url = converted_url.replace(f"/{content_id}-", f"/{content_id}/{content_id}jp-")
+                        if "thumb" in converted_url:
+                            converted_url = converted_url.replace("thumb", "")
+                        if "small" in converted_url and "sample" not in converted_url.lower():
+                            converted_url = converted_url.replace("small", "")
+                        sample_images.append(converted_url)
+            elif isinstance(img_data, str) and img_data and img_data not in sample_images:
+                # URLを大きいサイズに変換を試みる
+                converted_url = img_data
+                if "-" in converted_url and "jp-" not in converted_url:
+                    converted_url = converted_url.replace(f"-{content_id}-", f"{content_id}jp-")
+                    converted_url = converted_url.replace(f"/{content_id}-", f"/{content_id}/{content_id}jp-")
+                if "thumb" in converted_url:
+                    converted_url = converted_url.replace("thumb", "")
+                if "small" in converted_url and "sample" not in converted_url.lower():
+                    converted_url = converted_url.replace("small", "")
+                sample_images.append(converted_url)
+    
+    # サンプル画像が見つからない場合、content_idから直接生成（大きいサイズ）
+    if not sample_images and content_id:
+        # DMMのサンプル画像URLパターン（大きいサイズ）
+        # videoa と video の両方を試す
+        for floor in ["videoa", "video"]:
+            base_url = f"https://pics.dmm.co.jp/digital/{floor}/{content_id}/{content_id}jp-"
+            for i in range(1, 11):  # 1-10枚目
+                sample_images.append(f"{base_url}{i}.jpg")
+    
+    # 紹介文の取得（複数のフィールドから取得を試みる）
+    description = ""
+    if "review" in item and "text" in item["review"]:
+        description = item["review"]["text"]
+    elif "comment" in item:
+        description = item["comment"]
+    elif "iteminfo" in item and "comment" in item["iteminfo"]:
+        description = item["iteminfo"]["comment"]
+    
+    # 作品特徴（女優、ジャンル、メーカー等）を取得
+    keywords = []
+    genres_list = []
+    
+    # 女優名
+    if "iteminfo" in item and "actress" in item["iteminfo"]:
+        actresses = item["iteminfo"]["actress"]
+        for actress in actresses:
+            if "name" in actress:
+                keywords.append(actress["name"])
+    
+    # ジャンル（別途リストとして保持）
+    if "iteminfo" in item and "genre" in item["iteminfo"]:
+        genres = item["iteminfo"]["genre"]
+        for genre in genres:
+            if "name" in genre:
+                genre_name = genre["name"]
+                keywords.append(genre_name)
+                genres_list.append(genre_name)
+    
+    # メーカー
+    if "iteminfo" in item and "maker" in item["iteminfo"]:
+        makers = item["iteminfo"]["maker"]
+        if makers and len(makers) > 0 and "name" in makers[0]:
+            keywords.append(f"メーカー: {makers[0]['name']}")
+    
+    # シリーズ
+    if "iteminfo" in item and "series" in item["iteminfo"]:
+        series_list = item["iteminfo"]["series"]
+        if series_list and len(series_list) > 0 and "name" in series_list[0]:
+            keywords.append(f"シリーズ: {series_list[0]['name']}")
+    
+    # 監督
+    if "iteminfo" in item and "director" in item["iteminfo"]:
+        directors = item["iteminfo"]["director"]
+        if directors and len(directors) > 0 and "name" in directors[0]:
+            keywords.append(f"監督: {directors[0]['name']}")
+    
+    keywords_str = "、".join(keywords) if keywords else "不明"
+    
+    # 発売日を取得
+    release_date = item.get("date", "")
+    
+    return {
+        "content_id": item.get("content_id", content_id),
+        "title": item.get("title", ""),
+        "description": description,
+        "keywords": keywords_str,
+        "genres": genres_list,  # ジャンルを別途リストとして保持
+        "main_image_url": image_url_large,
+        "sample_images": sample_images,
+        "affiliate_url": item.get("affiliateURL", ""),
+        "url": item.get("URL", ""),
+        "release_date": release_date,
+    }
 
 
 def generate_cursor_prompt(product_info: dict, input_url: str, user_features: str = "", example_articles: list[str] = None) -> str:
@@ -3,7 +3,7 @@
 DMM APIで取得したデータを既存のall_works.jsonに統合するスクリプト
 
 機能:
-- actress_videos.json から既存の all_works.json 形式に変換
+- actress_videos.ndjson（以前の actress_videos.json も可）から既存の all_works.json 形式に変換
 - 重複チェックと新規データの追加
 - 女優名の正規化とマッピング
 """
@@ -11,13 +11,16 @@ DMM APIで取得したデータを既存のall_works.jsonに統合するスク
 import json
 import os
 from datetime import datetime
+from pathlib import Path
 from typing import List, Dict, Set
 
+from ndjson_store import find_records_file, iter_records
+
 class DMMDataIntegrator:
     def __init__(self):
         """データ統合クラスの初期化"""
         self.existing_data_path = '../data/all_works.json'
-        self.dmm_data_path = 'actress_videos.json'
+        self.dmm_data_path = str(find_records_file(Path('actress_videos.ndjson')) or 'actress_videos.ndjson')
         self.output_path = '../data/all_works_updated.json'
         
     def load_existing_data(self) -> List[Dict]:
@@ -42,10 +45,7 @@ class DMMDataIntegrator:
             return []
         
         try:
-            with open(self.dmm_data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            videos = data.get('videos', [])
+            videos = list(iter_records(Path(self.dmm_data_path)))
             print(f"✅ DMM データ読み込み完了: {len(videos)}件")
             return videos
         except Exception as e:
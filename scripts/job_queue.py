@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+記事生成ジョブのキュー（SQLite）
+
+失敗した記事を failed_articles.json に書き出し、再試行スクリプトが全件読み直して最後に書き直す代わりに、
+記事1本を1ジョブとして data/generation_jobs.sqlite3 に置く。
+
+ジョブの状態:
+    pending    → 未処理、または再試行待ち（backoff_until を過ぎたら取り出せる）
+    leased     → 処理中（lease_until を過ぎても終わらなければ落ちたとみなして再び取り出せる）
+    succeeded  → 記事を保存した
+    failed     → max_attempts 回失敗した、または対象外として取り消した
+
+状態は1件ごとにすぐ書き込むので、途中で落ちても処理済みの結果は失われず、
+失敗したジョブは attempts に応じた待ち時間のあと自動で再試行対象に戻る。
+
+使い方:
+    from job_queue import get_queue
+
+    queue = get_queue()
+    queue.enqueue("mature_drama", content_id, {"title": title, "publish_date": date, "work": work})
+    for job in queue.lease("mature_drama"):       # 再試行待ちが明けたジョブ
+        ...
+
+    leased = queue.submit("mgs", {content_id: payload, ...})   # 登録してすぐ取り出す
+    for content_id, job in leased.items():
+        # 取り出してから時間が経っていることがあるので、始める前に期限を延ばす（別のプロセスが取り出し直していれば飛ばす）
+        if not queue.renew(job):
+            continue
+        try:
+            ...
+            queue.complete(job["id"], job["lease_until"])
+        except Exception as e:
+            queue.fail(job["id"], str(e), job["lease_until"])
+
+    # 状態の確認・操作
+    python3 scripts/job_queue.py                       # 種類・状態ごとの件数
+    python3 scripts/job_queue.py --list failed         # 失敗したジョブの一覧
+    python3 scripts/job_queue.py --retry-failed        # 失敗したジョブを再試行対象に戻す
+    python3 scripts/job_queue.py --import data/failed_articles.json
+"""
+
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+# プロジェクトルート
+script_dir = Path(__file__).parent
+project_root = script_dir.parent
+DEFAULT_DB_PATH = project_root / "data" / "generation_jobs.sqlite3"
+LEGACY_FAILED_FILE = project_root / "data" / "failed_articles.json"
+
+SCHEMA_VERSION = 1
+
+STATUSES = ("pending", "leased", "succeeded", "failed")
+
+# 再試行までの待ち時間（BACKOFF_BASE * 2^(失敗回数-1) 秒、最大 BACKOFF_MAX 秒）
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 60.0
+BACKOFF_MAX = 6 * 3600.0
+
+# 処理中とみなす時間（これを過ぎたジョブは落ちたとみなして取り出し直す）
+LEASE_SECONDS = 30 * 60
+
+# complete() / fail() の結果: 別のプロセスが取り出し直していたため何もしなかった
+LEASE_LOST = "lost"
+
+
+def backoff_seconds(attempts: int) -> float:
+    """attempts回失敗したジョブを次に取り出せるまでの秒数"""
+    return min(BACKOFF_BASE * (2 ** max(attempts - 1, 0)), BACKOFF_MAX)
+
+
+def _lease_condition(lease_until: Optional[float]) -> tuple:
+    """lease_until を指定した場合の「まだ自分が取り出している」条件（SQL, パラメータ）"""
+    if lease_until is None:
+        return "", []
+    return " AND status = 'leased' AND lease_until = ?", [lease_until]
+
+
+class JobQueue:
+    """記事生成ジョブのキュー（スレッドセーフ、複数プロセスから同時に使える）"""
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # isolation_level=None: 取り出しは BEGIN IMMEDIATE で明示的にトランザクションを張る
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30,
+                                    isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise RuntimeError(f"ジョブキューのスキーマが不明です（version {version}）: {self.db_path}")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                content_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                last_error TEXT,
+                backoff_until REAL NOT NULL DEFAULT 0,
+                lease_until REAL NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE (kind, content_id)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (kind, status, backoff_until)")
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def enqueue(self, kind: str, content_id: str, payload: Dict[str, Any],
+                max_attempts: int = MAX_ATTEMPTS) -> bool:
+        """
+        ジョブを追加する
+
+        同じ種類・品番のジョブが未処理・処理中ならそのまま（再試行待ちの間隔も変えない）、
+        成功・失敗済みなら内容を差し替えて未処理に戻す。
+
+        Returns:
+            追加した（未処理に戻した）場合True
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (kind, content_id, payload, max_attempts, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (kind, content_id) DO UPDATE SET "
+                "payload = excluded.payload, max_attempts = excluded.max_attempts, status = 'pending', "
+                "attempts = 0, last_error = NULL, backoff_until = 0, updated_at = excluded.updated_at "
+                "WHERE jobs.status IN ('succeeded', 'failed')",
+                (kind, content_id, json.dumps(payload, ensure_ascii=False), max_attempts, now, now),
+            )
+            return cursor.rowcount > 0
+
+    def lease(self, kind: str, limit: Optional[int] = None, content_ids: Optional[Iterable[str]] = None,
+              lease_seconds: float = LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """
+        取り出せるジョブ（再試行待ちが明けた pending と、期限切れの leased）を処理中にして返す
+
+        Args:
+            kind: ジョブの種類
+            limit: 最大件数（Noneで全件）
+            content_ids: 指定した品番のジョブだけ取り出す
+            lease_seconds: 処理中とみなす秒数
+        """
+        now = time.time()
+        query = ("SELECT * FROM jobs WHERE kind = ? AND "
+                 "((status = 'pending' AND backoff_until <= ?) OR (status = 'leased' AND lease_until <= ?))")
+        params: List[Any] = [kind, now, now]
+        if content_ids is not None:
+            content_ids = list(content_ids)
+            if not content_ids:
+                return []
+            query += f" AND content_id IN ({', '.join('?' * len(content_ids))})"
+            params.extend(content_ids)
+        query += " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(query, params).fetchall()
+                self.conn.executemany(
+                    "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_until = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    [(now + lease_seconds, now, row["id"]) for row in rows],
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        jobs = [self._to_dict(row) for row in rows]
+        for job in jobs:
+            job["status"] = "leased"
+            job["attempts"] += 1
+            job["lease_until"] = now + lease_seconds
+        return jobs
+
+    def renew(self, job: Dict[str, Any], lease_seconds: float = LEASE_SECONDS) -> bool:
+        """
+        処理を始める前に、取り出したジョブの期限を延ばす
+
+        期限が切れて別のプロセスが取り出し直していた場合はFalse（job["status"] を LEASE_LOST にする。そのジョブは処理しない）。
+        """
+        lease_until = time.time() + lease_seconds
+        with self._lock:
+            renewed = self.conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'leased' AND lease_until = ?",
+                (lease_until, job["id"], job["lease_until"]),
+            ).rowcount
+        if renewed:
+            job["lease_until"] = lease_until
+        else:
+            job["status"] = LEASE_LOST
+        return bool(renewed)
+
+    def submit(self, kind: str, payloads: Dict[str, Dict[str, Any]],
+               lease_seconds: float = LEASE_SECONDS) -> Dict[str, Dict[str, Any]]:
+        """
+        {品番: 内容} をまとめて追加し、今すぐ処理できるものを取り出して {品番: ジョブ} を返す
+
+        再試行待ちのジョブと、別のプロセスが処理中のジョブは含まない。
+        """
+        for content_id, payload in payloads.items():
+            self.enqueue(kind, content_id, payload)
+        return {job["content_id"]: job
+                for job in self.lease(kind, content_ids=payloads, lease_seconds=lease_seconds)}
+
+    def get(self, kind: str, content_id: str) -> Optional[Dict[str, Any]]:
+        """種類・品番のジョブ（なければNone）"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE kind = ? AND content_id = ?", (kind, content_id)
+            ).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def complete(self, job_id: int, lease_until: Optional[float] = None) -> bool:
+        """
+        成功
+
+        lease_until（取り出したときの job["lease_until"]）を指定すると、期限切れのあと別のプロセスが
+        取り出し直したジョブは書き換えない。
+
+        Returns:
+            書き換えた場合True
+        """
+        condition, params = _lease_condition(lease_until)
+        with self._lock:
+            return self.conn.execute(
+                "UPDATE jobs SET status = 'succeeded', last_error = NULL, updated_at = ? WHERE id = ?" + condition,
+                [time.time(), job_id] + params,
+            ).rowcount > 0
+
+    def fail(self, job_id: int, error: str, lease_until: Optional[float] = None) -> str:
+        """
+        失敗（max_attempts 回に達していなければ待ち時間のあと再試行対象に戻す）
+
+        lease_until は complete() と同じ。
+
+        Returns:
+            新しい状態（pending / failed。別のプロセスが取り出し直していた場合は LEASE_LOST）
+        """
+        now = time.time()
+        condition, params = _lease_condition(lease_until)
+        with self._lock:
+            row = self.conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?" + condition,
+                                    [job_id] + params).fetchone()
+            if row is None:
+                return "failed" if lease_until is None else LEASE_LOST
+            status = "failed" if row["attempts"] >= row["max_attempts"] else "pending"
+            updated = self.conn.execute(
+                "UPDATE jobs SET status = ?, last_error = ?, backoff_until = ?, updated_at = ? WHERE id = ?" + condition,
+                [status, error, now + backoff_seconds(row["attempts"]), now, job_id] + params,
+            ).rowcount
+        return status if updated else LEASE_LOST
+
+    def cancel(self, job_id: int, reason: str) -> None:
+        """再試行しても意味がないジョブを失敗にする（対象外ジャンルなど）"""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', last_error = ?, updated_at = ? WHERE id = ?",
+                (reason, time.time(), job_id),
+            )
+
+    def retry_failed(self, kind: Optional[str] = None) -> int:
+        """失敗したジョブを回数をリセットして再試行対象に戻し、件数を返す"""
+        query = ("UPDATE jobs SET status = 'pending', attempts = 0, backoff_until = 0, updated_at = ? "
+                 "WHERE status = 'failed'")
+        params: List[Any] = [time.time()]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._lock:
+            return self.conn.execute(query, params).rowcount
+
+    def purge_succeeded(self, kind: Optional[str] = None) -> int:
+        """成功したジョブを削除し、件数を返す"""
+        query = "DELETE FROM jobs WHERE status = 'succeeded'"
+        params: List[Any] = []
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._lock:
+            return self.conn.execute(query, params).rowcount
+
+    def counts(self, kind: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """{種類: {状態: 件数}}（pending のうち再試行待ちは "waiting" として別に数える）"""
+        now = time.time()
+        query = ("SELECT kind, status, SUM(status = 'pending' AND backoff_until > ?) AS waiting, COUNT(*) AS n "
+                 "FROM jobs")
+        params: List[Any] = [now]
+        if kind:
+            query += " WHERE kind = ?"
+            params.append(kind)
+        query += " GROUP BY kind, status"
+        result: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            for row in self.conn.execute(query, params):
+                entry = result.setdefault(row["kind"], {status: 0 for status in STATUSES})
+                entry[row["status"]] = row["n"]
+                if row["waiting"]:
+                    entry["waiting"] = row["waiting"]
+        return result
+
+    def list_jobs(self, status: Optional[str] = None, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """ジョブの一覧"""
+        conditions, params = [], []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if kind:
+            conditions.append("kind = ?")
+            params.append(kind)
+        query = "SELECT * FROM jobs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id"
+        with self._lock:
+            return [self._to_dict(row) for row in self.conn.execute(query, params)]
+
+    def import_failed_json(self, path: Path, kind: str = "mature_drama") -> int:
+        """以前の failed_articles.json の項目をジョブとして追加し、追加した件数を返す"""
+        with open(path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        return sum(
+            self.enqueue(kind, item.get("content_id", ""), item)
+            for item in items
+            if item.get("content_id")
+        )
+
+
+def migrate_legacy_failed_file(queue: "JobQueue", path: Path = LEGACY_FAILED_FILE) -> int:
+    """failed_articles.json が残っていればキューに取り込み、.imported に改名する"""
+    if not path.exists():
+        return 0
+    count = queue.import_failed_json(path)
+    path.rename(path.with_name(path.name + ".imported"))
+    print(f"📥 {path.name} から{count}件のジョブを取り込みました")
+    return count
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> JobQueue:
+    """プロセス内で共有するキュー（data/generation_jobs.sqlite3）"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S") if timestamp else "-"
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="記事生成ジョブキューの確認・操作")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="ジョブキューDBのパス")
+    parser.add_argument("--kind", help="ジョブの種類（mature_drama / mgs / dmm_ranking）")
+    parser.add_argument("--list", choices=STATUSES, metavar="STATUS", help="指定した状態のジョブを一覧表示")
+    parser.add_argument("--retry-failed", action="store_true", help="失敗したジョブを再試行対象に戻す")
+    parser.add_argument("--purge-succeeded", action="store_true", help="成功したジョブを削除")
+    parser.add_argument("--import", dest="import_path", type=Path, help="以前の failed_articles.json を取り込む")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db)
+    try:
+        if args.import_path:
+            count = queue.import_failed_json(args.import_path, args.kind or "mature_drama")
+            print(f"📥 {count}件のジョブを取り込みました")
+        if args.retry_failed:
+            print(f"🔄 {queue.retry_failed(args.kind)}件のジョブを再試行対象に戻しました")
+        if args.purge_succeeded:
+            print(f"🗑️  成功したジョブを{queue.purge_succeeded(args.kind)}件削除しました")
+
+        if args.list:
+            for job in queue.list_jobs(args.list, args.kind):
+                title = job["payload"].get("title") or job["payload"].get("work", {}).get("title", "")
+                print(f"#{job['id']} [{job['kind']}] {job['content_id']} {title[:40]}")
+                print(f"   試行 {job['attempts']}/{job['max_attempts']} / 更新 {format_time(job['updated_at'])}"
+                      + (f" / 次回 {format_time(job['backoff_until'])}" if job["status"] == "pending" else ""))
+                if job["last_error"]:
+                    print(f"   エラー: {job['last_error']}")
+            return
+
+        counts = queue.counts(args.kind)
+        if not counts:
+            print("（ジョブはありません）")
+        for kind, entry in sorted(counts.items()):
+            waiting = f"（うち再試行待ち {entry['waiting']}）" if entry.get("waiting") else ""
+            print(f"📋 {kind}: 未処理 {entry['pending']}{waiting} / 処理中 {entry['leased']} / "
+                  f"成功 {entry['succeeded']} / 失敗 {entry['failed']}")
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+ランキング・スクレイピング結果をNDJSON（1行1件のJSON）で読み書きする共有モジュール
+
+全件をリストに溜めて indent=2 のJSONを1回で書き出す代わりに、取得した順に1行ずつ書き出す。
+最後の1行は件数などをまとめたインデックス（{"_index": {...}}）で、ファイル末尾だけ読めば
+全件を読まずに件数が分かる。読み込み側は iter_records() で1件ずつ処理するのでメモリは一定。
+
+書き込み中は「ファイル名.tmp」に書き、close() で置き換えるので、読み込み側が書きかけの
+ファイルを見ることはない。以前のJSON形式（{"ranking": [...]} など）のファイルもそのまま読める。
+
+使い方:
+    from ndjson_store import NDJSONWriter, find_records_file, iter_records, read_index
+
+    with NDJSONWriter(data_dir / "mature_drama_all_latest.ndjson", meta={"source": "DMM"}) as writer:
+        for item in items:
+            writer.write(item)
+
+    path = find_records_file(data_dir / "mature_drama_all_latest.ndjson")  # なければ .json を探す
+    print(read_index(path)["count"])
+    for item in iter_records(path):
+        ...
+
+    # 件数の確認
+    python3 scripts/ndjson_store.py data/mature_drama_all_latest.ndjson
+"""
+
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+from datetime import datetime
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+INDEX_KEY = "_index"
+
+# 以前のJSON形式で作品リストが入っているキー
+LEGACY_LIST_KEYS = ("ranking", "videos", "items", "works")
+
+# 末尾のインデックス行を探すときに1回に読むバイト数
+TAIL_CHUNK = 4096
+
+
+class NDJSONWriter:
+    """1件ずつ書き出すNDJSONライター（closeで末尾にインデックスを書いて確定する）"""
+
+    def __init__(self, path: Path, meta: Optional[Dict[str, Any]] = None, count_by: Optional[str] = None):
+        """
+        Args:
+            path: 保存先
+            meta: インデックスに入れる情報（取得条件など）
+            count_by: 指定したフィールドの値ごとの件数もインデックスに入れる
+        """
+        self.path = Path(path)
+        self.meta = dict(meta or {})
+        self.count_by = count_by
+        self.count = 0
+        self.counts: Counter = Counter()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """1件書き出す"""
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+        if self.count_by:
+            self.counts[str(record.get(self.count_by, ""))] += 1
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.write(record)
+
+    def close(self) -> None:
+        """インデックスを書いてファイルを置き換える"""
+        if self._file is None:
+            return
+        index = {"count": self.count, "written_at": datetime.now().isoformat(), **self.meta}
+        if self.count_by:
+            index["counts"] = {"field": self.count_by, **self.counts}
+        self._file.write(json.dumps({INDEX_KEY: index}, ensure_ascii=False) + "\n")
+        self._file.close()
+        self._file = None
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        """書きかけのファイルを捨てる（既存のファイルはそのまま）"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "NDJSONWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_records(path: Path, records: Iterable[Dict[str, Any]], meta: Optional[Dict[str, Any]] = None,
+                  count_by: Optional[str] = None) -> int:
+    """recordsをまとめて書き出し、件数を返す"""
+    with NDJSONWriter(path, meta, count_by) as writer:
+        writer.write_many(records)
+    return writer.count
+
+
+def is_legacy(path: Path) -> bool:
+    """以前のJSON形式のファイルか"""
+    return Path(path).suffix == ".json"
+
+
+def _load_legacy(path: Path) -> tuple:
+    """以前のJSON形式を読み込み、(作品リスト, それ以外の項目) を返す"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return data, {}
+    for key in LEGACY_LIST_KEYS:
+        if isinstance(data.get(key), list):
+            return data[key], {k: v for k, v in data.items() if k != key}
+    return [], data
+
+
+def find_records_file(path: Path) -> Optional[Path]:
+    """pathがあればpath、なければ同じ名前の .json（以前の形式）を返す（どちらもなければNone）"""
+    path = Path(path)
+    if path.exists():
+        return path
+    legacy_path = path.with_suffix(".json")
+    if legacy_path.exists():
+        return legacy_path
+    return None
+
+
+def iter_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """1件ずつ読み込む（インデックス行は返さない）"""
+    path = Path(path)
+    if is_legacy(path):
+        records, _ = _load_legacy(path)
+        yield from records
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if INDEX_KEY in record and len(record) == 1:
+                continue
+            yield record
+
+
+def read_index(path: Path) -> Dict[str, Any]:
+    """
+    末尾のインデックスを読み込む（全件は読まない）
+
+    インデックスがない（書き込み途中で止まった）場合は全件数えて {"count": n} を返す。
+    """
+    path = Path(path)
+    if is_legacy(path):
+        records, rest = _load_legacy(path)
+        return {**{k: v for k, v in rest.items() if not isinstance(v, (list, dict))}, "count": len(records)}
+
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        tail = b""
+        position = end
+        # 最後の行（末尾の改行を除く）の先頭が見つかるまで後ろから読む
+        while position > 0 and tail.rstrip(b"\n").count(b"\n") == 0:
+            step = min(TAIL_CHUNK, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+    last_line = tail.rstrip(b"\n").rsplit(b"\n", 1)[-1]
+
+    try:
+        record = json.loads(last_line)
+        if INDEX_KEY in record and len(record) == 1:
+            return record[INDEX_KEY]
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        pass
+    return {"count": sum(1 for _ in iter_records(path))}
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="NDJSONファイルの件数とインデックスを表示")
+    parser.add_argument("paths", nargs="+", type=Path, help="NDJSON（または以前のJSON）ファイル")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        if not path.exists():
+            print(f"❌ ファイルが見つかりません: {path}", file=sys.stderr)
+            continue
+        index = read_index(path)
+        print(f"📄 {path}: {index.get('count', 0)}件")
+        for key, value in index.items():
+            if key != "count":
+                print(f"   {key}: {json.dumps(value, ensure_ascii=False) if isinstance(value, dict) else value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+記事本文の類似度（MinHash/LSH）で、ほぼ同じ文章の記事を検出する共有モジュール
+
+本文からHTMLタグ・URL・Markdown記号・空白を除いた文字列を文字n-gram（シングル）に分け、
+MinHashの署名を作る。署名は帯（band）ごとにバケットに入れ、同じバケットに入った組だけを
+比較するので、全組み合わせを比べずに類似ペアを見つけられる。
+署名は data/near_duplicates.sqlite3 にキャッシュし、mtime/sizeが変わった記事だけを計算し直す。
+
+使い方:
+    from near_duplicates import find_near_duplicate, remember_article
+
+    # save_article の書き込み前
+    duplicate = find_near_duplicate(full_content, output_dir, exclude=filepath.stem)
+    if duplicate:
+        slug, similarity = duplicate
+        ...
+    remember_article(filepath, full_content)
+
+    # コマンドラインから類似ペアを一覧
+    python3 scripts/near_duplicates.py --threshold 0.6
+    python3 scripts/near_duplicates.py --query content/2025-12-14-1start00473.md
+"""
+
+import os
+import re
+import sys
+import sqlite3
+import hashlib
+import argparse
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from article_frontmatter import split_frontmatter
+from parallel import add_jobs_argument, map_parallel
+
+# プロジェクトルート
+script_dir = Path(__file__).parent
+project_root = script_dir.parent
+DEFAULT_CONTENT_DIR = project_root / "content"
+DEFAULT_DB_PATH = project_root / "data" / "near_duplicates.sqlite3"
+
+# 署名の長さ = BANDS * ROWS（NUM_PERMは2のべき乗）。閾値の目安は (1/BANDS)^(1/ROWS) ≒ 0.42
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+# 文字n-gramの長さ（日本語は単語区切りがないので文字単位）
+SHINGLE_SIZE = 5
+# この類似度（推定Jaccard係数）以上を「ほぼ同じ」とみなす
+DEFAULT_THRESHOLD = 0.5
+
+# シングル・パラメータを変えたら上げる（古い署名は作り直す）
+SCHEMA_VERSION = 1
+
+# One Permutation Hashing: ハッシュ値の下位ビットでビンに分け、ビンごとの最小値を署名にする
+# （NUM_PERM回ハッシュし直す通常のMinHashと同じ性質で、計算はシングル数に比例するだけ）
+_BIN_BITS = NUM_PERM.bit_length() - 1
+_EMPTY = (1 << 64) - 1
+# 空のビンを隣のビンの値で埋めるときのずらし幅（元の値と衝突しないよう大きく取る）
+_ROTATION = 1 << 57
+
+TAG_PATTERN = re.compile(r'<[^>]+>')
+URL_PATTERN = re.compile(r'https?://\S+')
+MARKDOWN_PATTERN = re.compile(r'[#*_>`\-|!\[\]()]+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_body(content: str) -> str:
+    """frontmatter・HTMLタグ・URL・Markdown記号・空白を除いた本文"""
+    _, body = split_frontmatter(content)
+    body = TAG_PATTERN.sub(" ", body)
+    body = URL_PATTERN.sub(" ", body)
+    body = MARKDOWN_PATTERN.sub(" ", body)
+    return WHITESPACE_PATTERN.sub("", body)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """文字n-gramのハッシュ値のセット"""
+    if len(text) < size:
+        return {_hash64(text)} if text else set()
+    return {_hash64(text[i:i + size]) for i in range(len(text) - size + 1)}
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash(content: str) -> Optional[array]:
+    """記事のMinHash署名（本文が空ならNone）"""
+    hashes = shingles(normalize_body(content))
+    if not hashes:
+        return None
+
+    signature = [_EMPTY] * NUM_PERM
+    mask = NUM_PERM - 1
+    for h in hashes:
+        slot = h & mask
+        value = h >> _BIN_BITS
+        if value < signature[slot]:
+            signature[slot] = value
+
+    # 空のビンは右隣（循環）の空でないビンの値で埋める
+    if _EMPTY in signature:
+        source = list(signature)
+        for i in range(NUM_PERM):
+            if source[i] != _EMPTY:
+                continue
+            distance = next(d for d in range(1, NUM_PERM) if source[(i + d) % NUM_PERM] != _EMPTY)
+            signature[i] = source[(i + distance) % NUM_PERM] + distance * _ROTATION
+    return array("Q", signature)
+
+
+def similarity(a: array, b: array) -> float:
+    """署名から推定したJaccard係数"""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+def _band_keys(signature: array) -> Iterable[Tuple[int, bytes]]:
+    for band in range(BANDS):
+        yield band, signature[band * ROWS:(band + 1) * ROWS].tobytes()
+
+
+def _signature_for_file(file_path: Path) -> Optional[bytes]:
+    """1記事分の署名（プロセス並列用のトップレベル関数）"""
+    try:
+        signature = minhash(file_path.read_text(encoding="utf-8"))
+    except (OSError, UnicodeDecodeError):
+        return None
+    return signature.tobytes() if signature is not None else None
+
+
+class NearDuplicateIndex:
+    """記事本文のMinHash署名とLSHバケット"""
+
+    def __init__(self, content_dir: Path = DEFAULT_CONTENT_DIR, db_path: Path = DEFAULT_DB_PATH):
+        self.content_dir = Path(content_dir)
+        self.db_path = Path(db_path)
+        self.signatures: Dict[str, array] = {}
+        self.buckets: Dict[Tuple[int, bytes], List[str]] = {}
+
+    def refresh(self, jobs: int = 1) -> Dict[str, int]:
+        """
+        content/ の署名を読み込む（mtime/sizeが変わった記事だけ計算し直してキャッシュに保存）
+
+        Returns:
+            {"computed": n, "cached": n, "removed": n}
+        """
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS signatures")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS signatures (
+                    slug TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    signature BLOB
+                )
+            """)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+            known = {
+                slug: (mtime_ns, size, blob)
+                for slug, mtime_ns, size, blob in conn.execute("SELECT slug, mtime_ns, size, signature FROM signatures")
+            }
+
+            current = {}
+            stale = []
+            if self.content_dir.exists():
+                with os.scandir(self.content_dir) as entries:
+                    for entry in entries:
+                        if not entry.name.endswith(".md") or not entry.is_file():
+                            continue
+                        slug = entry.name[:-3]
+                        stat = entry.stat()
+                        cached = known.get(slug)
+                        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                            current[slug] = cached[2]
+                        else:
+                            stale.append((slug, Path(entry.path), stat))
+
+            stale.sort(key=lambda item: item[0])
+            rows = []
+            for (slug, _, stat), blob in zip(stale, map_parallel(_signature_for_file, [s[1] for s in stale], jobs)):
+                current[slug] = blob
+                rows.append((slug, stat.st_mtime_ns, stat.st_size, blob))
+
+            removed = [(slug,) for slug in known if slug not in current]
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?)", rows)
+                conn.executemany("DELETE FROM signatures WHERE slug = ?", removed)
+        finally:
+            conn.close()
+
+        self.signatures = {}
+        self.buckets = {}
+        for slug in sorted(current):
+            if current[slug] is not None:
+                signature = array("Q")
+                signature.frombytes(current[slug])
+                self._insert(slug, signature)
+
+        return {"computed": len(rows), "cached": len(current) - len(rows), "removed": len(removed)}
+
+    def _insert(self, slug: str, signature: array):
+        if slug in self.signatures:
+            self.remove(slug)
+        self.signatures[slug] = signature
+        for key in _band_keys(signature):
+            self.buckets.setdefault(key, []).append(slug)
+
+    def remove(self, slug: str):
+        """記事をインデックスから外す"""
+        signature = self.signatures.pop(slug, None)
+        if signature is None:
+            return
+        for key in _band_keys(signature):
+            self.buckets[key].remove(slug)
+
+    def add(self, slug: str, content: str):
+        """記事をメモリ上のインデックスに追加（次回refreshでキャッシュにも入る）"""
+        signature = minhash(content)
+        if signature is not None:
+            self._insert(slug, signature)
+
+    def query(self, content: str, threshold: float = DEFAULT_THRESHOLD,
+              exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        内容が似ている既存記事を類似度の高い順に返す
+
+        Args:
+            content: 記事全体（frontmatter込みでもよい）
+            threshold: この類似度以上の記事だけを返す
+            exclude: 比較から外すslug（同じ記事を上書きする場合）
+        """
+        signature = minhash(content)
+        if signature is None:
+            return []
+        candidates = set()
+        for key in _band_keys(signature):
+            candidates.update(self.buckets.get(key, ()))
+        candidates.discard(exclude)
+
+        matches = [(slug, similarity(signature, self.signatures[slug])) for slug in candidates]
+        return sorted([m for m in matches if m[1] >= threshold], key=lambda m: (-m[1], m[0]))
+
+    def pairs(self, threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, str, float]]:
+        """類似度がthreshold以上の記事ペア（同じバケットに入った組だけを比較）"""
+        candidates = set()
+        for slugs in self.buckets.values():
+            if len(slugs) < 2:
+                continue
+            for i, a in enumerate(slugs):
+                for b in slugs[i + 1:]:
+                    candidates.add((a, b) if a < b else (b, a))
+
+        result = []
+        for a, b in candidates:
+            score = similarity(self.signatures[a], self.signatures[b])
+            if score >= threshold:
+                result.append((a, b, score))
+        return sorted(result, key=lambda p: (-p[2], p[0], p[1]))
+
+
+# save_article から使う共有インデックス（記事ディレクトリごとに1回だけ読み込む）
+_shared_indexes: Dict[Path, NearDuplicateIndex] = {}
+
+
+def get_shared_index(content_dir: Path = DEFAULT_CONTENT_DIR) -> NearDuplicateIndex:
+    """プロセス内で共有するインデックス（初回だけrefreshする）"""
+    key = Path(content_dir).resolve()
+    if key not in _shared_indexes:
+        index = NearDuplicateIndex(content_dir)
+        index.refresh()
+        _shared_indexes[key] = index
+    return _shared_indexes[key]
+
+
+def find_near_duplicate(content: str, content_dir: Path = DEFAULT_CONTENT_DIR,
+                        threshold: float = DEFAULT_THRESHOLD,
+                        exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+    """
+    生成した記事に酷似した既存記事があれば (slug, 類似度) を返す
+
+    Args:
+        content: 保存しようとしている記事全体
+        content_dir: 記事ディレクトリ
+        threshold: この類似度以上なら重複とみなす
+        exclude: 比較から外すslug（同じファイル名で上書きする場合）
+    """
+    matches = get_shared_index(content_dir).query(content, threshold, exclude)
+    return matches[0] if matches else None
+
+
+def remember_article(file_path: Path, content: str):
+    """保存した記事を共有インデックスに追加（同じ実行中の後続記事とも比較するため）"""
+    file_path = Path(file_path)
+    get_shared_index(file_path.parent).add(file_path.stem, content)
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="本文がほぼ同じ記事を検出")
+    parser.add_argument("--content-dir", type=Path, default=DEFAULT_CONTENT_DIR, help="記事ディレクトリ")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="署名キャッシュのパス")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="類似度の閾値（0〜1）")
+    parser.add_argument("--query", type=Path, help="指定した記事に似た既存記事を表示")
+    parser.add_argument("--limit", type=int, default=50, help="表示するペア数")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+
+    index = NearDuplicateIndex(args.content_dir, args.db)
+    stats = index.refresh(args.jobs)
+    print(f"✅ 署名: 計算 {stats['computed']}件 / キャッシュ {stats['cached']}件 / 削除 {stats['removed']}件")
+
+    if args.query:
+        try:
+            content = args.query.read_text(encoding="utf-8")
+        except OSError as e:
+            print(f"❌ 読み込み失敗: {e}", file=sys.stderr)
+            sys.exit(1)
+        matches = index.query(content, args.threshold, exclude=args.query.stem)
+        if not matches:
+            print(f"✅ 類似度 {args.threshold} 以上の記事はありません")
+        for slug, score in matches:
+            print(f"   {score:.2f}  {slug}")
+        return
+
+    pairs = index.pairs(args.threshold)
+    print(f"🔍 類似度 {args.threshold} 以上のペア: {len(pairs)}件")
+    for a, b, score in pairs[:args.limit]:
+        print(f"   {score:.2f}  {a}  ⇔  {b}")
+    if len(pairs) > args.limit:
+        print(f"   ...他{len(pairs) - args.limit}件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+記事一括処理スクリプト用の並列実行ヘルパー
+
+記事ごとの処理は互いに独立しているので、プロセスプールでまとめて実行する。
+結果は入力と同じ順番で返るため、呼び出し側はこれまでどおり順番にログを出して集計できる。
+
+使い方:
+    from parallel import add_jobs_argument, map_parallel
+
+    parser = argparse.ArgumentParser()
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+
+    for article_file, result in zip(files, map_parallel(process_article, files, args.jobs)):
+        ...
+
+    # API呼び出しのようにI/O待ちが中心の処理はスレッドで並列にする（lambdaも渡せる）
+    for response in map_threads(lambda params: client.item_list(**params), requests, workers=4):
+        ...
+
+注意:
+    - map_parallel に渡す関数はモジュールのトップレベルで定義すること（プロセス間で受け渡すため）
+    - 追加の引数は functools.partial で束縛する
+    - 関数内の例外は呼び出し側で再送出されるので、記事単位のエラーは関数内で結果に含めること
+"""
+
+import os
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# 1ワーカーあたりのチャンク数の目安（小さすぎると受け渡しのコスト、大きすぎると偏りが増える）
+CHUNKS_PER_WORKER = 4
+
+
+def add_jobs_argument(parser: argparse.ArgumentParser) -> None:
+    """--jobs オプションを追加"""
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=1,
+        help="並列プロセス数（1で逐次実行、0でCPUコア数）"
+    )
+
+
+def resolve_jobs(jobs: int) -> int:
+    """--jobs の値を実際のプロセス数に変換"""
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _init_worker() -> None:
+    """ワーカープロセスの初期化（fork元と同じ乱数列にならないようにする）"""
+    random.seed()
+
+
+def map_parallel(func: Callable[[T], R], items: Iterable[T], jobs: int = 1,
+                 chunksize: Optional[int] = None) -> Iterator[R]:
+    """
+    itemsの各要素にfuncを適用し、入力と同じ順番で結果を返す
+
+    Args:
+        func: 1件分の処理（トップレベル関数またはそのpartial）
+        items: 処理対象
+        jobs: 並列プロセス数（1で逐次実行、0でCPUコア数）
+        chunksize: 1回にワーカーへ渡す件数（省略時は件数とプロセス数から決める）
+    """
+    items = list(items)
+    jobs = min(resolve_jobs(jobs), max(len(items), 1))
+
+    if jobs == 1:
+        for item in items:
+            yield func(item)
+        return
+
+    if chunksize is None:
+        chunksize = max(1, len(items) // (jobs * CHUNKS_PER_WORKER))
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as executor:
+        yield from executor.map(func, items, chunksize=chunksize)
+
+
+def map_threads(func: Callable[[T], R], items: Iterable[T], workers: int = 4) -> Iterator[R]:
+    """
+    itemsの各要素にfuncをスレッドプールで適用し、入力と同じ順番で結果を返す
+
+    I/O待ちが中心の処理（API呼び出しなど）向け。リクエスト間隔の制御は呼び出し先で行うこと。
+
+    Args:
+        func: 1件分の処理
+        items: 処理対象
+        workers: 同時に実行するスレッド数（1で逐次実行）
+    """
+    items = list(items)
+    workers = min(max(workers, 1), max(len(items), 1))
+
+    if workers == 1:
+        for item in items:
+            yield func(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(func, items)
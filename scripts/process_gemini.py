@@ -6,25 +6,34 @@ Google Gemini APIを使ってDMMドラマ系動画データからブログ記事
 import os
 import json
 import sys
-import time
 from datetime import datetime, timedelta
 from pathlib import Path
+from itertools import islice
+from typing import Iterator
 import google.generativeai as genai
+from near_duplicates import remember_article
+from article_validator import check_before_save
+from ndjson_store import find_records_file, iter_records, read_index
+from gemini_pool import generate_content, get_controller, get_workers
+from parallel import map_threads
+from job_queue import get_queue, LEASE_LOST
 
+# ジョブキューの種類
+JOB_KIND = "dmm_ranking"
 
-def load_ranking_data(json_path: str) -> dict:
+
+def load_ranking_data(json_path: str) -> tuple[int, Iterator[dict]]:
     """
-    ランキングデータのJSONファイルを読み込む
+    ランキングデータ（NDJSON、または以前のJSON）を読み込む
     
     Args:
-        json_path: JSONファイルのパス
+        json_path: ファイルのパス
         
     Returns:
-        ランキングデータ
+        (件数, 動画データを1件ずつ返すイテレータ)
     """
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return read_index(Path(json_path))["count"], iter_records(Path(json_path))
     except FileNotFoundError:
         print(f"エラー: ファイルが見つかりません: {json_path}", file=sys.stderr)
         sys.exit(1)
@@ -190,7 +199,7 @@ def generate_article(model, video_data: dict) -> str:
     affiliate_url = video_data.get("affiliate_url", "")
     
     try:
-        response = model.generate_content(prompt)
+        response = generate_content(model, prompt)
         article_content = response.text
         
         # アフィリエイトリンクが不足している場合は自動挿入
@@ -203,7 +212,7 @@ def generate_article(model, video_data: dict) -> str:
         return None
 
 
-def save_article(content: str, video_data: dict, publish_date: str, output_dir: str) -> str:
+def save_article(content: str, video_data: dict, publish_date: str, output_dir: str) -> str | None:
     """
     記事をMarkdownファイルとして保存
     
@@ -214,7 +223,7 @@ def save_article(content: str, video_data: dict, publish_date: str, output_dir:
         output_dir: 出力ディレクトリ
         
     Returns:
-        保存したファイルパス
+        保存したファイルパス（既存記事と酷似している場合・保存に失敗した場合はNone）
     """
     content_id = video_data.get("content_id", "unknown")
     title = video_data.get("title", "")
@@ -249,9 +258,17 @@ affiliateLink: "{affiliate_url}"
     # 記事全体を作成
     full_content = frontmatter + content
     
+    # フロントマターの崩れ・プレースホルダー・画像URLを直し、既存記事とほぼ同じ文章なら保存しない
+    # （保存しない場合は生成した本文をキャッシュから消し、次の実行で生成し直す）
+    full_content = check_before_save(full_content, Path(output_dir), Path(filepath).stem, generated=content,
+                                     affiliate_url=affiliate_url)
+    if full_content is None:
+        return None
+    
     try:
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(full_content)
+        remember_article(Path(filepath), full_content)
         return filepath
     except IOError as e:
         print(f"エラー: ファイルの保存に失敗しました: {e}", file=sys.stderr)
@@ -274,24 +291,23 @@ def main():
     # JSONファイルのパスを確認（ranking_data.jsonを優先）
     json_path = project_root / "ranking_data.json"
     if not json_path.exists():
-        # ranking_data.jsonが存在しない場合は、data/dmm_ranking_latest.jsonを使用
-        json_path = project_root / "data" / "dmm_ranking_latest.json"
+        # ranking_data.jsonが存在しない場合は、data/dmm_ranking_latest.ndjson（なければ .json）を使用
+        json_path = project_root / "data" / "dmm_ranking_latest.ndjson"
+        json_path = find_records_file(json_path) or json_path
         print(f"⚠️  ranking_data.jsonが見つからないため、{json_path}を使用します")
     else:
         print(f"📂 ranking_data.jsonを読み込みます")
     
     # ランキングデータを読み込む
     print("📖 ランキングデータを読み込み中...")
-    ranking_data = load_ranking_data(str(json_path))
+    # 以前のJSON形式は rankingキー（なければitemsキー）の動画リストを読む
+    total_count, videos = load_ranking_data(str(json_path))
     
-    # rankingキーがある場合はそれを使用、なければitemsキーを探す
-    videos = ranking_data.get("ranking", ranking_data.get("items", []))
-    
-    if not videos:
+    if not total_count:
         print("エラー: 動画データが見つかりません", file=sys.stderr)
         sys.exit(1)
     
-    print(f"📊 {len(videos)}件の動画データを取得しました")
+    print(f"📊 {total_count}件の動画データを取得しました")
     
     # Gemini APIを初期化
     print("🤖 Gemini APIを初期化中...")
@@ -315,52 +331,71 @@ def main():
     
     # テストモード：環境変数TEST_MODEが設定されている場合は1件のみ処理
     test_mode = os.environ.get("TEST_MODE", "").lower() == "true"
-    videos_to_process = videos[:articles_to_generate] if not test_mode else videos[:1]
+    videos_to_process = list(islice(videos, articles_to_generate if not test_mode else 1))
     
     if test_mode:
         print("🧪 テストモード：1記事のみ生成します\n")
     
-    success_count = 0
+    # ジョブキューに登録してから取り出す（前回失敗して再試行待ちのものは待ち時間が明けるまで飛ばす）
+    queue = get_queue()
+    targets = []
     for idx, video in enumerate(videos_to_process):
         # 公開日を計算（1日あたり3記事）
         days_offset = idx // 3
         publish_date = (start_date + timedelta(days=days_offset)).strftime("%Y-%m-%d")
-        
-        content_id = video.get("content_id", f"video_{idx}")
+        targets.append((idx, video.get("content_id", f"video_{idx}"), publish_date, video))
+    leased = queue.submit(JOB_KIND, {
+        content_id: {"content_id": content_id, "title": video.get("title", "不明"),
+                     "publish_date": publish_date, "video": video}
+        for idx, content_id, publish_date, video in targets
+    })
+    if len(leased) < len(targets):
+        print(f"⏳ {len(targets) - len(leased)}件は再試行待ち・処理中のジョブのためスキップします（python3 scripts/job_queue.py --kind {JOB_KIND}）\n")
+        targets = [target for target in targets if target[1] in leased]
+    
+    # Gemini APIで記事を生成（同時実行数は gemini_pool がクォータと応答時間から調整する）
+    def generate(target):
+        # 取り出してから時間が経っていることがあるので、始める前に期限を延ばす（別のプロセスが取り出し直していれば生成しない）
+        if not queue.renew(leased[target[1]]):
+            return None
+        return generate_article(model, target[3])
+    
+    articles = map_threads(generate, targets, get_workers())
+    
+    success_count = 0
+    for (idx, content_id, publish_date, video), article_content in zip(targets, articles):
         title = video.get("title", "不明")
+        job = leased[content_id]
         
-        print(f"[{idx + 1}/{len(videos)}] {title}")
+        print(f"[{idx + 1}/{total_count}] {title}")
         print(f"  📅 公開日: {publish_date}")
-        print(f"  🔄 記事生成中...")
-        
-        # Gemini APIで記事を生成
-        article_content = generate_article(model, video)
         
-        if article_content:
+        if job["status"] == LEASE_LOST:
+            print(f"  ⏭️  スキップ（期限が切れ、別のプロセスが処理中）")
+        elif article_content:
             # 記事を保存
             filepath = save_article(article_content, video, publish_date, str(content_dir))
             
             if filepath:
                 print(f"  ✅ 保存完了: {filepath}")
                 success_count += 1
+                queue.complete(job["id"], job["lease_until"])
             else:
                 print(f"  ❌ 保存失敗")
+                queue.fail(job["id"], "記事の保存に失敗しました", job["lease_until"])
         else:
             print(f"  ❌ 生成失敗")
-        
-        # レート制限対策：4秒待機
-        if idx < len(videos_to_process) - 1:  # 最後の記事の後は待たない
-            print(f"  ⏳ レート制限対策で4秒待機中...\n")
-            time.sleep(4)
-        else:
-            print()
+            queue.fail(job["id"], "記事の生成に失敗しました", job["lease_until"])
+        print()
+    
+    print(get_controller().format_stats())
     
     # 完了メッセージ
     print("=" * 80)
     print(f"🎉 記事生成完了！")
     print(f"   成功: {success_count}/{len(videos_to_process)}件")
     if test_mode:
-        print(f"   テストモード：{len(videos) - len(videos_to_process)}件の記事が残っています")
+        print(f"   テストモード：{total_count - len(videos_to_process)}件の記事が残っています")
     print(f"   保存先: {content_dir}")
     print("=" * 80)
 
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+API呼び出しのレート制限（トークンバケット）
+
+固定の time.sleep() をリクエストごとに挟む代わりに、1秒あたり rate 個のトークンが貯まる
+バケット（最大 burst 個）から1個ずつ取り出してからリクエストする。
+複数スレッドから同時に acquire() しても、全体のリクエスト数は rate 回/秒 に収まる。
+
+get_limiter() が返すバケットは残量を data/rate_limit.sqlite3 に置くので、cronで同時に動く
+別々のスクリプト（fetch_dmm_ranking.py と update_article_tags_from_api.py など）も
+同じ上限を分け合う。上限はエンドポイントごとに BUDGETS で決め、環境変数 RATE_LIMITS で上書きできる。
+
+使い方:
+    from rate_limit import get_limiter
+
+    get_limiter("gemini").acquire()   # トークンが貯まるまで待つ
+    response = model.generate_content(prompt)
+
+    # プロセス内だけで使うバケット
+    limiter = TokenBucket(rate=1.0, burst=1)
+
+    # 上限の上書き（回/秒:バースト数）と残量の確認
+    RATE_LIMITS="gemini=0.1:1,dmm_api=2:2" python3 scripts/fetch_dmm_ranking.py
+    python3 scripts/rate_limit.py
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+# プロジェクトルート
+script_dir = Path(__file__).parent
+project_root = script_dir.parent
+DEFAULT_DB_PATH = project_root / "data" / "rate_limit.sqlite3"
+
+SCHEMA_VERSION = 1
+
+# エンドポイントごとの (回/秒, バースト数)
+BUDGETS = {
+    "dmm_api": (1.0, 1),        # DMM API（ItemList）
+    "dmm_page": (1.0, 1),       # DMMの作品ページ（HTML）
+    "gemini": (10 / 60, 1),     # Gemini API（無料枠の1分あたり10回。有料枠では RATE_LIMITS でクォータまで上げる）
+}
+DEFAULT_BUDGET = (1.0, 1)
+
+
+def parse_overrides(value: Optional[str]) -> Dict[str, tuple]:
+    """RATE_LIMITS="gemini=0.1:1,dmm_api=2" を {名前: (回/秒, バースト数)} に変換"""
+    overrides = {}
+    for entry in (value or "").split(","):
+        if "=" not in entry:
+            continue
+        name, spec = (part.strip() for part in entry.split("=", 1))
+        rate, _, burst = spec.partition(":")
+        try:
+            overrides[name] = (float(rate), int(burst) if burst else 1)
+        except ValueError:
+            print(f"⚠️  RATE_LIMITS の値が不正です（無視します）: {entry}", file=sys.stderr)
+    return overrides
+
+
+def get_budget(name: str) -> tuple:
+    """エンドポイントの (回/秒, バースト数)"""
+    overrides = parse_overrides(os.environ.get("RATE_LIMITS"))
+    return overrides.get(name, BUDGETS.get(name, DEFAULT_BUDGET))
+
+
+class TokenBucket:
+    """プロセス内で共有するトークンバケット（スレッドセーフ）"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError(f"rateは正の数を指定してください: {rate}")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def configure(self, rate: Optional[float] = None, burst: Optional[int] = None) -> None:
+        """レートとバースト数を変更（貯まっているトークンは新しい上限で切り詰める）"""
+        with self._lock:
+            self._refill()
+            if rate is not None:
+                if rate <= 0:
+                    raise ValueError(f"rateは正の数を指定してください: {rate}")
+                self.rate = rate
+            if burst is not None:
+                self.burst = max(1, burst)
+            self._tokens = min(self._tokens, self.burst)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self, tokens: float) -> float:
+        """トークンを取り出せたら0、足りなければ貯まるまでの秒数を返す"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        トークンを取り出す（足りなければ貯まるまで待つ）
+
+        Returns:
+            待った秒数
+        """
+        waited = 0.0
+        while True:
+            wait = self._take(tokens)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    残量をSQLiteに置き、プロセスをまたいで共有するトークンバケット
+
+    取り出しは BEGIN IMMEDIATE のトランザクション内で行うので、同時に動く別プロセスとも
+    二重に取り出さない。経過時間はプロセス間で比べられるよう time.time() で測る。
+    """
+
+    def __init__(self, name: str, rate: float, burst: int = 1, db_path: Path = DEFAULT_DB_PATH):
+        super().__init__(rate, burst)
+        self.name = name
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: トランザクションは BEGIN IMMEDIATE で明示的に張る
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30,
+                                    isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS buckets")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                rate REAL NOT NULL,
+                burst INTEGER NOT NULL
+            )
+        """)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _refill(self) -> None:
+        # 残量はDB側で管理する（configure() からも呼ばれるので何もしない）
+        pass
+
+    def _take(self, tokens: float) -> float:
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                now = time.time()
+                if row is None:
+                    available = float(self.burst)
+                else:
+                    # 時計が巻き戻った場合は経過0として扱う
+                    available = min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+
+                wait = 0.0
+                if available >= tokens:
+                    available -= tokens
+                else:
+                    wait = (tokens - available) / self.rate
+
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?, ?)",
+                    (self.name, available, now, self.rate, self.burst),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return wait
+
+
+_limiters: Dict[str, SharedTokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str) -> SharedTokenBucket:
+    """エンドポイント名に対応する共有バケット（上限は BUDGETS / RATE_LIMITS）"""
+    with _limiters_lock:
+        if name not in _limiters:
+            rate, burst = get_budget(name)
+            _limiters[name] = SharedTokenBucket(name, rate, burst)
+        return _limiters[name]
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="共有レート制限の上限と残量を表示")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="レート制限DBのパス")
+    parser.add_argument("--reset", action="store_true", help="残量をリセット（全エンドポイントを満タンに戻す）")
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print("（まだ使われていません）")
+        for name in BUDGETS:
+            rate, burst = get_budget(name)
+            print(f"⏱️  {name}: 上限 {rate * 60:g}回/分（バースト {burst}）")
+        return
+
+    conn = sqlite3.connect(str(args.db), timeout=30)
+    try:
+        if args.reset:
+            with conn:
+                conn.execute("DELETE FROM buckets")
+            print("🗑️  残量をリセットしました")
+        rows = {row[0]: row[1:] for row in conn.execute("SELECT name, tokens, updated_at, rate, burst FROM buckets")}
+    finally:
+        conn.close()
+
+    now = time.time()
+    for name in sorted(set(BUDGETS) | set(rows)):
+        # 最後に取り出したプロセスの上限を表示（未使用なら設定値）
+        rate, burst = rows[name][2:] if name in rows else get_budget(name)
+        line = f"⏱️  {name}: 上限 {rate * 60:g}回/分（バースト {burst}）"
+        if name in rows:
+            tokens, updated_at = rows[name][:2]
+            available = min(burst, tokens + max(0.0, now - updated_at) * rate)
+            line += f" / 残り {available:.2f} / 最終取得 {now - updated_at:.0f}秒前"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,25 +9,7 @@ from pathlib import Path
 from collections import defaultdict
 from datetime import datetime
 
-def extract_frontmatter(content: str):
-    """フロントマターを抽出"""
-    match = re.match(r'---\n(.*?)\n---', content, re.DOTALL)
-    if not match:
-        return None, content
-    
-    frontmatter_str = match.group(1)
-    body = content[match.end():]
-    
-    # 簡単なYAMLパース（contentIdとdateを取得）
-    frontmatter = {}
-    for line in frontmatter_str.split('\n'):
-        if ':' in line:
-            key, value = line.split(':', 1)
-            key = key.strip()
-            value = value.strip().strip('"').strip("'")
-            frontmatter[key] = value
-    
-    return frontmatter, body
+from content_index import ContentIndex
 
 def main():
     print("=" * 80)
@@ -44,39 +26,34 @@ def main():
     articles_by_content_id = defaultdict(list)
     
     print("📋 記事をスキャン中...")
-    for article_file in content_dir.glob("*.md"):
+    # content_index（SQLite）を差分更新し、変更のあった記事だけを読み直す
+    with ContentIndex(content_dir) as index:
+        index.refresh()
+        articles = index.articles()
+    
+    for article in articles:
+        content_id = (article["content_id"] or "").strip()
+        date_str = (article["date"] or "").strip()
+        
+        if not content_id:
+            continue
+        
+        # 日付をパース
         try:
-            content = article_file.read_text(encoding="utf-8")
-            frontmatter, _ = extract_frontmatter(content)
-            
-            if not frontmatter:
-                continue
-            
-            content_id = frontmatter.get("contentId", "").strip()
-            date_str = frontmatter.get("date", "").strip().strip('"').strip("'")
-            
-            if not content_id:
-                continue
-            
-            # 日付をパース
-            try:
-                date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-            except:
-                # 日付がパースできない場合は、ファイル名から取得
-                match = re.search(r'(\d{4}-\d{2}-\d{2})', article_file.name)
-                if match:
-                    date_obj = datetime.strptime(match.group(1), "%Y-%m-%d")
-                else:
-                    date_obj = datetime.min
-            
-            articles_by_content_id[content_id].append({
-                "file": article_file,
-                "date": date_obj,
-                "date_str": date_str
-            })
-            
-        except Exception as e:
-            print(f"⚠️  {article_file.name} の処理中にエラー: {e}")
+            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+        except ValueError:
+            # 日付がパースできない場合は、ファイル名から取得
+            match = re.search(r'(\d{4}-\d{2}-\d{2})', article["path"].name)
+            if match:
+                date_obj = datetime.strptime(match.group(1), "%Y-%m-%d")
+            else:
+                date_obj = datetime.min
+        
+        articles_by_content_id[content_id].append({
+            "file": article["path"],
+            "date": date_obj,
+            "date_str": date_str
+        })
     
     print(f"✅ {len(articles_by_content_id)}個のユニークな品番を発見\n")
     
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+DMM APIなどのレスポンスをSQLiteにキャッシュする共有モジュール
+
+キーは「エンドポイント名 + 正規化したリクエストパラメータ（認証情報を除き、キー順に並べたもの）」。
+エンドポイントごとに有効期限（TTL）を持ち、期限切れでも猶予期間（stale）内なら古い値をすぐ返して
+裏で取り直す（stale-while-revalidate）。ヒット・ミス数はプロセス内とDBの両方で数える。
+
+使い方:
+    from response_cache import get_default_cache
+
+    cache = get_default_cache()
+    data = cache.fetch("ItemList:cid", {"cid": "1start00473"}, lambda: call_api(...))
+    print(cache.format_stats())
+
+    # コマンドラインから確認・掃除
+    python3 scripts/response_cache.py --stats
+    python3 scripts/response_cache.py --purge-expired
+    python3 scripts/response_cache.py --clear
+"""
+
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# プロジェクトルート
+script_dir = Path(__file__).parent
+project_root = script_dir.parent
+DEFAULT_DB_PATH = project_root / "data" / "dmm_cache.sqlite3"
+
+SCHEMA_VERSION = 1
+
+# エンドポイントごとの (有効期限, 期限切れ後も古い値を返す猶予) 秒
+TTLS = {
+    "ItemList:cid": (7 * 24 * 3600, 23 * 24 * 3600),   # 品番指定の作品情報はほぼ変わらない
+    "ItemList": (3600, 5 * 3600),                        # ランキング・検索は毎日変わる
+    "detail_page": (30 * 24 * 3600, 60 * 24 * 3600),   # 作品ページのHTML
+}
+DEFAULT_TTL = (3600, 0)
+
+# キーに含めないパラメータ（認証情報は変わってもレスポンスは同じ）
+IGNORED_PARAMS = {"api_id", "affiliate_id"}
+
+
+def normalize_params(params: Dict[str, Any]) -> str:
+    """キー順に並べ、値を文字列にしたJSON（Noneと認証情報は除く）"""
+    normalized = {
+        key: str(value)
+        for key, value in params.items()
+        if value is not None and key not in IGNORED_PARAMS
+    }
+    return json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+
+
+def cache_key(endpoint: str, params: Dict[str, Any]) -> str:
+    return hashlib.sha1(f"{endpoint}\n{normalize_params(params)}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLiteのレスポンスキャッシュ（スレッドセーフ）"""
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH, ttls: Optional[Dict[str, tuple]] = None):
+        self.db_path = Path(db_path)
+        self.ttls = dict(TTLS if ttls is None else ttls)
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "revalidated": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        # 複数のスクリプトから同時に使えるようにWALにする
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS responses")
+            self.conn.execute("DROP TABLE IF EXISTS counters")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                params TEXT NOT NULL,
+                body TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS counters (
+                endpoint TEXT NOT NULL,
+                name TEXT NOT NULL,
+                value INTEGER NOT NULL,
+                PRIMARY KEY (endpoint, name)
+            )
+        """)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def close(self):
+        """裏で取り直し中の処理を待ってから閉じる"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def ttl(self, endpoint: str) -> tuple:
+        return self.ttls.get(endpoint, DEFAULT_TTL)
+
+    def _count(self, endpoint: str, name: str):
+        with self._lock:
+            self.stats[name] += 1
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO counters VALUES (?, ?, 1) "
+                    "ON CONFLICT (endpoint, name) DO UPDATE SET value = value + 1",
+                    (endpoint, name),
+                )
+
+    def get(self, endpoint: str, params: Dict[str, Any]) -> Optional[tuple]:
+        """(値, 取得からの経過秒) を返す（なければNone）"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT body, fetched_at FROM responses WHERE key = ?", (cache_key(endpoint, params),)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), time.time() - row[1]
+
+    def put(self, endpoint: str, params: Dict[str, Any], value: Any):
+        """値を保存する"""
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (cache_key(endpoint, params), endpoint, normalize_params(params),
+                     json.dumps(value, ensure_ascii=False), time.time()),
+                )
+
+    def fetch(self, endpoint: str, params: Dict[str, Any], fetch_func: Callable[[], Any]) -> Any:
+        """
+        キャッシュから取得し、なければ fetch_func() を呼んで保存する
+
+        - 有効期限内: キャッシュの値を返す
+        - 期限切れだが猶予期間内: キャッシュの値を返し、裏で fetch_func() を呼んで更新する
+        - それ以外: fetch_func() を呼ぶ（Noneが返った場合は保存しない）
+        """
+        fresh_for, stale_for = self.ttl(endpoint)
+        cached = self.get(endpoint, params)
+
+        if cached is not None:
+            value, age = cached
+            if age <= fresh_for:
+                self._count(endpoint, "hits")
+                return value
+            if age <= fresh_for + stale_for:
+                self._count(endpoint, "stale")
+                self._revalidate(endpoint, params, fetch_func)
+                return value
+
+        self._count(endpoint, "misses")
+        value = fetch_func()
+        if value is not None:
+            self.put(endpoint, params, value)
+        return value
+
+    def _revalidate(self, endpoint: str, params: Dict[str, Any], fetch_func: Callable[[], Any]):
+        """裏で取り直す（同じキーの取り直しは同時に1つだけ）"""
+        key = cache_key(endpoint, params)
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-revalidate")
+
+        def task():
+            try:
+                value = fetch_func()
+                if value is not None:
+                    self.put(endpoint, params, value)
+                    self._count(endpoint, "revalidated")
+            except Exception as e:
+                self._count(endpoint, "errors")
+                print(f"⚠️  キャッシュの更新に失敗しました（{endpoint}）: {e}", file=sys.stderr)
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        self._executor.submit(task)
+
+    def format_stats(self) -> str:
+        """このプロセスでのヒット・ミス数"""
+        total = self.stats["hits"] + self.stats["stale"] + self.stats["misses"]
+        rate = (self.stats["hits"] + self.stats["stale"]) / total * 100 if total else 0.0
+        return (f"🗄️  キャッシュ: ヒット {self.stats['hits']}件 / 期限切れヒット {self.stats['stale']}件 / "
+                f"ミス {self.stats['misses']}件（ヒット率 {rate:.1f}%）")
+
+    def summary(self) -> Dict[str, dict]:
+        """DB全体のエンドポイント別の件数と累計カウンタ"""
+        result: Dict[str, dict] = {}
+        now = time.time()
+        with self._lock:
+            rows = self.conn.execute("SELECT endpoint, fetched_at FROM responses").fetchall()
+            counters = self.conn.execute("SELECT endpoint, name, value FROM counters").fetchall()
+        for endpoint, fetched_at in rows:
+            entry = result.setdefault(endpoint, {"entries": 0, "fresh": 0})
+            entry["entries"] += 1
+            if now - fetched_at <= self.ttl(endpoint)[0]:
+                entry["fresh"] += 1
+        for endpoint, name, value in counters:
+            result.setdefault(endpoint, {"entries": 0, "fresh": 0})[name] = value
+        return result
+
+    def purge_expired(self) -> int:
+        """猶予期間も過ぎたエントリを削除"""
+        now = time.time()
+        removed = 0
+        with self._lock:
+            with self.conn:
+                for endpoint in {row[0] for row in self.conn.execute("SELECT DISTINCT endpoint FROM responses")}:
+                    fresh_for, stale_for = self.ttl(endpoint)
+                    removed += self.conn.execute(
+                        "DELETE FROM responses WHERE endpoint = ? AND fetched_at < ?",
+                        (endpoint, now - fresh_for - stale_for),
+                    ).rowcount
+        return removed
+
+    def clear(self):
+        """すべて削除"""
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM responses")
+                self.conn.execute("DELETE FROM counters")
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> ResponseCache:
+    """プロセス内で共有するキャッシュ（data/dmm_cache.sqlite3）"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="DMM APIレスポンスキャッシュの確認・掃除")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="キャッシュDBのパス")
+    parser.add_argument("--stats", action="store_true", help="エンドポイント別の件数とヒット・ミス数を表示")
+    parser.add_argument("--purge-expired", action="store_true", help="期限切れのエントリを削除")
+    parser.add_argument("--clear", action="store_true", help="すべて削除")
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.db)
+    try:
+        if args.clear:
+            cache.clear()
+            print("🗑️  キャッシュを削除しました")
+        if args.purge_expired:
+            print(f"🗑️  期限切れのエントリを{cache.purge_expired()}件削除しました")
+        if args.stats or not (args.clear or args.purge_expired):
+            summary = cache.summary()
+            if not summary:
+                print("（キャッシュは空です）")
+            for endpoint, entry in sorted(summary.items()):
+                hits = entry.get("hits", 0) + entry.get("stale", 0)
+                total = hits + entry.get("misses", 0)
+                rate = hits / total * 100 if total else 0.0
+                print(f"📦 {endpoint}: {entry['entries']}件（有効 {entry['fresh']}件） / "
+                      f"ヒット {entry.get('hits', 0)} / 期限切れヒット {entry.get('stale', 0)} / "
+                      f"ミス {entry.get('misses', 0)} / 更新 {entry.get('revalidated', 0)}（ヒット率 {rate:.1f}%）")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
 """
 失敗した記事の再試行スクリプト
-failed_articles.jsonから失敗した記事を読み込んで再生成を試みる
+ジョブキュー（data/generation_jobs.sqlite3）から再試行待ちが明けた記事を取り出して再生成を試みる
 """
 
 import os
-import json
 import sys
 import time
 import re
@@ -13,6 +12,9 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from gemini_pool import generate_content
+from gemini_prefix import create_model
+from job_queue import backoff_seconds, get_queue, migrate_legacy_failed_file, LEASE_LOST
 
 # .envファイルの読み込み
 try:
@@ -117,7 +119,7 @@ def create_article_prompt_from_prompt_file(prompt_file: Path) -> str | None:
 
 
 def create_article_prompt(product_info: dict) -> str:
-    """記事生成用のプロンプトを作成（bulk_generate_mature_drama_articles.pyと同じ）"""
+    """記事生成用のプロンプトを作成（bulk_generate_mature_drama_articles.pyと同じ、共通部分は SYSTEM_INSTRUCTION）"""
     return bulk_generate.create_article_prompt(product_info)
 
 
@@ -139,7 +141,8 @@ def generate_article_from_prompt(model: genai.GenerativeModel, prompt_text: str,
     
     for attempt in range(max_retries):
         try:
-            response = model.generate_content(
+            response = generate_content(
+                model,
                 prompt_text,
                 safety_settings=safety_settings,
                 generation_config=generation_config
@@ -199,7 +202,8 @@ def generate_article(model: genai.GenerativeModel, product_info: dict, max_retri
     
     for attempt in range(max_retries):
         try:
-            response = model.generate_content(
+            response = generate_content(
+                model,
                 prompt,
                 safety_settings=safety_settings,
                 generation_config=generation_config
@@ -241,8 +245,13 @@ def generate_article(model: genai.GenerativeModel, product_info: dict, max_retri
 
 
 def save_article(content: str, product_info: dict, publish_date: str, output_dir: Path, content_id: str, matched_genres: list) -> str | None:
-    """記事をMarkdownファイルとして保存（bulk_generate_mature_drama_articles.pyと同じ）"""
-    return bulk_generate.save_article(content, product_info, publish_date, output_dir, content_id, matched_genres)
+    """
+    記事をMarkdownファイルとして保存（bulk_generate_mature_drama_articles.pyと同じ）
+
+    検証エラー・既存記事と酷似で保存しなかった本文はキャッシュから消えるので、次のリトライでは生成し直す
+    """
+    return bulk_generate.save_article(content, product_info, publish_date, output_dir, content_id, matched_genres,
+                                      generated=content)
 
 
 def is_valid_genre(product_info: dict) -> tuple[bool, list]:
@@ -250,6 +259,17 @@ def is_valid_genre(product_info: dict) -> tuple[bool, list]:
     return bulk_generate.is_valid_genre(product_info)
 
 
+def report_failure(queue, job: dict, error: str) -> None:
+    """失敗をジョブキューに記録（回数が残っていれば待ち時間のあと再試行対象に戻る）"""
+    status = queue.fail(job["id"], error, job["lease_until"])
+    if status == LEASE_LOST:
+        print(f"   ⏭️  期限が切れ、別のプロセスが処理中のため記録しません")
+    elif status == "pending":
+        print(f"   ⏳ {backoff_seconds(job['attempts']) / 60:.0f}分後以降に再試行します")
+    else:
+        print(f"   🛑 {job['attempts']}回失敗したため再試行を打ち切りました（python3 scripts/job_queue.py --retry-failed で戻せます）")
+
+
 def main():
     """メイン処理"""
     print("\n" + "🔄" * 40)
@@ -271,25 +291,19 @@ def main():
     
     content_dir.mkdir(exist_ok=True)
     
-    # 失敗記事ファイルを読み込む
-    failed_file = data_dir / "failed_articles.json"
-    if not failed_file.exists():
-        print(f"❌ 失敗記事ファイルが見つかりません: {failed_file}", file=sys.stderr)
-        print("💡 まず bulk_generate_mature_drama_articles.py を実行してください", file=sys.stderr)
-        sys.exit(1)
-    
-    try:
-        with open(failed_file, "r", encoding="utf-8") as f:
-            failed_items = json.load(f)
-    except Exception as e:
-        print(f"❌ 失敗記事ファイルの読み込み失敗: {e}", file=sys.stderr)
-        sys.exit(1)
+    # ジョブキューから再試行できるジョブを取り出す（以前の failed_articles.json があれば先に取り込む）
+    queue = get_queue()
+    migrate_legacy_failed_file(queue)
+    failed_items = queue.lease(bulk_generate.JOB_KIND)
     
     if not failed_items:
         print("✅ 再試行する記事がありません")
+        counts = queue.counts(bulk_generate.JOB_KIND).get(bulk_generate.JOB_KIND, {})
+        if counts.get("waiting"):
+            print(f"⏳ 再試行待ちのジョブが{counts['waiting']}件あります（python3 scripts/job_queue.py --list pending）")
         sys.exit(0)
     
-    print(f"📖 {len(failed_items)}件の失敗記事を読み込みました\n")
+    print(f"📖 {len(failed_items)}件の失敗記事を取り出しました\n")
     
     # Gemini APIを初期化
     print("🤖 Gemini APIを初期化中...")
@@ -298,28 +312,36 @@ def main():
     model_name = "gemini-2.5-flash"
     print(f"✅ {model_name} を使用します\n")
     model = genai.GenerativeModel(model_name)
+    # 作品情報から生成するときは共通部分をシステムインストラクションにしたモデルを使う（プロンプトファイルは全文のまま）
+    prefix_model = create_model(model_name, bulk_generate.SYSTEM_INSTRUCTION)
     
     # 再試行
     success_count = 0
     fail_count = 0
-    still_failed = []
     
     # プロンプトディレクトリを設定
     prompts_dir = project_root / "prompts"
     
-    for idx, item in enumerate(failed_items, 1):
+    for idx, job in enumerate(failed_items, 1):
+        item = job["payload"]
         content_id = item.get("content_id", "")
         title = item.get("title", "不明")
         publish_date = item.get("publish_date", "")
         work = item.get("work", {})
         
-        print(f"[{idx}/{len(failed_items)}] 🔄 {title[:40]}...")
+        print(f"[{idx}/{len(failed_items)}] 🔄 {title[:40]}...（{job['attempts']}回目）")
         print(f"   公開日: {publish_date}")
         
+        # まとめて取り出してから時間が経っているので、始める前に期限を延ばす（別のプロセスが取り出し直していれば飛ばす）
+        if not queue.renew(job):
+            print(f"   ⏭️  スキップ（期限が切れ、別のプロセスが処理中）")
+            continue
+        
         # ジャンル判定
         is_valid, matched_genres = is_valid_genre(work)
         if not is_valid:
             print(f"   ⏭️  スキップ（対象外ジャンル）")
+            queue.cancel(job["id"], "対象外ジャンル")
             continue
         
         print(f"   ジャンル: {', '.join(matched_genres)}")
@@ -361,14 +383,14 @@ def main():
                 product_info = parse_prompt_file(prompt_file)
                 if product_info:
                     print(f"   ✍️  抽出した情報から記事生成中...")
-                    article_content = generate_article(model, product_info, max_retries=3)
+                    article_content = generate_article(prefix_model, product_info, max_retries=3)
         else:
             print(f"   ℹ️  プロンプトファイルが見つかりませんでした（{content_id}）")
         
         # プロンプトファイルがない場合は、work情報から生成
         if not article_content:
             print(f"   ✍️  保存された情報から記事生成中...")
-            article_content = generate_article(model, work, max_retries=3)
+            article_content = generate_article(prefix_model, work, max_retries=3)
         
         if article_content:
             # 保存
@@ -377,47 +399,26 @@ def main():
             if filepath:
                 print(f"   ✅ 保存完了")
                 success_count += 1
+                queue.complete(job["id"], job["lease_until"])
             else:
                 print(f"   ❌ 保存失敗")
                 fail_count += 1
-                still_failed.append(item)
+                report_failure(queue, job, "記事の保存に失敗しました")
         else:
             print(f"   ❌ 生成失敗")
             fail_count += 1
-            still_failed.append(item)
-        
-        # レート制限対策（再試行時は長めに待機）
-        if idx < len(failed_items):
-            wait_time = 20  # 20秒待機
-            print(f"   ⏳ {wait_time}秒待機中...")
-            time.sleep(wait_time)
+            report_failure(queue, job, "記事の生成に失敗しました")
         
         print()
     
-    # まだ失敗した記事を更新
-    if still_failed:
-        try:
-            with open(failed_file, "w", encoding="utf-8") as f:
-                json.dump(still_failed, f, ensure_ascii=False, indent=2)
-            print(f"📝 まだ失敗した記事を記録しました: {failed_file}")
-        except Exception as e:
-            print(f"⚠️  失敗記事の記録に失敗: {e}", file=sys.stderr)
-    else:
-        # すべて成功したらファイルを削除
-        try:
-            failed_file.unlink()
-            print(f"✅ すべて成功したため、失敗記事ファイルを削除しました")
-        except Exception as e:
-            print(f"⚠️  ファイル削除に失敗: {e}", file=sys.stderr)
-    
     # 完了メッセージ
     print("=" * 80)
     print("🎉 再試行完了！")
     print("=" * 80)
     print(f"✅ 成功: {success_count}本")
     print(f"❌ 失敗: {fail_count}本")
-    if still_failed:
-        print(f"💾 まだ失敗した記事は {failed_file} に保存されました")
+    if fail_count:
+        print(f"💾 まだ失敗した記事はジョブキューに残っています（python3 scripts/job_queue.py）")
     print(f"📁 保存先: {content_dir}")
     print("=" * 80)
     print()
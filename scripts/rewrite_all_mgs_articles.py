@@ -8,35 +8,13 @@ import re
 from pathlib import Path
 from datetime import datetime
 
+from article_frontmatter import extract_frontmatter
+
 # プロジェクトルート
 script_dir = Path(__file__).parent
 project_root = script_dir.parent
 content_dir = project_root / "content"
 
-def extract_frontmatter(content: str) -> tuple[dict, str]:
-    """フロントマターを抽出"""
-    if not content.startswith("---"):
-        return {}, content
-    
-    # フロントマターの終了位置を探す
-    end_pos = content.find("\n---", 3)
-    if end_pos == -1:
-        return {}, content
-    
-    frontmatter_text = content[4:end_pos].strip()
-    body = content[end_pos + 5:].strip()
-    
-    # フロントマターをパース
-    frontmatter = {}
-    for line in frontmatter_text.split("\n"):
-        if ":" in line:
-            key, value = line.split(":", 1)
-            key = key.strip()
-            value = value.strip().strip('"')
-            frontmatter[key] = value
-    
-    return frontmatter, body
-
 def rewrite_article_content(frontmatter: dict, body: str) -> str:
     """記事本文をDMM記事と同じ構成・スタイルに書き直す"""
     title = frontmatter.get("title", "")
@@ -32,12 +32,12 @@ echo "🚀 DMM API データ収集を開始..."
 python3 dmm_api_scraper.py
 
 # 収集結果の確認
-if [ -f "actress_videos.json" ]; then
+if [ -f "actress_videos.ndjson" ]; then
     echo ""
     echo "✅ データ収集完了"
     
     # ファイルサイズを表示
-    file_size=$(du -h actress_videos.json | cut -f1)
+    file_size=$(du -h actress_videos.ndjson | cut -f1)
     echo "📊 収集データサイズ: $file_size"
     
     # データ統合の実行確認
@@ -76,6 +76,6 @@ echo ""
 echo "🎉 処理完了!"
 echo ""
 echo "📋 次のステップ:"
-echo "   1. actress_videos.json の内容を確認"
+echo "   1. actress_videos.ndjson の内容を確認"
 echo "   2. 必要に応じて all_works.json を更新"
 echo "   3. サイトを再ビルド: npm run build"
@@ -6,7 +6,6 @@ MGStageのデータをスクレイピングするスクリプト
 
 import requests
 from bs4 import BeautifulSoup
-import json
 import time
 import random
 import os
@@ -15,6 +14,7 @@ from urllib.parse import urljoin
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
+from ndjson_store import NDJSONWriter
 
 # .envファイルの読み込み
 try:
@@ -44,7 +44,7 @@ if not AFFILIATE_ID:
 
 # 保存先
 OUTPUT_DIR = Path(__file__).parent.parent / "data"
-OUTPUT_FILE = OUTPUT_DIR / "mgs_scraped_data.json"
+OUTPUT_FILE = OUTPUT_DIR / "mgs_scraped_data.ndjson"
 # 取得ページ数
 MAX_PAGES = 5  # テスト用に少なめ。本番は100とかにする
 
@@ -67,12 +67,15 @@ def scrape_mgs(max_pages=MAX_PAGES, search_word=None, search_keywords=None, affi
         search_word: 検索キーワード（単一、後方互換性のため残す）
         search_keywords: 検索キーワードのリスト（複数対応）
         affiliate_id: アフィリエイトID（オプション、指定されない場合はグローバル変数を使用）
+    
+    Returns:
+        保存した件数（商品は取得するたびに OUTPUT_FILE へ1行ずつ書き出す）
     """
     # アフィリエイトIDの決定
     actual_affiliate_id = affiliate_id or AFFILIATE_ID
     if not actual_affiliate_id:
         print("❌ アフィリエイトIDが設定されていません", file=sys.stderr)
-        return []
+        return 0
     
     # 検索キーワードの決定
     if search_keywords:
@@ -83,7 +86,6 @@ def scrape_mgs(max_pages=MAX_PAGES, search_word=None, search_keywords=None, affi
         keywords = DEFAULT_SEARCH_KEYWORDS
     
     base_url = "https://www.mgstage.com/search/search.php"
-    results = []
     seen_content_ids = set()  # 重複チェック用
 
     # セッションを作成（年齢認証のクッキーを保持するため）
@@ -122,6 +124,13 @@ def scrape_mgs(max_pages=MAX_PAGES, search_word=None, search_keywords=None, affi
     print(f"🔍 検索キーワード: {', '.join(keywords)}")
     print(f"📝 合計 {len(keywords)}個のキーワードで検索します\n")
 
+    # 取得した商品は1件ずつ書き出す（途中で止まった場合は前回のファイルがそのまま残る）
+    writer = NDJSONWriter(
+        OUTPUT_FILE,
+        meta={"fetched_at": datetime.now().isoformat(), "affiliate_id": actual_affiliate_id},
+        count_by="search_keyword"
+    )
+
     # 各キーワードで検索を実行
     for keyword_idx, keyword in enumerate(keywords, 1):
         print(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
@@ -328,8 +337,8 @@ def scrape_mgs(max_pages=MAX_PAGES, search_word=None, search_keywords=None, affi
                         
                         # DMMのJSON形式に合わせる（ここが重要）
                         item_data = {
-                            "rank": len(results) + 1,
-                            "content_id": content_id or f"mgs_{len(results) + 1}",
+                            "rank": writer.count + 1,
+                            "content_id": content_id or f"mgs_{writer.count + 1}",
                             "title": title,
                             "url": link,
                             "affiliate_url": affiliate_url,
@@ -344,7 +353,7 @@ def scrape_mgs(max_pages=MAX_PAGES, search_word=None, search_keywords=None, affi
                             "service": "MGS",  # 判別用タグ
                             "search_keyword": keyword  # どのキーワードで見つかったか
                         }
-                        results.append(item_data)
+                        writer.write(item_data)
                         page_count += 1
                         keyword_results += 1
                         
@@ -377,21 +386,11 @@ def scrape_mgs(max_pages=MAX_PAGES, search_word=None, search_keywords=None, affi
             print(f"⏳ 次のキーワードまで {sleep_time:.1f}秒待機中...\n")
             time.sleep(sleep_time)
 
-    # 保存
-    OUTPUT_DIR.mkdir(exist_ok=True)
-    
-    output_data = {
-        "fetched_at": datetime.now().isoformat(),
-        "total_count": len(results),
-        "affiliate_id": actual_affiliate_id,
-        "ranking": results
-    }
-    
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    # 保存（末尾に件数のインデックスを書いて確定）
+    writer.close()
     
-    print(f"\n✅ 完了！ {len(results)}件のデータを保存しました: {OUTPUT_FILE}")
-    return results
+    print(f"\n✅ 完了！ {writer.count}件のデータを保存しました: {OUTPUT_FILE}")
+    return writer.count
 
 if __name__ == "__main__":
     import argparse
@@ -6,12 +6,12 @@
 import json
 import re
 import sys
-import time
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs, unquote
-import urllib.request
-import urllib.error
-import ssl
+
+from article_frontmatter import parse_frontmatter_text, read_frontmatter
+from dmm_client import DMMAPIError, get_client, parse_item
+from response_cache import get_default_cache
 
 # .envファイルの読み込み
 try:
@@ -31,85 +31,23 @@ import os
 
 def fetch_dmm_product_info(api_id: str, affiliate_id: str, content_id: str) -> dict | None:
     """DMM APIから作品情報を取得"""
-    base_url = "https://api.dmm.com/affiliate/v3/ItemList"
-    
-    params = {
-        "api_id": api_id,
-        "affiliate_id": affiliate_id,
-        "site": "FANZA",
-        "service": "digital",
-        "floor": "video",
-        "cid": content_id,
-        "output": "json"
-    }
-    
-    url = f"{base_url}?{urllib.parse.urlencode(params)}"
-    
     try:
-        # SSL証明書検証をスキップ（開発環境のみ）
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
-        req = urllib.request.Request(url)
-        with urllib.request.urlopen(req, timeout=10, context=ssl_context) as response:
-            data = json.loads(response.read().decode('utf-8'))
-            
-            if "result" in data and "items" in data["result"] and len(data["result"]["items"]) > 0:
-                item = data["result"]["items"][0]
-                
-                return {
-                    "content_id": item.get("content_id", ""),
-                    "title": item.get("title", ""),
-                    "genre": [genre.get("name", "") for genre in item.get("iteminfo", {}).get("genre", [])],
-                    "actress": [actress.get("name", "") for actress in item.get("iteminfo", {}).get("actress", [])],
-                    "maker": item.get("iteminfo", {}).get("maker", [{}])[0].get("name", "") if item.get("iteminfo", {}).get("maker") else "",
-                    "director": item.get("iteminfo", {}).get("director", [{}])[0].get("name", "") if item.get("iteminfo", {}).get("director") else "",
-                }
-            
-    except Exception as e:
+        item = get_client(api_id, affiliate_id).get_item(content_id, floor="video")
+    except DMMAPIError as e:
         print(f"⚠️  API取得エラー ({content_id}): {e}", file=sys.stderr)
         return None
     
-    return None
+    if item is None:
+        return None
+    
+    product_info = parse_item(item)
+    return {key: product_info[key] for key in ["content_id", "title", "genre", "actress", "maker", "director"]}
 
 
 def parse_markdown_file(file_path: Path) -> dict:
-    """Markdownファイルからfrontmatterを解析"""
+    """Markdownファイルからfrontmatterを解析（本文は読まない）"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # frontmatterを抽出
-        match = re.match(r'^---\n(.*?)\n---', content, re.DOTALL)
-        if not match:
-            return {}
-        
-        frontmatter_text = match.group(1)
-        frontmatter = {}
-        
-        # 各行をパース
-        for line in frontmatter_text.split('\n'):
-            if ':' in line:
-                key, value = line.split(':', 1)
-                key = key.strip()
-                value = value.strip().strip('"').strip("'")
-                
-                # 配列の処理
-                if value.startswith('[') and value.endswith(']'):
-                    # 配列から値を抽出
-                    array_content = value[1:-1]
-                    array_values = []
-                    for item in array_content.split(','):
-                        item = item.strip().strip('"').strip("'")
-                        if item:
-                            array_values.append(item)
-                    frontmatter[key] = array_values
-                else:
-                    frontmatter[key] = value
-        
-        return frontmatter
-        
+        return read_frontmatter(file_path).fields
     except Exception as e:
         print(f"⚠️  ファイル読み込みエラー ({file_path}): {e}", file=sys.stderr)
         return {}
@@ -122,15 +60,15 @@ def update_article_tags(file_path: Path, api_genres: list, api_actress: list, ap
             content = f.read()
         
         # frontmatterを抽出
-        match = re.match(r'^(---\n.*?\n---)', content, re.DOTALL)
+        match = re.match(r'^(---\n(.*?)\n---)', content, re.DOTALL)
         if not match:
             return False
         
         frontmatter_text = match.group(1)
         rest_content = content[len(frontmatter_text):]
         
-        # 既存のfrontmatterを解析
-        existing_frontmatter = parse_markdown_file(file_path)
+        # 既存のfrontmatterを解析（読み込み済みの内容を使う）
+        existing_frontmatter = parse_frontmatter_text(match.group(2))
         existing_tags = existing_frontmatter.get('tags', [])
         
         # 新しいタグリストを作成
@@ -291,8 +229,7 @@ def main():
             print(f"   ⚠️  タグの更新に失敗しました")
             error_count += 1
         
-        # API負荷軽減のため、少し待機
-        time.sleep(1)
+        # API負荷軽減の待機は dmm_client が実リクエストの前にだけ行う（キャッシュから返す場合は待たない）
     
     # 結果を表示
     print("\n" + "=" * 80)
@@ -301,6 +238,7 @@ def main():
     print(f"✅ 更新完了: {updated_count}件")
     print(f"⚠️  スキップ: {skipped_count}件")
     print(f"❌ エラー: {error_count}件")
+    print(get_default_cache().format_stats())
     print("=" * 80)
 
 
@@ -11,6 +11,9 @@ import time
 from datetime import datetime
 from pathlib import Path
 import google.generativeai as genai
+from near_duplicates import remember_article
+from article_validator import check_before_save
+from gemini_pool import generate_content
 
 
 def initialize_gemini(api_key: str):
@@ -113,7 +116,7 @@ def generate_article(model: genai.GenerativeModel, product_info: dict) -> str |
     prompt = create_prompt(product_info)
     
     try:
-        response = model.generate_content(prompt)
+        response = generate_content(model, prompt)
         
         # コンテンツがブロックされた場合のエラーハンドリング
         if not response.candidates:
@@ -185,9 +188,17 @@ tags: [{tags_str}]
     # 記事全体を作成
     full_content = frontmatter + content
     
+    # フロントマターの崩れ・プレースホルダー・画像URLを直し、既存記事とほぼ同じ文章なら保存しない
+    # （保存しない場合は生成した本文をキャッシュから消し、次の実行で生成し直す）
+    full_content = check_before_save(full_content, Path(output_dir), Path(filepath).stem, generated=content,
+                                     affiliate_url=affiliate_url)
+    if full_content is None:
+        return None
+    
     try:
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(full_content)
+        remember_article(Path(filepath), full_content)
         return filepath
     except IOError as e:
         print(f"❌ ファイルの保存に失敗: {e}", file=sys.stderr)
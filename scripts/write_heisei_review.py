@@ -14,10 +14,11 @@ import random
 from datetime import datetime
 from pathlib import Path
 import google.generativeai as genai
-import urllib.request
-import urllib.error
-import ssl
-from urllib.parse import urlencode, parse_qs, urlparse
+from urllib.parse import parse_qs, urlparse
+from near_duplicates import remember_article
+from article_validator import check_before_save
+from gemini_pool import generate_content
+from dmm_client import DMMAPIError, get_client, parse_item
 
 # .envファイルの読み込み
 try:
@@ -89,54 +90,18 @@ def fetch_dmm_product_info(api_id: str, affiliate_id: str, content_id: str) -> d
     Returns:
         商品情報の辞書、または None
     """
-    base_url = "https://api.dmm.com/affiliate/v3/ItemList"
-    
-    params = {
-        "api_id": api_id,
-        "affiliate_id": affiliate_id,
-        "site": "FANZA",
-        "service": "digital",
-        "floor": "videoa",
-        "cid": content_id,
-        "hits": 1,
-        "output": "json"
-    }
-    
-    url = f"{base_url}?{urlencode(params)}"
-    
     try:
-        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-        
-        req = urllib.request.Request(url)
-        with urllib.request.urlopen(req, context=context, timeout=30) as response:
-            data = response.read()
-            result = json.loads(data.decode('utf-8'))
-            
-            if "result" in result and "items" in result["result"] and len(result["result"]["items"]) > 0:
-                item = result["result"]["items"][0]
-                
-                return {
-                    "content_id": item.get("content_id", content_id),
-                    "title": item.get("title", ""),
-                    "url": item.get("URL", ""),
-                    "affiliate_url": item.get("affiliateURL", ""),
-                    "image_url": item.get("imageURL", {}).get("large", ""),
-                    "price": item.get("prices", {}).get("price", ""),
-                    "release_date": item.get("date", ""),
-                    "actress": [actress.get("name", "") for actress in item.get("iteminfo", {}).get("actress", [])],
-                    "genre": [genre.get("name", "") for genre in item.get("iteminfo", {}).get("genre", [])],
-                    "maker": item.get("iteminfo", {}).get("maker", [{}])[0].get("name", "") if item.get("iteminfo", {}).get("maker") else "",
-                    "director": item.get("iteminfo", {}).get("director", [{}])[0].get("name", "") if item.get("iteminfo", {}).get("director") else "",
-                    "description": item.get("review", {}).get("text", "") if item.get("review") else "",
-                }
-            else:
-                return None
-                
-    except Exception as e:
+        item = get_client(api_id, affiliate_id).get_item(content_id)
+    except DMMAPIError as e:
         print(f"❌ API取得エラー: {e}", file=sys.stderr)
         return None
+    
+    if item is None:
+        return None
+    
+    product_info = parse_item(item)
+    product_info["content_id"] = product_info["content_id"] or content_id
+    return product_info
 
 
 def get_random_angle() -> dict:
@@ -484,7 +449,7 @@ def generate_article(model: genai.GenerativeModel, product_info: dict, descripti
     prompt = create_prompt(product_info, description, example_article)
     
     try:
-        response = model.generate_content(prompt)
+        response = generate_content(model, prompt)
         
         if not response.candidates:
             if response.prompt_feedback and response.prompt_feedback.block_reason:
@@ -645,14 +610,23 @@ rating: {rating}
     filepath = os.path.join(output_dir, filename)
     
     # 動画プレーヤーを自動的に挿入
-    content = insert_video_player(content, content_id)
+    body = insert_video_player(content, content_id)
     
     # 記事全体を作成
-    full_content = frontmatter + content
+    full_content = frontmatter + body
+    
+    # フロントマターの崩れ・プレースホルダー・画像URLを直し、既存記事とほぼ同じ文章なら保存しない
+    # （保存しない場合は生成した本文をキャッシュから消し、次の実行で生成し直す）
+    full_content = check_before_save(full_content, Path(output_dir), Path(filepath).stem, generated=content,
+                                     required=("title", "date", "contentId"), affiliate_url=affiliate_url,
+                                     content_id=content_id)
+    if full_content is None:
+        return None
     
     try:
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(full_content)
+        remember_article(Path(filepath), full_content)
         return filepath
     except IOError as e:
         print(f"❌ ファイルの保存に失敗: {e}", file=sys.stderr)